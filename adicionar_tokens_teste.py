@@ -17,6 +17,7 @@ def adicionar_tokens_teste():
             quantidade=1000,
             descricao="Tokens para testes de votação DAO"
         )
+        db.commit()
 
         if resultado['sucesso']:
             print(f"✅ {resultado['mensagem']}")
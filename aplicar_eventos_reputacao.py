@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Job de reputação: aplica os eventos pendentes de eventos_reputacao
+
+Uso:
+    python aplicar_eventos_reputacao.py              # aplica os eventos pendentes
+    python aplicar_eventos_reputacao.py --recalcular # também refaz todas as reputações a partir do histórico
+"""
+import sys
+
+from app.models.database import SessionLocal
+from app.utils.crypto_manager import ReputacaoManager
+
+
+def aplicar(recalcular: bool = False):
+    db = SessionLocal()
+    try:
+        rep_manager = ReputacaoManager(db)
+
+        total = 0
+        while True:
+            resultado = rep_manager.aplicar_eventos()
+            db.commit()
+            if not resultado["eventos_aplicados"]:
+                break
+            total += resultado["eventos_aplicados"]
+
+        print(f"✅ {total} eventos de reputação aplicados")
+
+        if recalcular:
+            resultado = rep_manager.recalcular_reputacao()
+            db.commit()
+
+            if resultado["carteiras_corrigidas"]:
+                print(f"⚠️  {resultado['carteiras_corrigidas']} carteiras divergentes do histórico corrigidas:")
+                for usuario in resultado["usuarios"][:20]:
+                    print(f"   {usuario}")
+            else:
+                print("✅ Todas as reputações batem com o histórico")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    aplicar(recalcular="--recalcular" in sys.argv)
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy import func
+import asyncio
 import os
 
 from app.models.database import get_db, init_db, Produto, Preco, Alerta, Carteira, Transacao, Comentario, Sugestao, Voto, StatusSugestao, ValidacaoPreco, Moderador
@@ -35,13 +36,27 @@ from app.models.schemas_reputacao import (
     ContribuicaoParaValidar
 )
 from app.scrapers.scraper_manager import ScraperManager
-from app.scrapers.scraper_tempo_real import scraper_tempo_real
+from app.scrapers.cliente_http import registro_http
+from app.scrapers.servico_navegadores import servico_navegadores
+from app.scrapers.saude_fontes import saude_fontes
 from app.utils.comparador import Comparador
 from app.utils.geolocalizacao import (
     GeoLocalizacao, AnalisadorCustoBeneficio, ranquear_precos_por_custo_beneficio
 )
 from app.utils.crypto_manager import CryptoManager
+from app.utils.ingestao import IngestaoPrecos
+from app.utils.estatisticas import EstatisticasMaterializadas
+from app.utils.contadores import ContadoresGlobais
+from app.utils.consenso import ConsensoPrecos, TODOS
+from app.utils.ofertas import RankingOfertas
+from app.utils.produtos import resolver_produto, normalizar_ean
 from app.utils.price_updater import price_updater
+from app.utils.execucao_unica import execucao_unica, chave_busca
+from app.utils.agenda_atualizacao import AgendadorAtualizacao
+from app.utils.tarefas import (
+    executar, buscar_tempo_real, ocr_nota_fiscal, ocr_foto_preco, ocr_hibrido, codificar_imagem,
+    PRIORIDADE_USUARIO, PRIORIDADE_OCR
+)
 
 app = FastAPI(
     title="Comparador de Preços",
@@ -80,8 +95,8 @@ init_db()
 scraper_manager = ScraperManager()
 comparador = Comparador()
 
-# Iniciar agendador de atualização de preços (a cada 7 horas)
-price_updater.start(interval_hours=7)
+# Iniciar agendador de atualização de preços (ciclos curtos da agenda por demanda)
+price_updater.start()
 
 
 @app.get("/api")
@@ -108,6 +123,36 @@ async def listar_supermercados():
     }
 
 
+@app.get("/api/scrapers/cache-http")
+async def metricas_cache_http():
+    """Acertos, revalidações (304) e faltas do cache HTTP dos scrapers"""
+    cache = registro_http.cache()
+    if cache is None:
+        return {"ativo": False}
+    return {"ativo": True, **cache.metricas()}
+
+
+@app.get("/api/atualizacao/agenda")
+async def agenda_atualizacao(db: Session = Depends(get_db)):
+    """Agenda de atualização por demanda: vencidos, sem data e os produtos mais demandados"""
+    return AgendadorAtualizacao(db).resumo()
+
+
+@app.get("/api/scrapers/navegadores")
+async def saude_trabalhadores_navegador():
+    """Processos trabalhadores de Selenium/Playwright: tarefas, timeouts, quedas e reciclagens"""
+    return servico_navegadores.saude()
+
+
+@app.get("/api/scrapers/saude")
+async def saude_fontes_scraping():
+    """
+    Saúde por fonte: disjuntor, taxa de sucesso e latência p50/p95 das últimas chamadas
+    (deste processo; com CELERY_BROKER_URL o scraping roda nos workers)
+    """
+    return saude_fontes.resumo()
+
+
 @app.post("/api/buscar")
 async def buscar_produtos(
     request: BuscaRequest,
@@ -143,6 +188,9 @@ async def buscar_produtos(
             "tokens_gastos": resultado_gasto["tokens_gastos"],
             "saldo_restante": resultado_gasto["saldo_atual"]
         }
+        # Débito confirmado antes da busca: se o scraping (ou a gravação dele) falhar,
+        # o rollback da parte do scraping não devolve o custo da busca
+        db.commit()
 
     produtos_encontrados = []
 
@@ -155,8 +203,15 @@ async def buscar_produtos(
         Preco.disponivel == True
     ).order_by(Preco.data_coleta.desc()).all()  # MAIS RECENTES PRIMEIRO!
 
+    # Preço de referência (consenso da loja ou do produto): 1 SELECT pela chave para todos os resultados
+    consenso = ConsensoPrecos(db)
+    consensos = consenso.obter(
+        par for preco in precos_db for par in ((preco.produto_id, preco.supermercado), (preco.produto_id, TODOS))
+    )
+
     # Add products from database (PRODUTOS REAIS)
     for preco in precos_db:
+        referencia = consenso.referencia(preco.produto_id, preco.supermercado, consensos)
         produto_dict = {
             'nome': preco.produto.nome,
             'marca': preco.produto.marca,
@@ -170,70 +225,71 @@ async def buscar_produtos(
             'latitude': preco.latitude,
             'longitude': preco.longitude,
             'endereco': preco.endereco,
+            'preco_referencia': round(referencia.mediana, 2) if referencia else None,
             'produto_real': True  # MARCAR COMO REAL!
         }
         produtos_encontrados.append(produto_dict)
 
     print(f"   📦 Encontrados {len(produtos_encontrados)} produtos REAIS no banco de dados")
 
+    # Demanda para a agenda de atualização: produto buscado fica mais fresco
+    AgendadorAtualizacao(db).registrar_busca(preco.produto_id for preco in precos_db)
+    db.commit()
+
     # ✨ NOVO: Scraping em tempo real quando usuário busca
     # Tenta buscar preços REAIS daquele momento nos supermercados
     scraped_count = 0
     try:
         print(f"\n🔍 Usuário buscou '{request.termo}' - Iniciando scraping em tempo real...")
 
-        # Usar scraper otimizado para tempo real
-        produtos_scraped = scraper_tempo_real.buscar_todos(
-            request.termo,
-            max_por_fonte=10,
-            lat_usuario=request.latitude,
-            lon_usuario=request.longitude
+        # Usar scraper otimizado para tempo real (tarefa da fila, prioridade de usuário).
+        # Buscas simultâneas do mesmo termo esperam a primeira e recebem o mesmo
+        # resultado (já gravado por ela)
+        produtos_scraped, compartilhado = await execucao_unica.executar_async(
+            chave_busca("tempo_real", request.termo, request.latitude, request.longitude),
+            lambda: executar(
+                buscar_tempo_real, request.termo, request.latitude, request.longitude,
+                prioridade=PRIORIDADE_USUARIO, timeout=60
+            )
         )
 
-        # Salvar novos produtos no banco
-        for item in produtos_scraped:
-            try:
-                # Verificar se produto existe
-                produto = db.query(Produto).filter(
-                    Produto.nome.ilike(f"%{item['nome'][:50]}%")
-                ).first()
-
-                if not produto:
-                    produto = Produto(
-                        nome=item['nome'],
-                        marca=item.get('marca'),
-                        categoria=None
-                    )
-                    db.add(produto)
-                    db.flush()
-
-                # Adicionar preço
-                preco = Preco(
-                    produto_id=produto.id,
-                    supermercado=item['supermercado'],
-                    preco=item['preco'],
-                    preco_original=item.get('preco_original'),
-                    em_promocao=item.get('em_promocao', False),
-                    url=item.get('url', '#'),
-                    disponivel=item.get('disponivel', True),
-                    data_coleta=datetime.now(),
-                    manual=False  # Marcado como scraping automático
-                )
-                db.add(preco)
-
-                # Adicionar aos resultados
-                item['fonte'] = 'scraper_tempo_real'
-                item['data_coleta'] = datetime.now().isoformat()
-                item['produto_real'] = item.get('fonte') != 'gerador_sob_demanda'  # SE é gerador, NÃO é real
-                produtos_encontrados.append(item)
-                scraped_count += 1
+        # Salvar novos produtos no banco (em lote)
+        agora = datetime.now()
+        registros = [] if compartilhado else [
+            {
+                'nome': item['nome'],
+                'marca': item.get('marca'),
+                'ean': item.get('ean'),
+                'supermercado': item['supermercado'],
+                'preco': item['preco'],
+                'preco_original': item.get('preco_original'),
+                'em_promocao': item.get('em_promocao', False),
+                'url': item.get('url', '#'),
+                'disponivel': item.get('disponivel', True),
+                'data_coleta': agora,
+                'manual': False  # Marcado como scraping automático
+            }
+            for item in produtos_scraped
+            if item.get('nome') and item.get('preco')
+        ]
+        IngestaoPrecos(db).ingerir(registros)
+        db.commit()
 
-            except Exception as e:
-                print(f"   Erro ao salvar produto: {e}")
+        for item in produtos_scraped:
+            if not (item.get('nome') and item.get('preco')):
                 continue
 
-        db.commit()
-        print(f"   ✅ {scraped_count} novos preços salvos no banco")
+            # Adicionar aos resultados
+            item['fonte'] = 'scraper_tempo_real'
+            item['data_coleta'] = agora.isoformat()
+            item['produto_real'] = item.get('fonte') != 'gerador_sob_demanda'  # SE é gerador, NÃO é real
+            produtos_encontrados.append(item)
+            scraped_count += 1
+
+        if compartilhado:
+            print(f"   🔁 {scraped_count} preços compartilhados de uma busca simultânea")
+        else:
+            print(f"   ✅ {scraped_count} novos preços salvos no banco")
 
     except Exception as e:
         print(f"   ⚠️  Erro no scraping em tempo real: {e}")
@@ -345,6 +401,43 @@ async def listar_produtos(
     return produtos
 
 
+@app.get("/api/produtos/ean/{codigo}")
+async def buscar_produto_por_ean(
+    codigo: str,
+    dias: int = Query(default=30, ge=1, le=90),
+    db: Session = Depends(get_db)
+):
+    """Busca um produto pelo código de barras (EAN/GTIN) com o último preço de cada supermercado"""
+    ean = normalizar_ean(codigo)
+    if not ean:
+        raise HTTPException(status_code=400, detail="Código de barras inválido")
+
+    produto = db.query(Produto).filter(Produto.ean == ean).first()
+    if not produto:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+
+    data_limite = datetime.now() - timedelta(days=dias)
+
+    precos = db.query(Preco).filter(
+        Preco.produto_id == produto.id,
+        Preco.data_coleta >= data_limite
+    ).order_by(Preco.data_coleta.desc()).all()
+
+    # Último preço de cada supermercado, do mais barato para o mais caro
+    ultimos = {}
+    for preco in precos:
+        ultimos.setdefault(preco.supermercado, preco)
+    precos_atuais = sorted(ultimos.values(), key=lambda p: p.preco)
+
+    return {
+        "produto": produto,
+        "ean": ean,
+        "periodo_dias": dias,
+        "precos": precos_atuais,
+        "melhor_preco": precos_atuais[0] if precos_atuais else None
+    }
+
+
 @app.get("/api/produtos/{produto_id}/historico")
 async def historico_precos(
     produto_id: int,
@@ -422,18 +515,24 @@ async def deletar_alerta(
 
 @app.get("/api/melhores-ofertas")
 async def melhores_ofertas(
-    limite: int = Query(default=10, ge=1, le=50),
+    limite: int = Query(default=10, ge=1, le=RankingOfertas.TAMANHO),
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    distancia_maxima_km: Optional[float] = 5.0,
     db: Session = Depends(get_db)
 ):
-    """Lista as melhores ofertas disponíveis"""
-    data_limite = datetime.now() - timedelta(hours=24)
+    """
+    Lista as promoções das últimas 24h com maior desconto
+    Com latitude/longitude, só as que estão dentro de distancia_maxima_km
+    """
+    ranking = RankingOfertas(db)
 
-    # Get products on sale
-    precos = db.query(Preco).filter(
-        Preco.em_promocao == True,
-        Preco.data_coleta >= data_limite,
-        Preco.disponivel == True
-    ).order_by(Preco.preco.asc()).limit(limite).all()
+    if latitude is not None and longitude is not None:
+        precos = [
+            preco for preco, _ in ranking.proximas(limite, latitude, longitude, distancia_maxima_km or 5.0)
+        ]
+    else:
+        precos = ranking.melhores(limite)
 
     return {
         "total": len(precos),
@@ -455,19 +554,10 @@ async def adicionar_preco_manual(
     Permite que usuários contribuam adicionando preços manualmente
     RECOMPENSA: 10 tokens por contribuição!
     """
-    # Busca ou cria o produto
-    produto = db.query(Produto).filter(
-        Produto.nome.ilike(f"%{contribuicao.produto_nome}%")
-    ).first()
-
-    if not produto:
-        produto = Produto(
-            nome=contribuicao.produto_nome,
-            marca=contribuicao.produto_marca,
-            categoria=None  # Pode ser categorizado depois
-        )
-        db.add(produto)
-        db.flush()
+    # Busca ou cria o produto (pela chave canônica)
+    produto = resolver_produto(
+        db, contribuicao.produto_nome, contribuicao.produto_marca, ean=contribuicao.produto_ean
+    )
 
     # Adiciona o preço
     novo_preco = Preco(
@@ -489,8 +579,10 @@ async def adicionar_preco_manual(
     )
 
     db.add(novo_preco)
-    db.commit()
-    db.refresh(novo_preco)
+    EstatisticasMaterializadas(db).registrar_contribuicoes([{
+        "supermercado": novo_preco.supermercado, "data_coleta": novo_preco.data_coleta
+    }])
+    db.flush()  # id do preço para a recompensa e a validação (commit único no final)
 
     # Sistema de tokens: recompensar pela contribuição
     crypto = CryptoManager(db)
@@ -504,6 +596,18 @@ async def adicionar_preco_manual(
     rep_manager = ReputacaoManager(db)
     validacao_resultado = rep_manager.validar_preco_automaticamente(novo_preco.id)
 
+    # Depois da comparação, o preço entra no consenso (e, se for promoção, no ranking de ofertas)
+    ConsensoPrecos(db).registrar([{
+        "produto_id": produto.id, "supermercado": novo_preco.supermercado, "preco": novo_preco.preco,
+        "usuario_nome": novo_preco.usuario_nome, "data_coleta": novo_preco.data_coleta
+    }])
+    RankingOfertas(db).registrar([{
+        "id": novo_preco.id, "supermercado": novo_preco.supermercado, "em_promocao": novo_preco.em_promocao,
+        "desconto_percentual": 0.0, "data_coleta": novo_preco.data_coleta
+    }])
+
+    db.commit()
+
     return {
         "contribuicao": ContribuicaoResponse(
             id=novo_preco.id,
@@ -556,48 +660,31 @@ async def listar_contribuicoes(
 
 @app.get("/api/estatisticas-contribuicoes", response_model=EstatisticasContribuicao)
 async def estatisticas_contribuicoes(db: Session = Depends(get_db)):
-    """Estatísticas sobre contribuições dos usuários"""
-
-    total_contribuicoes = db.query(Preco).filter(Preco.manual == True).count()
-
-    produtos_unicos = db.query(func.count(func.distinct(Preco.produto_id))).filter(
-        Preco.manual == True
-    ).scalar()
+    """Estatísticas sobre contribuições dos usuários (servidas das estatísticas materializadas)"""
+    estatisticas = EstatisticasMaterializadas(db)
+    hoje = f"{EstatisticasMaterializadas.PREFIXO_DIA}{datetime.now().date().isoformat()}"
 
-    supermercados_unicos = db.query(func.count(func.distinct(Preco.supermercado))).filter(
-        Preco.manual == True
-    ).scalar()
-
-    hoje = datetime.now().date()
-    contribuicoes_hoje = db.query(Preco).filter(
-        Preco.manual == True,
-        func.date(Preco.data_coleta) == hoje
-    ).count()
-
-    ultima = db.query(Preco).filter(Preco.manual == True).order_by(
-        Preco.data_coleta.desc()
-    ).first()
+    valores = estatisticas.obter(["contribuicoes.total", "contribuicoes.produtos", "contribuicoes.ultima", hoje])
+    supermercados = estatisticas.obter_prefixo(EstatisticasMaterializadas.PREFIXO_SUPERMERCADO)
 
     return EstatisticasContribuicao(
-        total_contribuicoes=total_contribuicoes,
-        total_produtos=produtos_unicos or 0,
-        total_supermercados=supermercados_unicos or 0,
-        contribuicoes_hoje=contribuicoes_hoje,
-        ultima_contribuicao=ultima.data_coleta if ultima else None
+        total_contribuicoes=int(valores["contribuicoes.total"]),
+        total_produtos=int(valores["contribuicoes.produtos"]),
+        total_supermercados=len(supermercados),
+        contribuicoes_hoje=int(valores[hoje]),
+        ultima_contribuicao=datetime.fromtimestamp(valores["contribuicoes.ultima"]) if valores["contribuicoes.ultima"] else None
     )
 
 
 @app.get("/api/supermercados-contribuidos")
 async def listar_supermercados_contribuidos(db: Session = Depends(get_db)):
     """Lista supermercados que já receberam contribuições"""
-    supermercados = db.query(Preco.supermercado, func.count(Preco.id)).filter(
-        Preco.manual == True
-    ).group_by(Preco.supermercado).all()
+    supermercados = EstatisticasMaterializadas(db).obter_prefixo(EstatisticasMaterializadas.PREFIXO_SUPERMERCADO)
 
     return {
         "supermercados": [
-            {"nome": s[0], "total_precos": s[1]}
-            for s in supermercados
+            {"nome": nome, "total_precos": int(total)}
+            for nome, total in supermercados.items()
         ]
     }
 
@@ -608,8 +695,6 @@ async def extrair_preco_de_foto(file: UploadFile = File(...)):
     Extrai preço e informações do produto de uma foto usando OCR
     """
     try:
-        from app.utils.ocr import get_ocr_instance
-
         # Ler arquivo
         contents = await file.read()
 
@@ -621,9 +706,10 @@ async def extrair_preco_de_foto(file: UploadFile = File(...)):
         if len(contents) > 10 * 1024 * 1024:
             raise HTTPException(status_code=400, detail="Imagem muito grande (max 10MB)")
 
-        # Processar com OCR
-        ocr = get_ocr_instance()
-        resultado = ocr.extrair_de_imagem(contents)
+        # Processar com OCR (tarefa da fila)
+        resultado = await asyncio.to_thread(
+            executar, ocr_foto_preco, codificar_imagem(contents), prioridade=PRIORIDADE_OCR
+        )
 
         if 'erro' in resultado:
             return {
@@ -673,13 +759,13 @@ async def contribuir_com_foto(
     Contribuir direto com foto - extrai dados e salva automaticamente
     """
     try:
-        from app.utils.ocr import get_ocr_instance
         import base64
 
         # Extrair dados da foto
         contents = await file.read()
-        ocr = get_ocr_instance()
-        resultado = ocr.extrair_de_imagem(contents)
+        resultado = await asyncio.to_thread(
+            executar, ocr_foto_preco, codificar_imagem(contents), prioridade=PRIORIDADE_OCR
+        )
 
         if 'erro' in resultado or not resultado.get('preco'):
             raise HTTPException(
@@ -692,19 +778,8 @@ async def contribuir_com_foto(
         foto_url = f"data:image/jpeg;base64,{foto_base64[:100]}..."  # Truncado
 
         # Criar produto se não existir
-        produto_nome = resultado.get('produto_nome', 'Produto da Foto')
-        produto = db.query(Produto).filter(
-            Produto.nome.ilike(f"%{produto_nome}%")
-        ).first()
-
-        if not produto:
-            produto = Produto(
-                nome=produto_nome,
-                marca=resultado.get('marca'),
-                categoria=None
-            )
-            db.add(produto)
-            db.flush()
+        produto_nome = resultado.get('produto_nome') or 'Produto da Foto'
+        produto = resolver_produto(db, produto_nome, resultado.get('marca'))
 
         # Adicionar preço
         novo_preco = Preco(
@@ -725,6 +800,13 @@ async def contribuir_com_foto(
         )
 
         db.add(novo_preco)
+        EstatisticasMaterializadas(db).registrar_contribuicoes([{
+            "supermercado": novo_preco.supermercado, "data_coleta": novo_preco.data_coleta
+        }])
+        ConsensoPrecos(db).registrar([{
+            "produto_id": produto.id, "supermercado": novo_preco.supermercado, "preco": novo_preco.preco,
+            "usuario_nome": novo_preco.usuario_nome, "data_coleta": novo_preco.data_coleta
+        }])
         db.commit()
         db.refresh(novo_preco)
 
@@ -790,8 +872,6 @@ async def escanear_nota_fiscal(
             resultado = json.loads(dados_manuais)
         # Modo 2: Upload de arquivo (automático)
         elif file:
-            from app.utils.ocr_nota_fiscal import get_ocr_nota_fiscal
-
             # Validar arquivo
             contents = await file.read()
 
@@ -801,9 +881,10 @@ async def escanear_nota_fiscal(
             if len(contents) > 10 * 1024 * 1024:
                 raise HTTPException(status_code=400, detail="Imagem muito grande (max 10MB)")
 
-            # Processar nota fiscal
-            ocr = get_ocr_nota_fiscal()
-            resultado = ocr.processar_nota_fiscal(contents)
+            # Processar nota fiscal (tarefa da fila)
+            resultado = await asyncio.to_thread(
+                executar, ocr_nota_fiscal, codificar_imagem(contents), prioridade=PRIORIDADE_OCR
+            )
             print(f"DEBUG - Resultado OCR: sucesso={resultado.get('sucesso')}, produtos={len(resultado.get('produtos', []))}")
         else:
             raise HTTPException(status_code=400, detail="Envie um arquivo ou dados manuais")
@@ -837,86 +918,52 @@ async def escanear_nota_fiscal(
         #     except:
         #         pass  # Se não conseguiu parsear, continua
 
-        # Salvar produtos no banco
-        produtos_salvos = []
-        total_tokens_ganhos = 0
-
-        for item in resultado['produtos']:
-            # Buscar ou criar produto
-            produto = db.query(Produto).filter(
-                Produto.nome.ilike(f"%{item['nome'][:50]}%")
-            ).first()
-
-            if not produto:
-                produto = Produto(
-                    nome=item['nome'],
-                    marca=None,
-                    categoria=None
-                )
-                db.add(produto)
-                db.flush()
-
-            # Verificar se já existe preço similar (evitar duplicatas)
-            from sqlalchemy import func, and_
-            hoje = datetime.now().date()
-
-            preco_existente = db.query(Preco).filter(
-                and_(
-                    Preco.produto_id == produto.id,
-                    Preco.supermercado == resultado['supermercado'],
-                    Preco.preco == item['preco'],
-                    func.date(Preco.data_coleta) == hoje,
-                    Preco.usuario_nome == usuario_nome
-                )
-            ).first()
-
-            if preco_existente:
-                # Já foi adicionado hoje, pular
-                produtos_salvos.append({
-                    'id': preco_existente.id,
-                    'nome': item['nome'],
-                    'preco': item['preco'],
-                    'quantidade': item.get('quantidade', 1),
-                    'duplicado': True
-                })
-                continue
-
-            # Adicionar preço
-            novo_preco = Preco(
-                produto_id=produto.id,
-                supermercado=resultado['supermercado'],
-                preco=item['preco'],
-                em_promocao=False,
-                manual=True,
-                usuario_nome=usuario_nome,
-                localizacao=endereco,
-                observacao=f"Extraído de nota fiscal. Qtd: {item.get('quantidade', 1)}. Data nota: {resultado.get('data_compra', 'N/A')}",
-                disponivel=True,
-                verificado=resultado.get('verificado', False),
-                data_coleta=datetime.now(),  # Sempre usar data atual para busca funcionar
-                latitude=latitude,
-                longitude=longitude,
-                endereco=endereco
-            )
+        # Salvar produtos no banco (em lote)
+        agora = datetime.now()
+        registros = [
+            {
+                'nome': item['nome'],
+                'ean': item.get('ean'),
+                'supermercado': resultado['supermercado'],
+                'preco': item['preco'],
+                'em_promocao': False,
+                'manual': True,
+                'usuario_nome': usuario_nome,
+                'localizacao': endereco,
+                'observacao': f"Extraído de nota fiscal. Qtd: {item.get('quantidade', 1)}. Data nota: {resultado.get('data_compra', 'N/A')}",
+                'disponivel': True,
+                'verificado': resultado.get('verificado', False),
+                'data_coleta': agora,  # Sempre usar data atual para busca funcionar
+                'latitude': latitude,
+                'longitude': longitude,
+                'endereco': endereco
+            }
+            for item in resultado['produtos']
+        ]
 
-            db.add(novo_preco)
-            db.flush()
+        # Preço igual do mesmo usuário hoje = duplicata (evita recompensa repetida)
+        ingestao = IngestaoPrecos(db).ingerir(
+            registros,
+            usuario_nome=usuario_nome,
+            recompensa_por_item=CryptoManager.RECOMPENSA_CONTRIBUICAO,
+            descricao_recompensa=f"Recompensa por nota fiscal ({len(registros)} produtos)",
+            duplicata_por=("produto_id", "supermercado", "preco", "usuario_nome"),
+            duplicata_desde=datetime.combine(agora.date(), datetime.min.time())
+        )
 
-            produtos_salvos.append({
-                'id': novo_preco.id,
-                'nome': produto.nome,
+        produtos_salvos = []
+        for item, salvo in zip(resultado['produtos'], ingestao['itens']):
+            produto_salvo = {
+                'id': salvo['id'],
+                'nome': item['nome'],
                 'preco': item['preco'],
                 'quantidade': item.get('quantidade', 1)
-            })
-
-            # Recompensar com tokens
-            if usuario_nome:
-                crypto = CryptoManager(db)
-                recompensa = crypto.minerar_tokens(
-                    usuario_nome=usuario_nome,
-                    preco_id=novo_preco.id
-                )
-                total_tokens_ganhos += recompensa['tokens_ganhos']
+            }
+            if salvo['duplicado']:
+                produto_salvo['duplicado'] = True
+            produtos_salvos.append(produto_salvo)
+
+        total_tokens_ganhos = ingestao['tokens_ganhos']
 
         db.commit()
 
@@ -950,15 +997,14 @@ async def preview_nota_fiscal(file: UploadFile = File(...)):
     Útil para o usuário revisar antes de confirmar
     """
     try:
-        from app.utils.ocr_nota_fiscal import get_ocr_nota_fiscal
-
         contents = await file.read()
 
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Arquivo deve ser uma imagem")
 
-        ocr = get_ocr_nota_fiscal()
-        resultado = ocr.processar_nota_fiscal(contents)
+        resultado = await asyncio.to_thread(
+            executar, ocr_nota_fiscal, codificar_imagem(contents), prioridade=PRIORIDADE_OCR
+        )
 
         return resultado
 
@@ -1029,59 +1075,40 @@ async def ocr_claude_vision(
         else:
             data_compra = datetime.now()
 
-        produtos_adicionados = []
-        crypto_manager = CryptoManager(db)
-
-        for produto_data in produtos_validos:
-            # Buscar ou criar produto
-            produto = db.query(Produto).filter(
-                func.lower(Produto.nome) == func.lower(produto_data['nome'])
-            ).first()
+        registros = [
+            {
+                'nome': produto_data['nome'],
+                'ean': produto_data.get('ean'),
+                'categoria': 'Geral',
+                'supermercado': supermercado,
+                'preco': produto_data['preco'],
+                'data_coleta': data_compra,
+                'manual': True,
+                'disponivel': True,
+                'endereco': resultado.get('endereco'),
+                'url': None
+            }
+            for produto_data in produtos_validos
+        ]
 
-            if not produto:
-                produto = Produto(
-                    nome=produto_data['nome'],
-                    categoria='Geral'
-                )
-                db.add(produto)
-                db.flush()
-
-            # Criar preço
-            preco = Preco(
-                produto_id=produto.id,
-                supermercado=supermercado,
-                preco=produto_data['preco'],
-                data_coleta=data_compra,
-                manual=True,
-                disponivel=True,
-                endereco=resultado.get('endereco'),
-                url=None
-            )
-            db.add(preco)
-            db.flush()
+        # Gravar em lote e recompensar usuário (10 tokens por produto) em um só lançamento
+        ingestao = IngestaoPrecos(db).ingerir(
+            registros,
+            usuario_nome=usuario_nome,
+            recompensa_por_item=CryptoManager.RECOMPENSA_CONTRIBUICAO,
+            descricao_recompensa=f"Contribuição via OCR Claude Vision: {len(registros)} produtos"
+        )
 
-            produtos_adicionados.append({
-                "produto_id": produto.id,
-                "nome": produto.nome,
-                "preco": preco.preco,
+        produtos_adicionados = [
+            {
+                "produto_id": item["produto_id"],
+                "nome": item["nome"],
+                "preco": item["preco"],
                 "supermercado": supermercado
-            })
-
-        # Recompensar usuário com tokens se forneceu nome
-        tokens_ganhos = 0
-        if usuario_nome:
-            tokens_por_produto = 10  # 10 tokens por produto
-            total_tokens = len(produtos_adicionados) * tokens_por_produto
-
-            try:
-                crypto_manager.adicionar_tokens(
-                    usuario_nome,
-                    total_tokens,
-                    f"Contribuição via OCR Claude Vision: {len(produtos_adicionados)} produtos"
-                )
-                tokens_ganhos = total_tokens
-            except:
-                pass  # Falha silenciosa se usuário não existe
+            }
+            for item in ingestao["itens"]
+        ]
+        tokens_ganhos = ingestao["tokens_ganhos"]
 
         db.commit()
 
@@ -1126,17 +1153,12 @@ async def ocr_inteligente(
     - None: Automático (tenta grátis primeiro)
     """
     try:
-        from app.utils.ocr_hibrido import get_ocr_hibrido
-
         # Ler imagem
         contents = await file.read()
 
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Arquivo deve ser uma imagem")
 
-        # Criar OCR híbrido
-        ocr = get_ocr_hibrido()
-
         # Determinar preferências do usuário
         usuario_prefere_gratis = modo == "gratis" or modo is None
         usuario_tem_creditos = modo == "premium"
@@ -1148,12 +1170,13 @@ async def ocr_inteligente(
             # Deixa o sistema decidir (tentará todos até funcionar)
             pass
 
-        # Processar nota fiscal
-        resultado = ocr.processar_nota_fiscal(
-            imagem_bytes=contents,
+        # Processar nota fiscal com o OCR híbrido (tarefa da fila)
+        resultado = await asyncio.to_thread(
+            executar, ocr_hibrido, codificar_imagem(contents),
             usuario_prefere_gratis=usuario_prefere_gratis,
             usuario_tem_creditos_api=usuario_tem_creditos,
-            modo_forcado=modo_forcado
+            modo_forcado=modo_forcado,
+            prioridade=PRIORIDADE_OCR
         )
 
         # Verificar se houve sucesso
@@ -1187,58 +1210,39 @@ async def ocr_inteligente(
         else:
             data_compra = datetime.now()
 
-        produtos_adicionados = []
-        crypto_manager = CryptoManager(db)
-
-        for produto_data in produtos_extraidos:
-            # Buscar ou criar produto
-            produto = db.query(Produto).filter(
-                func.lower(Produto.nome) == func.lower(produto_data['nome'])
-            ).first()
+        registros = [
+            {
+                'nome': produto_data['nome'],
+                'ean': produto_data.get('ean'),
+                'categoria': 'Geral',
+                'supermercado': supermercado,
+                'preco': produto_data['preco'],
+                'data_coleta': data_compra,
+                'manual': True,
+                'disponivel': True,
+                'url': None
+            }
+            for produto_data in produtos_extraidos
+        ]
 
-            if not produto:
-                produto = Produto(
-                    nome=produto_data['nome'],
-                    categoria='Geral'
-                )
-                db.add(produto)
-                db.flush()
-
-            # Criar preço
-            preco = Preco(
-                produto_id=produto.id,
-                supermercado=supermercado,
-                preco=produto_data['preco'],
-                data_coleta=data_compra,
-                manual=True,
-                disponivel=True,
-                url=None
-            )
-            db.add(preco)
-            db.flush()
+        # Gravar em lote e recompensar usuário em um só lançamento
+        ingestao = IngestaoPrecos(db).ingerir(
+            registros,
+            usuario_nome=usuario_nome,
+            recompensa_por_item=CryptoManager.RECOMPENSA_CONTRIBUICAO,
+            descricao_recompensa=f"Contribuição via OCR: {len(registros)} produtos"
+        )
 
-            produtos_adicionados.append({
-                "produto_id": produto.id,
-                "nome": produto.nome,
-                "preco": preco.preco,
+        produtos_adicionados = [
+            {
+                "produto_id": item["produto_id"],
+                "nome": item["nome"],
+                "preco": item["preco"],
                 "supermercado": supermercado
-            })
-
-        # Recompensar usuário
-        tokens_ganhos = 0
-        if usuario_nome:
-            tokens_por_produto = 10
-            total_tokens = len(produtos_adicionados) * tokens_por_produto
-
-            try:
-                crypto_manager.adicionar_tokens(
-                    usuario_nome,
-                    total_tokens,
-                    f"Contribuição via OCR: {len(produtos_adicionados)} produtos"
-                )
-                tokens_ganhos = total_tokens
-            except:
-                pass
+            }
+            for item in ingestao["itens"]
+        ]
+        tokens_ganhos = ingestao["tokens_ganhos"]
 
         db.commit()
 
@@ -1658,8 +1662,12 @@ async def verificar_saldo_para_busca(
 
 
 @app.get("/api/economia-token/info")
-async def informacoes_economia_token():
+async def informacoes_economia_token(db: Session = Depends(get_db)):
     """Informações sobre o sistema de economia de tokens"""
+    circulacao = EstatisticasMaterializadas(db).obter([
+        "economia.tokens_minerados", "economia.tokens_gastos", ContadoresGlobais.TOTAL_CARTEIRAS
+    ])
+
     return {
         "nome": "PreçoCoin",
         "simbolo": "PRC",
@@ -1671,6 +1679,12 @@ async def informacoes_economia_token():
             },
             "custos": {
                 "busca_produto": f"{CryptoManager.CUSTO_BUSCA} token"
+            },
+            "circulacao": {
+                "total_minerado": round(circulacao["economia.tokens_minerados"], 2),
+                "total_gasto": round(circulacao["economia.tokens_gastos"], 2),
+                "em_circulacao": round(circulacao["economia.tokens_minerados"] - circulacao["economia.tokens_gastos"], 2),
+                "total_carteiras": int(circulacao[ContadoresGlobais.TOTAL_CARTEIRAS])
             }
         },
         "como_ganhar": [
@@ -1698,18 +1712,16 @@ async def ranking_mineradores(
         desc(Carteira.saldo)
     ).limit(limite).all()
 
-    ranking = []
-    for idx, carteira in enumerate(top_carteiras, 1):
-        crypto = CryptoManager(db)
-        stats = crypto.obter_saldo(carteira.usuario_nome)
-
-        ranking.append({
+    ranking = [
+        {
             "posicao": idx,
             "usuario": carteira.usuario_nome,
             "saldo": carteira.saldo,
-            "total_minerado": stats["total_minerado"],
-            "total_transacoes": stats["total_transacoes"]
-        })
+            "total_minerado": carteira.total_minerado,
+            "total_transacoes": carteira.total_transacoes
+        }
+        for idx, carteira in enumerate(top_carteiras, 1)
+    ]
 
     return {
         "total": len(ranking),
@@ -1740,8 +1752,8 @@ async def criar_comentario(
         conteudo=comentario.conteudo.strip()
     )
     db.add(novo_comentario)
-    db.commit()
-    db.refresh(novo_comentario)
+    EstatisticasMaterializadas(db).somar({"dao.comentarios": 1})
+    db.flush()  # o limite diário conta o comentário novo
 
     # Dar reputação por comentário (limitado)
     from app.utils.crypto_manager import ReputacaoManager
@@ -1753,6 +1765,9 @@ async def criar_comentario(
             "Comentário na DAO"
         )
 
+    db.commit()
+    db.refresh(novo_comentario)
+
     return novo_comentario
 
 
@@ -1766,57 +1781,47 @@ async def listar_comentarios(
     """
     Lista comentários da comunidade (mais recentes primeiro)
     Inclui informações de votos e reputação do autor
+
+    Custo constante por página: comentários, votos do usuário atual (IN)
+    e carteiras dos autores (IN) - likes/dislikes vêm dos contadores.
     """
     from app.models.database import VotoComentario, Carteira
-    from sqlalchemy import func
 
     comentarios = db.query(Comentario).order_by(
         Comentario.data_criacao.desc()
     ).offset(offset).limit(limite).all()
 
-    resultado = []
-    for c in comentarios:
-        # Contar likes e dislikes
-        likes = db.query(func.count(VotoComentario.id)).filter(
-            VotoComentario.comentario_id == c.id,
-            VotoComentario.tipo == "like"
-        ).scalar() or 0
-
-        dislikes = db.query(func.count(VotoComentario.id)).filter(
-            VotoComentario.comentario_id == c.id,
-            VotoComentario.tipo == "dislike"
-        ).scalar() or 0
-
-        # Verificar se usuário atual já votou
-        voto_usuario = None
-        if usuario_atual:
-            voto_obj = db.query(VotoComentario).filter(
-                VotoComentario.comentario_id == c.id,
-                VotoComentario.usuario_nome == usuario_atual
-            ).first()
-            if voto_obj:
-                voto_usuario = voto_obj.tipo
-
-        # Buscar reputação do autor
-        carteira = db.query(Carteira).filter(
-            Carteira.usuario_nome == c.usuario_nome
-        ).first()
-        reputacao = carteira.reputacao if carteira else 100
-
-        resultado.append({
+    if not comentarios:
+        return []
+
+    # Votos do usuário atual nos comentários da página
+    votos_usuario = {}
+    if usuario_atual:
+        votos_usuario = dict(db.query(VotoComentario.comentario_id, VotoComentario.tipo).filter(
+            VotoComentario.comentario_id.in_([c.id for c in comentarios]),
+            VotoComentario.usuario_nome == usuario_atual
+        ).all())
+
+    # Reputação dos autores
+    reputacoes = dict(db.query(Carteira.usuario_nome, Carteira.reputacao).filter(
+        Carteira.usuario_nome.in_({c.usuario_nome for c in comentarios})
+    ).all())
+
+    return [
+        {
             "id": c.id,
             "usuario_nome": c.usuario_nome,
             "conteudo": c.conteudo,
             "data_criacao": c.data_criacao,
             "editado": c.editado,
             "data_edicao": c.data_edicao,
-            "likes": likes,
-            "dislikes": dislikes,
-            "voto_usuario": voto_usuario,
-            "reputacao_autor": reputacao
-        })
-
-    return resultado
+            "likes": c.likes or 0,
+            "dislikes": c.dislikes or 0,
+            "voto_usuario": votos_usuario.get(c.id),
+            "reputacao_autor": reputacoes.get(c.usuario_nome, 100)
+        }
+        for c in comentarios
+    ]
 
 
 @app.delete("/api/dao/comentarios/{comentario_id}")
@@ -1838,6 +1843,7 @@ async def deletar_comentario(
         raise HTTPException(status_code=403, detail="Você não tem permissão para deletar este comentário")
 
     db.delete(comentario)
+    EstatisticasMaterializadas(db).somar({"dao.comentarios": -1})
     db.commit()
 
     return {"message": "Comentário deletado com sucesso"}
@@ -1872,17 +1878,21 @@ async def votar_comentario(
         VotoComentario.usuario_nome == usuario_nome
     ).first()
 
+    # Variação dos contadores: (likes, dislikes)
+    delta = {"like": 0, "dislike": 0}
+
     if voto_existente:
         # Se já votou do mesmo tipo, remove o voto
         if voto_existente.tipo == tipo:
             db.delete(voto_existente)
-            db.commit()
+            delta[tipo] -= 1
             mensagem = "Voto removido"
         else:
             # Muda o voto
+            delta[voto_existente.tipo] -= 1
+            delta[tipo] += 1
             voto_existente.tipo = tipo
             voto_existente.data_voto = datetime.now()
-            db.commit()
             mensagem = f"Voto alterado para {tipo}"
     else:
         # Novo voto
@@ -1892,29 +1902,26 @@ async def votar_comentario(
             tipo=tipo
         )
         db.add(novo_voto)
-        db.commit()
+        delta[tipo] += 1
         mensagem = f"Voto registrado: {tipo}"
 
-    # Recalcular reputação do autor do comentário
+    # Atualização atômica no banco (UPDATE ... SET likes = likes + ?), na mesma transação do voto
+    db.query(Comentario).filter(Comentario.id == comentario_id).update({
+        Comentario.likes: func.coalesce(Comentario.likes, 0) + delta["like"],
+        Comentario.dislikes: func.coalesce(Comentario.dislikes, 0) + delta["dislike"]
+    }, synchronize_session=False)
+    db.refresh(comentario)
+
+    # Recalcular reputação do autor do comentário (usa os contadores)
     rep_manager = ReputacaoManager(db)
     resultado_rep = rep_manager.calcular_reputacao_comentario(comentario_id)
 
-    # Contar votos atuais
-    from sqlalchemy import func
-    likes = db.query(func.count(VotoComentario.id)).filter(
-        VotoComentario.comentario_id == comentario_id,
-        VotoComentario.tipo == "like"
-    ).scalar() or 0
-
-    dislikes = db.query(func.count(VotoComentario.id)).filter(
-        VotoComentario.comentario_id == comentario_id,
-        VotoComentario.tipo == "dislike"
-    ).scalar() or 0
+    db.commit()
 
     return {
         "mensagem": mensagem,
-        "likes": likes,
-        "dislikes": dislikes,
+        "likes": comentario.likes,
+        "dislikes": comentario.dislikes,
         "reputacao_atualizada": resultado_rep
     }
 
@@ -1934,22 +1941,12 @@ async def criar_sugestao(
         raise HTTPException(status_code=400, detail="Todos os campos são obrigatórios")
 
     # Cobrar 5 tokens para criar sugestão
-    crypto = CryptoManager(db)
-    saldo_info = crypto.obter_saldo(sugestao.usuario_nome)
-
-    if saldo_info["saldo"] < 5:
-        raise HTTPException(
-            status_code=402,
-            detail={
-                "mensagem": f"Saldo insuficiente! Você tem {saldo_info['saldo']} tokens e precisa de 5 tokens para criar uma sugestão.",
-                "dica": "Contribua com preços para ganhar mais tokens!"
-            }
-        )
-
     # CONTRATO INTELIGENTE: Colocar 5 tokens em ESCROW
     # Os tokens ficam bloqueados e só são liberados quando:
     # 1. Sugestão for implementada → moderador recebe
     # 2. Sugestão for cancelada → criador recebe de volta
+    # (o débito atômico já verifica o saldo)
+    crypto = CryptoManager(db)
     resultado = crypto.gastar_tokens(
         sugestao.usuario_nome,
         quantidade=5,
@@ -1957,7 +1954,13 @@ async def criar_sugestao(
     )
 
     if not resultado["sucesso"]:
-        raise HTTPException(status_code=402, detail=resultado["mensagem"])
+        raise HTTPException(
+            status_code=402,
+            detail={
+                "mensagem": f"Saldo insuficiente! Você tem {resultado['saldo_atual']} tokens e precisa de 5 tokens para criar uma sugestão.",
+                "dica": "Contribua com preços para ganhar mais tokens!"
+            }
+        )
 
     # Criar sugestão com tokens em escrow
     nova_sugestao = Sugestao(
@@ -1968,6 +1971,9 @@ async def criar_sugestao(
         tokens_escrow=5.0  # Tokens bloqueados
     )
     db.add(nova_sugestao)
+    EstatisticasMaterializadas(db).somar({
+        "dao.sugestoes": 1, f"dao.status:{StatusSugestao.PENDENTE_APROVACAO.value}": 1
+    })
     db.commit()
     db.refresh(nova_sugestao)
 
@@ -2011,18 +2017,13 @@ async def obter_sugestao(
     if not sugestao:
         raise HTTPException(status_code=404, detail="Sugestão não encontrada")
 
-    # Contar quantos usuários votaram
-    votos_count = db.query(func.count(func.distinct(Voto.usuario_nome))).filter(
-        Voto.sugestao_id == sugestao_id
-    ).scalar()
-
     # Lista de aprovadores
     aprovadores_lista = sugestao.aprovadores.split(",") if sugestao.aprovadores else []
 
     return SugestaoDetalhadaResponse(
         **sugestao.__dict__,
         aprovadores_lista=aprovadores_lista,
-        total_usuarios_votaram=votos_count or 0
+        total_usuarios_votaram=sugestao.total_votantes  # Mantido em votar_sugestao
     )
 
 
@@ -2058,7 +2059,7 @@ async def aprovar_sugestao(
     # Se você (Vengel) ou qualquer usuário aprovar, vai para votação
     # Pode ajustar lógica aqui se quiser exigir mais aprovações
     if request.usuario_nome == "Vengel" or sugestao.total_aprovadores >= 1:
-        sugestao.status = StatusSugestao.EM_VOTACAO
+        EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.EM_VOTACAO)
         sugestao.data_aprovacao = datetime.now()
 
     db.commit()
@@ -2088,7 +2089,7 @@ async def rejeitar_sugestao(
     if not sugestao:
         raise HTTPException(status_code=404, detail="Sugestão não encontrada")
 
-    sugestao.status = StatusSugestao.REJEITADA
+    EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.REJEITADA)
     sugestao.motivo_rejeicao = request.motivo
     sugestao.data_finalizacao = datetime.now()
 
@@ -2128,23 +2129,17 @@ async def votar_sugestao(
     if sugestao.usuario_nome == voto.usuario_nome:
         raise HTTPException(status_code=400, detail="Você não pode votar na sua própria sugestão")
 
-    # Verificar se usuário já votou
+    # Verificar se usuário já votou (antes de cobrar: mudar de direção não é permitido)
     voto_existente = db.query(Voto).filter(
         Voto.sugestao_id == voto.sugestao_id,
         Voto.usuario_nome == voto.usuario_nome
     ).first()
 
-    # Verificar saldo
-    crypto = CryptoManager(db)
-    saldo_info = crypto.obter_saldo(voto.usuario_nome)
-
-    if saldo_info["saldo"] < voto.tokens_usados:
-        raise HTTPException(
-            status_code=402,
-            detail=f"Saldo insuficiente. Você tem {saldo_info['saldo']} tokens e precisa de {voto.tokens_usados}"
-        )
+    if voto_existente and voto_existente.voto_favor != voto.voto_favor:
+        raise HTTPException(status_code=400, detail="Você já votou em direção diferente. Não pode mudar o voto.")
 
-    # Gastar tokens
+    # Gastar tokens (o débito atômico já verifica o saldo)
+    crypto = CryptoManager(db)
     resultado_gasto = crypto.gastar_tokens(
         voto.usuario_nome,
         quantidade=voto.tokens_usados,
@@ -2152,36 +2147,23 @@ async def votar_sugestao(
     )
 
     if not resultado_gasto["sucesso"]:
-        raise HTTPException(status_code=402, detail=resultado_gasto["mensagem"])
+        raise HTTPException(
+            status_code=402,
+            detail=f"Saldo insuficiente. Você tem {resultado_gasto['saldo_atual']} tokens e precisa de {voto.tokens_usados}"
+        )
 
     if voto_existente:
-        # Usuário já votou - verificar se está mudando de direção
-        if voto_existente.voto_favor != voto.voto_favor:
-            raise HTTPException(status_code=400, detail="Você já votou em direção diferente. Não pode mudar o voto.")
-
-        # Atualizar voto existente (mesmo usuário pode votar múltiplas vezes na mesma direção)
-        # Remover votos anteriores dos contadores
-        if voto_existente.voto_favor:
-            sugestao.total_votos_favor -= voto_existente.votos_gerados
-        else:
-            sugestao.total_votos_contra -= voto_existente.votos_gerados
-
-        sugestao.total_tokens_votados -= voto_existente.tokens_usados
-
-        # Atualizar o voto com novos tokens
+        # Mesmo usuário pode votar múltiplas vezes na mesma direção:
+        # os votos são recalculados sobre o total de tokens dele
+        votos_anteriores = voto_existente.votos_gerados
         voto_existente.tokens_usados += voto.tokens_usados
         voto_existente.votos_gerados = int(math.sqrt(voto_existente.tokens_usados))
         voto_existente.data_voto = datetime.now()
 
-        # Adicionar novos votos aos contadores
-        if voto_existente.voto_favor:
-            sugestao.total_votos_favor += voto_existente.votos_gerados
-        else:
-            sugestao.total_votos_contra += voto_existente.votos_gerados
-
-        sugestao.total_tokens_votados += voto_existente.tokens_usados
         votos_gerados = voto_existente.votos_gerados
         tokens_totais = voto_existente.tokens_usados
+        delta_votos = votos_gerados - votos_anteriores
+        novo_votante = 0
 
     else:
         # Calcular votos gerados (votação quadrática)
@@ -2197,45 +2179,45 @@ async def votar_sugestao(
         )
         db.add(novo_voto)
 
-        # Atualizar contadores da sugestão
-        if voto.voto_favor:
-            sugestao.total_votos_favor += votos_gerados
-        else:
-            sugestao.total_votos_contra += votos_gerados
-
-        sugestao.total_tokens_votados += voto.tokens_usados
         tokens_totais = voto.tokens_usados
+        delta_votos = votos_gerados
+        novo_votante = 1
+
+    # Atualizar contadores da sugestão com um UPDATE atômico (sem recontar os votos)
+    from sqlalchemy import update
+    total_favor, total_contra = db.execute(
+        update(Sugestao).where(Sugestao.id == sugestao.id).values(
+            total_votos_favor=Sugestao.total_votos_favor + (delta_votos if voto.voto_favor else 0),
+            total_votos_contra=Sugestao.total_votos_contra + (0 if voto.voto_favor else delta_votos),
+            total_tokens_votados=Sugestao.total_tokens_votados + voto.tokens_usados,
+            total_votantes=Sugestao.total_votantes + novo_votante
+        ).returning(Sugestao.total_votos_favor, Sugestao.total_votos_contra)
+    ).one()
+    EstatisticasMaterializadas(db).somar({"dao.tokens_votados": voto.tokens_usados})
 
     # Calcular porcentagem
-    total_votos = sugestao.total_votos_favor + sugestao.total_votos_contra
+    total_votos = total_favor + total_contra
     if total_votos > 0:
-        sugestao.porcentagem_aprovacao = (sugestao.total_votos_favor / total_votos) * 100
+        sugestao.porcentagem_aprovacao = (total_favor / total_votos) * 100
     else:
         sugestao.porcentagem_aprovacao = 0
 
-    # Contar VOTOS GERADOS (sistema quadrático) e PESSOAS que votaram
-    from app.models.database import Carteira
-    votos_da_sugestao = db.query(Voto).filter(Voto.sugestao_id == sugestao.id).all()
-
-    # Total de pessoas que votaram (cada pessoa só pode votar uma vez)
-    pessoas_votaram = len(votos_da_sugestao)
-
-    # Votos gerados já estão em sugestao.total_votos_favor e sugestao.total_votos_contra
-    # que foram atualizados acima com votos_gerados
-
     # Contar total de usuários que PODEM votar (todos exceto o criador)
-    total_usuarios = db.query(Carteira).count()
-    usuarios_podem_votar = total_usuarios - 1  # Excluir o criador da sugestão
+    # Contador mantido na criação de carteiras (1 SELECT pela chave, sem COUNT na tabela)
+    total_usuarios = ContadoresGlobais(db).obter(
+        ContadoresGlobais.TOTAL_CARTEIRAS,
+        lambda: db.query(func.count(Carteira.id)).scalar()
+    )
+    usuarios_podem_votar = int(total_usuarios) - 1  # Excluir o criador da sugestão
 
     # Calcular threshold: 60% dos usuários que podem votar
     # Se cada um votar com 1 token mínimo = 1 voto cada
-    import math
     minimo_votos_para_decidir = math.ceil(usuarios_podem_votar * 0.6)
 
     # Verificar se atingiu 60% dos votos possíveis A FAVOR
     # Considerando os votos quadráticos gerados
-    if sugestao.total_votos_favor >= minimo_votos_para_decidir:
-        sugestao.status = StatusSugestao.APROVADA
+    if total_favor >= minimo_votos_para_decidir:
+        EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.APROVADA)
         sugestao.data_aprovacao = datetime.now()
 
         # Dar reputação ao criador da sugestão aprovada
@@ -2249,8 +2231,8 @@ async def votar_sugestao(
 
     # Verificar se atingiu 60% dos votos possíveis CONTRA
     # Considerando os votos quadráticos gerados
-    elif sugestao.total_votos_contra >= minimo_votos_para_decidir:
-        sugestao.status = StatusSugestao.REJEITADA
+    elif total_contra >= minimo_votos_para_decidir:
+        EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.REJEITADA)
         sugestao.data_finalizacao = datetime.now()
 
         # Devolver tokens do escrow ao criador (sugestão rejeitada)
@@ -2305,45 +2287,26 @@ async def listar_votos_sugestao(
 async def estatisticas_dao(db: Session = Depends(get_db)):
     """
     Estatísticas gerais do sistema DAO
+    Servidas das estatísticas materializadas (custo constante)
     """
-    total_comentarios = db.query(Comentario).count()
-    total_sugestoes = db.query(Sugestao).count()
-
-    sugestoes_pendentes = db.query(Sugestao).filter(
-        Sugestao.status == StatusSugestao.PENDENTE_APROVACAO
-    ).count()
-
-    sugestoes_em_votacao = db.query(Sugestao).filter(
-        Sugestao.status == StatusSugestao.EM_VOTACAO
-    ).count()
-
-    sugestoes_aprovadas = db.query(Sugestao).filter(
-        Sugestao.status == StatusSugestao.APROVADA
-    ).count()
-
-    sugestoes_implementadas = db.query(Sugestao).filter(
-        Sugestao.status == StatusSugestao.IMPLEMENTADA
-    ).count()
-
-    # Usuários que participaram (comentaram, sugeriram ou votaram)
-    usuarios_comentarios = db.query(func.count(func.distinct(Comentario.usuario_nome))).scalar() or 0
-    usuarios_sugestoes = db.query(func.count(func.distinct(Sugestao.usuario_nome))).scalar() or 0
-    usuarios_votos = db.query(func.count(func.distinct(Voto.usuario_nome))).scalar() or 0
-
-    total_usuarios_participantes = len(set([usuarios_comentarios, usuarios_sugestoes, usuarios_votos]))
-
-    # Total de tokens votados
-    total_tokens_votados = db.query(func.sum(Voto.tokens_usados)).scalar() or 0
+    valores = EstatisticasMaterializadas(db).obter([
+        "dao.comentarios", "dao.sugestoes",
+        f"dao.status:{StatusSugestao.PENDENTE_APROVACAO.value}",
+        f"dao.status:{StatusSugestao.EM_VOTACAO.value}",
+        f"dao.status:{StatusSugestao.APROVADA.value}",
+        f"dao.status:{StatusSugestao.IMPLEMENTADA.value}",
+        "dao.participantes", "dao.tokens_votados"
+    ])
 
     return EstatisticasDAO(
-        total_comentarios=total_comentarios,
-        total_sugestoes=total_sugestoes,
-        sugestoes_pendentes=sugestoes_pendentes,
-        sugestoes_em_votacao=sugestoes_em_votacao,
-        sugestoes_aprovadas=sugestoes_aprovadas,
-        sugestoes_implementadas=sugestoes_implementadas,
-        total_usuarios_participantes=total_usuarios_participantes,
-        total_tokens_votados=total_tokens_votados
+        total_comentarios=int(valores["dao.comentarios"]),
+        total_sugestoes=int(valores["dao.sugestoes"]),
+        sugestoes_pendentes=int(valores[f"dao.status:{StatusSugestao.PENDENTE_APROVACAO.value}"]),
+        sugestoes_em_votacao=int(valores[f"dao.status:{StatusSugestao.EM_VOTACAO.value}"]),
+        sugestoes_aprovadas=int(valores[f"dao.status:{StatusSugestao.APROVADA.value}"]),
+        sugestoes_implementadas=int(valores[f"dao.status:{StatusSugestao.IMPLEMENTADA.value}"]),
+        total_usuarios_participantes=int(valores["dao.participantes"]),
+        total_tokens_votados=int(valores["dao.tokens_votados"])
     )
 
 
@@ -2373,7 +2336,7 @@ async def atualizar_status_sugestao(
         raise HTTPException(status_code=400, detail="Status inválido")
 
     status_antigo = sugestao.status
-    sugestao.status = novo_status_enum
+    EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, novo_status_enum)
     sugestao.data_finalizacao = datetime.now()
 
     # Dar reputação baseado no novo status
@@ -2415,58 +2378,61 @@ async def listar_contribuicoes_pendentes(
 ):
     """
     Lista contribuições de preços que precisam de validação
-    Exclui as próprias contribuições do usuário
+    Exclui as próprias contribuições do usuário e as que ele já validou
+
+    Uma única consulta: a fila (manual, total_validacoes < 3, últimos 7 dias) sai do
+    índice ix_precos_fila_validacao, o "já validei" é um anti-join (NOT EXISTS) e as
+    aprovações vêm do contador do próprio preço.
     """
-    # Buscar preços manuais recentes (últimos 7 dias)
+    from sqlalchemy import exists
+    from sqlalchemy.orm import aliased
+
+    minimo_validacoes = 3  # Precisa de pelo menos 3 validações
     data_limite = datetime.now() - timedelta(days=7)
 
-    precos = db.query(Preco).join(Produto).filter(
+    minha_validacao = aliased(ValidacaoPreco)
+    ja_validou = exists().where(
+        minha_validacao.preco_id == Preco.id,
+        minha_validacao.validador_nome == usuario_nome
+    )
+
+    linhas = db.query(
+        Preco,
+        Produto.nome,
+        Produto.marca,
+        func.coalesce(Carteira.reputacao, 100)
+    ).join(
+        Produto, Produto.id == Preco.produto_id
+    ).outerjoin(
+        Carteira, Carteira.usuario_nome == Preco.usuario_nome
+    ).filter(
         Preco.manual == True,
+        Preco.total_validacoes < minimo_validacoes,
+        Preco.data_coleta >= data_limite,
         Preco.usuario_nome != usuario_nome,  # Não mostrar suas próprias
-        Preco.data_coleta >= data_limite
-    ).order_by(Preco.data_coleta.desc()).limit(limite).all()
-
-    resultado = []
-    for preco in precos:
-        # Contar validações deste preço
-        validacoes = db.query(ValidacaoPreco).filter(
-            ValidacaoPreco.preco_id == preco.id
-        ).all()
-
-        aprovacoes = sum(1 for v in validacoes if v.aprovado)
-        rejeicoes = sum(1 for v in validacoes if not v.aprovado)
-
-        # Buscar reputação do autor
-        carteira_autor = db.query(Carteira).filter(
-            Carteira.usuario_nome == preco.usuario_nome
-        ).first()
-
-        reputacao_autor = carteira_autor.reputacao if carteira_autor else 100
-
-        # Verificar se usuário já validou
-        ja_validou = db.query(ValidacaoPreco).filter(
-            ValidacaoPreco.preco_id == preco.id,
-            ValidacaoPreco.validador_nome == usuario_nome
-        ).first()
-
-        if not ja_validou:  # Só mostra se ainda não validou
-            resultado.append(ContribuicaoParaValidar(
-                preco_id=preco.id,
-                produto_nome=preco.produto.nome,
-                produto_marca=preco.produto.marca,
-                preco=preco.preco,
-                supermercado=preco.supermercado,
-                usuario_nome=preco.usuario_nome,
-                usuario_reputacao=reputacao_autor,
-                localizacao=preco.localizacao,
-                data_coleta=preco.data_coleta,
-                total_validacoes=len(validacoes),
-                aprovacoes=aprovacoes,
-                rejeicoes=rejeicoes,
-                precisa_validacao=len(validacoes) < 3  # Precisa de pelo menos 3 validações
-            ))
+        ~ja_validou  # Só mostra se ainda não validou
+    ).order_by(
+        Preco.data_coleta.desc()
+    ).limit(limite).all()
 
-    return resultado
+    return [
+        ContribuicaoParaValidar(
+            preco_id=preco.id,
+            produto_nome=produto_nome,
+            produto_marca=produto_marca,
+            preco=preco.preco,
+            supermercado=preco.supermercado,
+            usuario_nome=preco.usuario_nome,
+            usuario_reputacao=reputacao_autor,
+            localizacao=preco.localizacao,
+            data_coleta=preco.data_coleta,
+            total_validacoes=preco.total_validacoes,
+            aprovacoes=preco.validacoes_aprovadas,
+            rejeicoes=preco.total_validacoes - preco.validacoes_aprovadas,
+            precisa_validacao=preco.total_validacoes < minimo_validacoes
+        )
+        for preco, produto_nome, produto_marca, reputacao_autor in linhas
+    ]
 
 
 @app.post("/api/reputacao/validar", response_model=ValidacaoResponse)
@@ -2515,6 +2481,15 @@ async def validar_contribuicao(
     )
     db.add(nova_validacao)
 
+    # Contadores de validação do preço (UPDATE atômico, devolve os totais já com esta validação)
+    from sqlalchemy import update
+    total, aprovacoes = db.execute(
+        update(Preco).where(Preco.id == preco.id).values(
+            total_validacoes=func.coalesce(Preco.total_validacoes, 0) + 1,
+            validacoes_aprovadas=func.coalesce(Preco.validacoes_aprovadas, 0) + (1 if validacao.aprovado else 0)
+        ).returning(Preco.total_validacoes, Preco.validacoes_aprovadas)
+    ).one()
+
     # Atualizar contador de validações feitas do validador
     carteira_validador = db.query(Carteira).filter(
         Carteira.usuario_nome == validacao.validador_nome
@@ -2523,7 +2498,7 @@ async def validar_contribuicao(
         carteira_validador.total_validacoes_feitas += 1
 
     # Atualizar reputação do autor
-    atualizar_reputacao_autor(db, preco.id, preco.usuario_nome)
+    atualizar_reputacao_autor(db, preco.id, preco.usuario_nome, total, aprovacoes)
 
     db.commit()
     db.refresh(nova_validacao)
@@ -2531,47 +2506,38 @@ async def validar_contribuicao(
     return nova_validacao
 
 
-def atualizar_reputacao_autor(db: Session, preco_id: int, usuario_nome: str):
+def atualizar_reputacao_autor(db: Session, preco_id: int, usuario_nome: str, total: int, aprovacoes: int):
     """
     Atualiza reputação do autor baseado nas validações recebidas
     Sistema de consenso: maioria decide
+
+    total e aprovacoes são os contadores do preço (Preco.total_validacoes e
+    Preco.validacoes_aprovadas), mantidos em validar_contribuicao.
     """
-    # Buscar todas as validações deste preço
-    validacoes = db.query(ValidacaoPreco).filter(
-        ValidacaoPreco.preco_id == preco_id
-    ).all()
+    from app.utils.crypto_manager import ReputacaoManager
 
-    if len(validacoes) < 2:  # Precisa de pelo menos 2 validações
+    if total < 2:  # Precisa de pelo menos 2 validações
         return
 
-    aprovacoes = sum(1 for v in validacoes if v.aprovado)
-    rejeicoes = sum(1 for v in validacoes if not v.aprovado)
-    total = len(validacoes)
-
-    # Buscar carteira do autor
-    carteira = db.query(Carteira).filter(
-        Carteira.usuario_nome == usuario_nome
-    ).first()
-
-    if not carteira:
-        return
+    rejeicoes = total - aprovacoes
 
     # Atualizar contadores
-    carteira.total_validacoes_recebidas = total
-    carteira.validacoes_positivas = aprovacoes
-    carteira.validacoes_negativas = rejeicoes
+    db.query(Carteira).filter(Carteira.usuario_nome == usuario_nome).update({
+        Carteira.total_validacoes_recebidas: total,
+        Carteira.validacoes_positivas: aprovacoes,
+        Carteira.validacoes_negativas: rejeicoes
+    }, synchronize_session=False)
 
-    # Calcular mudança de reputação baseado no consenso
+    # Calcular mudança de reputação baseado no consenso (evento aplicado em lote)
     taxa_aprovacao = (aprovacoes / total) * 100
+    rep_manager = ReputacaoManager(db)
 
     if taxa_aprovacao >= 70:  # 70%+ de aprovação
-        # Ganha reputação
-        ganho = 5 * len(validacoes)  # 5 pontos por validação
-        carteira.reputacao = min(200, carteira.reputacao + ganho)
+        # Ganha reputação: 5 pontos por validação
+        rep_manager.adicionar_reputacao(usuario_nome, 5 * total, f"Preço #{preco_id} aprovado pela comunidade")
     elif taxa_aprovacao <= 30:  # 30%- de aprovação (maioria rejeitou)
-        # Perde reputação
-        perda = 10 * len(validacoes)  # 10 pontos por validação
-        carteira.reputacao = max(0, carteira.reputacao - perda)
+        # Perde reputação: 10 pontos por validação
+        rep_manager.adicionar_reputacao(usuario_nome, -10 * total, f"Preço #{preco_id} rejeitado pela comunidade")
 
 
 @app.get("/api/reputacao/{usuario_nome}", response_model=ReputacaoResponse)
@@ -2753,7 +2719,7 @@ async def aceitar_implementar_sugestao(
         )
 
     # Aceitar implementação
-    sugestao.status = StatusSugestao.EM_IMPLEMENTACAO
+    EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.EM_IMPLEMENTACAO)
     sugestao.moderador_implementador = request.moderador_nome
     sugestao.data_candidatura_moderador = datetime.now()
 
@@ -2825,7 +2791,7 @@ async def marcar_sugestao_como_implementada(
     )
 
     # Atualizar sugestão
-    sugestao.status = StatusSugestao.IMPLEMENTADA
+    EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.IMPLEMENTADA)
     sugestao.data_implementacao = datetime.now()
     sugestao.data_finalizacao = datetime.now()
     sugestao.tokens_escrow = 0.0  # Tokens foram liberados
@@ -2907,7 +2873,7 @@ async def cancelar_implementacao(
         mensagem_tokens = "Tokens retidos (não devolvidos)"
 
     # Atualizar sugestão
-    sugestao.status = StatusSugestao.CANCELADA
+    EstatisticasMaterializadas(db).mudar_status_sugestao(sugestao, StatusSugestao.CANCELADA)
     sugestao.motivo_cancelamento = request.motivo
     sugestao.data_finalizacao = datetime.now()
     sugestao.tokens_escrow = 0.0  # Tokens foram processados
@@ -2936,24 +2902,27 @@ async def buscar_promocoes(
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     distancia_maxima_km: Optional[float] = 5.0,
+    limite: int = Query(default=RankingOfertas.TAMANHO, ge=1, le=RankingOfertas.TAMANHO),
     db: Session = Depends(get_db)
 ):
     """
-    Busca produtos em promoção de um supermercado específico
+    Busca produtos em promoção de um supermercado específico (últimos 30 dias, maior desconto primeiro)
     Pode filtrar por proximidade se latitude/longitude fornecidos
     distancia_maxima_km: Raio máximo em km (padrão: 5km)
     """
-    # Buscar preços em promoção dos últimos 30 dias
-    data_limite = datetime.now() - timedelta(days=30)
+    ranking = RankingOfertas(db)
+    por_proximidade = latitude is not None and longitude is not None
 
-    precos_promocao = db.query(Preco).join(Produto).filter(
-        Preco.supermercado.ilike(f"%{supermercado}%"),
-        Preco.em_promocao == True,
-        Preco.disponivel == True,
-        Preco.data_coleta >= data_limite
-    ).all()
+    if por_proximidade:
+        # Maiores descontos dentro do raio, depois ordenados por distância (mais próximas primeiro)
+        encontrados = ranking.proximas(
+            limite, latitude, longitude, distancia_maxima_km or 5.0, supermercado=supermercado
+        )
+        encontrados.sort(key=lambda item: item[1])
+    else:
+        encontrados = [(preco, None) for preco in ranking.melhores(limite, supermercado=supermercado)]
 
-    if not precos_promocao:
+    if not encontrados:
         return {
             "supermercado": supermercado,
             "total": 0,
@@ -2962,15 +2931,15 @@ async def buscar_promocoes(
         }
 
     promocoes = []
-    for preco in precos_promocao:
+    for preco, distancia in encontrados:
         promo_dict = {
             'id': preco.id,
             'nome': preco.produto.nome,
             'marca': preco.produto.marca,
             'preco': preco.preco,
             'preco_original': preco.preco_original,
-            'desconto_percentual': round(((preco.preco_original - preco.preco) / preco.preco_original * 100), 1) if preco.preco_original and preco.preco_original > preco.preco else 0,
-            'economia': round(preco.preco_original - preco.preco, 2) if preco.preco_original else 0,
+            'desconto_percentual': preco.desconto_percentual,
+            'economia': preco.economia,
             'supermercado': preco.supermercado,
             'url': preco.url or '#',
             'data_coleta': preco.data_coleta.isoformat() if preco.data_coleta else None,
@@ -2978,43 +2947,15 @@ async def buscar_promocoes(
             'longitude': preco.longitude,
             'endereco': preco.endereco
         }
+        if distancia is not None:
+            promo_dict['distancia_km'] = round(distancia, 2)
         promocoes.append(promo_dict)
 
-    # Filtrar e ordenar por proximidade se localização fornecida
-    if latitude is not None and longitude is not None:
-        from app.utils.geolocalizacao import GeoLocalizacao
-
-        geo = GeoLocalizacao()
-        distancia_max = distancia_maxima_km or 5.0
-
-        promocoes_filtradas = []
-        for promo in promocoes:
-            if promo.get('latitude') and promo.get('longitude'):
-                distancia = geo.calcular_distancia(
-                    latitude,
-                    longitude,
-                    promo['latitude'],
-                    promo['longitude']
-                )
-                promo['distancia_km'] = round(distancia, 2)
-
-                # Apenas incluir se estiver dentro do raio
-                if distancia <= distancia_max:
-                    promocoes_filtradas.append(promo)
-            # Não incluir promoções sem localização quando usuário forneceu sua posição
-
-        # Ordenar por distância (mais próximas primeiro)
-        promocoes_filtradas.sort(key=lambda x: x['distancia_km'])
-        promocoes = promocoes_filtradas
-    else:
-        # Ordenar por maior desconto
-        promocoes.sort(key=lambda x: x['desconto_percentual'], reverse=True)
-
     return {
         "supermercado": supermercado,
         "total": len(promocoes),
         "promocoes": promocoes,
-        "ordenado_por_proximidade": latitude is not None and longitude is not None,
+        "ordenado_por_proximidade": por_proximidade,
         "distancia_maxima_km": distancia_maxima_km if latitude is not None else None
     }
 
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -25,10 +25,26 @@ class Produto(Base):
     descricao = Column(String)
     data_criacao = Column(DateTime, default=datetime.now)
 
+    # Chave canônica (tokens normalizados + tamanho + marca) - ver app/utils/produtos.py
+    chave = Column(String, unique=True, index=True)
+
+    # Código de barras EAN/GTIN normalizado para 13 dígitos (ver normalizar_ean)
+    ean = Column(String, unique=True, index=True)
+
     precos = relationship("Preco", back_populates="produto")
     alertas = relationship("Alerta", back_populates="produto")
 
 
+class AliasProduto(Base):
+    """Chaves de produtos mesclados apontando para o produto sobrevivente"""
+    __tablename__ = "aliases_produtos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chave = Column(String, unique=True, index=True, nullable=False)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False, index=True)
+    data_criacao = Column(DateTime, default=datetime.now)
+
+
 class Preco(Base):
     __tablename__ = "precos"
 
@@ -55,8 +71,26 @@ class Preco(Base):
     longitude = Column(Float, index=True)  # Store longitude
     endereco = Column(String)  # Full address
 
+    # Validações recebidas (mantido em validar_contribuicao)
+    total_validacoes = Column(Integer, default=0, nullable=False)
+    validacoes_aprovadas = Column(Integer, default=0, nullable=False)
+
+    # Z-score robusto quando o detector de anomalias tirou o preço do ar (DetectorAnomalias)
+    score_anomalia = Column(Float)
+
+    # Desconto sobre o preço original, calculados na ingestão (app/utils/ofertas.py)
+    desconto_percentual = Column(Float, default=0.0, nullable=False)
+    economia = Column(Float, default=0.0, nullable=False)
+
     produto = relationship("Produto", back_populates="precos")
 
+    __table_args__ = (
+        # Fila de validação: manual = 1 AND total_validacoes < N, mais recentes primeiro
+        Index("ix_precos_fila_validacao", "manual", "total_validacoes", "data_coleta"),
+        # Ofertas por maior desconto (consultas com filtro geográfico e reconstrução do ranking)
+        Index("ix_precos_ofertas", "em_promocao", "disponivel", "desconto_percentual"),
+    )
+
 
 class Alerta(Base):
     __tablename__ = "alertas"
@@ -89,6 +123,11 @@ class Carteira(Base):
     validacoes_positivas = Column(Integer, default=0)  # Validações positivas que recebeu
     validacoes_negativas = Column(Integer, default=0)  # Validações negativas que recebeu
 
+    # Totais do livro de transações (mantidos em CryptoManager._registrar_transacao)
+    total_minerado = Column(Float, default=0.0, nullable=False)
+    total_gasto = Column(Float, default=0.0, nullable=False)
+    total_transacoes = Column(Integer, default=0, nullable=False)
+
     data_criacao = Column(DateTime, default=datetime.now)
     ultima_atualizacao = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -123,6 +162,10 @@ class Comentario(Base):
     editado = Column(Boolean, default=False)
     data_edicao = Column(DateTime)
 
+    # Contadores de votos (mantidos em votar_comentario, evitam COUNT por comentário)
+    likes = Column(Integer, default=0, nullable=False)
+    dislikes = Column(Integer, default=0, nullable=False)
+
     # Relacionamento com votos
     votos = relationship("VotoComentario", back_populates="comentario")
 
@@ -171,6 +214,7 @@ class Sugestao(Base):
     # Aprovação inicial
     aprovadores = Column(String)  # Lista de usuários que aprovaram (separados por vírgula)
     total_aprovadores = Column(Integer, default=0)
+    total_votantes = Column(Integer, default=0, nullable=False)  # Pessoas distintas que votaram
 
     # Sistema de Escrow de Tokens (Contrato Inteligente)
     tokens_escrow = Column(Float, default=0.0)  # Tokens bloqueados (5 tokens da criação)
@@ -250,6 +294,67 @@ class ValidacaoPreco(Base):
     data_validacao = Column(DateTime, default=datetime.now, index=True)
 
 
+class Contador(Base):
+    """Contadores globais mantidos pelos caminhos de escrita (ver app/utils/contadores.py)"""
+    __tablename__ = "contadores"
+
+    chave = Column(String, primary_key=True)
+    valor = Column(Float, nullable=False, default=0.0)
+    data_atualizacao = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class PrecoConsenso(Base):
+    """Preço de consenso por produto × supermercado ("*" = qualquer loja), ver app/utils/consenso.py"""
+    __tablename__ = "precos_consenso"
+
+    produto_id = Column(Integer, ForeignKey("produtos.id"), primary_key=True)
+    supermercado = Column(String, primary_key=True)
+    mediana = Column(Float)
+    quartil_inferior = Column(Float)
+    quartil_superior = Column(Float)
+    peso = Column(Float, default=0.0)  # Peso efetivo (reputação dos autores, com esquecimento)
+    observacoes = Column(Integer, default=0, nullable=False)
+    estado = Column(String, nullable=False)  # Marcadores do estimador P² (JSON)
+    data_atualizacao = Column(DateTime, default=datetime.now)
+
+
+class OfertaDestaque(Base):
+    """Ranking das maiores promoções por supermercado ("*" = todos), ver app/utils/ofertas.py"""
+    __tablename__ = "ofertas_destaque"
+
+    escopo = Column(String, primary_key=True)
+    preco_id = Column(Integer, ForeignKey("precos.id"), primary_key=True)
+    desconto_percentual = Column(Float, nullable=False)
+    data_coleta = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_ofertas_destaque_ranking", "escopo", "desconto_percentual"),
+    )
+
+
+class EventoReputacao(Base):
+    """Livro de eventos de reputação (só inserção; aplicado em lotes por ReputacaoManager.aplicar_eventos)"""
+    __tablename__ = "eventos_reputacao"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_nome = Column(String, nullable=False, index=True)
+    pontos = Column(Float, nullable=False)  # Positivo = ganho, negativo = perda
+    motivo = Column(String)
+    data_criacao = Column(DateTime, default=datetime.now)
+
+
+class AgendaAtualizacao(Base):
+    """Próxima atualização de preço por produto, por demanda (ver app/utils/agenda_atualizacao.py)"""
+    __tablename__ = "agenda_atualizacao"
+
+    produto_id = Column(Integer, ForeignKey("produtos.id"), primary_key=True)
+    buscas = Column(Float, default=0.0, nullable=False)  # Buscas com decaimento exponencial
+    data_ultima_busca = Column(DateTime)
+    demanda = Column(Float, default=0.0, nullable=False)  # Última pontuação (buscas + alertas + volatilidade)
+    proxima_atualizacao = Column(DateTime, index=True)  # NULL = avaliar no próximo ciclo
+    data_ultima_atualizacao = Column(DateTime)
+
+
 # Database connection
 DATABASE_URL = "sqlite:///./precos.db"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
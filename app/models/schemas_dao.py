@@ -64,6 +64,7 @@ class SugestaoResponse(BaseModel):
     total_tokens_votados: int
     porcentagem_aprovacao: float
     total_aprovadores: int
+    total_votantes: int = 0  # Pessoas distintas que votaram
     aprovadores: Optional[str] = None  # Lista de moderadores que aprovaram (separados por vírgula)
     # Escrow de tokens
     tokens_escrow: float = 0.0
@@ -7,6 +7,7 @@ class PrecoManualCreate(BaseModel):
     """Schema for manually adding a price"""
     produto_nome: str = Field(..., min_length=3, max_length=200, description="Nome do produto")
     produto_marca: Optional[str] = Field(None, max_length=100, description="Marca do produto")
+    produto_ean: Optional[str] = Field(None, max_length=20, description="Código de barras (EAN/GTIN)")
     supermercado: str = Field(..., description="Nome do supermercado/loja")
     preco: float = Field(..., gt=0, description="Preço do produto")
     em_promocao: bool = Field(default=False, description="Produto está em promoção?")
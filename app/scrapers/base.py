@@ -1,16 +1,16 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
-import requests
 from bs4 import BeautifulSoup
+import httpx
 import time
-import random
+
+from app.scrapers.cliente_http import registro_http
 
 
 class BaseScraper(ABC):
     """Base class for all supermarket scrapers"""
 
     def __init__(self):
-        self.session = requests.Session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -27,20 +27,26 @@ class BaseScraper(ABC):
         """Return the supermarket name"""
         pass
 
-    def _get_page(self, url: str, retries: int = 3) -> Optional[BeautifulSoup]:
-        """Get page content with retries"""
+    def _get_page(self, url: str, retries: int = 3) -> BeautifulSoup:
+        """
+        Get page content with retries (shared pool, per-host rate limit in registro_http)
+
+        Raises:
+            httpx.HTTPError: network error or non-2xx status after the last retry. A source
+                that is down must fail, not look like a search with no products
+                (saude_fontes and the Celery retries only see exceptions)
+        """
         for attempt in range(retries):
             try:
-                time.sleep(random.uniform(1, 3))  # Random delay to avoid blocking
-                response = self.session.get(url, headers=self.headers, timeout=10)
+                response = registro_http.get(url, headers=self.headers)
                 response.raise_for_status()
-                return BeautifulSoup(response.content, 'lxml')
-            except Exception as e:
+            except httpx.HTTPError as e:
                 if attempt == retries - 1:
                     print(f"Error fetching {url}: {e}")
-                    return None
+                    raise
                 time.sleep(2 ** attempt)  # Exponential backoff
-        return None
+                continue
+            return BeautifulSoup(response.content, 'lxml')
 
     def _clean_price(self, price_str: str) -> Optional[float]:
         """Clean and convert price string to float"""
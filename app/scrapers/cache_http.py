@@ -0,0 +1,259 @@
+"""
+Cache HTTP em disco para os scrapers
+Respostas guardadas em SQLite, respeitando Cache-Control, ETag e Last-Modified
+(revalidação condicional), com TTL mínimo por fonte e limite de tamanho (LRU)
+"""
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+
+CACHE_ARQUIVO = os.getenv("SCRAPER_CACHE_ARQUIVO", "./cache_http.db")
+CACHE_MAX_MB = float(os.getenv("SCRAPER_CACHE_MAX_MB", "200"))
+
+# Mesmo que o servidor mande max-age=0, preço de busca não muda de um minuto para o outro
+TTL_MINIMO_SEGUNDOS = int(os.getenv("SCRAPER_CACHE_TTL_MINIMO", "300"))
+TTL_MINIMO_POR_HOST: Dict[str, int] = {
+    "api.mercadolibre.com": 600,
+    "lista.mercadolivre.com.br": 600,
+    "nominatim.openstreetmap.org": 86400,  # Endereço -> coordenadas quase nunca muda
+    "overpass-api.de": 86400,
+}
+
+
+class CacheHTTP:
+    """Respostas GET (status 200) por método + URL + parâmetros
+
+    - Fresca (dentro do TTL): devolvida sem rede ("acertos")
+    - Vencida com ETag/Last-Modified: requisição condicional; 304 renova a entrada
+      ("revalidacoes") sem baixar o corpo de novo
+    - TTL = max(max-age/s-maxage/Expires do servidor, TTL mínimo do host); no-store não é guardado
+    - Passou de CACHE_MAX_MB: remove as menos acessadas até 90% do limite
+    """
+
+    def __init__(self, arquivo: str = CACHE_ARQUIVO, max_mb: float = CACHE_MAX_MB):
+        self.arquivo = arquivo
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._metricas = {"acertos": 0, "revalidacoes": 0, "faltas": 0, "gravacoes": 0, "removidas": 0,
+                          "bytes_economizados": 0}
+        self._criar_tabela()
+
+    # ---------- Conexão ----------
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.arquivo, timeout=10, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _criar_tabela(self):
+        conexao = self._conexao()
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                corpo BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expira_em REAL NOT NULL,
+                acessado_em REAL NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+        """)
+        conexao.execute("CREATE INDEX IF NOT EXISTS ix_respostas_acessado_em ON respostas(acessado_em)")
+
+    # ---------- Chave e política ----------
+
+    @staticmethod
+    def chave(metodo: str, url: str, params: Optional[Dict] = None) -> str:
+        bruto = json.dumps([metodo.upper(), url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(bruto.encode()).hexdigest()
+
+    @staticmethod
+    def cacheavel(metodo: str, **kwargs) -> bool:
+        return metodo.upper() == "GET" and not kwargs.get("json") and not kwargs.get("data")
+
+    def ttl(self, url: str, headers: httpx.Headers) -> Optional[float]:
+        """Segundos de validade; None quando a resposta não pode ser guardada"""
+        diretivas = {}
+        for parte in headers.get("cache-control", "").lower().split(","):
+            nome, _, valor = parte.strip().partition("=")
+            if nome:
+                diretivas[nome] = valor.strip('"')
+
+        if "no-store" in diretivas:
+            return None
+
+        servidor = 0.0
+        if "no-cache" not in diretivas:
+            idade = diretivas.get("s-maxage") or diretivas.get("max-age")
+            if idade and idade.isdigit():
+                servidor = float(idade)
+            elif headers.get("expires"):
+                try:
+                    servidor = email.utils.parsedate_to_datetime(headers["expires"]).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    servidor = 0.0
+
+        minimo = TTL_MINIMO_POR_HOST.get(urlsplit(url).hostname or "", TTL_MINIMO_SEGUNDOS)
+        return max(servidor, minimo)
+
+    # ---------- Fluxo de uma requisição ----------
+
+    def consultar(self, metodo: str, url: str, **kwargs) -> Tuple[Optional[str], Optional[Tuple], Dict[str, str]]:
+        """
+        Antes de ir à rede: (chave, entrada, headers condicionais)
+
+        chave None = requisição não cacheável. Entrada fresca: usar entrada[0] e não
+        requisitar (já contado como acerto). Vencida: requisitar com os headers
+        condicionais e passar a resposta para concluir.
+        """
+        if not self.cacheavel(metodo, **kwargs):
+            return None, None, {}
+
+        chave = self.chave(metodo, url, kwargs.get("params"))
+        entrada = self.obter(chave)
+        if entrada is None:
+            return chave, None, {}
+
+        resposta, fresca, condicionais = entrada
+        if fresca:
+            self.tocar(chave)
+            self._contar("acertos")
+            self._contar("bytes_economizados", len(resposta.content))
+            return chave, entrada, {}
+        return chave, entrada, condicionais
+
+    def concluir(self, chave: Optional[str], entrada: Optional[Tuple], resposta: httpx.Response) -> httpx.Response:
+        """Depois da rede: 304 devolve a cópia guardada (renovada); 200 é guardado"""
+        if chave is None:
+            return resposta
+
+        if resposta.status_code == 304 and entrada is not None:
+            guardada = entrada[0]
+            self.renovar(chave, resposta, str(guardada.url))
+            self._contar("revalidacoes")
+            self._contar("bytes_economizados", len(guardada.content))
+            return guardada
+
+        self._contar("faltas")
+        self.guardar(chave, resposta)
+        return resposta
+
+    # ---------- Leitura e escrita ----------
+
+    def obter(self, chave: str) -> Optional[Tuple[httpx.Response, bool, Dict[str, str]]]:
+        """
+        (resposta, fresca, headers condicionais) ou None
+
+        Os headers condicionais (If-None-Match/If-Modified-Since) só vêm quando a
+        entrada está vencida e o servidor mandou ETag ou Last-Modified.
+        """
+        linha = self._conexao().execute(
+            "SELECT url, status, headers, corpo, etag, last_modified, expira_em FROM respostas WHERE chave = ?",
+            (chave,)
+        ).fetchone()
+        if linha is None:
+            return None
+
+        url, status, headers, corpo, etag, last_modified, expira_em = linha
+        resposta = httpx.Response(
+            status, headers=json.loads(headers), content=corpo, request=httpx.Request("GET", url)
+        )
+        condicionais = {}
+        if etag:
+            condicionais["If-None-Match"] = etag
+        if last_modified:
+            condicionais["If-Modified-Since"] = last_modified
+        return resposta, expira_em > time.time(), condicionais
+
+    def guardar(self, chave: str, resposta: httpx.Response):
+        if resposta.status_code != 200:
+            return
+        ttl = self.ttl(str(resposta.url), resposta.headers)
+        if ttl is None:
+            return
+
+        # O corpo já vem descomprimido: não guardar os headers de codificação/tamanho
+        headers = {
+            nome: valor for nome, valor in resposta.headers.items()
+            if nome.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        }
+        corpo = resposta.content
+        agora = time.time()
+        self._conexao().execute(
+            "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (chave, str(resposta.url), resposta.status_code, json.dumps(headers), corpo,
+             resposta.headers.get("etag"), resposta.headers.get("last-modified"),
+             agora + ttl, agora, len(corpo))
+        )
+        self._contar("gravacoes")
+        self._limitar_tamanho()
+
+    def renovar(self, chave: str, resposta_304: httpx.Response, url: str):
+        """Servidor respondeu 304: a entrada vale mais um TTL"""
+        ttl = self.ttl(url, resposta_304.headers) or 0
+        agora = time.time()
+        self._conexao().execute(
+            "UPDATE respostas SET expira_em = ?, acessado_em = ? WHERE chave = ?", (agora + ttl, agora, chave)
+        )
+
+    def tocar(self, chave: str):
+        self._conexao().execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+
+    def _limitar_tamanho(self):
+        conexao = self._conexao()
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excesso = total - int(self.max_bytes * 0.9)
+        removidas = 0
+        for chave, tamanho in conexao.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY acessado_em"
+        ).fetchall():
+            if excesso <= 0:
+                break
+            conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            excesso -= tamanho
+            removidas += 1
+        self._contar("removidas", removidas)
+
+    # ---------- Métricas ----------
+
+    def _contar(self, metrica: str, quantidade: int = 1):
+        with self._lock:
+            self._metricas[metrica] += quantidade
+
+    def metricas(self) -> Dict:
+        with self._lock:
+            metricas = dict(self._metricas)
+        entradas, tamanho = self._conexao().execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+        ).fetchone()
+        consultas = metricas["acertos"] + metricas["revalidacoes"] + metricas["faltas"]
+        metricas.update({
+            "taxa_acerto": round((metricas["acertos"] + metricas["revalidacoes"]) / consultas, 3) if consultas else 0.0,
+            "entradas": entradas,
+            "tamanho_mb": round(tamanho / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2)
+        })
+        return metricas
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM respostas")
@@ -6,9 +6,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-import time
 import re
 
+from app.scrapers.recursos_pagina import (
+    bloquear_recursos_selenium, configurar_opcoes_selenium, registrar_pagina_selenium
+)
+
 
 class CarrefourSeleniumScraper:
     """Scraper para Carrefour usando Selenium"""
@@ -30,8 +33,11 @@ class CarrefourSeleniumScraper:
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
 
+        configurar_opcoes_selenium(chrome_options)  # Sem imagens, com log de rede
+
         service = Service(ChromeDriverManager().install())
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        bloquear_recursos_selenium(self.driver)
 
     def get_supermercado_name(self) -> str:
         return "Carrefour"
@@ -57,15 +63,17 @@ class CarrefourSeleniumScraper:
 
             self.driver.get(search_url)
 
-            # Aguardar carregamento da página
-            time.sleep(3)
-
-            # Esperar produtos carregarem
+            # Esperar produtos carregarem (termina no primeiro card, sem sleep fixo)
             try:
                 WebDriverWait(self.driver, 10).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-testid='product-card'], article, div.product"))
                 )
+                encontrou = True
             except:
+                encontrou = False
+
+            registrar_pagina_selenium(self.driver, self.get_supermercado_name())
+            if not encontrou:
                 print("   Nenhum produto encontrado ou timeout")
                 return []
 
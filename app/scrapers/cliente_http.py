@@ -0,0 +1,297 @@
+"""
+Cliente HTTP compartilhado pelos scrapers
+Um pool de conexões (keep-alive, HTTP/2 quando o pacote h2 está instalado) por
+processo, limite de taxa por host (balde de tokens), cache de DNS (só nestes clientes) e timeouts
+configuráveis pelo ambiente
+"""
+import asyncio
+import importlib.util
+import ipaddress
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from app.scrapers.cache_http import CacheHTTP
+
+
+HTTP2_DISPONIVEL = importlib.util.find_spec("h2") is not None
+
+TIMEOUT_CONEXAO = float(os.getenv("SCRAPER_TIMEOUT_CONEXAO", "5"))
+TIMEOUT_LEITURA = float(os.getenv("SCRAPER_TIMEOUT_LEITURA", "10"))
+
+# Requisições por segundo e rajada por host (substituem os sleeps aleatórios)
+TAXA_POR_HOST = float(os.getenv("SCRAPER_TAXA_POR_HOST", "1"))
+RAJADA_POR_HOST = int(os.getenv("SCRAPER_RAJADA_POR_HOST", "3"))
+
+# Hosts que aguentam (ou exigem) outro ritmo: host -> (taxa, rajada)
+TAXAS_POR_HOST: Dict[str, Tuple[float, int]] = {
+    "api.mercadolibre.com": (5.0, 10),  # API oficial
+    "overpass-api.de": (0.5, 1),
+    "nominatim.openstreetmap.org": (1.0, 1),  # Política de uso: 1 requisição/s
+}
+
+DNS_TTL_SEGUNDOS = int(os.getenv("SCRAPER_DNS_TTL_SEGUNDOS", "300"))
+
+CACHE_ATIVO = os.getenv("SCRAPER_CACHE_ATIVO", "1") != "0"
+
+
+class BaldeTokens:
+    """Balde de tokens thread-safe; a espera é reservada (o saldo pode ficar negativo)"""
+
+    def __init__(self, taxa: float, capacidade: int):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self) -> float:
+        """Consome um token e devolve quantos segundos esperar antes de usar"""
+        with self._lock:
+            agora = time.monotonic()
+            self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+            self.atualizado_em = agora
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.taxa)
+
+    def aguardar(self):
+        espera = self.reservar()
+        if espera:
+            time.sleep(espera)
+
+    async def aguardar_async(self):
+        espera = self.reservar()
+        if espera:
+            await asyncio.sleep(espera)
+
+
+class CacheDNS:
+    """Cache de resolução de nomes com TTL, só para os clientes HTTP dos scrapers
+
+    Não mexe em socket.getaddrinfo: Redis, broker do Celery, banco e APIs externas
+    continuam resolvendo pelo sistema. Entra nos transportes do httpx pelos
+    ResolvedorDNS abaixo.
+    """
+
+    MAXIMO_ENTRADAS = 1024
+
+    def __init__(self, ttl: int = DNS_TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._entradas: Dict[tuple, Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _enderecos(resultado: list) -> List[str]:
+        """IPs do getaddrinfo, sem repetição e na ordem do sistema"""
+        return list(dict.fromkeys(sockaddr[0] for *_, sockaddr in resultado))
+
+    def _obter(self, host: str, port: int) -> Optional[List[str]]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entrada = self._entradas.get((host, port))
+        if entrada and entrada[0] > time.monotonic():
+            return entrada[1]
+        return None
+
+    def _guardar(self, host: str, port: int, enderecos: List[str]):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entradas) >= self.MAXIMO_ENTRADAS:
+                self._entradas.clear()
+            self._entradas[(host, port)] = (time.monotonic() + self.ttl, enderecos)
+
+    def resolver(self, host: str, port: int) -> List[str]:
+        enderecos = self._obter(host, port)
+        if enderecos is None:
+            enderecos = self._enderecos(socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+            self._guardar(host, port, enderecos)
+        return enderecos
+
+    async def resolver_async(self, host: str, port: int) -> List[str]:
+        enderecos = self._obter(host, port)
+        if enderecos is None:
+            resultado = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            enderecos = self._enderecos(resultado)
+            self._guardar(host, port, enderecos)
+        return enderecos
+
+
+def _ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class ResolvedorDNS(httpcore.NetworkBackend):
+    """Backend de rede do httpcore que resolve pelo CacheDNS e conecta no IP
+
+    O TLS continua usando o nome do host (SNI e verificação do certificado vêm da
+    origem da requisição, não do endereço conectado). Tenta os IPs em ordem, como
+    socket.create_connection.
+    """
+
+    def __init__(self, cache_dns: CacheDNS, original: httpcore.NetworkBackend):
+        self.cache_dns = cache_dns
+        self.original = original
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _ip_literal(host):
+            return self.original.connect_tcp(host, port, timeout, local_address, socket_options)
+        try:
+            enderecos = self.cache_dns.resolver(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+
+        erro = None
+        for endereco in enderecos:
+            try:
+                return self.original.connect_tcp(endereco, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                erro = e
+        raise erro or httpcore.ConnectError(f"Sem endereços para {host}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self.original.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float):
+        self.original.sleep(seconds)
+
+
+class ResolvedorDNSAsync(httpcore.AsyncNetworkBackend):
+    """Versão assíncrona do ResolvedorDNS (a resolução não bloqueia o loop)"""
+
+    def __init__(self, cache_dns: CacheDNS, original: httpcore.AsyncNetworkBackend):
+        self.cache_dns = cache_dns
+        self.original = original
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _ip_literal(host):
+            return await self.original.connect_tcp(host, port, timeout, local_address, socket_options)
+        try:
+            enderecos = await self.cache_dns.resolver_async(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+
+        erro = None
+        for endereco in enderecos:
+            try:
+                return await self.original.connect_tcp(endereco, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                erro = e
+        raise erro or httpcore.ConnectError(f"Sem endereços para {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.original.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self.original.sleep(seconds)
+
+
+class RegistroHTTP:
+    """Clientes HTTP do processo
+
+    - cliente(): httpx.Client síncrono (thread-safe) para os scrapers atuais
+    - cliente_async(): httpx.AsyncClient que vive em um loop de fundo próprio, para
+      que as conexões sejam reaproveitadas entre buscas (executar roda corrotinas nele)
+    - get/post/requisitar: requisição síncrona respeitando o limite do host
+    - cache(): cache HTTP em disco usado pelos GETs (resposta fresca não gasta token)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cliente: Optional[httpx.Client] = None
+        self._cliente_async: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._baldes: Dict[str, BaldeTokens] = {}
+        self._cache: Optional[CacheHTTP] = None
+        self.cache_dns = CacheDNS()
+
+    def _opcoes(self) -> Dict:
+        return {
+            "timeout": httpx.Timeout(TIMEOUT_LEITURA, connect=TIMEOUT_CONEXAO),
+            "follow_redirects": True,
+        }
+
+    def _opcoes_transporte(self) -> Dict:
+        return {
+            "http2": HTTP2_DISPONIVEL,
+            "limits": httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+        }
+
+    def cliente(self) -> httpx.Client:
+        with self._lock:
+            if self._cliente is None:
+                transporte = httpx.HTTPTransport(**self._opcoes_transporte())
+                # O httpx 0.25 não expõe network_backend no transporte: troca no pool do httpcore
+                transporte._pool._network_backend = ResolvedorDNS(self.cache_dns, transporte._pool._network_backend)
+                self._cliente = httpx.Client(transport=transporte, **self._opcoes())
+            return self._cliente
+
+    def cliente_async(self) -> httpx.AsyncClient:
+        """Só pode ser usado dentro do loop de fundo (corrotinas passadas a executar)"""
+        if self._cliente_async is None:
+            transporte = httpx.AsyncHTTPTransport(**self._opcoes_transporte())
+            transporte._pool._network_backend = ResolvedorDNSAsync(
+                self.cache_dns, transporte._pool._network_backend
+            )
+            self._cliente_async = httpx.AsyncClient(transport=transporte, **self._opcoes())
+        return self._cliente_async
+
+    def cache(self) -> Optional[CacheHTTP]:
+        """None quando desligado (SCRAPER_CACHE_ATIVO=0)"""
+        if not CACHE_ATIVO:
+            return None
+        with self._lock:
+            if self._cache is None:
+                self._cache = CacheHTTP()
+            return self._cache
+
+    def balde(self, host: str) -> BaldeTokens:
+        with self._lock:
+            if host not in self._baldes:
+                taxa, rajada = TAXAS_POR_HOST.get(host, (TAXA_POR_HOST, RAJADA_POR_HOST))
+                self._baldes[host] = BaldeTokens(taxa, rajada)
+            return self._baldes[host]
+
+    def requisitar(self, metodo: str, url: str, usar_cache: bool = True, **kwargs) -> httpx.Response:
+        """Requisição síncrona pelo pool compartilhado, esperando o token do host"""
+        cache = self.cache() if usar_cache else None
+        chave, entrada, condicionais = cache.consultar(metodo, url, **kwargs) if cache else (None, None, {})
+        if entrada is not None and entrada[1]:  # Fresca: nem vai à rede
+            return entrada[0]
+
+        if condicionais:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **condicionais}
+        self.balde(urlsplit(url).hostname or "").aguardar()
+        resposta = self.cliente().request(metodo, url, **kwargs)
+        return cache.concluir(chave, entrada, resposta) if cache else resposta
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.requisitar("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.requisitar("POST", url, **kwargs)
+
+    def executar(self, corrotina, timeout: float = None):
+        """Roda a corrotina no loop de fundo e espera o resultado (chamável de qualquer thread)"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="loop-http", daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(corrotina, self._loop).result(timeout)
+
+
+# Instância global
+registro_http = RegistroHTTP()
@@ -3,9 +3,10 @@ Descobre supermercados próximos usando geolocalização
 Usa APIs públicas para encontrar supermercados reais na região do usuário
 """
 from typing import List, Dict, Optional
-import requests
 import json
 
+from app.scrapers.cliente_http import registro_http
+
 
 class DescobrirSupermercados:
     """
@@ -57,7 +58,7 @@ class DescobrirSupermercados:
         supermercados = []
 
         try:
-            response = requests.post(
+            response = registro_http.post(
                 self.overpass_url,
                 data={'data': overpass_query},
                 timeout=30,
@@ -178,7 +179,7 @@ class DescobrirSupermercados:
                 'addressdetails': 1
             }
 
-            response = requests.get(
+            response = registro_http.get(
                 geocode_url,
                 params=params,
                 headers={'User-Agent': 'AppDeMercados/1.0'},
@@ -213,7 +214,7 @@ class DescobrirSupermercados:
                 'format': 'json'
             }
 
-            response = requests.get(
+            response = registro_http.get(
                 self.nominatim_url,
                 params=params,
                 headers={'User-Agent': 'AppDeMercados/1.0'},
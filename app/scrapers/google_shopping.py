@@ -1,6 +1,7 @@
 from .base import BaseScraper
 from typing import List, Dict
 from urllib.parse import quote
+import httpx
 import re
 
 
@@ -26,13 +27,12 @@ class GoogleShoppingScraper(BaseScraper):
         search_url = f"{self.base_url}/search?q={termo_encoded}+preço+supermercado&tbm=shop"
 
         print(f"🔍 Buscando no Google Shopping: {termo}")
-        soup = self._get_page(search_url)
-        if not soup:
-            # Try regular Google search with shopping intent
+        try:
+            soup = self._get_page(search_url)
+        except httpx.HTTPStatusError:
+            # Try regular Google search with shopping intent (network errors propagate: same host)
             search_url = f"{self.base_url}/search?q={termo_encoded}+preço+comprar"
             soup = self._get_page(search_url)
-            if not soup:
-                return []
 
         produtos = []
 
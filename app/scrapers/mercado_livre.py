@@ -1,6 +1,6 @@
 from typing import List, Dict
-import requests
-import time
+
+from app.scrapers.cliente_http import registro_http
 
 
 class MercadoLivreScraper:
@@ -14,7 +14,13 @@ class MercadoLivreScraper:
         return "Mercado Livre"
 
     def search(self, termo: str) -> List[Dict]:
-        """Search for products on Mercado Livre using official API"""
+        """
+        Search for products on Mercado Livre using official API
+
+        Raises:
+            httpx.HTTPError: network error or non-2xx status (an API that is down is a
+                failure for saude_fontes, not an empty search)
+        """
         try:
             # Buscar apenas em categorias de supermercado/alimentos
             categorias_alimentos = [
@@ -25,8 +31,6 @@ class MercadoLivreScraper:
             todos_produtos = []
 
             for categoria in categorias_alimentos:
-                time.sleep(0.5)  # Rate limiting
-
                 # API endpoint para busca
                 url = f"{self.api_url}/sites/{self.site_id}/search"
                 params = {
@@ -36,9 +40,8 @@ class MercadoLivreScraper:
                     'offset': 0
                 }
 
-                response = requests.get(url, params=params, timeout=10)
-                if response.status_code != 200:
-                    continue
+                response = registro_http.get(url, params=params, timeout=10)
+                response.raise_for_status()
 
                 data = response.json()
                 results = data.get('results', [])
@@ -62,6 +65,7 @@ class MercadoLivreScraper:
                             'preco_original': preco_original,
                             'em_promocao': em_promocao,
                             'url': item.get('permalink', ''),
+                            'ean': next((a.get('value_name') for a in item.get('attributes', []) if a.get('id') == 'GTIN'), None),
                             'supermercado': self.get_supermercado_name(),
                             'disponivel': item.get('available_quantity', 0) > 0,
                             'thumbnail': item.get('thumbnail', '')
@@ -89,4 +93,4 @@ class MercadoLivreScraper:
 
         except Exception as e:
             print(f"Erro na API do Mercado Livre: {e}")
-            return []
+            raise
@@ -0,0 +1,161 @@
+"""
+Motor assíncrono de scraping
+Busca em todas as fontes HTTP ao mesmo tempo (asyncio + httpx), com limite de
+requisições simultâneas por host e prazo total: uma busca demora o tempo da fonte
+mais lenta (ou o prazo), e não a soma das fontes
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.scrapers.cliente_http import registro_http
+
+
+class FontesFalharam(Exception):
+    """Nenhuma fonte respondeu (rede, HTTP fora de 2xx ou prazo): não é uma busca sem produtos"""
+
+    def __init__(self, falhas: Dict[str, str]):
+        super().__init__("; ".join(f"{nome}: {motivo}" for nome, motivo in falhas.items()))
+        self.falhas = falhas
+
+
+class FonteHTTP:
+    """Uma requisição de uma fonte e a função que extrai os produtos da resposta
+
+    extrair recebe a resposta (httpx.Response, já com status 2xx) e devolve a lista
+    de produtos normalizados; roda em uma thread para não travar o loop no parse do HTML.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        url: str,
+        extrair: Callable[[httpx.Response], List[Dict]],
+        metodo: str = "GET",
+        params: Optional[Dict] = None,
+        json: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ):
+        self.nome = nome
+        self.url = url
+        self.extrair = extrair
+        self.metodo = metodo
+        self.params = params
+        self.json = json
+        self.headers = headers or {}
+        self.timeout = timeout
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).hostname or ""
+
+
+class MotorScraping:
+    """Executa várias FonteHTTP em paralelo
+
+    - No máximo LIMITE_POR_HOST requisições simultâneas no mesmo host, e no ritmo
+      do balde de tokens do host (cliente_http)
+    - Prazo total: o que não terminou é cancelado e o resultado sai parcial
+    - Falha de uma fonte não derruba as outras (vai para "falhas")
+    - GETs passam pelo cache HTTP em disco (cache_http): resposta fresca não vai à rede
+
+    As corrotinas rodam no loop de fundo do registro_http, com o AsyncClient
+    compartilhado (conexões reaproveitadas entre buscas).
+    """
+
+    LIMITE_POR_HOST = 2
+    PRAZO_PADRAO = 12.0  # segundos para a busca inteira
+
+    def __init__(self, limite_por_host: int = None, prazo: float = None):
+        self.limite_por_host = limite_por_host or self.LIMITE_POR_HOST
+        self.prazo = prazo or self.PRAZO_PADRAO
+
+    def executar(self, fontes: List[FonteHTTP], prazo: float = None) -> Dict:
+        """
+        Versão síncrona de executar_async, para os scrapers atuais
+        (chamável de qualquer thread, inclusive de endpoints async)
+
+        Returns:
+            Dict com resultados (fonte -> produtos), falhas (fonte -> motivo) e segundos
+        """
+        return registro_http.executar(self.executar_async(fontes, prazo))
+
+    def buscar(self, fonte: FonteHTTP, prazo: float = None) -> List[Dict]:
+        """Uma fonte só (lista vazia se falhar ou estourar o prazo)"""
+        return self.executar([fonte], prazo)["resultados"].get(fonte.nome, [])
+
+    async def executar_async(self, fontes: List[FonteHTTP], prazo: float = None) -> Dict:
+        inicio = time.monotonic()
+        semaforos: Dict[str, asyncio.Semaphore] = {}
+
+        cliente = registro_http.cliente_async()
+        tarefas = {
+            asyncio.create_task(self._buscar_fonte(cliente, semaforos, fonte)): fonte
+            for fonte in fontes
+        }
+        pendentes = set()
+        if tarefas:
+            _, pendentes = await asyncio.wait(tarefas, timeout=prazo or self.prazo)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            await asyncio.gather(*pendentes, return_exceptions=True)
+
+        resultados = {}
+        falhas = {}
+        for tarefa, fonte in tarefas.items():
+            if tarefa in pendentes:
+                falhas[fonte.nome] = "prazo esgotado"
+            elif isinstance(tarefa.exception(), httpx.HTTPStatusError):
+                falhas[fonte.nome] = f"HTTP {tarefa.exception().response.status_code}"
+            elif tarefa.exception() is not None:
+                erro = tarefa.exception()
+                falhas[fonte.nome] = str(erro) or type(erro).__name__
+            else:
+                resultados[fonte.nome] = tarefa.result()
+
+        for nome, produtos in resultados.items():
+            print(f"   ✓ {nome}: {len(produtos)} produtos")
+        for nome, motivo in falhas.items():
+            print(f"   ✗ {nome}: {motivo}")
+
+        return {
+            "resultados": resultados,
+            "falhas": falhas,
+            "segundos": round(time.monotonic() - inicio, 2)
+        }
+
+    async def _buscar_fonte(self, cliente: httpx.AsyncClient, semaforos: Dict[str, asyncio.Semaphore],
+                            fonte: FonteHTTP) -> List[Dict]:
+        cache = registro_http.cache()
+        chave, entrada, condicionais = (None, None, {})
+        if cache:
+            chave, entrada, condicionais = await asyncio.to_thread(
+                cache.consultar, fonte.metodo, fonte.url, params=fonte.params, json=fonte.json
+            )
+
+        if entrada is not None and entrada[1]:  # Fresca no cache: sem rede nem token
+            resposta = entrada[0]
+        else:
+            semaforo = semaforos.setdefault(fonte.host, asyncio.Semaphore(self.limite_por_host))
+            async with semaforo:
+                await registro_http.balde(fonte.host).aguardar_async()
+                resposta = await cliente.request(
+                    fonte.metodo,
+                    fonte.url,
+                    params=fonte.params,
+                    json=fonte.json,
+                    headers={**fonte.headers, **condicionais},
+                    timeout=fonte.timeout or httpx.USE_CLIENT_DEFAULT
+                )
+            if cache:
+                resposta = await asyncio.to_thread(cache.concluir, chave, entrada, resposta)
+        resposta.raise_for_status()
+        return await asyncio.to_thread(fonte.extrair, resposta)
+
+
+# Instância global
+motor_scraping = MotorScraping()
@@ -6,9 +6,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-import time
 import re
 
+from app.scrapers.recursos_pagina import (
+    bloquear_recursos_selenium, configurar_opcoes_selenium, registrar_pagina_selenium
+)
+
 
 class PaoAcucarSeleniumScraper:
     """Scraper para Pão de Açúcar usando Selenium"""
@@ -30,8 +33,11 @@ class PaoAcucarSeleniumScraper:
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
 
+        configurar_opcoes_selenium(chrome_options)  # Sem imagens, com log de rede
+
         service = Service(ChromeDriverManager().install())
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        bloquear_recursos_selenium(self.driver)
 
     def get_supermercado_name(self) -> str:
         return "Pão de Açúcar"
@@ -54,13 +60,18 @@ class PaoAcucarSeleniumScraper:
             print(f"   Acessando: {search_url}")
 
             self.driver.get(search_url)
-            time.sleep(3)
 
+            # Esperar produtos carregarem (termina no primeiro card, sem sleep fixo)
             try:
                 WebDriverWait(self.driver, 10).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "div[class*='product'], article, li[class*='product']"))
                 )
+                encontrou = True
             except:
+                encontrou = False
+
+            registrar_pagina_selenium(self.driver, self.get_supermercado_name())
+            if not encontrou:
                 print("   Nenhum produto encontrado ou timeout")
                 return []
 
@@ -0,0 +1,330 @@
+"""
+Pool de navegadores Playwright
+Número fixo de Chromium de vida longa com contextos pré-criados: os scrapers pegam
+uma página emprestada e devolvem, sem pagar a partida a frio do navegador a cada busca
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+
+from app.scrapers.recursos_pagina import EconomiaPlaywright
+
+
+NAVEGADORES = int(os.getenv("PLAYWRIGHT_NAVEGADORES", "2"))
+CONTEXTOS_POR_NAVEGADOR = int(os.getenv("PLAYWRIGHT_CONTEXTOS_POR_NAVEGADOR", "2"))
+HEADLESS = os.getenv("PLAYWRIGHT_HEADLESS", "1") != "0"
+
+# Reciclagem: o Chromium vaza memória em sessões longas
+PAGINAS_POR_NAVEGADOR = int(os.getenv("PLAYWRIGHT_PAGINAS_POR_NAVEGADOR", "200"))
+MEMORIA_MAXIMA_MB = int(os.getenv("PLAYWRIGHT_MEMORIA_MAXIMA_MB", "1024"))
+
+ARGUMENTOS_CHROMIUM = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+]
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+]
+
+SCRIPT_ANTI_DETECCAO = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+    Object.defineProperty(navigator, 'languages', {get: () => ['pt-BR', 'pt', 'en-US', 'en']});
+"""
+
+
+class _Navegador:
+    """Um Chromium do pool e seus contextos"""
+
+    def __init__(self, indice: int):
+        self.indice = indice
+        self.browser: Optional[Browser] = None
+        self.contextos: List[BrowserContext] = []
+        self.geracao = 0  # Muda a cada reinício: contextos de gerações antigas são descartados
+        self.paginas = 0
+        self.em_uso = 0
+        self.reciclar = False
+        self.iniciado_em = 0.0
+        self.lock = asyncio.Lock()
+
+
+class PoolNavegadores:
+    """Navegadores compartilhados pelos scrapers Playwright
+
+    - NAVEGADORES Chromium x CONTEXTOS_POR_NAVEGADOR contextos, criados na primeira
+      página pedida; cada contexto atende uma página por vez, então o total de
+      contextos é o limite de páginas simultâneas (quem passa dele espera na fila)
+    - pagina(): empresta uma página nova de um contexto livre e a fecha na devolução
+    - Saúde: navegador desconectado (crash) é reiniciado; depois de PAGINAS_POR_NAVEGADOR
+      páginas ou acima de MEMORIA_MAXIMA_MB ele é reciclado assim que ficar ocioso
+    - Tudo roda em um loop de fundo próprio (objetos do Playwright são presos ao loop);
+      código síncrono usa executar()
+    """
+
+    ESPERA_MAXIMA = 30.0  # segundos esperando um contexto livre
+    INTERVALO_SAUDE = 30.0
+
+    def __init__(self, navegadores: int = NAVEGADORES, contextos_por_navegador: int = CONTEXTOS_POR_NAVEGADOR):
+        self.total_navegadores = navegadores
+        self.contextos_por_navegador = contextos_por_navegador
+        self._navegadores: List[_Navegador] = []
+        self._livres: Optional[asyncio.Queue] = None
+        self._playwright = None
+        self._iniciar_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._tarefa_saude = None
+        self.contagem = {"paginas": 0, "esperas": 0, "reinicios": 0, "reciclagens": 0}
+
+    # ---------- Loop de fundo ----------
+
+    def executar(self, corrotina, timeout: float = None):
+        """Roda a corrotina no loop do pool e espera o resultado (chamável de qualquer thread)
+
+        Estourado o timeout, a corrotina é cancelada (e a página devolvida ao pool).
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="loop-navegadores", daemon=True
+                ).start()
+                atexit.register(self.fechar)
+        futuro = asyncio.run_coroutine_threadsafe(corrotina, self._loop)
+        try:
+            return futuro.result(timeout)
+        except concurrent.futures.TimeoutError:
+            futuro.cancel()
+            raise
+
+    # ---------- Ciclo de vida ----------
+
+    async def _iniciar(self):
+        if self._iniciar_lock is None:
+            self._iniciar_lock = asyncio.Lock()
+        async with self._iniciar_lock:
+            if self._livres is not None:
+                return
+            self._playwright = await async_playwright().start()
+            livres = asyncio.Queue()
+            self._navegadores = [_Navegador(i) for i in range(self.total_navegadores)]
+            try:
+                for navegador in self._navegadores:
+                    await self._lancar(navegador, livres)
+            except Exception:
+                await self._fechar()  # Sem pool pela metade (nem processos órfãos)
+                raise
+            self._livres = livres
+            self._tarefa_saude = asyncio.create_task(self._verificar_saude())
+            print(f"   ✓ Pool Playwright: {self.total_navegadores} navegadores x "
+                  f"{self.contextos_por_navegador} contextos")
+
+    async def _lancar(self, navegador: _Navegador, livres: asyncio.Queue):
+        navegador.browser = await self._playwright.chromium.launch(headless=HEADLESS, args=ARGUMENTOS_CHROMIUM)
+        navegador.contextos = []
+        for _ in range(self.contextos_por_navegador):
+            contexto = await navegador.browser.new_context(
+                viewport={'width': 1920, 'height': 1080},
+                user_agent=random.choice(USER_AGENTS),
+                locale='pt-BR',
+                timezone_id='America/Sao_Paulo',
+                geolocation={'latitude': -23.5505, 'longitude': -46.6333},  # São Paulo
+                permissions=['geolocation'],
+                extra_http_headers={'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7', 'DNT': '1'}
+            )
+            await contexto.add_init_script(SCRIPT_ANTI_DETECCAO)
+            navegador.contextos.append(contexto)
+
+        navegador.geracao += 1
+        navegador.paginas = 0
+        navegador.reciclar = False
+        navegador.iniciado_em = time.time()
+        for contexto in navegador.contextos:
+            livres.put_nowait((navegador, navegador.geracao, contexto))
+
+    async def _reiniciar(self, navegador: _Navegador, motivo: str):
+        """Fecha e relança o navegador (só com nenhuma página dele em uso)"""
+        async with navegador.lock:
+            if navegador.em_uso or not (navegador.reciclar or not navegador.browser.is_connected()):
+                return
+            print(f"   ♻️  Navegador {navegador.indice}: reiniciando ({motivo})")
+            navegador.reciclar = True  # Se o relançamento falhar, a verificação de saúde tenta de novo
+            try:
+                await navegador.browser.close()
+            except Exception:
+                pass
+            await self._lancar(navegador, self._livres)
+            self.contagem["reinicios" if motivo == "desconectado" else "reciclagens"] += 1
+
+    async def _fechar(self):
+        if self._tarefa_saude:
+            self._tarefa_saude.cancel()
+        for navegador in self._navegadores:
+            try:
+                if navegador.browser:
+                    await navegador.browser.close()
+            except Exception:
+                pass
+        if self._playwright:
+            await self._playwright.stop()
+        self._navegadores = []
+        self._livres = None
+        self._playwright = None
+
+    def fechar(self):
+        """Fecha navegadores e o driver (registrado no atexit: nada de Chromium órfão)"""
+        if self._loop is not None and self._livres is not None:
+            try:
+                self.executar(self._fechar(), timeout=10)
+            except Exception:
+                pass
+
+    # ---------- Empréstimo de páginas ----------
+
+    @asynccontextmanager
+    async def pagina(self, fonte: str = None, espera_maxima: float = None):
+        """
+        Página nova de um contexto livre; fechada (e o contexto devolvido) na saída
+
+        Com fonte, a página só baixa o que o filtro de recursos permite e os bytes
+        baixados entram nas métricas da fonte (recursos_pagina).
+
+        Uso (dentro do loop do pool):
+            async with pool_navegadores.pagina("Mercado Livre") as page:
+                await page.goto(url)
+        """
+        await self._iniciar()
+        navegador, geracao, contexto = await self._emprestar(espera_maxima or self.ESPERA_MAXIMA)
+        page: Optional[Page] = None
+        economia = None
+        try:
+            page = await contexto.new_page()
+            if fonte:
+                economia = await EconomiaPlaywright.instalar(page, fonte)
+            yield page
+        finally:
+            if economia is not None:
+                economia.registrar()
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            await self._devolver(navegador, geracao, contexto)
+
+    async def _emprestar(self, espera_maxima: float):
+        limite = time.monotonic() + espera_maxima
+        while True:
+            if self._livres.empty():
+                self.contagem["esperas"] += 1
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise TimeoutError("Nenhum navegador livre no pool")
+            navegador, geracao, contexto = await asyncio.wait_for(self._livres.get(), restante)
+
+            if geracao != navegador.geracao:
+                continue  # Contexto de um navegador que já foi reiniciado
+            if navegador.reciclar or not navegador.browser.is_connected():
+                # Fora de circulação até ser reiniciado (pelo último a devolver, se houver)
+                await self._reiniciar(navegador, "desconectado" if not navegador.browser.is_connected() else "reciclagem")
+                continue
+
+            navegador.em_uso += 1
+            return navegador, geracao, contexto
+
+    async def _devolver(self, navegador: _Navegador, geracao: int, contexto: BrowserContext):
+        navegador.em_uso -= 1
+        navegador.paginas += 1
+        self.contagem["paginas"] += 1
+
+        if geracao != navegador.geracao:
+            return
+        if navegador.paginas >= PAGINAS_POR_NAVEGADOR:
+            navegador.reciclar = True
+
+        if not navegador.browser.is_connected():
+            await self._reiniciar(navegador, "desconectado")
+        elif navegador.reciclar:
+            await self._reiniciar(navegador, "reciclagem")
+        else:
+            self._livres.put_nowait((navegador, geracao, contexto))
+
+    # ---------- Saúde ----------
+
+    async def _memoria_mb(self, navegador: _Navegador) -> Optional[float]:
+        """RSS somado dos processos do navegador (pids via CDP, memória via /proc; só Linux)"""
+        try:
+            sessao = await navegador.browser.new_browser_cdp_session()
+            try:
+                info = await sessao.send("SystemInfo.getProcessInfo")
+            finally:
+                await sessao.detach()
+            pagina = os.sysconf("SC_PAGE_SIZE")
+            total = 0
+            for processo in info.get("processInfo", []):
+                with open(f"/proc/{processo['id']}/statm") as arquivo:
+                    total += int(arquivo.read().split()[1]) * pagina
+            return total / 1024 / 1024
+        except Exception:
+            return None
+
+    async def _verificar_saude(self):
+        while True:
+            await asyncio.sleep(self.INTERVALO_SAUDE)
+            for navegador in self._navegadores:
+                motivo = "reciclagem"
+                if not navegador.browser.is_connected():
+                    motivo = "desconectado"
+                elif not navegador.reciclar:
+                    memoria = await self._memoria_mb(navegador)
+                    if memoria is None or memoria <= MEMORIA_MAXIMA_MB:
+                        continue
+                    navegador.reciclar = True
+                    motivo = f"{memoria:.0f} MB"
+                try:
+                    await self._reiniciar(navegador, motivo)
+                except Exception as e:
+                    print(f"   ❌ Navegador {navegador.indice}: falha ao reiniciar ({e})")
+
+    def saude(self) -> Dict:
+        """Estado dos navegadores (para monitoramento)"""
+        return {
+            "iniciado": self._livres is not None,
+            "contextos_livres": sum(
+                self.contextos_por_navegador - navegador.em_uso for navegador in self._navegadores
+                if not navegador.reciclar and navegador.browser and navegador.browser.is_connected()
+            ),
+            "limite_paginas_simultaneas": self.total_navegadores * self.contextos_por_navegador,
+            "navegadores": [
+                {
+                    "indice": navegador.indice,
+                    "conectado": bool(navegador.browser and navegador.browser.is_connected()),
+                    "paginas": navegador.paginas,
+                    "em_uso": navegador.em_uso,
+                    "reciclar": navegador.reciclar,
+                    "idade_segundos": round(time.time() - navegador.iniciado_em)
+                }
+                for navegador in self._navegadores
+            ],
+            **self.contagem
+        }
+
+
+# Instância global
+pool_navegadores = PoolNavegadores()
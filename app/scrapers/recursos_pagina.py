@@ -0,0 +1,206 @@
+"""
+Economia de banda nos scrapers com navegador (Playwright e Selenium)
+Bloqueia tipos de recurso desnecessários (imagens, fontes, vídeo) e domínios de
+terceiros fora da lista permitida, e mede os bytes baixados por página
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+def _lista_env(nome: str, padrao: str) -> set:
+    return {item.strip().lower() for item in os.getenv(nome, padrao).split(",") if item.strip()}
+
+
+# Tipos de recurso do Playwright (request.resource_type) que nunca são baixados
+TIPOS_BLOQUEADOS = _lista_env("SCRAPER_TIPOS_BLOQUEADOS", "image,media,font,texttrack,manifest")
+
+# Terceiros permitidos (além do próprio site): CDNs de onde os sites carregam o JS que monta a vitrine
+DOMINIOS_PERMITIDOS = _lista_env(
+    "SCRAPER_DOMINIOS_PERMITIDOS",
+    "mlstatic.com,vtexassets.com,vteximg.com.br,vtex.com.br,vtexcommercestable.com.br,gstatic.com"
+)
+
+# Selenium não intercepta por allowlist: bloqueia por padrão de URL (extensões + rastreadores conhecidos)
+PADROES_BLOQUEADOS_SELENIUM = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.avif",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*tiktok.com*", "*criteo.*",
+]
+
+# Sufixos de dois níveis: o domínio do site é o terceiro rótulo ("carrefour.com.br")
+SUFIXOS_DUPLOS = {"com.br", "net.br", "org.br", "gov.br", "co.uk", "com.ar", "com.mx"}
+
+
+def dominio_base(host: str) -> str:
+    """
+    Domínio do site a partir do host
+
+    Exemplos: "mercado.carrefour.com.br" -> "carrefour.com.br", "www.google.com" -> "google.com"
+    """
+    rotulos = (host or "").lower().strip(".").split(".")
+    tamanho = 3 if ".".join(rotulos[-2:]) in SUFIXOS_DUPLOS else 2
+    return ".".join(rotulos[-tamanho:])
+
+
+class FiltroRecursos:
+    """Decide se uma requisição da página pode ser baixada"""
+
+    def __init__(self, tipos_bloqueados: set = None, dominios_permitidos: set = None):
+        self.tipos_bloqueados = TIPOS_BLOQUEADOS if tipos_bloqueados is None else tipos_bloqueados
+        self.dominios_permitidos = DOMINIOS_PERMITIDOS if dominios_permitidos is None else dominios_permitidos
+
+    def permitir(self, url: str, tipo: str, dominio_site: str) -> bool:
+        if tipo in self.tipos_bloqueados:
+            return False
+        if tipo == "document":
+            return True  # Navegação (e redirecionamentos) sempre passa
+
+        host = urlsplit(url).hostname or ""
+        if not host:
+            return True  # data:, blob:
+        dominio = dominio_base(host)
+        return dominio == dominio_site or dominio in self.dominios_permitidos
+
+
+class MetricasPaginas:
+    """Bytes baixados e requisições bloqueadas por fonte (acumulado do processo)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fontes: Dict[str, Dict] = {}
+
+    def registrar(self, fonte: str, bytes_baixados: int, requisicoes: int, bloqueadas: int):
+        with self._lock:
+            total = self._fontes.setdefault(fonte, {"paginas": 0, "bytes": 0, "requisicoes": 0, "bloqueadas": 0})
+            total["paginas"] += 1
+            total["bytes"] += bytes_baixados
+            total["requisicoes"] += requisicoes
+            total["bloqueadas"] += bloqueadas
+        print(f"   📉 {fonte}: {bytes_baixados / 1024:.0f} KB em {requisicoes} requisições "
+              f"({bloqueadas} bloqueadas)")
+
+    def resumo(self) -> Dict:
+        with self._lock:
+            return {
+                fonte: {**total, "kb_por_pagina": round(total["bytes"] / 1024 / total["paginas"], 1)}
+                for fonte, total in self._fontes.items()
+            }
+
+
+# Instância global
+metricas_paginas = MetricasPaginas()
+
+
+# ---------- Playwright ----------
+
+class EconomiaPlaywright:
+    """Interceptação e medição de uma página do Playwright
+
+    Uso (o pool_navegadores faz isso em pagina(fonte=...)):
+        economia = await EconomiaPlaywright.instalar(page, "Mercado Livre")
+        await page.goto(url)
+        ...
+        economia.registrar()
+
+    O site (primeira parte) é o domínio da navegação do frame principal; bytes são o
+    encodedDataLength do CDP (o que veio pela rede, comprimido), só no Chromium.
+    """
+
+    def __init__(self, fonte: str, filtro: FiltroRecursos):
+        self.fonte = fonte
+        self.dominio_site = ""
+        self.filtro = filtro
+        self.bytes = 0
+        self.requisicoes = 0
+        self.bloqueadas = 0
+        self._sessao = None
+
+    @classmethod
+    async def instalar(cls, page, fonte: str, filtro: Optional[FiltroRecursos] = None) -> "EconomiaPlaywright":
+        economia = cls(fonte, filtro or FiltroRecursos())
+        await page.route("**/*", economia._rotear)
+        try:
+            economia._sessao = await page.context.new_cdp_session(page)
+            await economia._sessao.send("Network.enable")
+            economia._sessao.on("Network.loadingFinished", economia._carregado)
+        except Exception:
+            economia._sessao = None  # Sem CDP (outro navegador): só o bloqueio
+        return economia
+
+    async def _rotear(self, route):
+        requisicao = route.request
+        if requisicao.is_navigation_request() and requisicao.frame.parent_frame is None:
+            self.dominio_site = dominio_base(urlsplit(requisicao.url).hostname or "")
+        if self.filtro.permitir(requisicao.url, requisicao.resource_type, self.dominio_site):
+            await route.continue_()
+        else:
+            self.bloqueadas += 1
+            await route.abort()
+
+    def _carregado(self, evento: Dict):
+        self.requisicoes += 1
+        self.bytes += int(evento.get("encodedDataLength", 0))
+
+    def registrar(self):
+        metricas_paginas.registrar(self.fonte, self.bytes, self.requisicoes, self.bloqueadas)
+
+
+async def esperar_vitrine(page, seletores, timeout: int = 10000) -> Optional[str]:
+    """
+    Espera o primeiro card de produto aparecer (no lugar de sleeps fixos)
+
+    Returns:
+        O primeiro seletor da lista que encontrou elementos, ou None no timeout
+    """
+    try:
+        await page.wait_for_selector(", ".join(seletores), timeout=timeout)
+    except Exception:
+        return None
+    for seletor in seletores:
+        if await page.locator(seletor).count() > 0:
+            return seletor
+    return None
+
+
+# ---------- Selenium ----------
+
+def configurar_opcoes_selenium(options):
+    """Opções do Chrome: sem imagens e com log de rede (para medir bytes por página)"""
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.default_content_settings.popups": 0,
+    })
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def bloquear_recursos_selenium(driver):
+    """Bloqueia imagens, fontes, vídeo e rastreadores por padrão de URL (CDP)"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": PADROES_BLOQUEADOS_SELENIUM})
+    except Exception:
+        pass  # Driver sem CDP: segue sem bloqueio
+
+
+def registrar_pagina_selenium(driver, fonte: str):
+    """Soma os bytes da página a partir do log de rede (o log é esvaziado a cada leitura)"""
+    try:
+        entradas = driver.get_log("performance")
+    except Exception:
+        return
+
+    bytes_baixados = requisicoes = bloqueadas = 0
+    for entrada in entradas:
+        mensagem = json.loads(entrada["message"])["message"]
+        if mensagem["method"] == "Network.loadingFinished":
+            requisicoes += 1
+            bytes_baixados += int(mensagem["params"].get("encodedDataLength", 0))
+        elif mensagem["method"] == "Network.loadingFailed" and mensagem["params"].get("blockedReason"):
+            bloqueadas += 1
+    metricas_paginas.registrar(fonte, bytes_baixados, requisicoes, bloqueadas)
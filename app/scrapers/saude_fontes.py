@@ -0,0 +1,206 @@
+"""
+Saúde das fontes de scraping
+Por fonte: janela das últimas chamadas (sucesso e latência), disjuntor
+(fechado, aberto, meio-aberto) e timeout derivado do p95 observado. Fonte que
+falha em toda busca é pulada na hora, em vez de gastar segundos de cada usuário.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+JANELA_CHAMADAS = int(os.getenv("SAUDE_JANELA_CHAMADAS", "50"))
+ESPERA_ABERTO_SEGUNDOS = float(os.getenv("SAUDE_ESPERA_ABERTO_SEGUNDOS", "60"))
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class FonteIndisponivel(Exception):
+    """Disjuntor da fonte está aberto: a chamada nem foi feita"""
+
+
+def percentil(valores: List[float], p: float) -> Optional[float]:
+    """Percentil por interpolação linear (p entre 0 e 1)"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+class _EstadoFonte:
+    def __init__(self, janela: int):
+        self.resultados = deque(maxlen=janela)  # True/False das últimas chamadas
+        self.latencias = deque(maxlen=janela)  # Segundos das últimas chamadas com sucesso
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.espera = ESPERA_ABERTO_SEGUNDOS
+        self.sonda_desde: Optional[float] = None
+        self.aberturas = 0
+        self.puladas = 0
+        self.vazias = 0
+
+
+class SaudeFontes:
+    """Saúde e disjuntor por fonte (em memória, por processo)
+
+    - registrar(fonte, sucesso, latencia) depois de cada chamada com erro ou com
+      produtos; registrar_vazia(fonte) quando a fonte respondeu sem produtos (termo
+      sem resultado não é falha: não entra na taxa nem nas falhas seguidas). Fonte
+      fora do ar levanta exceção (BaseScraper._get_page, FontesFalharam): lista
+      vazia é sempre uma resposta 2xx de verdade
+    - Abre com FALHAS_SEGUIDAS_MAXIMAS falhas seguidas ou taxa de sucesso abaixo de
+      TAXA_SUCESSO_MINIMA (com pelo menos MINIMO_CHAMADAS na janela)
+    - Aberto: permitir() devolve False até passar a espera; aí fica meio-aberto e
+      deixa passar uma única chamada de teste. Sucesso fecha (e zera a janela de
+      resultados); falha reabre com o dobro da espera (até ESPERA_ABERTO_MAXIMA)
+    - timeout(fonte, padrao, minimo): p95 das latências com sucesso × MARGEM_TIMEOUT,
+      entre o mínimo (TIMEOUT_MINIMO se não informado) e o padrão de quem chama
+    """
+
+    MINIMO_CHAMADAS = 5
+    TAXA_SUCESSO_MINIMA = 0.3
+    FALHAS_SEGUIDAS_MAXIMAS = 5
+    ESPERA_ABERTO_MAXIMA = 1800
+    MARGEM_TIMEOUT = 1.5
+    TIMEOUT_MINIMO = 3.0
+
+    def __init__(self, janela: int = JANELA_CHAMADAS):
+        self.janela = janela
+        self._fontes: Dict[str, _EstadoFonte] = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, fonte: str) -> _EstadoFonte:
+        estado = self._fontes.get(fonte)
+        if estado is None:
+            estado = self._fontes[fonte] = _EstadoFonte(self.janela)
+        return estado
+
+    def permitir(self, fonte: str) -> bool:
+        """A fonte pode ser chamada agora? (no meio-aberto, só uma chamada de teste por vez)"""
+        agora = time.monotonic()
+        with self._lock:
+            estado = self._estado(fonte)
+            if estado.estado == FECHADO:
+                return True
+            if estado.estado == ABERTO and agora >= estado.aberto_ate:
+                estado.estado = MEIO_ABERTO
+                estado.sonda_desde = None
+            if estado.estado == MEIO_ABERTO:
+                # Chamada de teste que nunca voltou (processo morto, exceção fora do registrar): libera outra
+                if estado.sonda_desde is None or agora - estado.sonda_desde > estado.espera:
+                    estado.sonda_desde = agora
+                    return True
+            estado.puladas += 1
+            return False
+
+    def registrar(self, fonte: str, sucesso: bool, latencia: float):
+        agora = time.monotonic()
+        with self._lock:
+            estado = self._estado(fonte)
+            estado.resultados.append(sucesso)
+            if sucesso:
+                estado.latencias.append(latencia)
+                estado.falhas_seguidas = 0
+                if estado.estado != FECHADO:
+                    print(f"   🟢 Fonte '{fonte}' voltou: disjuntor fechado")
+                    estado.estado = FECHADO
+                    estado.espera = ESPERA_ABERTO_SEGUNDOS
+                    estado.resultados.clear()
+                    estado.resultados.append(True)
+                return
+
+            estado.falhas_seguidas += 1
+            if estado.estado == MEIO_ABERTO:
+                estado.espera = min(estado.espera * 2, self.ESPERA_ABERTO_MAXIMA)
+                self._abrir(fonte, estado, agora)
+            elif estado.estado == FECHADO and self._deve_abrir(estado):
+                self._abrir(fonte, estado, agora)
+
+    def registrar_vazia(self, fonte: str):
+        """A fonte respondeu, mas sem produtos: não conta como sucesso nem como falha"""
+        with self._lock:
+            estado = self._estado(fonte)
+            estado.vazias += 1
+            if estado.estado == MEIO_ABERTO:
+                # Sonda inconclusiva: a próxima chamada testa de novo
+                estado.sonda_desde = None
+
+    def _deve_abrir(self, estado: _EstadoFonte) -> bool:
+        if estado.falhas_seguidas >= self.FALHAS_SEGUIDAS_MAXIMAS:
+            return True
+        chamadas = len(estado.resultados)
+        return chamadas >= self.MINIMO_CHAMADAS and sum(estado.resultados) / chamadas < self.TAXA_SUCESSO_MINIMA
+
+    def _abrir(self, fonte: str, estado: _EstadoFonte, agora: float):
+        estado.estado = ABERTO
+        estado.aberto_ate = agora + estado.espera
+        estado.sonda_desde = None
+        estado.aberturas += 1
+        print(f"   🔴 Fonte '{fonte}' instável ({estado.falhas_seguidas} falhas seguidas): "
+              f"pulada pelos próximos {estado.espera:.0f}s")
+
+    def timeout(self, fonte: str, padrao: float, minimo: Optional[float] = None) -> float:
+        """Timeout da próxima chamada: p95 observado com margem (padrão enquanto há poucas amostras)"""
+        with self._lock:
+            latencias = list(self._estado(fonte).latencias)
+        if len(latencias) < self.MINIMO_CHAMADAS:
+            return padrao
+        minimo = self.TIMEOUT_MINIMO if minimo is None else minimo
+        return min(max(percentil(latencias, 0.95) * self.MARGEM_TIMEOUT, minimo), padrao)
+
+    def chamar(self, fonte: str, funcao: Callable, *args, **kwargs):
+        """
+        Chama a fonte passando pelo disjuntor e registra o resultado
+
+        Raises:
+            FonteIndisponivel: disjuntor aberto (a função não é chamada)
+        """
+        if not self.permitir(fonte):
+            raise FonteIndisponivel(f"Fonte '{fonte}' temporariamente desativada (disjuntor aberto)")
+        inicio = time.monotonic()
+        try:
+            resultado = funcao(*args, **kwargs)
+        except Exception:
+            self.registrar(fonte, False, time.monotonic() - inicio)
+            raise
+        if resultado:
+            self.registrar(fonte, True, time.monotonic() - inicio)
+        else:
+            self.registrar_vazia(fonte)
+        return resultado
+
+    def resumo(self) -> Dict:
+        agora = time.monotonic()
+        with self._lock:
+            resumo = {}
+            for fonte, estado in sorted(self._fontes.items()):
+                chamadas = len(estado.resultados)
+                latencias = list(estado.latencias)
+                p50, p95 = percentil(latencias, 0.5), percentil(latencias, 0.95)
+                resumo[fonte] = {
+                    "estado": estado.estado,
+                    "chamadas_na_janela": chamadas,
+                    "taxa_sucesso": round(sum(estado.resultados) / chamadas, 3) if chamadas else None,
+                    "latencia_p50": round(p50, 2) if p50 is not None else None,
+                    "latencia_p95": round(p95, 2) if p95 is not None else None,
+                    "falhas_seguidas": estado.falhas_seguidas,
+                    "reabre_em_segundos": (
+                        max(0, round(estado.aberto_ate - agora)) if estado.estado == ABERTO else None
+                    ),
+                    "aberturas": estado.aberturas,
+                    "puladas": estado.puladas,
+                    "vazias": estado.vazias,
+                }
+        return resumo
+
+
+# Instância global
+saude_fontes = SaudeFontes()
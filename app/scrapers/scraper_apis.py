@@ -3,19 +3,16 @@ Scraper usando APIs públicas dos sites
 Mais confiável e rápido que scraping HTML
 """
 from typing import List, Dict
-import requests
-import time
-import random
 import re
-import json
+
+from app.scrapers.motor_async import FonteHTTP, FontesFalharam, motor_scraping
 
 
 class ScraperAPIs:
     """Scraper que usa APIs internas públicas dos sites"""
 
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'pt-BR,pt;q=0.9',
@@ -25,7 +22,7 @@ class ScraperAPIs:
             'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120"',
             'sec-ch-ua-mobile': '?0',
             'sec-ch-ua-platform': '"Linux"',
-        })
+        }
 
     def _clean_price(self, price_str: str) -> float:
         """Limpa string de preço"""
@@ -40,130 +37,112 @@ class ScraperAPIs:
         except:
             return 0.0
 
-    def buscar_mercadolivre_api(self, termo: str) -> List[Dict]:
-        """Busca no Mercado Livre via API oficial"""
-        produtos = []
-
-        try:
-            # API pública do Mercado Livre
-            url = "https://api.mercadolibre.com/sites/MLB/search"
-
-            params = {
+    def fonte_mercadolivre_api(self, termo: str) -> FonteHTTP:
+        """Mercado Livre via API oficial"""
+        # API pública do Mercado Livre
+        return FonteHTTP(
+            'Mercado Livre',
+            "https://api.mercadolibre.com/sites/MLB/search",
+            self._extrair_mercadolivre,
+            params={
                 'q': termo,
                 'limit': 20,
                 'offset': 0
-            }
-
-            print(f"   🔍 Mercado Livre API: {termo}")
+            },
+            headers=self.headers,
+            timeout=15
+        )
 
-            time.sleep(random.uniform(0.5, 1.5))
-
-            response = self.session.get(url, params=params, timeout=15)
-
-            if response.status_code == 200:
-                data = response.json()
-
-                items = data.get('results', [])
-
-                for item in items[:15]:
-                    try:
-                        nome = item.get('title', '')
-                        preco = item.get('price', 0)
-
-                        if not nome or preco == 0:
-                            continue
-
-                        produtos.append({
-                            'nome': nome,
-                            'marca': None,
-                            'preco': float(preco),
-                            'preco_original': item.get('original_price'),
-                            'em_promocao': item.get('original_price') is not None,
-                            'url': item.get('permalink', ''),
-                            'supermercado': 'Mercado Livre',
-                            'disponivel': item.get('available_quantity', 0) > 0,
-                            'imagem': item.get('thumbnail', '')
-                        })
+    def _extrair_mercadolivre(self, response) -> List[Dict]:
+        produtos = []
+        data = response.json()
 
-                    except Exception as e:
-                        continue
+        items = data.get('results', [])
 
-                print(f"   ✅ Mercado Livre API: {len(produtos)} produtos")
+        for item in items[:15]:
+            try:
+                nome = item.get('title', '')
+                preco = item.get('price', 0)
+
+                if not nome or preco == 0:
+                    continue
+
+                produtos.append({
+                    'nome': nome,
+                    'marca': None,
+                    'preco': float(preco),
+                    'preco_original': item.get('original_price'),
+                    'em_promocao': item.get('original_price') is not None,
+                    'url': item.get('permalink', ''),
+                    'ean': next((a.get('value_name') for a in item.get('attributes', []) if a.get('id') == 'GTIN'), None),
+                    'supermercado': 'Mercado Livre',
+                    'disponivel': item.get('available_quantity', 0) > 0,
+                    'imagem': item.get('thumbnail', '')
+                })
 
-        except Exception as e:
-            print(f"   ❌ Erro Mercado Livre API: {e}")
+            except Exception as e:
+                continue
 
         return produtos
 
-    def buscar_americanas_api(self, termo: str) -> List[Dict]:
-        """Busca nas Americanas via API"""
-        produtos = []
-
-        try:
-            # API de busca das Americanas
-            url = "https://mystique-v2-americanas.b2w.io/search"
-
-            params = {
+    def fonte_americanas_api(self, termo: str) -> FonteHTTP:
+        """Americanas via API"""
+        # API de busca das Americanas
+        return FonteHTTP(
+            'Americanas',
+            "https://mystique-v2-americanas.b2w.io/search",
+            self._extrair_americanas,
+            params={
                 'query': termo,
                 'page': 1,
                 'rows': 15,
                 'source': 'omega'
-            }
-
-            headers = {
-                **self.session.headers,
+            },
+            headers={
+                **self.headers,
                 'referer': 'https://www.americanas.com.br/',
                 'origin': 'https://www.americanas.com.br'
-            }
-
-            print(f"   🔍 Americanas API: {termo}")
-
-            time.sleep(random.uniform(0.5, 1.5))
-
-            response = requests.get(url, params=params, headers=headers, timeout=15)
-
-            if response.status_code == 200:
-                data = response.json()
-
-                items = data.get('products', [])
+            },
+            timeout=15
+        )
 
-                for item in items[:15]:
-                    try:
-                        nome = item.get('name', '')
-                        preco_info = item.get('offers', {}).get('price', 0)
-                        preco = self._clean_price(preco_info)
-
-                        if not nome or preco == 0:
-                            continue
-
-                        produtos.append({
-                            'nome': nome,
-                            'marca': item.get('brand', {}).get('name'),
-                            'preco': preco,
-                            'em_promocao': item.get('offers', {}).get('onSale', False),
-                            'url': f"https://www.americanas.com.br/produto/{item.get('id', '')}",
-                            'supermercado': 'Americanas',
-                            'disponivel': True
-                        })
+    def _extrair_americanas(self, response) -> List[Dict]:
+        produtos = []
+        data = response.json()
 
-                    except Exception as e:
-                        continue
+        items = data.get('products', [])
 
-                print(f"   ✅ Americanas API: {len(produtos)} produtos")
+        for item in items[:15]:
+            try:
+                nome = item.get('name', '')
+                preco_info = item.get('offers', {}).get('price', 0)
+                preco = self._clean_price(preco_info)
+
+                if not nome or preco == 0:
+                    continue
+
+                produtos.append({
+                    'nome': nome,
+                    'marca': item.get('brand', {}).get('name'),
+                    'preco': preco,
+                    'em_promocao': item.get('offers', {}).get('onSale', False),
+                    'url': f"https://www.americanas.com.br/produto/{item.get('id', '')}",
+                    'supermercado': 'Americanas',
+                    'disponivel': True
+                })
 
-        except Exception as e:
-            print(f"   ❌ Erro Americanas API: {e}")
+            except Exception as e:
+                continue
 
         return produtos
 
-    def buscar_shopee_api(self, termo: str) -> List[Dict]:
-        """Busca na Shopee via API"""
-        produtos = []
-
-        try:
-            url = "https://shopee.com.br/api/v4/search/search_items"
-
-            params = {
+    def fonte_shopee_api(self, termo: str) -> FonteHTTP:
+        """Shopee via API"""
+        return FonteHTTP(
+            'Shopee',
+            "https://shopee.com.br/api/v4/search/search_items",
+            self._extrair_shopee,
+            params={
                 'by': 'relevancy',
                 'keyword': termo,
                 'limit': 15,
@@ -172,82 +151,84 @@ class ScraperAPIs:
                 'page_type': 'search',
                 'scenario': 'PAGE_GLOBAL_SEARCH',
                 'version': 2
-            }
-
-            headers = {
-                **self.session.headers,
+            },
+            headers={
+                **self.headers,
                 'referer': 'https://shopee.com.br/',
                 'origin': 'https://shopee.com.br',
                 'x-requested-with': 'XMLHttpRequest'
-            }
-
-            print(f"   🔍 Shopee API: {termo}")
+            },
+            timeout=15
+        )
 
-            time.sleep(random.uniform(0.5, 1.5))
+    def _extrair_shopee(self, response) -> List[Dict]:
+        produtos = []
+        data = response.json()
 
-            response = requests.get(url, params=params, headers=headers, timeout=15)
+        items = data.get('items', [])
 
-            if response.status_code == 200:
-                data = response.json()
+        for item_wrapper in items[:15]:
+            try:
+                item = item_wrapper.get('item_basic', {})
 
-                items = data.get('items', [])
+                nome = item.get('name', '')
+                preco_centavos = item.get('price', 0)
+                preco = preco_centavos / 100000  # Shopee usa preço em centavos * 1000
 
-                for item_wrapper in items[:15]:
-                    try:
-                        item = item_wrapper.get('item_basic', {})
+                if not nome or preco == 0:
+                    continue
 
-                        nome = item.get('name', '')
-                        preco_centavos = item.get('price', 0)
-                        preco = preco_centavos / 100000  # Shopee usa preço em centavos * 1000
+                produtos.append({
+                    'nome': nome,
+                    'marca': None,
+                    'preco': preco,
+                    'em_promocao': item.get('raw_discount', 0) > 0,
+                    'url': f"https://shopee.com.br/product/{item.get('shopid', '')}/{item.get('itemid', '')}",
+                    'supermercado': 'Shopee',
+                    'disponivel': item.get('stock', 0) > 0
+                })
 
-                        if not nome or preco == 0:
-                            continue
+            except Exception as e:
+                continue
 
-                        produtos.append({
-                            'nome': nome,
-                            'marca': None,
-                            'preco': preco,
-                            'em_promocao': item.get('raw_discount', 0) > 0,
-                            'url': f"https://shopee.com.br/product/{item.get('shopid', '')}/{item.get('itemid', '')}",
-                            'supermercado': 'Shopee',
-                            'disponivel': item.get('stock', 0) > 0
-                        })
+        return produtos
 
-                    except Exception as e:
-                        continue
+    def buscar_mercadolivre_api(self, termo: str) -> List[Dict]:
+        """Busca no Mercado Livre via API oficial"""
+        return motor_scraping.buscar(self.fonte_mercadolivre_api(termo))
 
-                print(f"   ✅ Shopee API: {len(produtos)} produtos")
+    def buscar_americanas_api(self, termo: str) -> List[Dict]:
+        """Busca nas Americanas via API"""
+        return motor_scraping.buscar(self.fonte_americanas_api(termo))
 
-        except Exception as e:
-            print(f"   ❌ Erro Shopee API: {e}")
+    def buscar_shopee_api(self, termo: str) -> List[Dict]:
+        """Busca na Shopee via API"""
+        return motor_scraping.buscar(self.fonte_shopee_api(termo))
 
-        return produtos
+    def buscar_todos(self, termo: str, max_por_fonte: int = 15, prazo: float = None) -> List[Dict]:
+        """
+        Busca em todas as APIs ao mesmo tempo (prazo em segundos; padrão do motor)
 
-    def buscar_todos(self, termo: str, max_por_fonte: int = 15) -> List[Dict]:
-        """Busca em todas as APIs"""
+        Raises:
+            FontesFalharam: todas as APIs falharam (lista vazia só quando alguma respondeu)
+        """
         print(f"\n{'='*60}")
         print(f"🚀 API SCRAPER: '{termo}'")
         print(f"{'='*60}")
 
         todos_produtos = []
 
-        # Buscar em paralelo seria melhor, mas por enquanto sequencial
         fontes = [
-            ('Mercado Livre', self.buscar_mercadolivre_api),
-            ('Americanas', self.buscar_americanas_api),
-            ('Shopee', self.buscar_shopee_api),
+            self.fonte_mercadolivre_api(termo),
+            self.fonte_americanas_api(termo),
+            self.fonte_shopee_api(termo),
         ]
 
-        for nome_fonte, metodo_busca in fontes:
-            try:
-                produtos = metodo_busca(termo)
-                todos_produtos.extend(produtos[:max_por_fonte])
-
-                # Delay entre fontes
-                time.sleep(random.uniform(1, 2))
-
-            except Exception as e:
-                print(f"   ❌ Erro em {nome_fonte}: {e}")
+        execucao = motor_scraping.executar(fontes, prazo=prazo)
+        if not execucao['resultados']:
+            raise FontesFalharam(execucao['falhas'])
+        for produtos in execucao['resultados'].values():
+            todos_produtos.extend(produtos[:max_por_fonte])
 
         # Remover duplicatas
         produtos_unicos = {}
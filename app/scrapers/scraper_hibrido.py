@@ -2,18 +2,15 @@
 Scraper híbrido que combina diferentes técnicas para buscar preços reais
 """
 from typing import List, Dict
-import requests
 from bs4 import BeautifulSoup
-import time
-import random
-import json
+
+from app.scrapers.cliente_http import registro_http
 
 
 class ScraperHibrido:
     """Scraper que tenta múltiplas fontes para encontrar preços reais"""
 
     def __init__(self):
-        self.session = requests.Session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -33,8 +30,7 @@ class ScraperHibrido:
             # Busca no Google Shopping (versão simplificada)
             url = f"https://www.google.com/search?tbm=shop&q={termo}+supermercado+brasil"
 
-            time.sleep(random.uniform(2, 4))
-            response = self.session.get(url, headers=self.headers, timeout=15)
+            response = registro_http.get(url, headers=self.headers, timeout=15)
 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -103,8 +99,7 @@ class ScraperHibrido:
             # Buscapé API (endpoint público de busca)
             url = f"https://www.buscape.com.br/search?q={termo}"
 
-            time.sleep(random.uniform(1, 3))
-            response = self.session.get(url, headers=self.headers, timeout=15)
+            response = registro_http.get(url, headers=self.headers, timeout=15)
 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
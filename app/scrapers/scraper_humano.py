@@ -17,6 +17,11 @@ import time
 import random
 import re
 
+from app.scrapers.motor_async import FontesFalharam
+from app.scrapers.recursos_pagina import (
+    bloquear_recursos_selenium, configurar_opcoes_selenium, registrar_pagina_selenium
+)
+
 
 class ScraperHumano:
     """
@@ -51,8 +56,10 @@ class ScraperHumano:
 
             # User agent realista
             options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            configurar_opcoes_selenium(options)  # Sem imagens, com log de rede
 
             self.driver = uc.Chrome(options=options, use_subprocess=True, version_main=None)
+            bloquear_recursos_selenium(self.driver)
 
             # Remover propriedades que indicam automação
             try:
@@ -94,16 +101,13 @@ class ScraperHumano:
             options.add_argument('--window-size=1920,1080')
             options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
 
-            # Preferências
-            prefs = {
-                "profile.default_content_setting_values.notifications": 2,
-                "profile.default_content_settings.popups": 0,
-            }
-            options.add_experimental_option("prefs", prefs)
+            # Preferências (sem notificações, popups e imagens) e log de rede
+            configurar_opcoes_selenium(options)
 
             try:
                 service = Service(ChromeDriverManager().install())
                 self.driver = webdriver.Chrome(service=service, options=options)
+                bloquear_recursos_selenium(self.driver)
 
                 # Tentar remover webdriver flag
                 try:
@@ -121,6 +125,21 @@ class ScraperHumano:
         max_t = max_time if max_time else self.wait_time[1]
         time.sleep(random.uniform(min_t, max_t))
 
+    def _esperar_vitrine(self, seletores: List[str], timeout: int = 10) -> List:
+        """Espera qualquer um dos seletores de card; devolve os cards do primeiro que existir"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(seletores)))
+            )
+        except TimeoutException:
+            return []
+
+        for seletor in seletores:
+            cards = self.driver.find_elements(By.CSS_SELECTOR, seletor)
+            if cards:
+                return cards
+        return []
+
     def _scroll_aleatorio(self):
         """Faz scroll aleatório na página (comportamento humano)"""
         try:
@@ -178,31 +197,19 @@ class ScraperHumano:
             print(f"   🔍 Acessando Carrefour: {termo}")
 
             self.driver.get(url)
-            self._esperar_humano(3, 5)  # Esperar página carregar
 
-            # Comportamento humano: scroll
-            self._scroll_aleatorio()
-
-            # Esperar produtos carregarem com vários seletores possíveis
+            # Esperar o primeiro card aparecer (sem sleep fixo) e só então o scroll humano
             selectors_container = [
                 "div[data-testid='product-card']",
                 "div[class*='ProductCard']",
                 "div[class*='product-card']",
                 "article[class*='product']"
             ]
-
-            product_cards = []
-            for selector in selectors_container:
-                try:
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    product_cards = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if product_cards:
-                        print(f"   ✓ Encontrados {len(product_cards)} produtos")
-                        break
-                except TimeoutException:
-                    continue
+            product_cards = self._esperar_vitrine(selectors_container)
+            self._scroll_aleatorio()
+            registrar_pagina_selenium(self.driver, 'Carrefour')
+            if product_cards:
+                print(f"   ✓ Encontrados {len(product_cards)} produtos")
 
             if not product_cards:
                 print("   ⚠️  Nenhum produto encontrado")
@@ -211,10 +218,6 @@ class ScraperHumano:
             # Processar cada produto
             for i, card in enumerate(product_cards[:15]):
                 try:
-                    # Scroll até o card (comportamento humano)
-                    self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", card)
-                    self._esperar_humano(0.2, 0.5)
-
                     # Extrair nome
                     nome = None
                     for tag in ['h2', 'h3', 'h4', 'span[class*="title"]', 'a[class*="title"]', 'p[class*="title"]']:
@@ -307,29 +310,19 @@ class ScraperHumano:
             print(f"   🔍 Acessando Pão de Açúcar: {termo}")
 
             self.driver.get(url)
-            self._esperar_humano(3, 5)
-
-            self._scroll_aleatorio()
 
+            # Esperar o primeiro card aparecer (sem sleep fixo) e só então o scroll humano
             selectors_container = [
                 "div[class*='ProductCard']",
                 "div[class*='product-card']",
                 "article[class*='product']",
                 "li[class*='product']"
             ]
-
-            product_cards = []
-            for selector in selectors_container:
-                try:
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    product_cards = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if product_cards:
-                        print(f"   ✓ Encontrados {len(product_cards)} produtos")
-                        break
-                except TimeoutException:
-                    continue
+            product_cards = self._esperar_vitrine(selectors_container)
+            self._scroll_aleatorio()
+            registrar_pagina_selenium(self.driver, 'Pão de Açúcar')
+            if product_cards:
+                print(f"   ✓ Encontrados {len(product_cards)} produtos")
 
             if not product_cards:
                 print("   ⚠️  Nenhum produto encontrado")
@@ -337,9 +330,6 @@ class ScraperHumano:
 
             for i, card in enumerate(product_cards[:15]):
                 try:
-                    self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", card)
-                    self._esperar_humano(0.2, 0.5)
-
                     # Nome
                     nome = None
                     for tag in ['h2', 'h3', 'h4', 'a[class*="name"]', 'span[class*="name"]', 'p[class*="name"]']:
@@ -423,29 +413,18 @@ class ScraperHumano:
             print(f"   🔍 Acessando Extra: {termo}")
 
             self.driver.get(url)
-            self._esperar_humano(3, 5)
 
-            self._scroll_aleatorio()
-
-            # Extra usa estrutura similar ao Pão de Açúcar (mesmo grupo)
+            # Esperar o primeiro card aparecer (sem sleep fixo) e só então o scroll humano
             selectors_container = [
                 "div[class*='ProductCard']",
                 "div[class*='product-card']",
                 "article[class*='product']"
             ]
-
-            product_cards = []
-            for selector in selectors_container:
-                try:
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    product_cards = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if product_cards:
-                        print(f"   ✓ Encontrados {len(product_cards)} produtos")
-                        break
-                except TimeoutException:
-                    continue
+            product_cards = self._esperar_vitrine(selectors_container)
+            self._scroll_aleatorio()
+            registrar_pagina_selenium(self.driver, 'Extra')
+            if product_cards:
+                print(f"   ✓ Encontrados {len(product_cards)} produtos")
 
             if not product_cards:
                 print("   ⚠️  Nenhum produto encontrado")
@@ -453,9 +432,6 @@ class ScraperHumano:
 
             for i, card in enumerate(product_cards[:15]):
                 try:
-                    self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", card)
-                    self._esperar_humano(0.2, 0.5)
-
                     # Nome
                     nome = None
                     for tag in ['h2', 'h3', 'h4', 'a', 'span', 'p']:
@@ -538,18 +514,18 @@ class ScraperHumano:
             mercados_busca = mercados_disponiveis
 
         todos_produtos = []
+        falhas = {}
 
         for nome_mercado, metodo_busca in mercados_busca.items():
             try:
                 produtos = metodo_busca(termo)
                 todos_produtos.extend(produtos)
-
-                # Esperar entre mercados (comportamento humano)
-                if nome_mercado != list(mercados_busca.keys())[-1]:
-                    self._esperar_humano(2, 4)
-
             except Exception as e:
                 print(f"   ❌ Erro em {nome_mercado}: {e}")
+                falhas[nome_mercado] = str(e) or type(e).__name__
+
+        if falhas and len(falhas) == len(mercados_busca):
+            raise FontesFalharam(falhas)  # Nenhum mercado respondeu: falha, não busca vazia
 
         # Remover duplicatas
         produtos_unicos = {}
@@ -1,15 +1,19 @@
+import time
 from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from .carrefour import CarrefourScraper
 from .pao_acucar import PaoAcucarScraper
 from .extra import ExtraScraper
 from .mercado_livre import MercadoLivreScraper
 from .google_shopping import GoogleShoppingScraper
+from .saude_fontes import saude_fontes
 
 
 class ScraperManager:
     """Manages all scrapers and coordinates searches"""
 
+    TIMEOUT_PADRAO = 30  # Seconds per source until there are enough latency samples
+
     def __init__(self, usar_google: bool = True):
         if usar_google:
             # Use Google Shopping as primary source
@@ -28,7 +32,8 @@ class ScraperManager:
     def search_all(self, termo: str, supermercados: Optional[List[str]] = None) -> List[Dict]:
         """
         Search for products in all or specified supermarkets
-        Uses parallel execution for faster results
+        Uses parallel execution for faster results. Sources with an open circuit
+        breaker are skipped; each source gets a timeout derived from its observed p95
         """
         if supermercados:
             active_scrapers = {k: v for k, v in self.scrapers.items() if k in supermercados}
@@ -37,21 +42,53 @@ class ScraperManager:
 
         all_produtos = []
 
-        # Use ThreadPoolExecutor for parallel scraping
-        with ThreadPoolExecutor(max_workers=len(active_scrapers)) as executor:
-            future_to_scraper = {
-                executor.submit(scraper.search, termo): name
-                for name, scraper in active_scrapers.items()
-            }
+        allowed = {}
+        for name, scraper in active_scrapers.items():
+            if saude_fontes.permitir(name):
+                allowed[name] = scraper
+            else:
+                print(f"⏭ {name}: fonte instável, pulada")
+        if not allowed:
+            return all_produtos
+
+        # Don't use the executor as a context manager: it would wait for timed-out threads
+        executor = ThreadPoolExecutor(max_workers=len(allowed))
+        start = time.monotonic()
+        pending = {}
+        for name, scraper in allowed.items():
+            future = executor.submit(scraper.search, termo)
+            pending[future] = (name, start + saude_fontes.timeout(name, self.TIMEOUT_PADRAO))
 
-            for future in as_completed(future_to_scraper):
-                scraper_name = future_to_scraper[future]
-                try:
-                    produtos = future.result(timeout=30)
+        try:
+            while pending:
+                next_deadline = min(deadline for _, deadline in pending.values())
+                done, _ = wait(pending, timeout=max(0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+
+                for future in done:
+                    scraper_name, _ = pending.pop(future)
+                    try:
+                        produtos = future.result()
+                    except Exception as e:
+                        saude_fontes.registrar(scraper_name, False, now - start)
+                        print(f"✗ {scraper_name}: Erro ao buscar - {e}")
+                        continue
+                    if produtos:
+                        saude_fontes.registrar(scraper_name, True, now - start)
+                    else:
+                        saude_fontes.registrar_vazia(scraper_name)
                     all_produtos.extend(produtos)
                     print(f"✓ {scraper_name}: {len(produtos)} produtos encontrados")
-                except Exception as e:
-                    print(f"✗ {scraper_name}: Erro ao buscar - {e}")
+
+                for future, (scraper_name, deadline) in list(pending.items()):
+                    if now >= deadline:
+                        del pending[future]
+                        future.cancel()
+                        saude_fontes.registrar(scraper_name, False, now - start)
+                        print(f"✗ {scraper_name}: Timeout após {now - start:.1f}s")
+        finally:
+            executor.shutdown(wait=False)
 
         return all_produtos
 
@@ -61,7 +98,7 @@ class ScraperManager:
             raise ValueError(f"Supermercado '{supermercado}' não suportado")
 
         scraper = self.scrapers[supermercado]
-        return scraper.search(termo)
+        return saude_fontes.chamar(supermercado, scraper.search, termo)
 
     def get_available_supermarkets(self) -> List[str]:
         """Get list of available supermarkets"""
@@ -1,21 +1,20 @@
 """
-Scraper simples usando apenas requests + BeautifulSoup
+Scraper simples usando apenas HTTP + BeautifulSoup
 Funciona em qualquer ambiente, sem necessidade de Chrome/ChromeDriver
 """
 from typing import List, Dict
-import requests
 from bs4 import BeautifulSoup
-import time
-import random
 import re
 
+from app.scrapers.cliente_http import registro_http
+from app.scrapers.motor_async import FontesFalharam
+
 
 class ScraperSimples:
     """Scraper leve sem dependência de Selenium"""
 
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -26,7 +25,7 @@ class ScraperSimples:
             'Sec-Fetch-Mode': 'navigate',
             'Sec-Fetch-Site': 'none',
             'Cache-Control': 'max-age=0',
-        })
+        }
 
     def _clean_price(self, price_str: str) -> float:
         """Limpa string de preço"""
@@ -47,57 +46,56 @@ class ScraperSimples:
             url = f"https://lista.mercadolivre.com.br/{termo.replace(' ', '-')}"
             print(f"   🔍 Mercado Livre: {termo}")
 
-            time.sleep(random.uniform(1, 2))
+            response = registro_http.get(url, headers=self.headers, timeout=15)
+            response.raise_for_status()
 
-            response = self.session.get(url, timeout=15)
+            soup = BeautifulSoup(response.content, 'html.parser')
 
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+            # Buscar cards de produtos
+            items = soup.find_all('li', class_=re.compile('ui-search-layout__item'))
 
-                # Buscar cards de produtos
-                items = soup.find_all('li', class_=re.compile('ui-search-layout__item'))
+            for item in items[:15]:
+                try:
+                    # Nome
+                    nome_elem = item.find('h2', class_=re.compile('ui-search-item__title'))
+                    if not nome_elem:
+                        continue
+                    nome = nome_elem.get_text(strip=True)
 
-                for item in items[:15]:
-                    try:
-                        # Nome
-                        nome_elem = item.find('h2', class_=re.compile('ui-search-item__title'))
-                        if not nome_elem:
-                            continue
-                        nome = nome_elem.get_text(strip=True)
+                    # Preço
+                    preco_elem = item.find('span', class_=re.compile('andes-money-amount__fraction'))
+                    if not preco_elem:
+                        continue
 
-                        # Preço
-                        preco_elem = item.find('span', class_=re.compile('andes-money-amount__fraction'))
-                        if not preco_elem:
-                            continue
+                    preco = self._clean_price(preco_elem.get_text(strip=True))
+                    if preco == 0:
+                        continue
 
-                        preco = self._clean_price(preco_elem.get_text(strip=True))
-                        if preco == 0:
-                            continue
+                    # URL
+                    link = item.find('a', href=True)
+                    url_produto = link['href'] if link else ''
 
-                        # URL
-                        link = item.find('a', href=True)
-                        url_produto = link['href'] if link else ''
+                    # Promoção
+                    em_promocao = item.find(class_=re.compile('ui-search-price__discount')) is not None
 
-                        # Promoção
-                        em_promocao = item.find(class_=re.compile('ui-search-price__discount')) is not None
+                    produtos.append({
+                        'nome': nome,
+                        'marca': None,
+                        'preco': preco,
+                        'em_promocao': em_promocao,
+                        'url': url_produto,
+                        'supermercado': 'Mercado Livre',
+                        'disponivel': True
+                    })
 
-                        produtos.append({
-                            'nome': nome,
-                            'marca': None,
-                            'preco': preco,
-                            'em_promocao': em_promocao,
-                            'url': url_produto,
-                            'supermercado': 'Mercado Livre',
-                            'disponivel': True
-                        })
+                except Exception:
+                    continue
 
-                    except Exception:
-                        continue
-
-                print(f"   ✅ Mercado Livre: {len(produtos)} produtos")
+            print(f"   ✅ Mercado Livre: {len(produtos)} produtos")
 
         except Exception as e:
             print(f"   ❌ Erro Mercado Livre: {e}")
+            raise
 
         return produtos
 
@@ -109,85 +107,90 @@ class ScraperSimples:
             url = f"https://www.americanas.com.br/busca/{termo.replace(' ', '-')}"
             print(f"   🔍 Americanas: {termo}")
 
-            time.sleep(random.uniform(1, 2))
-
-            response = self.session.get(url, timeout=15)
-
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                # Buscar produtos (seletores podem mudar)
-                items = soup.find_all('div', class_=re.compile('product|Product'))
-
-                for item in items[:15]:
-                    try:
-                        # Nome
-                        nome = None
-                        for tag in ['h2', 'h3', 'span', 'a']:
-                            elem = item.find(tag, class_=re.compile('name|title|Title'))
-                            if elem:
-                                nome = elem.get_text(strip=True)
-                                if len(nome) > 3:
-                                    break
-
-                        if not nome:
-                            continue
-
-                        # Preço
-                        preco = 0.0
-                        for tag in ['span', 'div', 'p']:
-                            elem = item.find(tag, class_=re.compile('price|Price'))
-                            if elem:
-                                preco = self._clean_price(elem.get_text(strip=True))
-                                if preco > 0:
-                                    break
-
-                        if preco == 0:
-                            continue
-
-                        # URL
-                        link = item.find('a', href=True)
-                        url_produto = link['href'] if link else ''
-                        if url_produto and not url_produto.startswith('http'):
-                            url_produto = f"https://www.americanas.com.br{url_produto}"
-
-                        produtos.append({
-                            'nome': nome,
-                            'marca': None,
-                            'preco': preco,
-                            'em_promocao': False,
-                            'url': url_produto,
-                            'supermercado': 'Americanas',
-                            'disponivel': True
-                        })
-
-                    except Exception:
+            response = registro_http.get(url, headers=self.headers, timeout=15)
+            response.raise_for_status()
+
+            soup = BeautifulSoup(response.content, 'html.parser')
+
+            # Buscar produtos (seletores podem mudar)
+            items = soup.find_all('div', class_=re.compile('product|Product'))
+
+            for item in items[:15]:
+                try:
+                    # Nome
+                    nome = None
+                    for tag in ['h2', 'h3', 'span', 'a']:
+                        elem = item.find(tag, class_=re.compile('name|title|Title'))
+                        if elem:
+                            nome = elem.get_text(strip=True)
+                            if len(nome) > 3:
+                                break
+
+                    if not nome:
                         continue
 
-                print(f"   ✅ Americanas: {len(produtos)} produtos")
+                    # Preço
+                    preco = 0.0
+                    for tag in ['span', 'div', 'p']:
+                        elem = item.find(tag, class_=re.compile('price|Price'))
+                        if elem:
+                            preco = self._clean_price(elem.get_text(strip=True))
+                            if preco > 0:
+                                break
+
+                    if preco == 0:
+                        continue
+
+                    # URL
+                    link = item.find('a', href=True)
+                    url_produto = link['href'] if link else ''
+                    if url_produto and not url_produto.startswith('http'):
+                        url_produto = f"https://www.americanas.com.br{url_produto}"
+
+                    produtos.append({
+                        'nome': nome,
+                        'marca': None,
+                        'preco': preco,
+                        'em_promocao': False,
+                        'url': url_produto,
+                        'supermercado': 'Americanas',
+                        'disponivel': True
+                    })
+
+                except Exception:
+                    continue
+
+            print(f"   ✅ Americanas: {len(produtos)} produtos")
 
         except Exception as e:
             print(f"   ❌ Erro Americanas: {e}")
+            raise
 
         return produtos
 
     def buscar_todos(self, termo: str) -> List[Dict]:
-        """Busca em todas as fontes disponíveis"""
+        """
+        Busca em todas as fontes disponíveis
+
+        Raises:
+            FontesFalharam: nenhuma fonte respondeu (uma que falhe sozinha só fica de fora)
+        """
         print(f"\n{'='*60}")
         print(f"🔍 BUSCANDO (Modo Simples): '{termo}'")
         print(f"{'='*60}")
 
         todos_produtos = []
+        falhas = {}
 
-        # Mercado Livre
-        produtos_ml = self.buscar_mercadolivre(termo)
-        todos_produtos.extend(produtos_ml)
-
-        time.sleep(random.uniform(2, 3))
+        for nome_fonte, metodo_busca in (("mercadolivre", self.buscar_mercadolivre),
+                                         ("americanas", self.buscar_americanas)):
+            try:
+                todos_produtos.extend(metodo_busca(termo))
+            except Exception as e:
+                falhas[nome_fonte] = str(e) or type(e).__name__
 
-        # Americanas
-        produtos_am = self.buscar_americanas(termo)
-        todos_produtos.extend(produtos_am)
+        if len(falhas) == 2:
+            raise FontesFalharam(falhas)
 
         # Remover duplicatas
         produtos_unicos = {}
@@ -4,12 +4,11 @@ Usa APIs internas dos supermercados quando possível
 E se necessário, usa Selenium com comportamento humano
 """
 from typing import List, Dict, Optional
-import requests
-import time
-import random
 from bs4 import BeautifulSoup
 import re
 
+from app.scrapers.motor_async import FonteHTTP, motor_scraping
+
 
 class ScraperTempoReal:
     """Scraper para busca em tempo real quando usuário faz pesquisa"""
@@ -27,177 +26,176 @@ class ScraperTempoReal:
             'Sec-Fetch-Site': 'same-origin',
         }
 
-    def buscar_carrefour_api(self, termo: str) -> List[Dict]:
+    def fonte_carrefour_api(self, termo: str) -> FonteHTTP:
         """
-        Tenta usar API interna do Carrefour
+        API interna do Carrefour
         O site usa GraphQL para buscar produtos
         """
-        produtos = []
-        try:
-            # Carrefour Mercado usa uma API GraphQL
-            url = "https://mercado.carrefour.com.br/api/graphql"
-
-            # Query GraphQL que o site usa
-            query = {
-                "query": """
-                    query Search($term: String!, $limit: Int) {
-                        search(term: $term, limit: $limit) {
-                            products {
-                                name
-                                price
-                                oldPrice
-                                link
-                                image
-                                available
-                            }
+        # Query GraphQL que o site usa
+        query = {
+            "query": """
+                query Search($term: String!, $limit: Int) {
+                    search(term: $term, limit: $limit) {
+                        products {
+                            name
+                            price
+                            oldPrice
+                            link
+                            image
+                            available
+                            gtin
                         }
                     }
-                """,
-                "variables": {
-                    "term": termo,
-                    "limit": 10
                 }
+            """,
+            "variables": {
+                "term": termo,
+                "limit": 10
             }
+        }
 
-            headers = {**self.headers, 'Content-Type': 'application/json'}
-
-            response = requests.post(url, json=query, headers=headers, timeout=self.timeout)
-
-            if response.status_code == 200:
-                data = response.json()
-                items = data.get('data', {}).get('search', {}).get('products', [])
-
-                for item in items:
-                    preco = float(item.get('price', 0))
-                    preco_original = item.get('oldPrice')
-
-                    if preco > 0:
-                        produtos.append({
-                            'nome': item.get('name', '').strip(),
-                            'marca': None,
-                            'preco': preco,
-                            'preco_original': float(preco_original) if preco_original else None,
-                            'em_promocao': preco_original is not None and float(preco_original) > preco,
-                            'url': item.get('link', ''),
-                            'supermercado': 'Carrefour',
-                            'disponivel': item.get('available', True)
-                        })
-
-                print(f"   ✓ Carrefour API: {len(produtos)} produtos")
-
-        except Exception as e:
-            print(f"   ✗ Carrefour API: {e}")
+        return FonteHTTP(
+            'Carrefour',
+            "https://mercado.carrefour.com.br/api/graphql",
+            self._extrair_carrefour,
+            metodo="POST",
+            json=query,
+            headers={**self.headers, 'Content-Type': 'application/json'},
+            timeout=self.timeout
+        )
+
+    def _extrair_carrefour(self, response) -> List[Dict]:
+        produtos = []
+        data = response.json()
+        items = data.get('data', {}).get('search', {}).get('products', [])
+
+        for item in items:
+            preco = float(item.get('price', 0))
+            preco_original = item.get('oldPrice')
+
+            if preco > 0:
+                produtos.append({
+                    'nome': item.get('name', '').strip(),
+                    'marca': None,
+                    'preco': preco,
+                    'preco_original': float(preco_original) if preco_original else None,
+                    'em_promocao': preco_original is not None and float(preco_original) > preco,
+                    'url': item.get('link', ''),
+                    'ean': item.get('gtin'),
+                    'supermercado': 'Carrefour',
+                    'disponivel': item.get('available', True)
+                })
 
         return produtos
 
-    def buscar_mercadolivre_simples(self, termo: str) -> List[Dict]:
+    def fonte_mercadolivre_simples(self, termo: str) -> FonteHTTP:
         """
         Mercado Livre - busca simples sem autenticação
         """
+        return FonteHTTP(
+            'Mercado Livre',
+            f"https://lista.mercadolivre.com.br/{termo.replace(' ', '-')}",
+            self._extrair_mercadolivre,
+            headers=self.headers,
+            timeout=self.timeout
+        )
+
+    def _extrair_mercadolivre(self, response) -> List[Dict]:
         produtos = []
-        try:
-            # Tenta buscar através de URL simples
-            url = f"https://lista.mercadolivre.com.br/{termo.replace(' ', '-')}"
-
-            time.sleep(random.uniform(1, 2))
-
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
-
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                # Procurar por items
-                items = soup.find_all('li', class_=re.compile('ui-search-layout__item'))
-
-                for item in items[:10]:
-                    try:
-                        # Nome
-                        nome_elem = item.find('h2', class_=re.compile('ui-search-item__title'))
-                        if not nome_elem:
-                            continue
-                        nome = nome_elem.get_text(strip=True)
-
-                        # Preço
-                        preco_elem = item.find('span', class_=re.compile('andes-money-amount__fraction'))
-                        if not preco_elem:
-                            continue
-
-                        preco_text = preco_elem.get_text(strip=True)
-                        preco = self._clean_price(preco_text)
-
-                        if preco == 0:
-                            continue
-
-                        # URL
-                        link = item.find('a', href=True)
-                        url_produto = link['href'] if link else ''
+        soup = BeautifulSoup(response.content, 'html.parser')
 
-                        # Promoção (se tem badge de desconto)
-                        em_promocao = item.find(class_=re.compile('ui-search-price__discount')) is not None
+        # Procurar por items
+        items = soup.find_all('li', class_=re.compile('ui-search-layout__item'))
 
-                        produtos.append({
-                            'nome': nome,
-                            'marca': None,
-                            'preco': preco,
-                            'em_promocao': em_promocao,
-                            'url': url_produto,
-                            'supermercado': 'Mercado Livre',
-                            'disponivel': True
-                        })
-
-                    except Exception as e:
-                        continue
-
-                print(f"   ✓ Mercado Livre: {len(produtos)} produtos")
+        for item in items[:10]:
+            try:
+                # Nome
+                nome_elem = item.find('h2', class_=re.compile('ui-search-item__title'))
+                if not nome_elem:
+                    continue
+                nome = nome_elem.get_text(strip=True)
+
+                # Preço
+                preco_elem = item.find('span', class_=re.compile('andes-money-amount__fraction'))
+                if not preco_elem:
+                    continue
+
+                preco_text = preco_elem.get_text(strip=True)
+                preco = self._clean_price(preco_text)
+
+                if preco == 0:
+                    continue
+
+                # URL
+                link = item.find('a', href=True)
+                url_produto = link['href'] if link else ''
+
+                # Promoção (se tem badge de desconto)
+                em_promocao = item.find(class_=re.compile('ui-search-price__discount')) is not None
+
+                produtos.append({
+                    'nome': nome,
+                    'marca': None,
+                    'preco': preco,
+                    'em_promocao': em_promocao,
+                    'url': url_produto,
+                    'supermercado': 'Mercado Livre',
+                    'disponivel': True
+                })
 
-        except Exception as e:
-            print(f"   ✗ Mercado Livre: {e}")
+            except Exception as e:
+                continue
 
         return produtos
 
-    def buscar_extra(self, termo: str) -> List[Dict]:
+    def fonte_extra(self, termo: str) -> FonteHTTP:
         """
         Extra/Pão de Açúcar - pertence ao mesmo grupo GPA
         """
-        produtos = []
-        try:
-            # Extra também usa uma API interna
-            url = f"https://www.extra.com.br/api/catalog/products"
-
-            params = {
+        # Extra também usa uma API interna
+        return FonteHTTP(
+            'Extra',
+            "https://www.extra.com.br/api/catalog/products",
+            self._extrair_extra,
+            params={
                 'query': termo,
                 'page': 1,
                 'limit': 10
-            }
-
-            headers = {**self.headers}
-
-            response = requests.get(url, params=params, headers=headers, timeout=self.timeout)
+            },
+            headers=self.headers,
+            timeout=self.timeout
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                items = data.get('products', [])
-
-                for item in items:
-                    preco = item.get('price', 0)
+    def _extrair_extra(self, response) -> List[Dict]:
+        produtos = []
+        data = response.json()
+        items = data.get('products', [])
+
+        for item in items:
+            preco = item.get('price', 0)
+
+            if preco > 0:
+                produtos.append({
+                    'nome': item.get('name', '').strip(),
+                    'marca': item.get('brand'),
+                    'preco': float(preco),
+                    'em_promocao': item.get('onSale', False),
+                    'url': item.get('url', ''),
+                    'ean': item.get('ean') or item.get('gtin'),
+                    'supermercado': 'Extra',
+                    'disponivel': item.get('available', True)
+                })
 
-                    if preco > 0:
-                        produtos.append({
-                            'nome': item.get('name', '').strip(),
-                            'marca': item.get('brand'),
-                            'preco': float(preco),
-                            'em_promocao': item.get('onSale', False),
-                            'url': item.get('url', ''),
-                            'supermercado': 'Extra',
-                            'disponivel': item.get('available', True)
-                        })
+        return produtos
 
-                print(f"   ✓ Extra: {len(produtos)} produtos")
+    def buscar_carrefour_api(self, termo: str) -> List[Dict]:
+        return motor_scraping.buscar(self.fonte_carrefour_api(termo))
 
-        except Exception as e:
-            print(f"   ✗ Extra: {e}")
+    def buscar_mercadolivre_simples(self, termo: str) -> List[Dict]:
+        return motor_scraping.buscar(self.fonte_mercadolivre_simples(termo))
 
-        return produtos
+    def buscar_extra(self, termo: str) -> List[Dict]:
+        return motor_scraping.buscar(self.fonte_extra(termo))
 
     def buscar_todos(
         self,
@@ -207,7 +205,9 @@ class ScraperTempoReal:
         usar_scraper_real: bool = False,  # Desativado: muito lento (15-30s)
         usar_gerador_fallback: bool = True,  # Usar gerador (instantâneo)
         lat_usuario: float = None,  # NOVO: Coordenadas do usuário
-        lon_usuario: float = None
+        lon_usuario: float = None,
+        usar_scraper_unificado: bool = False,
+        prazo: float = None  # Segundos para todas as fontes HTTP (padrão do motor)
     ) -> List[Dict]:
         """
         Busca produtos sob demanda
@@ -239,10 +239,11 @@ class ScraperTempoReal:
         # SCRAPING REAL (Desativado por padrão - muito lento)
         if usar_scraper_real:
             try:
-                from app.scrapers.scraper_real_playwright import buscar_produtos_reais
+                from app.scrapers.servico_navegadores import servico_navegadores
                 print("   🌐 Fazendo scraping REAL da web...")
 
-                produtos = buscar_produtos_reais(termo)
+                # Navegador roda em processo trabalhador (travou: morre ele, não a API)
+                produtos = servico_navegadores.executar("real_playwright", termo=termo)
 
                 if produtos and len(produtos) > 0:
                     print(f"   ✅ Encontrados {len(produtos)} produtos REAIS!")
@@ -277,7 +278,7 @@ class ScraperTempoReal:
                 produtos = scraper_unificado.buscar_inteligente(termo, minimo_produtos=5)
 
                 # Se não encontrou nada, usar gerador
-                if not produtos and usar_gerador:
+                if not produtos and usar_gerador_fallback:
                     print("   ⚠️  Scraping falhou, usando gerador...")
                     from app.scrapers.gerador_produtos import gerador_produtos
                     return gerador_produtos.gerar_produtos(termo, quantidade=15,
@@ -289,7 +290,7 @@ class ScraperTempoReal:
                 print(f"   ⚠️  Erro no Scraper Unificado: {e}")
 
                 # Fallback para gerador
-                if usar_gerador:
+                if usar_gerador_fallback:
                     print("   🎲 Usando gerador como fallback...")
                     from app.scrapers.gerador_produtos import gerador_produtos
                     return gerador_produtos.gerar_produtos(termo, quantidade=15,
@@ -299,32 +300,27 @@ class ScraperTempoReal:
         # Método tradicional (fallback)
         todos_produtos = []
 
-        # Tentar todas as fontes em paralelo seria melhor, mas por enquanto sequencial
+        # Todas as fontes em paralelo (tempo total = fonte mais lenta, limitado pelo prazo)
         fontes = [
-            ('Mercado Livre', self.buscar_mercadolivre_simples),
-            ('Carrefour', self.buscar_carrefour_api),
-            ('Extra', self.buscar_extra),
+            self.fonte_mercadolivre_simples(termo),
+            self.fonte_carrefour_api(termo),
+            self.fonte_extra(termo),
         ]
 
-        for nome_fonte, metodo_busca in fontes:
-            try:
-                time.sleep(random.uniform(0.5, 1.5))  # Delay entre fontes
-                produtos = metodo_busca(termo)
-                todos_produtos.extend(produtos[:max_por_fonte])
-            except Exception as e:
-                print(f"   ✗ Erro em {nome_fonte}: {e}")
+        execucao = motor_scraping.executar(fontes, prazo=prazo)
+        for produtos in execucao['resultados'].values():
+            todos_produtos.extend(produtos[:max_por_fonte])
 
         # Se não encontrou produtos suficientes E selenium está ativado, usar scraper humano
         if usar_selenium and len(todos_produtos) < 5:
             print(f"\n   ⚡ Poucos produtos encontrados ({len(todos_produtos)}), usando Scraper Humano...")
             try:
-                from app.scrapers.scraper_humano import get_scraper_humano
-
-                scraper_humano = get_scraper_humano(headless=True)
+                from app.scrapers.servico_navegadores import servico_navegadores
 
-                # Buscar nos mercados principais
-                produtos_selenium = scraper_humano.buscar_todos(
-                    termo,
+                # Buscar nos mercados principais (Selenium no processo trabalhador)
+                produtos_selenium = servico_navegadores.executar(
+                    "selenium",
+                    termo=termo,
                     mercados=['carrefour', 'pao_acucar']
                 )
 
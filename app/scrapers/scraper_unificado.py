@@ -5,6 +5,10 @@ Tenta múltiplas estratégias até conseguir resultados
 from typing import List, Dict, Optional
 import time
 
+from app.scrapers.servico_navegadores import servico_navegadores, TIMEOUT_MINIMO_NAVEGADOR
+from app.scrapers.saude_fontes import saude_fontes, FonteIndisponivel
+from app.scrapers.motor_async import FontesFalharam
+
 
 class ScraperUnificado:
     """
@@ -31,30 +35,6 @@ class ScraperUnificado:
                 self.scrapers['apis'] = None
         return self.scrapers['apis']
 
-    def _get_scraper_playwright(self):
-        """Lazy load do Playwright"""
-        if 'playwright' not in self.scrapers:
-            try:
-                from app.scrapers.scraper_playwright import get_scraper_playwright
-                self.scrapers['playwright'] = get_scraper_playwright(headless=True)
-                print("   ✓ Playwright carregado")
-            except Exception as e:
-                print(f"   ⚠️  Erro ao carregar Playwright: {e}")
-                self.scrapers['playwright'] = None
-        return self.scrapers['playwright']
-
-    def _get_scraper_selenium(self):
-        """Lazy load do Selenium"""
-        if 'selenium' not in self.scrapers:
-            try:
-                from app.scrapers.scraper_humano import get_scraper_humano
-                self.scrapers['selenium'] = get_scraper_humano(headless=True)
-                print("   ✓ Selenium anti-detecção carregado")
-            except Exception as e:
-                print(f"   ⚠️  Erro ao carregar Selenium: {e}")
-                self.scrapers['selenium'] = None
-        return self.scrapers['selenium']
-
     def _get_scraper_simples(self):
         """Lazy load do scraper simples"""
         if 'simples' not in self.scrapers:
@@ -75,7 +55,9 @@ class ScraperUnificado:
     ) -> List[Dict]:
         """
         Busca inteligente com múltiplas estratégias
-        Para assim que conseguir produtos suficientes
+        Para assim que conseguir produtos suficientes. Estratégia com disjuntor
+        aberto (saude_fontes) é pulada; as de navegador usam o timeout do p95 observado,
+        nunca abaixo de TIMEOUT_MINIMO_NAVEGADOR
         """
         print(f"\n{'='*70}")
         print(f"🧠 SCRAPER UNIFICADO INTELIGENTE: '{termo}'")
@@ -91,7 +73,7 @@ class ScraperUnificado:
             scraper_apis = self._get_scraper_apis()
             if scraper_apis:
                 start_time = time.time()
-                produtos_api = scraper_apis.buscar_todos(termo)
+                produtos_api = saude_fontes.chamar("unificado_apis", scraper_apis.buscar_todos, termo)
 
                 todos_produtos.extend(produtos_api)
 
@@ -102,6 +84,8 @@ class ScraperUnificado:
                 if len(todos_produtos) >= minimo_produtos:
                     print(f"\n✅ Objetivo alcançado com APIs! ({len(todos_produtos)} produtos)")
                     return self._remover_duplicatas(todos_produtos)
+        except FonteIndisponivel:
+            print("   ⏭  APIs instáveis: estratégia pulada")
         except Exception as e:
             print(f"   ❌ Erro na estratégia de APIs: {e}")
 
@@ -112,23 +96,29 @@ class ScraperUnificado:
             print("🎭 Estratégia 2: Playwright (Navegador Moderno)")
             print("-" * 70)
             try:
-                scraper_playwright = self._get_scraper_playwright()
-                if scraper_playwright:
-                    start_time = time.time()
+                start_time = time.time()
 
-                    # Tentar mercados específicos
-                    mercados = ['mercadolivre', 'carrefour']
-                    produtos_pw = scraper_playwright.buscar_todos(termo, mercados=mercados)
+                # Tentar mercados específicos (navegador no processo trabalhador)
+                mercados = ['mercadolivre', 'carrefour']
+                produtos_pw = saude_fontes.chamar(
+                    "unificado_playwright", servico_navegadores.executar, "playwright",
+                    timeout=saude_fontes.timeout(
+                        "unificado_playwright", servico_navegadores.timeout, minimo=TIMEOUT_MINIMO_NAVEGADOR
+                    ),
+                    termo=termo, mercados=mercados
+                )
 
-                    todos_produtos.extend(produtos_pw)
+                todos_produtos.extend(produtos_pw)
 
-                    elapsed = time.time() - start_time
-                    print(f"   ⏱️  Tempo: {elapsed:.2f}s")
-                    print(f"   📊 Produtos encontrados: {len(produtos_pw)}")
+                elapsed = time.time() - start_time
+                print(f"   ⏱️  Tempo: {elapsed:.2f}s")
+                print(f"   📊 Produtos encontrados: {len(produtos_pw)}")
 
-                    if len(todos_produtos) >= minimo_produtos:
-                        print(f"\n✅ Objetivo alcançado com Playwright! ({len(todos_produtos)} produtos)")
-                        return self._remover_duplicatas(todos_produtos)
+                if len(todos_produtos) >= minimo_produtos:
+                    print(f"\n✅ Objetivo alcançado com Playwright! ({len(todos_produtos)} produtos)")
+                    return self._remover_duplicatas(todos_produtos)
+            except FonteIndisponivel:
+                print("   ⏭  Playwright instável: estratégia pulada")
             except Exception as e:
                 print(f"   ❌ Erro na estratégia Playwright: {e}")
 
@@ -139,22 +129,28 @@ class ScraperUnificado:
             print("🤖 Estratégia 3: Selenium Anti-Detecção")
             print("-" * 70)
             try:
-                scraper_selenium = self._get_scraper_selenium()
-                if scraper_selenium:
-                    start_time = time.time()
+                start_time = time.time()
 
-                    mercados = ['carrefour', 'pao_acucar']
-                    produtos_sel = scraper_selenium.buscar_todos(termo, mercados=mercados)
+                mercados = ['carrefour', 'pao_acucar']
+                produtos_sel = saude_fontes.chamar(
+                    "unificado_selenium", servico_navegadores.executar, "selenium",
+                    timeout=saude_fontes.timeout(
+                        "unificado_selenium", servico_navegadores.timeout, minimo=TIMEOUT_MINIMO_NAVEGADOR
+                    ),
+                    termo=termo, mercados=mercados
+                )
 
-                    todos_produtos.extend(produtos_sel)
+                todos_produtos.extend(produtos_sel)
 
-                    elapsed = time.time() - start_time
-                    print(f"   ⏱️  Tempo: {elapsed:.2f}s")
-                    print(f"   📊 Produtos encontrados: {len(produtos_sel)}")
+                elapsed = time.time() - start_time
+                print(f"   ⏱️  Tempo: {elapsed:.2f}s")
+                print(f"   📊 Produtos encontrados: {len(produtos_sel)}")
 
-                    if len(todos_produtos) >= minimo_produtos:
-                        print(f"\n✅ Objetivo alcançado com Selenium! ({len(todos_produtos)} produtos)")
-                        return self._remover_duplicatas(todos_produtos)
+                if len(todos_produtos) >= minimo_produtos:
+                    print(f"\n✅ Objetivo alcançado com Selenium! ({len(todos_produtos)} produtos)")
+                    return self._remover_duplicatas(todos_produtos)
+            except FonteIndisponivel:
+                print("   ⏭  Selenium instável: estratégia pulada")
             except Exception as e:
                 print(f"   ❌ Erro na estratégia Selenium: {e}")
 
@@ -168,13 +164,15 @@ class ScraperUnificado:
                 scraper_simples = self._get_scraper_simples()
                 if scraper_simples:
                     start_time = time.time()
-                    produtos_simples = scraper_simples.buscar_todos(termo)
+                    produtos_simples = saude_fontes.chamar("unificado_simples", scraper_simples.buscar_todos, termo)
 
                     todos_produtos.extend(produtos_simples)
 
                     elapsed = time.time() - start_time
                     print(f"   ⏱️  Tempo: {elapsed:.2f}s")
                     print(f"   📊 Produtos encontrados: {len(produtos_simples)}")
+            except FonteIndisponivel:
+                print("   ⏭  Requests simples instáveis: estratégia pulada")
             except Exception as e:
                 print(f"   ❌ Erro na estratégia simples: {e}")
 
@@ -209,7 +207,10 @@ class ScraperUnificado:
 
         scraper_apis = self._get_scraper_apis()
         if scraper_apis:
-            return scraper_apis.buscar_todos(termo)
+            try:
+                return scraper_apis.buscar_todos(termo)
+            except FontesFalharam as e:
+                print(f"   ❌ APIs fora do ar: {e}")
 
         return []
 
@@ -221,19 +222,8 @@ class ScraperUnificado:
         """Fecha todos os scrapers"""
         print("\n🔧 Fechando scrapers...")
 
-        if 'playwright' in self.scrapers and self.scrapers['playwright']:
-            try:
-                self.scrapers['playwright'].close()
-                print("   ✓ Playwright fechado")
-            except:
-                pass
-
-        if 'selenium' in self.scrapers and self.scrapers['selenium']:
-            try:
-                self.scrapers['selenium'].close()
-                print("   ✓ Selenium fechado")
-            except:
-                pass
+        # Navegadores (Playwright/Selenium) vivem nos processos do servico_navegadores
+        servico_navegadores.fechar()
 
         print("✅ Scrapers fechados\n")
 
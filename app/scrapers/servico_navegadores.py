@@ -0,0 +1,308 @@
+"""
+Serviço de scraping com navegador em processos separados
+Selenium e Playwright rodam em processos trabalhadores (python -m
+app.scrapers.servico_navegadores); a API só manda tarefas por uma conexão local
+e recebe produtos normalizados. Navegador travado ou estourando memória derruba
+o trabalhador, não a API. Este módulo não importa selenium nem playwright.
+"""
+import atexit
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+TRABALHADORES = int(os.getenv("SCRAPER_TRABALHADORES", "2"))
+TAREFAS_POR_TRABALHADOR = int(os.getenv("SCRAPER_TAREFAS_POR_TRABALHADOR", "50"))
+TIMEOUT_TAREFA = float(os.getenv("SCRAPER_TIMEOUT_TAREFA", "90"))
+# Piso do timeout adaptativo: subir o navegador sozinho já leva dezenas de segundos
+TIMEOUT_MINIMO_NAVEGADOR = float(os.getenv("SCRAPER_TIMEOUT_MINIMO_NAVEGADOR", "45"))
+
+RAIZ_PROJETO = str(Path(__file__).resolve().parents[2])
+
+
+# ---------- Tarefas (executadas só dentro do trabalhador) ----------
+
+def _tarefa_real_playwright(termo: str) -> List[Dict]:
+    from app.scrapers.scraper_real_playwright import buscar_produtos_reais
+    return buscar_produtos_reais(termo)
+
+
+def _tarefa_playwright(termo: str, mercados: List[str] = None) -> List[Dict]:
+    from app.scrapers.scraper_playwright import get_scraper_playwright
+    return get_scraper_playwright(headless=True).buscar_todos(termo, mercados=mercados)
+
+
+def _tarefa_selenium(termo: str, mercados: List[str] = None) -> List[Dict]:
+    from app.scrapers.scraper_humano import get_scraper_humano
+    return get_scraper_humano(headless=True).buscar_todos(termo, mercados=mercados)
+
+
+def _tarefa_humano_avancado(termo: str, supermercados: List[str] = None) -> List[Dict]:
+    from app.scrapers.scraper_humano_avancado import buscar_produtos_supermercados
+    return buscar_produtos_supermercados(termo, supermercados)
+
+
+# Nome da tarefa -> função (a API manda só o nome e os argumentos)
+TAREFAS = {
+    "real_playwright": _tarefa_real_playwright,
+    "playwright": _tarefa_playwright,
+    "selenium": _tarefa_selenium,
+    "humano_avancado": _tarefa_humano_avancado,
+}
+
+
+def normalizar_produto(produto: Dict, fonte: str) -> Dict:
+    """Mesmo formato para todos os scrapers (só tipos simples, para atravessar o processo)"""
+    preco = float(produto.get("preco") or 0)
+    preco_original = produto.get("preco_original")
+    return {
+        "nome": str(produto.get("nome") or "").strip(),
+        "marca": produto.get("marca"),
+        "preco": preco,
+        "preco_original": float(preco_original) if preco_original else None,
+        "em_promocao": bool(produto.get("em_promocao", False)),
+        "url": produto.get("url"),
+        "supermercado": produto.get("supermercado") or "Desconhecido",
+        "disponivel": bool(produto.get("disponivel", True)),
+        "fonte": produto.get("fonte") or f"navegador_{fonte}",
+    }
+
+
+def _fechar_navegadores():
+    """Fecha os navegadores que o trabalhador abriu (o Playwright fecha pelo atexit do pool)"""
+    humano = sys.modules.get("app.scrapers.scraper_humano")
+    if humano is not None and humano._scraper_instance is not None:
+        humano._scraper_instance.close()
+
+
+def _laco_trabalhador(conexao: Connection, max_tarefas: int):
+    """Processo trabalhador: atende até max_tarefas e sai (o serviço sobe outro)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C é da API; ela encerra os trabalhadores
+    try:
+        for _ in range(max_tarefas):
+            try:
+                pedido = conexao.recv()
+            except EOFError:
+                break  # API fechou a conexão
+            if pedido is None:
+                break
+
+            tarefa, argumentos = pedido
+            try:
+                produtos = TAREFAS[tarefa](**argumentos) or []
+                conexao.send(("ok", [normalizar_produto(p, tarefa) for p in produtos if p.get("nome")]))
+            except Exception as e:
+                conexao.send(("erro", f"{type(e).__name__}: {e}"))
+    finally:
+        _fechar_navegadores()
+
+
+# ---------- Lado da API ----------
+
+class _Trabalhador:
+    """Um processo trabalhador e a ponta da API da conexão com ele"""
+
+    def __init__(self, indice: int, max_tarefas: int):
+        pai, filho = socket.socketpair()
+        ambiente = dict(os.environ)
+        ambiente["PYTHONPATH"] = os.pathsep.join(filter(None, [RAIZ_PROJETO, ambiente.get("PYTHONPATH")]))
+        # Sessão própria: no timeout o grupo inteiro (trabalhador + Chrome + driver) é morto junto
+        self.processo = subprocess.Popen(
+            [sys.executable, "-m", "app.scrapers.servico_navegadores", str(filho.fileno()), str(max_tarefas)],
+            pass_fds=(filho.fileno(),), env=ambiente, start_new_session=True
+        )
+        filho.close()
+        self.conexao = Connection(pai.detach())
+        self.indice = indice
+        self.max_tarefas = max_tarefas
+        self.tarefas = 0
+        self.iniciado_em = time.monotonic()
+
+    def disponivel(self) -> bool:
+        return self.tarefas < self.max_tarefas and self.processo.poll() is None
+
+    def encerrar(self, forcar: bool = False, espera: float = 5):
+        """Pede para sair; se não sair a tempo (ou forcar), mata o grupo de processos"""
+        if not forcar and self.processo.poll() is None:
+            try:
+                self.conexao.send(None)
+                self.processo.wait(espera)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        if self.processo.poll() is None:
+            for sinal in (signal.SIGTERM, signal.SIGKILL):
+                try:
+                    os.killpg(self.processo.pid, sinal)
+                    self.processo.wait(2)
+                    break
+                except ProcessLookupError:
+                    break
+                except subprocess.TimeoutExpired:
+                    continue
+        else:
+            # Saiu sozinho: ainda pode ter deixado Chrome/driver órfão no grupo
+            try:
+                os.killpg(self.processo.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        self.conexao.close()
+
+
+class ServicoNavegadores:
+    """Fila de tarefas de navegador atendida por N processos trabalhadores
+
+    - executar(tarefa, **argumentos): pega um trabalhador livre, manda a tarefa e
+      espera até timeout; passou do prazo, o trabalhador (e os navegadores dele)
+      é morto e outro sobe no lugar
+    - Reciclagem: cada trabalhador atende TAREFAS_POR_TRABALHADOR tarefas e sai
+      (memória do Chrome/driver volta ao sistema)
+    - Trabalhadores sobem sob demanda, na primeira tarefa de cada vaga
+    """
+
+    ESPERA_MAXIMA = 30  # segundos esperando um trabalhador livre
+
+    def __init__(self, trabalhadores: int = TRABALHADORES, tarefas_por_trabalhador: int = TAREFAS_POR_TRABALHADOR,
+                 timeout: float = TIMEOUT_TAREFA):
+        self.trabalhadores = trabalhadores
+        self.tarefas_por_trabalhador = tarefas_por_trabalhador
+        self.timeout = timeout
+        self._livres: queue.Queue = queue.Queue()
+        self._todos: Dict[int, _Trabalhador] = {}
+        self._lock = threading.Lock()
+        self._iniciado = False
+        self._metricas = {"tarefas": 0, "erros": 0, "timeouts": 0, "quedas": 0, "reciclagens": 0, "esperas": 0}
+
+    def _iniciar(self):
+        with self._lock:
+            if self._iniciado:
+                return
+            for indice in range(self.trabalhadores):
+                self._livres.put(indice)  # Vaga vazia: o processo sobe no primeiro uso
+            self._iniciado = True
+            atexit.register(self.fechar)
+
+    def _contar(self, metrica: str):
+        with self._lock:
+            self._metricas[metrica] += 1
+
+    def _trabalhador(self, indice: int) -> _Trabalhador:
+        """Trabalhador pronto para a vaga (sobe um novo se não existe, caiu ou foi reciclado)"""
+        trabalhador = self._todos.get(indice)
+        if trabalhador is not None and trabalhador.disponivel():
+            return trabalhador
+        if trabalhador is not None:
+            reciclado = trabalhador.tarefas >= trabalhador.max_tarefas
+            trabalhador.encerrar(forcar=not reciclado)
+            if reciclado:
+                self._contar("reciclagens")
+        trabalhador = self._todos[indice] = _Trabalhador(indice, self.tarefas_por_trabalhador)
+        return trabalhador
+
+    def _descartar(self, indice: int):
+        trabalhador = self._todos.pop(indice, None)
+        if trabalhador is not None:
+            trabalhador.encerrar(forcar=True)
+
+    def executar(self, tarefa: str, timeout: Optional[float] = None, **argumentos) -> List[Dict]:
+        """
+        Roda a tarefa em um trabalhador e devolve os produtos normalizados
+
+        Raises:
+            ValueError: tarefa desconhecida
+            TimeoutError: sem trabalhador livre ou tarefa passou do prazo
+            RuntimeError: erro no scraper ou trabalhador caiu
+        """
+        if tarefa not in TAREFAS:
+            raise ValueError(f"Tarefa de navegador desconhecida: '{tarefa}'")
+        self._iniciar()
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            indice = self._livres.get_nowait()
+        except queue.Empty:
+            self._contar("esperas")
+            try:
+                indice = self._livres.get(timeout=self.ESPERA_MAXIMA)
+            except queue.Empty:
+                raise TimeoutError("Nenhum trabalhador de navegador livre")
+
+        try:
+            trabalhador = self._trabalhador(indice)
+            if trabalhador.tarefas == 0:
+                # Primeira tarefa do processo inclui a partida do navegador: prazo cheio,
+                # senão o timeout mata o trabalhador e a próxima chamada parte do zero de novo
+                timeout = max(timeout, self.timeout)
+            try:
+                trabalhador.conexao.send((tarefa, argumentos))
+            except (BrokenPipeError, ConnectionResetError) as e:
+                self._contar("quedas")
+                self._descartar(indice)
+                raise RuntimeError(f"Falha na conexão com o trabalhador: {e}")
+            if not trabalhador.conexao.poll(timeout):
+                self._contar("timeouts")
+                print(f"   ⏱️  Tarefa '{tarefa}' passou de {timeout:.0f}s; reiniciando trabalhador {indice}")
+                self._descartar(indice)
+                raise TimeoutError(f"Tarefa '{tarefa}' passou de {timeout:.0f}s")
+            try:
+                status, dados = trabalhador.conexao.recv()
+            except (EOFError, ConnectionResetError):
+                self._contar("quedas")
+                print(f"   ❌ Trabalhador {indice} caiu durante '{tarefa}'")
+                self._descartar(indice)
+                raise RuntimeError(f"Trabalhador de navegador caiu durante '{tarefa}'")
+            trabalhador.tarefas += 1
+        finally:
+            self._livres.put(indice)
+
+        self._contar("tarefas")
+        if status == "erro":
+            self._contar("erros")
+            raise RuntimeError(dados)
+        return dados
+
+    def saude(self) -> Dict:
+        with self._lock:
+            metricas = dict(self._metricas)
+        agora = time.monotonic()
+        return {
+            "iniciado": self._iniciado,
+            "vagas": self.trabalhadores,
+            "vagas_livres": self._livres.qsize(),
+            "tarefas_por_trabalhador": self.tarefas_por_trabalhador,
+            "timeout_segundos": self.timeout,
+            "trabalhadores": [
+                {
+                    "indice": indice,
+                    "pid": trabalhador.processo.pid,
+                    "vivo": trabalhador.processo.poll() is None,
+                    "tarefas": trabalhador.tarefas,
+                    "idade_segundos": int(agora - trabalhador.iniciado_em)
+                }
+                for indice, trabalhador in sorted(self._todos.items())
+            ],
+            **metricas
+        }
+
+    def fechar(self):
+        """Encerra todos os trabalhadores (no atexit; se vier outra tarefa, sobem de novo)"""
+        for indice in list(self._todos):
+            trabalhador = self._todos.pop(indice, None)
+            if trabalhador is not None:
+                trabalhador.encerrar()
+
+
+# Instância global
+servico_navegadores = ServicoNavegadores()
+
+
+if __name__ == "__main__":
+    # Entrada do processo trabalhador: <descritor da conexão> <máximo de tarefas>
+    _laco_trabalhador(Connection(int(sys.argv[1])), int(sys.argv[2]))
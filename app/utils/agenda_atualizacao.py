@@ -0,0 +1,264 @@
+"""
+Agenda de atualização de preços por demanda
+Cada produto tem a sua próxima atualização, com intervalo que encolhe com a
+demanda (buscas recentes, alertas ativos e volatilidade do preço): produto
+popular fica fresco e produto que ninguém vê só volta a cada INTERVALO_MAXIMO.
+Cada ciclo atualiza no máximo ORCAMENTO_POR_CICLO produtos, os mais urgentes.
+"""
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.database import AgendaAtualizacao, Alerta, Preco, PrecoConsenso, Produto
+from app.utils.consenso import TODOS
+
+
+ORCAMENTO_POR_CICLO = int(os.getenv("ATUALIZACAO_ORCAMENTO_CICLO", "20"))  # Produtos por ciclo
+INTERVALO_CICLO_SEGUNDOS = int(os.getenv("ATUALIZACAO_INTERVALO_CICLO_SEGUNDOS", "300"))
+PARALELISMO = int(os.getenv("ATUALIZACAO_PARALELISMO", "4"))  # Scrapings simultâneos (modo sem broker)
+
+
+class AgendadorAtualizacao:
+    """Prioridade de atualização por produto, persistida em agenda_atualizacao
+
+    - Demanda = log(1 + buscas) + PESO_ALERTAS·log(1 + alertas ativos)
+      + PESO_VOLATILIDADE·IQR relativo do consenso (limitado a 50%)
+    - Intervalo = INTERVALO_MAXIMO / (1 + demanda)², entre INTERVALO_MINIMO e INTERVALO_MAXIMO
+      (0 buscas: 7 dias; ~10 buscas: ~15h; ~100 buscas ou buscas + alertas: poucas horas)
+    - Buscas decaem com meia-vida de MEIA_VIDA_BUSCAS_HORAS (registrar_busca, chamado pela API)
+    - proximos: entre os vencidos, escolhe os de maior urgência = (1 + demanda) × idade do
+      preço mais novo / intervalo, e já grava a próxima atualização de cada um
+    """
+
+    MEIA_VIDA_BUSCAS_HORAS = 72
+    INTERVALO_MINIMO = timedelta(hours=1)
+    INTERVALO_MAXIMO = timedelta(days=7)
+    PESO_ALERTAS = 2.0
+    PESO_VOLATILIDADE = 4.0
+    VOLATILIDADE_MAXIMA = 0.5
+    MAXIMO_PRODUTOS_POR_BUSCA = 50
+    CANDIDATOS_POR_VAGA = 5
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @classmethod
+    def intervalo(cls, demanda: float) -> timedelta:
+        segundos = cls.INTERVALO_MAXIMO.total_seconds() / (1 + demanda) ** 2
+        segundos = min(max(segundos, cls.INTERVALO_MINIMO.total_seconds()), cls.INTERVALO_MAXIMO.total_seconds())
+        return timedelta(seconds=segundos)
+
+    @classmethod
+    def decair(cls, buscas: float, desde: datetime, agora: datetime) -> float:
+        if not buscas or desde is None:
+            return buscas or 0.0
+        horas = (agora - desde).total_seconds() / 3600
+        return buscas * 0.5 ** (horas / cls.MEIA_VIDA_BUSCAS_HORAS)
+
+    def _salvar(self, produto_id: int, **valores):
+        self.db.execute(
+            sqlite_insert(AgendaAtualizacao).values(produto_id=produto_id, **valores)
+            .on_conflict_do_update(index_elements=["produto_id"], set_=valores)
+        )
+
+    # ---------- Demanda ----------
+
+    def registrar_busca(self, produto_ids: Iterable[int]):
+        """
+        Uma busca mostrou estes produtos: +1 busca (com decaimento) e, se o produto
+        ficou mais popular, a próxima atualização é antecipada
+        """
+        ids = list(dict.fromkeys(produto_ids))[:self.MAXIMO_PRODUTOS_POR_BUSCA]
+        if not ids:
+            return
+
+        self.db.execute(
+            sqlite_insert(AgendaAtualizacao)
+            .values([{"produto_id": produto_id} for produto_id in ids])
+            .on_conflict_do_nothing(index_elements=["produto_id"])
+        )
+
+        agora = datetime.now()
+        for agenda in self.db.query(AgendaAtualizacao).filter(AgendaAtualizacao.produto_id.in_(ids)):
+            agenda.buscas = self.decair(agenda.buscas, agenda.data_ultima_busca, agora) + 1
+            agenda.data_ultima_busca = agora
+            if agenda.data_ultima_atualizacao is None:
+                continue  # Nunca avaliado: o próximo ciclo decide pela idade do preço
+
+            # A demanda só pode ter subido (pelas buscas): o intervalo novo é no máximo este
+            demanda = max(agenda.demanda, math.log1p(agenda.buscas))
+            antecipada = agenda.data_ultima_atualizacao + self.intervalo(demanda)
+            if agenda.proxima_atualizacao is None or antecipada < agenda.proxima_atualizacao:
+                agenda.proxima_atualizacao = antecipada
+
+    def mesclar(self, destinos: Dict[int, int]):
+        """
+        Produtos mesclados (antigo -> sobrevivente): as buscas dos antigos (com
+        decaimento) somam no sobrevivente e as linhas deles saem da agenda
+        """
+        if not destinos:
+            return
+        agora = datetime.now()
+
+        somas = defaultdict(float)
+        for produto_id, buscas, desde in self.db.query(
+            AgendaAtualizacao.produto_id, AgendaAtualizacao.buscas, AgendaAtualizacao.data_ultima_busca
+        ).filter(AgendaAtualizacao.produto_id.in_(destinos)):
+            somas[destinos[produto_id]] += self.decair(buscas, desde, agora)
+
+        self.db.query(AgendaAtualizacao).filter(
+            AgendaAtualizacao.produto_id.in_(destinos)
+        ).delete(synchronize_session=False)
+
+        somas = {sobrevivente: soma for sobrevivente, soma in somas.items() if soma}
+        if not somas:
+            return
+        atuais = {
+            produto_id: (buscas, desde)
+            for produto_id, buscas, desde in self.db.query(
+                AgendaAtualizacao.produto_id, AgendaAtualizacao.buscas, AgendaAtualizacao.data_ultima_busca
+            ).filter(AgendaAtualizacao.produto_id.in_(somas))
+        }
+        for sobrevivente, soma in somas.items():
+            buscas, desde = atuais.get(sobrevivente, (0.0, None))
+            self._salvar(sobrevivente, buscas=self.decair(buscas, desde, agora) + soma, data_ultima_busca=agora)
+
+    def pontuar(self, produto_ids: List[int]) -> Dict[int, float]:
+        """Demanda atual de cada produto (3 SELECTs para todos)"""
+        if not produto_ids:
+            return {}
+        agora = datetime.now()
+
+        buscas = {
+            produto_id: self.decair(total, desde, agora)
+            for produto_id, total, desde in self.db.query(
+                AgendaAtualizacao.produto_id, AgendaAtualizacao.buscas, AgendaAtualizacao.data_ultima_busca
+            ).filter(AgendaAtualizacao.produto_id.in_(produto_ids))
+        }
+        alertas = dict(
+            self.db.query(Alerta.produto_id, func.count(Alerta.id))
+            .filter(Alerta.ativo == True, Alerta.produto_id.in_(produto_ids))
+            .group_by(Alerta.produto_id)
+        )
+        volatilidade = {
+            produto_id: (superior - inferior) / mediana
+            for produto_id, mediana, inferior, superior in self.db.query(
+                PrecoConsenso.produto_id, PrecoConsenso.mediana,
+                PrecoConsenso.quartil_inferior, PrecoConsenso.quartil_superior
+            ).filter(PrecoConsenso.supermercado == TODOS, PrecoConsenso.produto_id.in_(produto_ids))
+            if mediana and inferior is not None and superior is not None
+        }
+
+        return {
+            produto_id: (
+                math.log1p(buscas.get(produto_id, 0.0))
+                + self.PESO_ALERTAS * math.log1p(alertas.get(produto_id, 0))
+                + self.PESO_VOLATILIDADE * min(max(volatilidade.get(produto_id, 0.0), 0.0), self.VOLATILIDADE_MAXIMA)
+            )
+            for produto_id in produto_ids
+        }
+
+    def _ultimas_coletas(self, produto_ids: List[int]) -> Dict[int, datetime]:
+        return dict(
+            self.db.query(Preco.produto_id, func.max(Preco.data_coleta))
+            .filter(Preco.produto_id.in_(produto_ids))
+            .group_by(Preco.produto_id)
+        )
+
+    def agendar(self, produto_ids: List[int]) -> int:
+        """Grava demanda e próxima atualização (idade do preço mais novo + intervalo), sem atualizar nada"""
+        demandas = self.pontuar(produto_ids)
+        ultimas_coletas = self._ultimas_coletas(produto_ids)
+        for produto_id in produto_ids:
+            demanda = demandas[produto_id]
+            ultima = ultimas_coletas.get(produto_id)
+            self._salvar(
+                produto_id, demanda=demanda, data_ultima_atualizacao=ultima,
+                proxima_atualizacao=ultima + self.intervalo(demanda) if ultima else None
+            )
+        return len(produto_ids)
+
+    # ---------- Ciclo ----------
+
+    def proximos(self, orcamento: int = ORCAMENTO_POR_CICLO) -> List[Tuple[int, str]]:
+        """
+        Até orcamento produtos (id, nome) para atualizar agora, já reagendados
+
+        Candidatos: agenda vencida ou produto ainda sem data (maior demanda primeiro).
+        Candidato com preço recente não venceu de verdade: ganha a data certa e fica
+        fora. Vencidos que não couberam no orçamento continuam vencidos para o próximo ciclo.
+        """
+        agora = datetime.now()
+        candidatos = self.db.query(Produto.id, Produto.nome).outerjoin(
+            AgendaAtualizacao, AgendaAtualizacao.produto_id == Produto.id
+        ).filter(
+            or_(AgendaAtualizacao.proxima_atualizacao == None, AgendaAtualizacao.proxima_atualizacao <= agora)
+        ).order_by(
+            func.coalesce(AgendaAtualizacao.demanda, 0).desc(), AgendaAtualizacao.proxima_atualizacao
+        ).limit(orcamento * self.CANDIDATOS_POR_VAGA).all()
+        if not candidatos:
+            return []
+
+        ids = [produto_id for produto_id, _ in candidatos]
+        demandas = self.pontuar(ids)
+        ultimas_coletas = self._ultimas_coletas(ids)
+
+        vencidos = []
+        for produto_id, nome in candidatos:
+            demanda = demandas[produto_id]
+            intervalo = self.intervalo(demanda)
+            ultima = ultimas_coletas.get(produto_id)
+            if ultima is not None and agora - ultima < intervalo:
+                self._salvar(produto_id, demanda=demanda, proxima_atualizacao=ultima + intervalo,
+                             data_ultima_atualizacao=ultima)
+                continue
+            atraso = (agora - ultima) / intervalo if ultima is not None else 1.0
+            vencidos.append(((1 + demanda) * atraso, produto_id, nome, demanda, intervalo))
+
+        vencidos.sort(key=lambda vencido: vencido[0], reverse=True)
+        escolhidos = []
+        for posicao, (_, produto_id, nome, demanda, intervalo) in enumerate(vencidos):
+            if posicao < orcamento:
+                self._salvar(produto_id, demanda=demanda, proxima_atualizacao=agora + intervalo,
+                             data_ultima_atualizacao=agora)
+                escolhidos.append((produto_id, nome))
+            else:
+                self._salvar(produto_id, demanda=demanda)
+        return escolhidos
+
+    def resumo(self) -> Dict:
+        """Tamanho da fila de vencidos e próximas atualizações (para acompanhamento)"""
+        agora = datetime.now()
+        agendados = self.db.query(func.count(AgendaAtualizacao.produto_id)).scalar()
+        vencidos = self.db.query(func.count(AgendaAtualizacao.produto_id)).filter(
+            AgendaAtualizacao.proxima_atualizacao <= agora
+        ).scalar()
+        sem_data = self.db.query(func.count(Produto.id)).outerjoin(
+            AgendaAtualizacao, AgendaAtualizacao.produto_id == Produto.id
+        ).filter(AgendaAtualizacao.proxima_atualizacao == None).scalar()
+        mais_demandados = self.db.query(
+            Produto.nome, AgendaAtualizacao.demanda, AgendaAtualizacao.proxima_atualizacao
+        ).join(AgendaAtualizacao, AgendaAtualizacao.produto_id == Produto.id).order_by(
+            AgendaAtualizacao.demanda.desc()
+        ).limit(10).all()
+        return {
+            "agendados": agendados,
+            "vencidos": vencidos,
+            "sem_data": sem_data,
+            "orcamento_por_ciclo": ORCAMENTO_POR_CICLO,
+            "intervalo_ciclo_segundos": INTERVALO_CICLO_SEGUNDOS,
+            "mais_demandados": [
+                {
+                    "nome": nome,
+                    "demanda": round(demanda, 2),
+                    "proxima_atualizacao": proxima.isoformat() if proxima else None
+                }
+                for nome, demanda, proxima in mais_demandados
+            ]
+        }
@@ -0,0 +1,160 @@
+"""
+Detecção de preços anômalos em lote
+Z-score robusto (mediana/MAD) por produto × supermercado × semana, vetorizado com pandas
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.database import Preco, Produto
+from app.utils.ofertas import RankingOfertas
+
+
+class DetectorAnomalias:
+    """Marca preços fora da curva (erro de digitação, OCR, fraude)
+
+    1. Carrega os preços da janela recente em um DataFrame (só colunas numéricas)
+    2. Trabalha com log(preço): erros são multiplicativos (R$ 1,00 em vez de R$ 25,00)
+    3. Mediana e MAD por (produto, supermercado, semana); grupos pequenos usam o
+       produto inteiro na janela
+    4. z = 0.6745 * (x - mediana) / MAD (Iglewicz-Hoaglin); MAD zero cai para
+       1.2533 * desvio médio absoluto. Anomalia: |z| > LIMIAR e preço a mais de
+       VARIACAO_MINIMA da mediana (grupos muito estáveis têm MAD minúsculo)
+    5. Anomalias viram disponivel=False, verificado=False e guardam o score
+    """
+
+    LIMIAR = 3.5
+    VARIACAO_MINIMA = 0.5  # Abaixo de ±50% da mediana nunca é anomalia (promoções, ruído do MAD)
+    MINIMO_GRUPO = 8  # Preços no grupo para a estatística valer
+    LOTE_UPDATE = 500
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def carregar(self, dias: int, produtos_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        # Data como dia juliano (float): evita converter 1 milhão de datas em Python
+        consulta = select(
+            Preco.id, Preco.produto_id, Preco.supermercado, Preco.preco,
+            func.julianday(Preco.data_coleta).label("dia")
+        ).where(
+            Preco.data_coleta >= datetime.now() - timedelta(days=dias),
+            Preco.preco > 0,
+            Preco.disponivel == True
+        )
+        if produtos_ids is not None:
+            consulta = consulta.where(Preco.produto_id.in_(set(produtos_ids)))
+
+        return pd.read_sql(consulta, self.db.connection())
+
+    def pontuar(self, precos: pd.DataFrame) -> pd.DataFrame:
+        """
+        Z-score robusto e variação (log da razão preço/mediana) de cada preço
+
+        Grupos com menos de MINIMO_GRUPO preços usam a estatística do produto na janela;
+        se nem o produto tiver preços suficientes, z fica NaN (não avaliado).
+        """
+        if precos.empty:
+            return pd.DataFrame({"z": [], "variacao": []}, dtype=float)
+
+        valores = np.log(precos["preco"].to_numpy(dtype=float))
+        produto = precos["produto_id"].to_numpy()
+        loja = pd.factorize(precos["supermercado"])[0]
+        semana = (precos["dia"].to_numpy() // 7).astype(np.int64)
+
+        z_grupo, variacao_grupo = self._z_por_grupo(valores, [produto, loja, semana])
+        z_produto, variacao_produto = self._z_por_grupo(valores, [produto])
+
+        pequeno = np.isnan(z_grupo)
+        return pd.DataFrame({
+            "z": np.where(pequeno, z_produto, z_grupo),
+            "variacao": np.where(pequeno, variacao_produto, variacao_grupo)
+        }, index=precos.index)
+
+    def _z_por_grupo(self, valores: np.ndarray, chaves) -> Tuple[np.ndarray, np.ndarray]:
+        chaves = [pd.Series(chave) for chave in chaves]
+        grupos = pd.Series(valores).groupby(chaves, sort=False)
+
+        tamanho = grupos.transform("size").to_numpy()
+        mediana = grupos.transform("median").to_numpy()
+        variacao = valores - mediana
+
+        desvios = pd.Series(np.abs(variacao)).groupby(chaves, sort=False)
+        mad = desvios.transform("median").to_numpy()
+        media_desvio = desvios.transform("mean").to_numpy()
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(mad > 0, 0.6745 * variacao / mad, variacao / (1.2533 * media_desvio))
+
+        z = np.where(np.isfinite(z), z, 0.0)  # Grupo todo igual: nada é anômalo
+        return np.where(tamanho >= self.MINIMO_GRUPO, z, np.nan), variacao
+
+    def detectar(self, dias: int = 28, produtos_ids: Optional[Iterable[int]] = None,
+                 aplicar: bool = True) -> Dict:
+        """
+        Roda a detecção e (com aplicar) marca as anomalias; não faz commit
+
+        Args:
+            dias: Janela de preços analisada
+            produtos_ids: Restringe aos produtos de um lote recém-ingerido
+            aplicar: False só gera o relatório
+        """
+        inicio = datetime.now()
+        precos = self.carregar(dias, produtos_ids)
+        precos[["z", "variacao"]] = self.pontuar(precos)
+
+        anomalias = precos[
+            (precos["z"].abs() > self.LIMIAR) &
+            (precos["variacao"].abs() > np.log1p(self.VARIACAO_MINIMA))
+        ]
+
+        if aplicar and not anomalias.empty:
+            self._marcar(anomalias)
+
+        return self._relatorio(precos, anomalias, aplicar, (datetime.now() - inicio).total_seconds())
+
+    def _marcar(self, anomalias: pd.DataFrame):
+        """UPDATE ... CASE em lotes: tira das buscas e do ranking de ofertas e guarda o score"""
+        scores = dict(zip(anomalias["id"].astype(int), anomalias["z"].round(2).astype(float)))
+        ids = list(scores)
+        for inicio in range(0, len(ids), self.LOTE_UPDATE):
+            lote = {i: scores[i] for i in ids[inicio:inicio + self.LOTE_UPDATE]}
+            self.db.execute(
+                update(Preco).where(Preco.id.in_(lote)).values(
+                    disponivel=False,
+                    verificado=False,
+                    score_anomalia=case(lote, value=Preco.id)
+                ),
+                execution_options={"synchronize_session": False}
+            )
+            RankingOfertas(self.db).remover(lote)
+
+    def _relatorio(self, precos: pd.DataFrame, anomalias: pd.DataFrame, aplicado: bool, segundos: float) -> Dict:
+        piores = anomalias.reindex(anomalias["z"].abs().sort_values(ascending=False).index).head(20)
+        nomes = dict(self.db.query(Produto.id, Produto.nome).filter(
+            Produto.id.in_([int(p) for p in piores["produto_id"].unique()])
+        ).all()) if not piores.empty else {}
+
+        return {
+            "analisados": int(len(precos)),
+            "avaliados": int(precos["z"].notna().sum()) if not precos.empty else 0,
+            "anomalias": int(len(anomalias)),
+            "aplicado": aplicado,
+            "segundos": round(segundos, 2),
+            "por_supermercado": {
+                str(loja): int(total) for loja, total in anomalias["supermercado"].value_counts().items()
+            },
+            "exemplos": [
+                {
+                    "preco_id": int(linha.id),
+                    "produto": nomes.get(int(linha.produto_id)),
+                    "supermercado": linha.supermercado,
+                    "preco": float(linha.preco),
+                    "z": round(float(linha.z), 2)
+                }
+                for linha in piores.itertuples()
+            ]
+        }
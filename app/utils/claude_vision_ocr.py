@@ -10,6 +10,8 @@ import anthropic
 from anthropic import Anthropic
 import json
 
+from app.utils.produtos import normalizar_ean
+
 
 class ClaudeVisionOCR:
     """OCR usando Claude Vision API para notas fiscais"""
@@ -64,7 +66,7 @@ Analise esta imagem de nota fiscal e extraia as seguintes informações em forma
   "hora_compra": "hora da compra no formato HH:MM:SS",
   "produtos": [
     {
-      "codigo": "código do produto (se houver)",
+      "codigo": "código de barras EAN/GTIN ou código do produto (se houver, só os dígitos)",
       "nome": "nome do produto (limpo e corrigido)",
       "quantidade": "quantidade comprada",
       "unidade": "unidade (kg, un, lt, etc)",
@@ -199,6 +201,7 @@ Seja preciso e extraia o máximo de informações possível da nota fiscal."""
                 'quantidade': produto.get('quantidade', '1'),
                 'unidade': produto.get('unidade', 'un'),
                 'codigo': produto.get('codigo'),
+                'ean': normalizar_ean(produto.get('codigo')),
                 'preco_unitario': produto.get('preco_unitario', preco_total)
             }
 
@@ -0,0 +1,312 @@
+"""
+Preço de consenso por produto × supermercado
+Mediana móvel ponderada pela reputação, mantida de forma incremental com o
+estimador P² (Jain & Chlamtac): 5 marcadores por par, atualização O(1) por preço
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy import tuple_
+
+from app.models.database import PrecoConsenso, Preco, Carteira
+
+
+# Supermercado "todos": consenso do produto em qualquer loja
+TODOS = "*"
+
+
+class EstimadorP2:
+    """
+    Estimador P² da mediana com pesos e esquecimento exponencial
+
+    Marcadores nas posições 0, 25%, 50%, 75% e 100% da distribuição: além da mediana,
+    dão quartis aproximados. As posições são somas de pesos (não contagens), então um
+    preço de autor com reputação alta move os marcadores mais que um de reputação baixa.
+    Até juntar 5 preços o estado é só a lista deles (mediana ponderada exata).
+    """
+
+    FRACOES = (0.0, 0.25, 0.5, 0.75, 1.0)
+    FRACAO_PASSO = 1 / 16  # Passo máximo dos marcadores: 1/4 do espaço ideal entre eles
+
+    def __init__(self, estado: Optional[Dict] = None):
+        estado = estado or {}
+        self.q = list(estado.get("q", []))  # Alturas dos marcadores (ou preços, na fase inicial)
+        self.n = list(estado.get("n", []))  # Posições acumuladas (ou pesos, na fase inicial)
+
+    @property
+    def inicializado(self) -> bool:
+        return len(self.q) == 5
+
+    def estado(self) -> Dict:
+        return {"q": self.q, "n": self.n}
+
+    def esquecer(self, fator: float):
+        """Reduz o peso do que já foi visto (fator em (0, 1]) mantendo os marcadores"""
+        if fator >= 1:
+            return
+        if not self.inicializado:
+            self.n = [w * fator for w in self.n]
+            return
+        base = self.n[0]
+        self.n = [base] + [base + (posicao - base) * fator for posicao in self.n[1:]]
+
+    def adicionar(self, valor: float, peso: float = 1.0):
+        if not self.inicializado:
+            self.q.append(valor)
+            self.n.append(peso)
+            if len(self.q) == 5:
+                # Vira P²: marcadores = preços ordenados, posições = pesos acumulados
+                pares = sorted(zip(self.q, self.n))
+                self.q = [v for v, _ in pares]
+                acumulado = 0.0
+                self.n = []
+                for _, w in pares:
+                    acumulado += w
+                    self.n.append(acumulado)
+            return
+
+        q, n = self.q, self.n
+
+        # 1. Célula k onde o valor cai (ajustando mínimo e máximo)
+        if valor < q[0]:
+            q[0] = valor
+            k = 0
+        elif valor >= q[4]:
+            q[4] = valor
+            k = 3
+        else:
+            k = max(i for i in range(4) if q[i] <= valor)
+
+        # 2. Marcadores à direita andam o peso do valor
+        for i in range(k + 1, 5):
+            n[i] += peso
+
+        # 3. Ajustar marcadores internos que se afastaram da posição desejada
+        # O passo (e o limiar) é uma unidade de peso, não 1: as posições são somas de pesos
+        # fracionários e encolhem no esquecimento, e com passo 1 os marcadores congelariam.
+        # A unidade é o peso do valor, limitada a uma fração da massa total (com
+        # esquecimento forte a massa inteira pode ficar perto de 1)
+        total = n[4] - n[0]
+        unidade = min(peso, total * self.FRACAO_PASSO)
+        for i in (1, 2, 3):
+            desejada = n[0] + total * self.FRACOES[i]
+            d = desejada - n[i]
+            if (d >= unidade and n[i + 1] - n[i] > unidade) or (d <= -unidade and n[i - 1] - n[i] < -unidade):
+                s = 1 if d > 0 else -1
+                passo = s * unidade
+                candidato = self._parabolico(i, s, passo)
+                if not q[i - 1] < candidato < q[i + 1]:
+                    candidato = q[i] + passo * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = candidato
+                n[i] += passo
+
+    def _parabolico(self, i: int, s: int, passo: float) -> float:
+        q, n = self.q, self.n
+        return q[i] + passo / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + passo) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - passo) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def quantil(self, fracao: float) -> Optional[float]:
+        """Mediana (0.5) e quartis (0.25, 0.75); valores intermediários são interpolados"""
+        if not self.q:
+            return None
+
+        if not self.inicializado:
+            # Quantil ponderado exato da lista
+            pares = sorted(zip(self.q, self.n))
+            total = sum(w for _, w in pares)
+            alvo = total * fracao
+            acumulado = 0.0
+            for indice, (valor, w) in enumerate(pares):
+                acumulado += w
+                if abs(acumulado - alvo) <= 1e-6 * total and indice + 1 < len(pares):
+                    return (valor + pares[indice + 1][0]) / 2  # Exatamente no meio: média dos vizinhos
+                if acumulado >= alvo:
+                    return valor
+            return pares[-1][0]
+
+        for i in range(4):
+            if self.FRACOES[i] <= fracao <= self.FRACOES[i + 1]:
+                t = (fracao - self.FRACOES[i]) / (self.FRACOES[i + 1] - self.FRACOES[i])
+                return self.q[i] + t * (self.q[i + 1] - self.q[i])
+        return self.q[2]
+
+    @property
+    def peso(self) -> float:
+        """Peso efetivo já visto (com o esquecimento aplicado)"""
+        if not self.inicializado:
+            return sum(self.n)
+        return self.n[4]
+
+
+class ConsensoPrecos:
+    """Consenso de preço por (produto, supermercado) e por produto em qualquer loja
+
+    - registrar: 1 SELECT dos estados + 1 INSERT ... ON CONFLICT para um lote de preços
+    - obter / comparar: leitura de 1-2 linhas pela chave primária (O(1))
+
+    Cada preço entra com peso pela reputação do autor (scrapers: peso 1) e o passado
+    perde metade do peso a cada MEIA_VIDA_DIAS, substituindo a janela fixa de 30 dias.
+    """
+
+    MEIA_VIDA_DIAS = 15
+    MINIMO_OBSERVACOES = 2  # Preços já vistos para o consenso valer como referência
+    MINIMO_OBSERVACOES_LOJA = 3  # Abaixo disso, a referência é o consenso do produto em qualquer loja
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def peso_reputacao(self, reputacao: Optional[float]) -> float:
+        """Reputação 0-200 -> peso 0.1-2 (reputação padrão 100 = peso 1)"""
+        return max(reputacao if reputacao is not None else 100, 10) / 100
+
+    def registrar(self, precos: Iterable[Dict], pesos: Optional[Dict[str, float]] = None):
+        """
+        Adiciona preços aos consensos do produto × supermercado e do produto
+
+        Args:
+            precos: dicts com produto_id, supermercado, preco e opcionalmente
+                usuario_nome e data_coleta
+            pesos: peso por usuário (se omitido, vem da reputação da carteira)
+        """
+        precos = [p for p in precos if p.get("preco") and p["preco"] > 0 and p.get("produto_id")]
+        if not precos:
+            return
+
+        if pesos is None:
+            usuarios = {p["usuario_nome"] for p in precos if p.get("usuario_nome")}
+            pesos = {
+                usuario: self.peso_reputacao(reputacao)
+                for usuario, reputacao in self.db.query(Carteira.usuario_nome, Carteira.reputacao).filter(
+                    Carteira.usuario_nome.in_(usuarios)
+                ).all()
+            } if usuarios else {}
+
+        chaves = set()
+        for p in precos:
+            chaves.add((p["produto_id"], p["supermercado"]))
+            chaves.add((p["produto_id"], TODOS))
+
+        # Colunas (não entidades): o UPSERT abaixo não passa pelo identity map da sessão
+        linhas = {
+            (linha.produto_id, linha.supermercado): linha
+            for linha in self.db.query(
+                PrecoConsenso.produto_id, PrecoConsenso.supermercado, PrecoConsenso.estado,
+                PrecoConsenso.observacoes, PrecoConsenso.data_atualizacao
+            ).filter(
+                tuple_(PrecoConsenso.produto_id, PrecoConsenso.supermercado).in_(chaves)
+            ).all()
+        }
+
+        estimadores = {}
+        observacoes = defaultdict(int)
+        atualizados = {}
+        for chave in chaves:
+            linha = linhas.get(chave)
+            estimadores[chave] = EstimadorP2(json.loads(linha.estado) if linha else None)
+            observacoes[chave] = linha.observacoes if linha else 0
+            atualizados[chave] = linha.data_atualizacao if linha else None
+
+        for p in sorted(precos, key=lambda p: p.get("data_coleta") or datetime.min):
+            data = p.get("data_coleta") or datetime.now()
+            peso = pesos.get(p.get("usuario_nome"), 1.0) if p.get("usuario_nome") else 1.0
+
+            for chave in ((p["produto_id"], p["supermercado"]), (p["produto_id"], TODOS)):
+                estimador = estimadores[chave]
+                if atualizados[chave] and data > atualizados[chave]:
+                    dias = (data - atualizados[chave]).total_seconds() / 86400
+                    estimador.esquecer(0.5 ** (dias / self.MEIA_VIDA_DIAS))
+                estimador.adicionar(p["preco"], peso)
+                observacoes[chave] += 1
+                atualizados[chave] = max(data, atualizados[chave] or data)
+
+        valores = [
+            {
+                "produto_id": produto_id,
+                "supermercado": supermercado,
+                "mediana": estimadores[(produto_id, supermercado)].quantil(0.5),
+                "quartil_inferior": estimadores[(produto_id, supermercado)].quantil(0.25),
+                "quartil_superior": estimadores[(produto_id, supermercado)].quantil(0.75),
+                "peso": estimadores[(produto_id, supermercado)].peso,
+                "observacoes": observacoes[(produto_id, supermercado)],
+                "estado": json.dumps(estimadores[(produto_id, supermercado)].estado()),
+                "data_atualizacao": atualizados[(produto_id, supermercado)]
+            }
+            for produto_id, supermercado in chaves
+        ]
+
+        stmt = sqlite_insert(PrecoConsenso.__table__)
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=["produto_id", "supermercado"],
+            set_={coluna: stmt.excluded[coluna] for coluna in (
+                "mediana", "quartil_inferior", "quartil_superior", "peso",
+                "observacoes", "estado", "data_atualizacao"
+            )}
+        ), valores)
+
+    def obter(self, pares: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], PrecoConsenso]:
+        """Consensos de vários (produto_id, supermercado) em um SELECT pela chave primária"""
+        pares = set(pares)
+        if not pares:
+            return {}
+        return {
+            (linha.produto_id, linha.supermercado): linha
+            for linha in self.db.query(PrecoConsenso).filter(
+                tuple_(PrecoConsenso.produto_id, PrecoConsenso.supermercado).in_(pares),
+                PrecoConsenso.observacoes >= self.MINIMO_OBSERVACOES
+            ).populate_existing().all()
+        }
+
+    def referencia(self, produto_id: int, supermercado: str,
+                   consensos: Optional[Dict[Tuple[int, str], PrecoConsenso]] = None) -> Optional[PrecoConsenso]:
+        """
+        Consenso da loja; se a loja tem poucos preços, o do produto em qualquer loja
+
+        Para vários preços, passe consensos já lidos com obter (pares da loja e TODOS).
+        """
+        if consensos is None:
+            consensos = self.obter([(produto_id, supermercado), (produto_id, TODOS)])
+
+        loja = consensos.get((produto_id, supermercado))
+        if loja is not None and loja.observacoes >= self.MINIMO_OBSERVACOES_LOJA:
+            return loja
+        return consensos.get((produto_id, TODOS)) or loja
+
+    def reconstruir(self, dias: int = 90) -> int:
+        """Refaz todos os consensos a partir dos preços dos últimos dias (job de manutenção)"""
+        self.db.query(PrecoConsenso).delete(synchronize_session=False)
+
+        pesos = {
+            usuario: self.peso_reputacao(reputacao)
+            for usuario, reputacao in self.db.query(Carteira.usuario_nome, Carteira.reputacao).all()
+        }
+
+        total = 0
+        lote = []
+        consulta = self.db.query(
+            Preco.produto_id, Preco.supermercado, Preco.preco, Preco.usuario_nome, Preco.data_coleta
+        ).filter(
+            Preco.data_coleta >= datetime.now() - timedelta(days=dias),
+            Preco.preco > 0
+        ).order_by(Preco.data_coleta)
+
+        for produto_id, supermercado, preco, usuario_nome, data_coleta in consulta.yield_per(5000):
+            lote.append({
+                "produto_id": produto_id, "supermercado": supermercado, "preco": preco,
+                "usuario_nome": usuario_nome, "data_coleta": data_coleta
+            })
+            if len(lote) >= 5000:
+                self.registrar(lote, pesos)
+                total += len(lote)
+                lote = []
+
+        if lote:
+            self.registrar(lote, pesos)
+            total += len(lote)
+
+        return total
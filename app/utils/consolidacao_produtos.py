@@ -0,0 +1,263 @@
+"""
+Consolidação de produtos quase duplicados
+MinHash + LSH (bandas) para achar candidatos em tempo quase linear
+"""
+import re
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import numpy as np
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from app.models.database import Produto, Preco, Alerta, AliasProduto, PrecoConsenso
+from app.utils.produtos import normalizar_texto, tokens_nome, extrair_tamanho, cache_chaves, NEGACOES
+from app.utils.agenda_atualizacao import AgendadorAtualizacao
+
+
+# Primo de Mersenne 2^61 - 1 para as permutações (a * x + b) mod P
+PRIMO = (1 << 61) - 1
+
+
+class ConsolidadorProdutos:
+    """Encontra e mescla produtos quase idênticos
+
+    1. Cada nome vira um conjunto de shingles (3-gramas de caracteres do nome normalizado)
+    2. Assinatura MinHash com NUM_PERMUTACOES funções de hash
+    3. LSH: a assinatura é dividida em BANDAS; nomes que colidem em alguma banda são candidatos
+    4. Candidatos são confirmados pelo Jaccard exato, pelo tamanho (5kg != 1kg) e pelas
+       negações ("sem açúcar" != "com açúcar")
+    5. Grupos (union-find) viram propostas de mesclagem: sobrevive o produto com mais preços
+    """
+
+    NUM_PERMUTACOES = 128
+    BANDAS = 32  # 32 bandas x 4 linhas -> limiar LSH ~ (1/32)^(1/4) = 0.42
+    TAMANHO_SHINGLE = 3
+    SIMILARIDADE_MINIMA = 0.65  # Jaccard exato dos shingles para confirmar o par
+    LOTE_UPDATE = 500
+
+    def __init__(self, db: Session, semente: int = 42):
+        self.db = db
+
+        # a, b < 2^31 e crc32 < 2^32: a * x + b < 2^64, sem overflow em uint64
+        rng = np.random.default_rng(semente)
+        self._a = rng.integers(1, 1 << 31, size=self.NUM_PERMUTACOES, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=self.NUM_PERMUTACOES, dtype=np.uint64)
+
+    # ---------- Assinaturas ----------
+
+    def texto_canonico(self, nome: str) -> str:
+        """Nome normalizado para shingling (sem acentos, pontuação e com tamanho padronizado)"""
+        tamanho = extrair_tamanho(normalizar_texto(nome)) or ""
+        return " ".join(tokens_nome(nome) + [tamanho]).strip()
+
+    def shingles(self, texto: str) -> set:
+        texto = re.sub(r"\s+", " ", texto)
+        if len(texto) <= self.TAMANHO_SHINGLE:
+            return {texto}
+        return {texto[i:i + self.TAMANHO_SHINGLE] for i in range(len(texto) - self.TAMANHO_SHINGLE + 1)}
+
+    def negacoes(self, texto: str) -> frozenset:
+        """Tokens negados do texto canônico ("sem_acucar"): um a mais ou a menos muda o produto"""
+        return frozenset(t for t in texto.split() if t.split("_", 1)[0] in NEGACOES)
+
+    def assinatura(self, shingles: set) -> np.ndarray:
+        """Assinatura MinHash (NUM_PERMUTACOES valores)"""
+        hashes = np.array([zlib.crc32(s.encode()) for s in shingles], dtype=np.uint64)
+        valores = (np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(PRIMO)  # permutações x shingles
+        return valores.min(axis=1)
+
+    # ---------- Candidatos ----------
+
+    def encontrar_grupos(self, produtos: List[Dict]) -> List[List[int]]:
+        """
+        Agrupa produtos quase idênticos
+
+        Args:
+            produtos: [{"id": ..., "nome": ...}]
+
+        Returns:
+            Lista de grupos (listas de ids) com 2+ produtos
+        """
+        linhas = self.NUM_PERMUTACOES // self.BANDAS
+
+        # Nomes com o mesmo texto canônico já são o mesmo produto: uma assinatura por texto
+        ids_por_texto = defaultdict(list)
+        for produto in produtos:
+            texto = self.texto_canonico(produto["nome"])
+            if texto:
+                ids_por_texto[texto].append(produto["id"])
+
+        textos = list(ids_por_texto)
+        shingles = [self.shingles(texto) for texto in textos]
+        tamanhos = [extrair_tamanho(texto) for texto in textos]
+        negacoes = [self.negacoes(texto) for texto in textos]
+
+        buckets = defaultdict(list)
+        for indice, conjunto in enumerate(shingles):
+            sig = self.assinatura(conjunto)
+            for banda in range(self.BANDAS):
+                buckets[(banda, sig[banda * linhas:(banda + 1) * linhas].tobytes())].append(indice)
+
+        # Union-find sobre os textos
+        pai = list(range(len(textos)))
+
+        def raiz(x):
+            while pai[x] != x:
+                pai[x] = pai[pai[x]]
+                x = pai[x]
+            return x
+
+        verificados = set()
+        for indices in buckets.values():
+            if len(indices) < 2:
+                continue
+
+            # Buckets pequenos: todos os pares; grandes: cada um contra o primeiro (linear)
+            if len(indices) <= 10:
+                pares = ((a, b) for i, a in enumerate(indices) for b in indices[i + 1:])
+            else:
+                pares = ((indices[0], b) for b in indices[1:])
+
+            for a, b in pares:
+                if (a, b) in verificados or raiz(a) == raiz(b):
+                    continue
+                verificados.add((a, b))
+
+                if negacoes[a] != negacoes[b]:
+                    continue
+                if self._mesmo_produto(shingles[a], shingles[b], tamanhos[a], tamanhos[b]):
+                    pai[raiz(b)] = raiz(a)
+
+        grupos = defaultdict(list)
+        for indice, texto in enumerate(textos):
+            grupos[raiz(indice)].extend(ids_por_texto[texto])
+
+        return [sorted(g) for g in grupos.values() if len(g) > 1]
+
+    def _mesmo_produto(self, shingles_a: set, shingles_b: set,
+                       tamanho_a: Optional[str], tamanho_b: Optional[str]) -> bool:
+        """Confirma um par candidato pela similaridade de Jaccard exata"""
+        # Tamanhos diferentes (ex: 1kg x 5kg) nunca são o mesmo produto
+        if tamanho_a and tamanho_b and tamanho_a != tamanho_b:
+            return False
+
+        similaridade = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+        return similaridade >= self.SIMILARIDADE_MINIMA
+
+    # ---------- Propostas ----------
+
+    def propor_mesclagens(self) -> List[Dict]:
+        """Gera propostas de mesclagem para todo o catálogo (não altera o banco)"""
+        produtos = {
+            produto_id: {"id": produto_id, "nome": nome}
+            for produto_id, nome in self.db.query(Produto.id, Produto.nome).all()
+        }
+
+        total_precos = dict(
+            self.db.query(Preco.produto_id, func.count(Preco.id)).group_by(Preco.produto_id).all()
+        )
+
+        propostas = []
+        for grupo in self.encontrar_grupos(list(produtos.values())):
+            # Sobrevive o produto com mais preços (empate: o mais antigo)
+            sobrevivente = min(grupo, key=lambda pid: (-total_precos.get(pid, 0), pid))
+            propostas.append({
+                "sobrevivente_id": sobrevivente,
+                "sobrevivente_nome": produtos[sobrevivente]["nome"],
+                "mesclar": [
+                    {"id": pid, "nome": produtos[pid]["nome"], "total_precos": total_precos.get(pid, 0)}
+                    for pid in grupo if pid != sobrevivente
+                ],
+                "aprovada": False
+            })
+
+        return propostas
+
+    # ---------- Aplicação ----------
+
+    def aplicar_mesclagens(self, propostas: List[Dict]) -> Dict:
+        """
+        Aplica as propostas aprovadas ("aprovada": true)
+
+        Preços e alertas são reapontados com UPDATE ... CASE em lotes;
+        as chaves dos produtos removidos viram aliases do sobrevivente,
+        para que novas coletas do mesmo nome caiam no produto certo,
+        e o EAN deles passa para o sobrevivente. Não faz commit.
+        """
+        mapa = {}  # produto antigo -> sobrevivente
+        for proposta in propostas:
+            if not proposta.get("aprovada"):
+                continue
+            for item in proposta["mesclar"]:
+                if item["id"] != proposta["sobrevivente_id"]:
+                    mapa[item["id"]] = proposta["sobrevivente_id"]
+
+        if not mapa:
+            return {"produtos_mesclados": 0, "precos_atualizados": 0, "alertas_atualizados": 0}
+
+        # Resolver cadeias (A -> B -> C vira A -> C)
+        for antigo in list(mapa):
+            destino = mapa[antigo]
+            while destino in mapa:
+                destino = mapa[destino]
+            mapa[antigo] = destino
+
+        precos_atualizados = 0
+        alertas_atualizados = 0
+        antigos = list(mapa)
+
+        for inicio in range(0, len(antigos), self.LOTE_UPDATE):
+            lote = {pid: mapa[pid] for pid in antigos[inicio:inicio + self.LOTE_UPDATE]}
+
+            precos_atualizados += self.db.query(Preco).filter(
+                Preco.produto_id.in_(lote)
+            ).update({Preco.produto_id: case(lote, value=Preco.produto_id)}, synchronize_session=False)
+
+            alertas_atualizados += self.db.query(Alerta).filter(
+                Alerta.produto_id.in_(lote)
+            ).update({Alerta.produto_id: case(lote, value=Alerta.produto_id)}, synchronize_session=False)
+
+            # Guardar chaves antigas como aliases e remover os produtos mesclados
+            chaves = self.db.query(Produto.id, Produto.chave).filter(
+                Produto.id.in_(lote), Produto.chave.isnot(None)
+            ).all()
+
+            self.db.query(AliasProduto).filter(
+                AliasProduto.produto_id.in_(lote)
+            ).update({AliasProduto.produto_id: case(lote, value=AliasProduto.produto_id)}, synchronize_session=False)
+
+            eans = self.db.query(Produto.id, Produto.ean).filter(
+                Produto.id.in_(lote), Produto.ean.isnot(None)
+            ).all()
+
+            # Buscas dos removidos passam para o sobrevivente na agenda de atualização
+            AgendadorAtualizacao(self.db).mesclar(lote)
+
+            # Consenso de preço dos removidos é descartado (o do sobrevivente segue com os preços novos)
+            self.db.query(PrecoConsenso).filter(
+                PrecoConsenso.produto_id.in_(lote)
+            ).delete(synchronize_session=False)
+
+            self.db.query(Produto).filter(Produto.id.in_(lote)).delete(synchronize_session=False)
+
+            # O código de barras passa para o sobrevivente (se ele ainda não tiver um)
+            for pid, ean in eans:
+                self.db.query(Produto).filter(
+                    Produto.id == lote[pid], Produto.ean.is_(None)
+                ).update({Produto.ean: ean}, synchronize_session=False)
+
+            if chaves:
+                self.db.bulk_insert_mappings(AliasProduto, [
+                    {"chave": chave, "produto_id": lote[pid], "data_criacao": datetime.now()}
+                    for pid, chave in chaves
+                ])
+                cache_chaves.remover(chave for _, chave in chaves)
+
+        return {
+            "produtos_mesclados": len(mapa),
+            "precos_atualizados": precos_atualizados,
+            "alertas_atualizados": alertas_atualizados
+        }
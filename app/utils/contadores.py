@@ -0,0 +1,63 @@
+"""
+Contadores globais persistidos
+Mantidos de forma incremental pelos caminhos de escrita; leitura por chave primária
+"""
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.database import Contador
+
+
+class ContadoresGlobais:
+    """Contadores (chave -> valor) na tabela contadores
+
+    - obter: 1 SELECT pela chave; se o contador ainda não existe, é calculado
+      uma vez pela função de recálculo e gravado
+    - incrementar: UPDATE atômico (valor = valor + delta) na transação de quem escreve;
+      contador ainda não materializado é ignorado (o primeiro obter calcula o valor certo)
+    """
+
+    TOTAL_CARTEIRAS = "total_carteiras"
+    ULTIMO_EVENTO_REPUTACAO = "reputacao.ultimo_evento"  # Cursor de ReputacaoManager.aplicar_eventos
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def obter(self, chave: str, recalcular: Callable[[], float]) -> float:
+        valor = self.db.query(Contador.valor).filter(Contador.chave == chave).scalar()
+        if valor is None:
+            valor = recalcular()
+            self.definir(chave, valor)
+        return valor
+
+    def definir(self, chave: str, valor: float):
+        """Grava o valor (INSERT ... ON CONFLICT DO UPDATE, seguro com requests simultâneos)"""
+        agora = datetime.now()
+        self.db.execute(
+            sqlite_insert(Contador).values(chave=chave, valor=valor, data_atualizacao=agora)
+            .on_conflict_do_update(index_elements=["chave"], set_={"valor": valor, "data_atualizacao": agora})
+        )
+
+    def incrementar(self, chave: str, delta: float = 1):
+        self.db.execute(
+            update(Contador).where(Contador.chave == chave).values(
+                valor=Contador.valor + delta,
+                data_atualizacao=datetime.now()
+            ),
+            execution_options={"synchronize_session": False}
+        )
+
+    def trocar(self, chave: str, esperado: float, novo: float) -> bool:
+        """Compare-and-set: grava novo só se o valor ainda for o esperado (False se outro chegou antes)"""
+        resultado = self.db.execute(
+            update(Contador).where(Contador.chave == chave, Contador.valor == esperado).values(
+                valor=novo,
+                data_atualizacao=datetime.now()
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        return resultado.rowcount == 1
@@ -1,5 +1,8 @@
+from sqlalchemy import func, case, select, update, or_
 from sqlalchemy.orm import Session
-from app.models.database import Carteira, Transacao
+from app.models.database import Carteira, Transacao, EventoReputacao
+from app.utils.contadores import ContadoresGlobais
+from app.utils.estatisticas import EstatisticasMaterializadas
 from datetime import datetime
 import hashlib
 
@@ -7,6 +10,13 @@ import hashlib
 class ReputacaoManager:
     """Gerenciador centralizado de reputação
 
+    Não faz commit: as alterações entram na transação de quem chama
+    (o endpoint faz um único commit no final da requisição).
+
+    Cada ganho ou perda vira uma linha em eventos_reputacao (histórico auditável);
+    a reputação da carteira é atualizada em lote por aplicar_eventos e pode ser
+    refeita a partir do histórico com recalcular_reputacao.
+
     Sistema de pontos balanceado:
     - Validações de preços: +2 a +10 pontos (baseado em consenso)
     - Sugestão aprovada pela DAO: +15 pontos
@@ -31,39 +41,126 @@ class ReputacaoManager:
     REPUTACAO_MINIMA = 0
     REPUTACAO_MAXIMA = 200
 
+    LOTE_UPDATE = 500  # Carteiras por UPDATE ... CASE
+
     def __init__(self, db: Session):
         self.db = db
 
     def adicionar_reputacao(self, usuario_nome: str, pontos: float, motivo: str) -> dict:
-        """Adiciona ou remove pontos de reputação de um usuário"""
-        from app.models.database import Carteira
-
-        carteira = self.db.query(Carteira).filter(
-            Carteira.usuario_nome == usuario_nome
-        ).first()
-
-        if not carteira:
-            return {
-                "sucesso": False,
-                "mensagem": "Usuário não encontrado"
-            }
-
-        reputacao_antiga = carteira.reputacao or 100
-        carteira.reputacao = max(
-            self.REPUTACAO_MINIMA,
-            min(self.REPUTACAO_MAXIMA, reputacao_antiga + pontos)
-        )
+        """
+        Registra pontos de reputação (positivos ou negativos) no livro de eventos
 
-        self.db.commit()
+        Só um INSERT em eventos_reputacao, sem ler nem travar a carteira: o saldo de
+        reputação é atualizado depois, em lote, por aplicar_eventos.
+        """
+        self.db.add(EventoReputacao(
+            usuario_nome=usuario_nome,
+            pontos=pontos,
+            motivo=motivo,
+            data_criacao=datetime.now()
+        ))
 
         return {
             "sucesso": True,
-            "reputacao_antiga": reputacao_antiga,
-            "reputacao_nova": carteira.reputacao,
             "pontos_ganhos": pontos,
-            "motivo": motivo
+            "motivo": motivo,
+            "pendente": True  # Entra na reputação na próxima aplicação do lote
+        }
+
+    def _limitar(self, reputacao: float) -> float:
+        return max(self.REPUTACAO_MINIMA, min(self.REPUTACAO_MAXIMA, reputacao))
+
+    def aplicar_eventos(self, limite: int = 10000) -> dict:
+        """
+        Aplica os eventos de reputação ainda não aplicados
+
+        - Cursor (último id aplicado) em contadores, avançado com compare-and-set:
+          dois aplicadores simultâneos nunca aplicam o mesmo evento duas vezes
+        - Os eventos são somados em ordem, com o limite 0-200 a cada evento
+          (mesmo resultado de aplicar um por um)
+        - 1 UPDATE ... CASE para todas as carteiras afetadas
+        - Evento de usuário sem carteira, ou anterior à criação dela, não conta (nem
+          aqui nem em recalcular_reputacao): a carteira começa com 100
+        """
+        contadores = ContadoresGlobais(self.db)
+        cursor = int(contadores.obter(ContadoresGlobais.ULTIMO_EVENTO_REPUTACAO, lambda: 0))
+
+        eventos = self.db.query(
+            EventoReputacao.id, EventoReputacao.usuario_nome, EventoReputacao.pontos, EventoReputacao.data_criacao
+        ).filter(EventoReputacao.id > cursor).order_by(EventoReputacao.id).limit(limite).all()
+
+        if not eventos:
+            return {"eventos_aplicados": 0, "usuarios_atualizados": 0, "ultimo_evento": cursor}
+
+        ultimo = eventos[-1][0]
+        if not contadores.trocar(ContadoresGlobais.ULTIMO_EVENTO_REPUTACAO, cursor, ultimo):
+            # Outro aplicador pegou este lote
+            return {"eventos_aplicados": 0, "usuarios_atualizados": 0, "ultimo_evento": cursor}
+
+        carteiras = {
+            usuario: (reputacao, criacao)
+            for usuario, reputacao, criacao in self.db.query(
+                Carteira.usuario_nome, Carteira.reputacao, Carteira.data_criacao
+            ).filter(Carteira.usuario_nome.in_({usuario for _, usuario, _, _ in eventos}))
+        }
+
+        novas = {}
+        for _, usuario, pontos, data_evento in eventos:
+            if usuario not in carteiras:
+                continue  # Sem carteira: o evento fica só no histórico
+            reputacao, criacao = carteiras[usuario]
+            if criacao is not None and data_evento is not None and data_evento < criacao:
+                continue  # Anterior à carteira (mesma regra do recalcular_reputacao)
+            atual = novas.get(usuario, reputacao if reputacao is not None else 100)
+            novas[usuario] = self._limitar(atual + pontos)
+
+        self._gravar_reputacoes(novas)
+
+        return {"eventos_aplicados": len(eventos), "usuarios_atualizados": len(novas), "ultimo_evento": ultimo}
+
+    def _gravar_reputacoes(self, reputacoes: dict):
+        """UPDATE ... SET reputacao = CASE usuario_nome ... em lotes de LOTE_UPDATE carteiras"""
+        usuarios = list(reputacoes)
+        for inicio in range(0, len(usuarios), self.LOTE_UPDATE):
+            lote = {u: reputacoes[u] for u in usuarios[inicio:inicio + self.LOTE_UPDATE]}
+            self.db.query(Carteira).filter(Carteira.usuario_nome.in_(lote)).update(
+                {Carteira.reputacao: case(lote, value=Carteira.usuario_nome)},
+                synchronize_session=False
+            )
+
+    def recalcular_reputacao(self) -> dict:
+        """
+        Recalcula a reputação de todas as carteiras a partir do histórico de eventos
+
+        Refaz a soma (a partir de 100, com o limite a cada evento) até o cursor de
+        aplicar_eventos e corrige só as carteiras divergentes. Como em aplicar_eventos,
+        só contam os eventos registrados depois da criação da carteira.
+        """
+        cursor = int(ContadoresGlobais(self.db).obter(ContadoresGlobais.ULTIMO_EVENTO_REPUTACAO, lambda: 0))
+
+        recalculadas = {}
+        for usuario, pontos in self.db.query(EventoReputacao.usuario_nome, EventoReputacao.pontos).join(
+            Carteira, Carteira.usuario_nome == EventoReputacao.usuario_nome
+        ).filter(
+            EventoReputacao.id <= cursor,
+            or_(
+                Carteira.data_criacao.is_(None),
+                EventoReputacao.data_criacao.is_(None),
+                EventoReputacao.data_criacao >= Carteira.data_criacao
+            )
+        ).order_by(EventoReputacao.id).yield_per(5000):
+            recalculadas[usuario] = self._limitar(recalculadas.get(usuario, 100) + pontos)
+
+        divergentes = {
+            usuario: recalculadas.get(usuario, 100)
+            for usuario, reputacao in self.db.query(Carteira.usuario_nome, Carteira.reputacao).all()
+            if abs((reputacao if reputacao is not None else 100) - recalculadas.get(usuario, 100)) > 1e-6
         }
 
+        self._gravar_reputacoes(divergentes)
+
+        return {"carteiras_corrigidas": len(divergentes), "usuarios": list(divergentes)}
+
     def pode_ganhar_reputacao_comentario(self, usuario_nome: str) -> bool:
         """Verifica se usuário pode ganhar reputação por comentário hoje"""
         from app.models.database import Comentario
@@ -91,23 +188,15 @@ class ReputacaoManager:
         - 10 likes, 1 dislike: +0.09 pts ((10-1)/100 * 1 = 0.09)
         - 11 likes, 22 dislikes: -0.11 pts ((22-11)/100 * 1 = -0.11)
         """
-        from app.models.database import Comentario, VotoComentario
-        from sqlalchemy import func
+        from app.models.database import Comentario
 
         comentario = self.db.query(Comentario).filter(Comentario.id == comentario_id).first()
         if not comentario:
             return {"sucesso": False, "mensagem": "Comentário não encontrado"}
 
-        # Contar likes e dislikes
-        likes = self.db.query(func.count(VotoComentario.id)).filter(
-            VotoComentario.comentario_id == comentario_id,
-            VotoComentario.tipo == "like"
-        ).scalar() or 0
-
-        dislikes = self.db.query(func.count(VotoComentario.id)).filter(
-            VotoComentario.comentario_id == comentario_id,
-            VotoComentario.tipo == "dislike"
-        ).scalar() or 0
+        # Contadores mantidos em votar_comentario
+        likes = comentario.likes or 0
+        dislikes = comentario.dislikes or 0
 
         total_votos = likes + dislikes
 
@@ -156,43 +245,35 @@ class ReputacaoManager:
 
     def validar_preco_automaticamente(self, preco_id: int) -> dict:
         """
-        Valida um preço automaticamente comparando com outros preços do mesmo produto
+        Valida um preço automaticamente comparando com o preço de consenso
 
         Lógica:
-        - Se o preço está próximo da mediana (± 30%): +2 reputação
+        - Se o preço está próximo da mediana de consenso (± 30%): +2 reputação
         - Se o preço está muito diferente da mediana (> 50%): -5 reputação
-        - Precisa de pelo menos 2 outros preços para comparar
+        - Precisa de pelo menos 2 preços já vistos no consenso
+
+        O consenso (app/utils/consenso.py) é o da loja ou, com poucos preços nela, o do
+        produto em qualquer loja: 1 leitura pela chave, sem carregar os preços do período.
+        Chamar antes de registrar o preço novo no consenso.
         """
-        from app.models.database import Preco, Produto, Carteira
-        from sqlalchemy import func
-        from datetime import timedelta
-        import statistics
+        from app.models.database import Preco
+        from app.utils.consenso import ConsensoPrecos
 
         # Buscar o preço adicionado
         preco_novo = self.db.query(Preco).filter(Preco.id == preco_id).first()
         if not preco_novo or not preco_novo.manual:
             return {"sucesso": False, "mensagem": "Preço não encontrado ou não é manual"}
 
-        # Buscar outros preços do mesmo produto (últimos 30 dias)
-        data_limite = datetime.now() - timedelta(days=30)
-        outros_precos = self.db.query(Preco).filter(
-            Preco.produto_id == preco_novo.produto_id,
-            Preco.id != preco_id,
-            Preco.data_coleta >= data_limite,
-            Preco.preco > 0  # Ignorar preços inválidos
-        ).all()
-
-        # Precisa de pelo menos 2 outros preços para comparar
-        if len(outros_precos) < 2:
+        consenso = ConsensoPrecos(self.db).referencia(preco_novo.produto_id, preco_novo.supermercado)
+
+        if consenso is None or not consenso.mediana:
             return {
                 "sucesso": True,
                 "mensagem": "Poucos preços para comparar, sem alteração de reputação",
                 "alteracao_reputacao": 0
             }
 
-        # Calcular mediana dos outros preços
-        precos_valores = [p.preco for p in outros_precos]
-        mediana = statistics.median(precos_valores)
+        mediana = consenso.mediana
 
         # Calcular diferença percentual
         diferenca_percentual = abs((preco_novo.preco - mediana) / mediana) * 100
@@ -238,7 +319,11 @@ class ReputacaoManager:
 
 
 class CryptoManager:
-    """Gerenciador de criptomoeda do app"""
+    """Gerenciador de criptomoeda do app
+
+    Não faz commit: créditos, débitos e lançamentos entram na transação de quem
+    chama, que faz um único commit (um fsync no SQLite) no final da requisição.
+    """
 
     # Constantes de recompensas
     RECOMPENSA_CONTRIBUICAO = 10.0
@@ -265,6 +350,8 @@ class CryptoManager:
             self.db.add(carteira)
             self.db.flush()
 
+            ContadoresGlobais(self.db).incrementar(ContadoresGlobais.TOTAL_CARTEIRAS)
+
             # Registrar bônus inicial
             self._registrar_transacao(
                 carteira_id=carteira.id,
@@ -305,6 +392,30 @@ class CryptoManager:
         """Hash simples de senha (em produção usar bcrypt)"""
         return hashlib.sha256(senha.encode()).hexdigest()
 
+    def _movimentar_saldo(self, usuario_nome: str, quantidade: float, exigir_saldo: bool = False):
+        """
+        Soma quantidade ao saldo com um único UPDATE atômico (saldo = saldo + :q)
+
+        Com exigir_saldo, o débito só acontece se houver saldo (WHERE saldo >= :q), sem
+        ler-e-regravar: duas buscas simultâneas nunca passam as duas pela mesma verificação.
+
+        Returns:
+            (carteira_id, saldo_atual) ou None se nenhuma linha foi afetada
+        """
+        condicoes = [Carteira.usuario_nome == usuario_nome]
+        if exigir_saldo:
+            condicoes.append(Carteira.saldo >= -quantidade)
+
+        linha = self.db.execute(
+            update(Carteira).where(*condicoes).values(
+                saldo=Carteira.saldo + quantidade,
+                ultima_atualizacao=datetime.now()
+            ).returning(Carteira.id, Carteira.saldo)
+        ).first()
+
+        # RETURNING do SQLite devolve o valor antes da afinidade da coluna (pode vir int)
+        return (linha[0], float(linha[1])) if linha else None
+
     def minerar_tokens(self, usuario_nome: str, preco_id: int = None, quantidade: float = None, descricao: str = None) -> dict:
         """Recompensa usuário por contribuir com preço ou libera tokens do escrow"""
         if quantidade is None:
@@ -313,86 +424,91 @@ class CryptoManager:
         if descricao is None:
             descricao = "Recompensa por adicionar preço"
 
-        carteira = self.criar_ou_obter_carteira(usuario_nome)
+        # Crédito atômico; carteira nova só é criada se o UPDATE não achar o usuário
+        movimento = self._movimentar_saldo(usuario_nome, quantidade)
+        if movimento is None:
+            self.criar_ou_obter_carteira(usuario_nome)
+            movimento = self._movimentar_saldo(usuario_nome, quantidade)
 
-        # Adicionar tokens
-        carteira.saldo += quantidade
-        carteira.ultima_atualizacao = datetime.now()
+        carteira_id, saldo_atual = movimento
 
         # Registrar transação
         self._registrar_transacao(
-            carteira_id=carteira.id,
+            carteira_id=carteira_id,
             tipo="mineracao",
             quantidade=quantidade,
             descricao=descricao,
             preco_id=preco_id
         )
 
-        self.db.commit()
-
         return {
             "sucesso": True,
             "mensagem": f"Você minerou {quantidade} tokens!",
-            "saldo_atual": carteira.saldo,
+            "saldo_atual": saldo_atual,
             "tokens_ganhos": quantidade
         }
 
-    def gastar_tokens(self, usuario_nome: str, quantidade: float = None, descricao: str = "Busca de produto") -> dict:
-        """Gasta tokens do usuário (busca ou outra ação)"""
+    def gastar_tokens(self, usuario_nome: str, quantidade: float = None, descricao: str = "Busca de produto",
+                      criar_carteira: bool = True) -> dict:
+        """
+        Gasta tokens do usuário (busca ou outra ação)
+
+        O débito é um UPDATE condicional (WHERE saldo >= :q) na mesma transação do
+        lançamento no livro. Com criar_carteira=False, usuário sem carteira é tratado
+        como saldo zero (sem a consulta extra de criar_ou_obter_carteira).
+        """
         if quantidade is None:
             quantidade = self.CUSTO_BUSCA
 
-        carteira = self.criar_ou_obter_carteira(usuario_nome)
+        movimento = self._movimentar_saldo(usuario_nome, -quantidade, exigir_saldo=True)
+
+        if movimento is None and criar_carteira:
+            # Pode ser só carteira inexistente: criar (com bônus) e tentar de novo
+            carteira = self.db.query(Carteira.id).filter(Carteira.usuario_nome == usuario_nome).first()
+            if not carteira:
+                self.criar_ou_obter_carteira(usuario_nome)
+                movimento = self._movimentar_saldo(usuario_nome, -quantidade, exigir_saldo=True)
+
+        if movimento is None:
+            saldo = self.db.query(Carteira.saldo).filter(
+                Carteira.usuario_nome == usuario_nome
+            ).scalar() or 0.0
 
-        # Verificar se tem saldo suficiente
-        if carteira.saldo < quantidade:
             return {
                 "sucesso": False,
-                "mensagem": f"Saldo insuficiente! Você tem {carteira.saldo} tokens mas precisa de {quantidade}",
-                "saldo_atual": carteira.saldo,
-                "faltam": quantidade - carteira.saldo
+                "mensagem": f"Saldo insuficiente! Você tem {saldo} tokens mas precisa de {quantidade}",
+                "saldo_atual": saldo,
+                "faltam": quantidade - saldo
             }
 
-        # Deduzir tokens
-        carteira.saldo -= quantidade
-        carteira.ultima_atualizacao = datetime.now()
+        carteira_id, saldo_atual = movimento
 
         # Registrar transação (quantidade negativa)
         self._registrar_transacao(
-            carteira_id=carteira.id,
+            carteira_id=carteira_id,
             tipo="busca",
             quantidade=-quantidade,
             descricao=descricao
         )
 
-        self.db.commit()
-
         return {
             "sucesso": True,
             "mensagem": f"Busca realizada! Custo: {quantidade} tokens",
-            "saldo_atual": carteira.saldo,
+            "saldo_atual": saldo_atual,
             "tokens_gastos": quantidade
         }
 
     def obter_saldo(self, usuario_nome: str) -> dict:
-        """Retorna saldo e estatísticas da carteira"""
+        """Retorna saldo e estatísticas da carteira (totais mantidos na própria carteira, O(1))"""
         carteira = self.criar_ou_obter_carteira(usuario_nome)
 
-        # Calcular estatísticas
-        transacoes = self.db.query(Transacao).filter(
-            Transacao.carteira_id == carteira.id
-        ).all()
-
-        total_minerado = sum(t.quantidade for t in transacoes if t.quantidade > 0)
-        total_gasto = abs(sum(t.quantidade for t in transacoes if t.quantidade < 0))
-
         return {
             "usuario_nome": carteira.usuario_nome,
             "saldo": carteira.saldo,
-            "total_minerado": total_minerado,
-            "total_gasto": total_gasto,
+            "total_minerado": carteira.total_minerado,
+            "total_gasto": carteira.total_gasto,
             "ultima_atualizacao": carteira.ultima_atualizacao,
-            "total_transacoes": len(transacoes),
+            "total_transacoes": carteira.total_transacoes,
             # Reputação
             "reputacao": carteira.reputacao,
             "total_validacoes_feitas": carteira.total_validacoes_feitas,
@@ -413,7 +529,7 @@ class CryptoManager:
 
     def _registrar_transacao(self, carteira_id: int, tipo: str, quantidade: float,
                             descricao: str = None, preco_id: int = None):
-        """Registra uma transação no histórico"""
+        """Registra uma transação no histórico e atualiza os totais da carteira"""
         transacao = Transacao(
             carteira_id=carteira_id,
             tipo=tipo,
@@ -424,6 +540,57 @@ class CryptoManager:
         )
         self.db.add(transacao)
 
+        # UPDATE atômico (total = total + x), refletido também na carteira carregada na sessão
+        self.db.query(Carteira).filter(Carteira.id == carteira_id).update({
+            Carteira.total_minerado: Carteira.total_minerado + max(quantidade, 0),
+            Carteira.total_gasto: Carteira.total_gasto + max(-quantidade, 0),
+            Carteira.total_transacoes: Carteira.total_transacoes + 1
+        }, synchronize_session="evaluate")
+
+        EstatisticasMaterializadas(self.db).somar({
+            "economia.tokens_minerados": max(quantidade, 0),
+            "economia.tokens_gastos": max(-quantidade, 0)
+        })
+
+    def reconciliar_totais(self) -> dict:
+        """
+        Recalcula os totais de todas as carteiras a partir do livro de transações
+
+        Usa agregados SQL (SUM/COUNT por carteira) e corrige só as carteiras divergentes.
+        """
+        agregados = select(
+            Transacao.carteira_id.label("carteira_id"),
+            func.sum(case((Transacao.quantidade > 0, Transacao.quantidade), else_=0)).label("minerado"),
+            func.sum(case((Transacao.quantidade < 0, -Transacao.quantidade), else_=0)).label("gasto"),
+            func.count(Transacao.id).label("transacoes")
+        ).group_by(Transacao.carteira_id).subquery()
+
+        minerado = func.coalesce(agregados.c.minerado, 0)
+        gasto = func.coalesce(agregados.c.gasto, 0)
+        transacoes = func.coalesce(agregados.c.transacoes, 0)
+
+        divergentes = self.db.query(
+            Carteira.id, Carteira.usuario_nome, minerado, gasto, transacoes
+        ).outerjoin(
+            agregados, agregados.c.carteira_id == Carteira.id
+        ).filter(or_(
+            func.abs(func.coalesce(Carteira.total_minerado, 0) - minerado) > 1e-6,
+            func.abs(func.coalesce(Carteira.total_gasto, 0) - gasto) > 1e-6,
+            func.coalesce(Carteira.total_transacoes, -1) != transacoes
+        )).all()
+
+        for carteira_id, _, total_minerado, total_gasto, total_transacoes in divergentes:
+            self.db.query(Carteira).filter(Carteira.id == carteira_id).update({
+                Carteira.total_minerado: total_minerado,
+                Carteira.total_gasto: total_gasto,
+                Carteira.total_transacoes: total_transacoes
+            }, synchronize_session=False)
+
+        return {
+            "carteiras_corrigidas": len(divergentes),
+            "usuarios": [usuario_nome for _, usuario_nome, _, _, _ in divergentes]
+        }
+
     def verificar_saldo_suficiente(self, usuario_nome: str, quantidade: float = None) -> bool:
         """Verifica se usuário tem saldo suficiente"""
         if quantidade is None:
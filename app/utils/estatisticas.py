@@ -0,0 +1,175 @@
+"""
+Estatísticas materializadas
+Contadores na tabela contadores, atualizados pelos caminhos de escrita e
+recalculados por completo por um job periódico (PriceUpdater.recalcular_estatisticas);
+as leituras servem o último snapshot, sem recalcular
+"""
+import os
+import time
+from collections import Counter
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, union, select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.database import Contador, Preco, Comentario, Sugestao, Voto, Carteira, StatusSugestao
+from app.utils.contadores import ContadoresGlobais
+
+
+# Idade máxima das estatísticas: o job de recálculo completo roda na metade disso
+# (corrige divergências e atualiza as contagens distintas, que não são incrementais)
+MAX_IDADE_SEGUNDOS = int(os.getenv("ESTATISTICAS_MAX_IDADE_SEGUNDOS", "600"))
+
+
+class EstatisticasMaterializadas:
+    """Store de estatísticas (chave -> valor) servido em custo constante
+
+    Chaves:
+        contribuicoes.total, contribuicoes.produtos, contribuicoes.ultima (timestamp)
+        contribuicoes.dia:<AAAA-MM-DD>, supermercado:<nome>
+        dao.comentarios, dao.sugestoes, dao.status:<status>, dao.tokens_votados, dao.participantes
+        economia.tokens_minerados, economia.tokens_gastos, total_carteiras (ContadoresGlobais)
+        estatisticas.recalculado_em (timestamp do último recálculo completo)
+
+    contribuicoes.produtos e dao.participantes são COUNT DISTINCT: só mudam no recálculo.
+    Não faz commit (nem no recálculo): quem chama decide.
+    """
+
+    RECALCULADO_EM = "estatisticas.recalculado_em"
+    PREFIXO_SUPERMERCADO = "supermercado:"
+    PREFIXO_DIA = "contribuicoes.dia:"
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- Escrita (incremental) ----------
+
+    def somar(self, deltas: Dict[str, float]):
+        """INSERT ... ON CONFLICT DO UPDATE SET valor = valor + delta, na transação de quem escreve"""
+        agora = datetime.now()
+        for chave, delta in deltas.items():
+            if not delta:
+                continue
+            stmt = sqlite_insert(Contador).values(chave=chave, valor=delta, data_atualizacao=agora)
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["chave"],
+                set_={"valor": Contador.valor + stmt.excluded.valor, "data_atualizacao": agora}
+            ))
+
+    def maximo(self, chave: str, valor: float):
+        """Guarda o maior valor visto (ex: data da última contribuição)"""
+        stmt = sqlite_insert(Contador).values(chave=chave, valor=valor, data_atualizacao=datetime.now())
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=["chave"],
+            set_={"valor": func.max(Contador.valor, stmt.excluded.valor)}
+        ))
+
+    def registrar_contribuicoes(self, contribuicoes: Iterable[Dict]):
+        """Contribuições manuais novas (dicts com supermercado e data_coleta)"""
+        contribuicoes = list(contribuicoes)
+        if not contribuicoes:
+            return
+
+        deltas = Counter({"contribuicoes.total": len(contribuicoes)})
+        for contribuicao in contribuicoes:
+            data_coleta = contribuicao.get("data_coleta") or datetime.now()
+            deltas[f"{self.PREFIXO_DIA}{data_coleta.date().isoformat()}"] += 1
+            deltas[f"{self.PREFIXO_SUPERMERCADO}{contribuicao['supermercado']}"] += 1
+
+        self.somar(deltas)
+        self.maximo("contribuicoes.ultima", max(
+            (c.get("data_coleta") or datetime.now()).timestamp() for c in contribuicoes
+        ))
+
+    def mudar_status_sugestao(self, sugestao: Sugestao, novo_status: StatusSugestao):
+        """Troca o status da sugestão e move a contagem entre os status"""
+        anterior = sugestao.status
+        sugestao.status = novo_status
+        if anterior != novo_status:
+            self.somar({
+                f"dao.status:{self._valor_status(anterior)}": -1,
+                f"dao.status:{self._valor_status(novo_status)}": 1
+            })
+
+    # ---------- Leitura ----------
+
+    def obter(self, chaves: List[str]) -> Dict[str, float]:
+        """Lê as chaves (1 SELECT pela chave primária)"""
+        valores = dict(self.db.query(Contador.chave, Contador.valor).filter(Contador.chave.in_(chaves)).all())
+        return {chave: valores.get(chave, 0) for chave in chaves}
+
+    def obter_prefixo(self, prefixo: str) -> Dict[str, float]:
+        """Todas as chaves com o prefixo (faixa no índice da chave primária)"""
+        # Próximo caractere depois do último do prefixo: chave >= prefixo AND chave < limite
+        limite = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+        return {
+            chave[len(prefixo):]: valor
+            for chave, valor in self.db.query(Contador.chave, Contador.valor).filter(
+                Contador.chave >= prefixo, Contador.chave < limite, Contador.valor > 0
+            ).all()
+        }
+
+    # ---------- Recálculo completo ----------
+
+    def recalcular(self) -> Dict[str, float]:
+        """Recalcula todas as estatísticas com agregados SQL e substitui os valores guardados"""
+        manual = Preco.manual == True
+        hoje = date.today().isoformat()
+
+        valores = {
+            "contribuicoes.total": self.db.query(func.count(Preco.id)).filter(manual).scalar() or 0,
+            "contribuicoes.produtos": self.db.query(
+                func.count(func.distinct(Preco.produto_id))
+            ).filter(manual).scalar() or 0,
+            f"{self.PREFIXO_DIA}{hoje}": self.db.query(func.count(Preco.id)).filter(
+                manual, func.date(Preco.data_coleta) == hoje
+            ).scalar() or 0,
+            "dao.comentarios": self.db.query(func.count(Comentario.id)).scalar() or 0,
+            "dao.sugestoes": self.db.query(func.count(Sugestao.id)).scalar() or 0,
+            "dao.tokens_votados": self.db.query(func.sum(Voto.tokens_usados)).scalar() or 0,
+            "economia.tokens_minerados": self.db.query(func.sum(Carteira.total_minerado)).scalar() or 0,
+            "economia.tokens_gastos": self.db.query(func.sum(Carteira.total_gasto)).scalar() or 0,
+            ContadoresGlobais.TOTAL_CARTEIRAS: self.db.query(func.count(Carteira.id)).scalar() or 0,
+        }
+
+        ultima = self.db.query(func.max(Preco.data_coleta)).filter(manual).scalar()
+        if ultima:
+            valores["contribuicoes.ultima"] = ultima.timestamp()
+
+        for supermercado, total in self.db.query(Preco.supermercado, func.count(Preco.id)).filter(
+            manual
+        ).group_by(Preco.supermercado).all():
+            valores[f"{self.PREFIXO_SUPERMERCADO}{supermercado}"] = total
+
+        for status in StatusSugestao:
+            valores[f"dao.status:{status.value}"] = 0
+        for status, total in self.db.query(Sugestao.status, func.count(Sugestao.id)).group_by(Sugestao.status).all():
+            valores[f"dao.status:{self._valor_status(status)}"] = total
+
+        # Pessoas distintas que comentaram, sugeriram ou votaram
+        participantes = union(
+            select(Comentario.usuario_nome), select(Sugestao.usuario_nome), select(Voto.usuario_nome)
+        ).subquery()
+        valores["dao.participantes"] = self.db.query(func.count()).select_from(participantes).scalar() or 0
+
+        valores[self.RECALCULADO_EM] = time.time()
+
+        # Chaves por dia/supermercado que não existem mais são removidas
+        self.db.execute(delete(Contador).where(
+            (Contador.chave.like(f"{self.PREFIXO_DIA}%") | Contador.chave.like(f"{self.PREFIXO_SUPERMERCADO}%")),
+            Contador.chave.notin_(list(valores))
+        ))
+
+        agora = datetime.now()
+        for chave, valor in valores.items():
+            stmt = sqlite_insert(Contador).values(chave=chave, valor=valor, data_atualizacao=agora)
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["chave"], set_={"valor": valor, "data_atualizacao": agora}
+            ))
+
+        return valores
+
+    def _valor_status(self, status: Optional[StatusSugestao]) -> str:
+        return status.value if isinstance(status, StatusSugestao) else str(status)
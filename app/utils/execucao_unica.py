@@ -0,0 +1,155 @@
+"""
+Execução única (single-flight) de buscas caras
+Chamadas simultâneas com a mesma chave (fonte + termo normalizado) esperam a
+primeira terminar e recebem o mesmo resultado, em vez de repetir o scraping e a
+gravação no banco. Entre workers, opcionalmente, por um lock no Redis (REDIS_URL).
+"""
+import asyncio
+import copy
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple
+
+from app.utils.produtos import normalizar_texto
+
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+
+def chave_busca(fonte: str, termo: str, latitude: float = None, longitude: float = None) -> str:
+    """
+    Chave de uma busca: fonte + termo normalizado ("Arroz  TIO joão" -> "arroz tio joao")
+
+    Com localização, entra a região (~1 km): o resultado do gerador depende dos
+    supermercados próximos do usuário.
+    """
+    termo = re.sub(r"\s+", " ", normalizar_texto(termo)).strip()
+    chave = f"{fonte}:{termo}"
+    if latitude is not None and longitude is not None:
+        chave += f"@{round(latitude, 2)},{round(longitude, 2)}"
+    return chave
+
+
+class ExecucaoUnica:
+    """Uma execução por chave por vez; quem chega durante ela compartilha o resultado
+
+    - No processo: dicionário chave -> Future (quem chega espera o Future do primeiro)
+    - Entre workers (REDIS_URL): o primeiro pega o lock (SET NX PX) e publica o
+      resultado em JSON por RESULTADO_TTL segundos; os outros esperam o resultado
+      aparecer. Se o dono do lock morrer, o lock expira e quem espera executa.
+      Redis fora do ar: segue só no processo.
+
+    executar devolve (resultado, compartilhado). compartilhado=True significa que
+    outra chamada já fez o trabalho (e a gravação): quem recebe não deve gravar de novo.
+    """
+
+    PRAZO_LOCK = 60  # segundos: maior que o pior caso de uma busca
+    RESULTADO_TTL = 15
+    INTERVALO_ESPERA = 0.1
+
+    def __init__(self, redis_url: Optional[str] = REDIS_URL, prefixo: str = "execucao-unica"):
+        self.redis_url = redis_url
+        self.prefixo = prefixo
+        self._redis = None
+        self._voos: dict = {}
+        self._lock = threading.Lock()
+        self.contagem = {"executadas": 0, "compartilhadas": 0}
+
+    # ---------- Redis (opcional) ----------
+
+    def _cliente_redis(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, socket_connect_timeout=2)
+                self._redis.ping()
+            except Exception as e:
+                print(f"   ⚠️  Redis indisponível para execução única ({e}); usando só o processo")
+                self.redis_url = None
+                self._redis = None
+        return self._redis
+
+    def _executar_distribuido(self, chave: str, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        redis = self._cliente_redis()
+        if redis is None:
+            return funcao(), False
+
+        chave_lock = f"{self.prefixo}:lock:{chave}"
+        chave_resultado = f"{self.prefixo}:resultado:{chave}"
+        dono = uuid.uuid4().hex
+        limite = time.monotonic() + self.PRAZO_LOCK
+
+        try:
+            while True:
+                # Resultado recém-publicado por outro worker (que está buscando ou acabou de buscar)
+                publicado = redis.get(chave_resultado)
+                if publicado is not None:
+                    return json.loads(publicado), True
+                if redis.set(chave_lock, dono, nx=True, px=self.PRAZO_LOCK * 1000) or time.monotonic() > limite:
+                    break
+                time.sleep(self.INTERVALO_ESPERA)
+        except Exception as e:
+            print(f"   ⚠️  Erro no Redis ({e}); executando localmente")
+            return funcao(), False
+
+        try:
+            resultado = funcao()
+            redis.set(chave_resultado, json.dumps(resultado, default=str), ex=self.RESULTADO_TTL)
+            return resultado, False
+        finally:
+            # Só libera se o lock ainda for nosso (pode ter expirado e sido pego por outro)
+            try:
+                if redis.get(chave_lock) == dono.encode():
+                    redis.delete(chave_lock)
+            except Exception:
+                pass
+
+    # ---------- Processo ----------
+
+    def executar(self, chave: str, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Roda funcao (ou espera quem já está rodando com a mesma chave)"""
+        with self._lock:
+            voo = self._voos.get(chave)
+            primeiro = voo is None
+            if primeiro:
+                voo = self._voos[chave] = Future()
+
+        if not primeiro:
+            resultado, _ = voo.result()
+            self.contagem["compartilhadas"] += 1
+            return copy.deepcopy(resultado), True
+
+        try:
+            resultado, compartilhado = self._executar_distribuido(chave, funcao)
+            voo.set_result((resultado, compartilhado))
+            self.contagem["executadas"] += 1
+            # Cada chamador recebe a sua cópia (os endpoints alteram os itens)
+            return copy.deepcopy(resultado), compartilhado
+        except BaseException as e:
+            voo.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+
+    async def executar_async(self, chave: str, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Para endpoints async: funcao (síncrona) roda em uma thread, sem travar o loop"""
+        with self._lock:
+            voo = self._voos.get(chave)
+        if voo is not None:
+            # Espera sem ocupar uma thread do executor
+            resultado, _ = await asyncio.wrap_future(voo)
+            self.contagem["compartilhadas"] += 1
+            return copy.deepcopy(resultado), True
+        return await asyncio.to_thread(self.executar, chave, funcao)
+
+
+# Instância global
+execucao_unica = ExecucaoUnica()
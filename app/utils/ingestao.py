@@ -0,0 +1,261 @@
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import insert, case
+from sqlalchemy.orm import Session
+
+from app.models.database import Preco, Produto
+from app.utils.estatisticas import EstatisticasMaterializadas
+from app.utils.consenso import ConsensoPrecos
+from app.utils.ofertas import RankingOfertas, calcular_desconto
+from app.utils.produtos import (
+    gerar_chave_produto, normalizar_ean, buscar_ids_por_ean, buscar_ids_por_chave, criar_produtos
+)
+
+
+# Campos de Preco aceitos em um registro normalizado
+CAMPOS_PRECO = (
+    "supermercado", "preco", "preco_original", "em_promocao", "url", "disponivel",
+    "data_coleta", "manual", "usuario_nome", "localizacao", "observacao", "foto_url",
+    "verificado", "latitude", "longitude", "endereco"
+)
+
+
+class IngestaoPrecos:
+    """Ingestão em lote de preços (scrapers, notas fiscais, OCR)
+
+    Recebe uma lista de registros normalizados e grava tudo com poucos comandos:
+    - 1 SELECT para resolver os produtos pelo código de barras (EAN), quando houver
+    - 1 SELECT para resolver o resto pela chave canônica (com LRU)
+    - 1 INSERT ... ON CONFLICT para os produtos novos (+ 1 SELECT dos ids)
+    - 1 UPDATE para gravar o EAN em produtos antigos que ainda não tinham
+    - 1 SELECT para detectar duplicatas (opcional)
+    - 1 INSERT multi-linha para os preços
+    - upserts nas estatísticas materializadas (contribuições manuais)
+    - 1 SELECT + 1 UPSERT no consenso de preços (produto × supermercado)
+    - 1 INSERT + 1 DELETE por supermercado no ranking de ofertas (só promoções)
+    - 1 lançamento no livro de tokens para a recompensa total
+
+    Registro normalizado (dict):
+        nome, marca, categoria  -> produto (ou produto_id, se já conhecido)
+        ean (opcional)          -> código de barras, tem prioridade sobre o nome
+        supermercado, preco, ... -> colunas de Preco (ver CAMPOS_PRECO)
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ingerir(
+        self,
+        registros: List[Dict],
+        usuario_nome: Optional[str] = None,
+        recompensa_por_item: float = 0,
+        descricao_recompensa: Optional[str] = None,
+        duplicata_por: Optional[Tuple[str, ...]] = None,
+        duplicata_desde: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Grava um lote de preços
+
+        Args:
+            registros: Registros normalizados (um por preço)
+            usuario_nome: Usuário que recebe a recompensa (opcional)
+            recompensa_por_item: Tokens por preço novo gravado
+            descricao_recompensa: Descrição do lançamento de tokens
+            duplicata_por: Campos que identificam um preço repetido,
+                ex: ("produto_id", "supermercado", "preco", "usuario_nome")
+            duplicata_desde: Só considera duplicatas coletadas a partir desta data
+
+        Returns:
+            Dict com os itens gravados (na ordem de entrada) e totais
+        """
+        if not registros:
+            return self._resultado([], 0, 0)
+
+        produtos_ids, produtos_criados = self._resolver_produtos(registros)
+
+        agora = datetime.now()
+        existentes = self._buscar_existentes(
+            set(produtos_ids), duplicata_por, duplicata_desde
+        ) if duplicata_por else {}
+
+        itens = []
+        novos = []
+        repetidos = []  # (item, item original) para repetidos dentro do lote
+        for registro, produto_id in zip(registros, produtos_ids):
+            mapping = {campo: registro[campo] for campo in CAMPOS_PRECO if campo in registro}
+            mapping["produto_id"] = produto_id
+            mapping.setdefault("data_coleta", agora)
+            mapping.setdefault("disponivel", True)
+            mapping.setdefault("em_promocao", False)
+            mapping["desconto_percentual"], mapping["economia"] = calcular_desconto(
+                mapping["preco"], mapping.get("preco_original")
+            )
+
+            item = {
+                "produto_id": produto_id,
+                "nome": registro.get("nome"),
+                "preco": mapping["preco"],
+                "registro": registro,
+                "duplicado": False
+            }
+
+            if duplicata_por:
+                chave = tuple(mapping.get(campo) for campo in duplicata_por)
+                if chave in existentes:
+                    # Já existe no banco ou apareceu antes no próprio lote
+                    item["duplicado"] = True
+                    if isinstance(existentes[chave], dict):
+                        repetidos.append((item, existentes[chave]))
+                    else:
+                        item["id"] = existentes[chave]
+                    itens.append(item)
+                    continue
+                existentes[chave] = item
+
+            novos.append(mapping)
+            itens.append(item)
+
+        # Propagar ids gerados (inclusive para repetidos dentro do lote)
+        ids = self._inserir_em_lote(Preco, novos)
+        for item, mapping, preco_id in zip([i for i in itens if not i["duplicado"]], novos, ids):
+            item["id"] = mapping["id"] = preco_id
+        for item, original in repetidos:
+            item["id"] = original["id"]
+
+        # Contribuições manuais entram nas estatísticas materializadas
+        EstatisticasMaterializadas(self.db).registrar_contribuicoes(m for m in novos if m.get("manual"))
+
+        # Todos os preços novos alimentam o consenso por produto × supermercado
+        ConsensoPrecos(self.db).registrar(novos)
+
+        # Promoções novas disputam o ranking de ofertas
+        RankingOfertas(self.db).registrar(novos)
+
+        tokens_ganhos = 0
+        if usuario_nome and recompensa_por_item and novos:
+            from app.utils.crypto_manager import CryptoManager
+
+            tokens_ganhos = recompensa_por_item * len(novos)
+            CryptoManager(self.db).minerar_tokens(
+                usuario_nome=usuario_nome,
+                quantidade=tokens_ganhos,
+                descricao=descricao_recompensa or f"Recompensa por adicionar {len(novos)} preços"
+            )
+
+        return self._resultado(itens, produtos_criados, tokens_ganhos)
+
+    def _resolver_produtos(self, registros: List[Dict]) -> Tuple[List[int], int]:
+        """Resolve (ou cria) os produtos de todos os registros de uma vez: EAN primeiro, depois chave canônica"""
+        eans = [
+            None if registro.get("produto_id") else normalizar_ean(registro.get("ean"))
+            for registro in registros
+        ]
+        por_ean = buscar_ids_por_ean(self.db, eans)
+
+        # Sem EAN conhecido: chave canônica. O mesmo EAN no lote sempre cai na mesma chave
+        chaves = []
+        chave_do_ean = {}
+        for registro, ean in zip(registros, eans):
+            if registro.get("produto_id") or ean in por_ean:
+                chaves.append(None)
+                continue
+            chave = chave_do_ean.get(ean) or gerar_chave_produto(registro["nome"], registro.get("marca"))
+            if ean:
+                chave_do_ean.setdefault(ean, chave)
+            chaves.append(chave)
+
+        por_chave = buscar_ids_por_chave(self.db, [c for c in chaves if c])
+
+        # Criar produtos que faltam (um por chave, mesmo que apareça várias vezes)
+        # e anotar EANs novos de produtos que já existiam pelo nome
+        faltando = {}
+        ean_por_produto = {}
+        eans_usados = set()
+        for registro, chave, ean in zip(registros, chaves, eans):
+            if not chave:
+                continue
+            if ean in eans_usados:
+                ean = None
+            if chave in por_chave:
+                if ean and por_chave[chave] not in ean_por_produto:
+                    ean_por_produto[por_chave[chave]] = ean
+                    eans_usados.add(ean)
+            elif chave not in faltando:
+                faltando[chave] = {
+                    "nome": registro["nome"],
+                    "marca": registro.get("marca"),
+                    "categoria": registro.get("categoria"),
+                    "chave": chave,
+                    "ean": ean
+                }
+                eans_usados.add(ean)
+            elif ean and not faltando[chave]["ean"]:
+                faltando[chave]["ean"] = ean
+                eans_usados.add(ean)
+
+        por_chave.update(criar_produtos(self.db, faltando.values()))
+
+        if ean_por_produto:
+            self.db.query(Produto).filter(
+                Produto.id.in_(ean_por_produto), Produto.ean.is_(None)
+            ).update({Produto.ean: case(ean_por_produto, value=Produto.id)}, synchronize_session=False)
+
+        produtos_ids = [
+            registro.get("produto_id") or (por_ean[ean] if chave is None else por_chave[chave])
+            for registro, chave, ean in zip(registros, chaves, eans)
+        ]
+        return produtos_ids, len(faltando)
+
+    def _inserir_em_lote(self, modelo, mappings: List[Dict]) -> List[int]:
+        """INSERT multi-linha com RETURNING; devolve os ids na ordem dos mappings
+
+        O SQLite atribui os rowids em ordem crescente, na ordem das linhas do VALUES,
+        então basta ordenar os ids retornados (premissa conferida abaixo).
+        (sort_by_parameter_order faria o SQLAlchemy voltar a um INSERT por linha neste driver.)
+
+        O insert é Core, na tabela: o bulk do ORM quebraria o lote em um INSERT
+        por sequência de linhas com colunas nulas diferentes (ex: preco_original).
+        """
+        if not mappings:
+            return []
+
+        tabela = modelo.__table__
+        colunas = set().union(*mappings)
+        padroes = {
+            c.name: c.default.arg for c in tabela.columns
+            if c.default is not None and c.default.is_scalar
+        }
+        linhas = [{coluna: m.get(coluna, padroes.get(coluna)) for coluna in colunas} for m in mappings]
+
+        # Pareamento id <-> linha por ordenação: vale porque id é INTEGER PRIMARY KEY
+        # (rowid) sem valor explícito, e o SQLite dá max(rowid) + 1 a cada linha, na
+        # ordem do VALUES; a transação segura o lock de escrita entre os lotes do
+        # insertmanyvalues, então os ids saem contíguos. Se não saírem, a premissa
+        # quebrou (outro banco, id explícito, rowid no limite) e o pareamento estaria errado
+        ids = sorted(self.db.scalars(insert(tabela).returning(tabela.c.id), linhas))
+        if ids[-1] - ids[0] != len(ids) - 1:
+            raise RuntimeError(f"Ids não contíguos no INSERT em lote de {tabela.name}: pareamento inválido")
+        return ids
+
+    def _buscar_existentes(self, produtos_ids: set, duplicata_por: Tuple[str, ...],
+                           duplicata_desde: Optional[datetime]) -> Dict[tuple, int]:
+        """Carrega, em uma consulta, os preços que já existem para os produtos do lote"""
+        colunas = [getattr(Preco, campo) for campo in duplicata_por]
+        query = self.db.query(Preco.id, *colunas).filter(Preco.produto_id.in_(produtos_ids))
+
+        if duplicata_desde:
+            query = query.filter(Preco.data_coleta >= duplicata_desde)
+
+        existentes = {}
+        for linha in query.all():
+            existentes.setdefault(tuple(linha[1:]), linha[0])
+        return existentes
+
+    def _resultado(self, itens: List[Dict], produtos_criados: int, tokens_ganhos: float) -> Dict:
+        return {
+            "itens": itens,
+            "total_novos": sum(1 for i in itens if not i["duplicado"]),
+            "total_duplicados": sum(1 for i in itens if i["duplicado"]),
+            "produtos_criados": produtos_criados,
+            "tokens_ganhos": tokens_ganhos
+        }
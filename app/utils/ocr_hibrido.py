@@ -178,7 +178,8 @@ class OCRHibrido:
                     {
                         'nome': p['nome'],
                         'preco': p['preco'],
-                        'quantidade': p.get('quantidade', '1')
+                        'quantidade': p.get('quantidade', '1'),
+                        'ean': p.get('ean')
                     }
                     for p in produtos_validos
                 ]
@@ -11,6 +11,8 @@ import io
 from difflib import SequenceMatcher
 import numpy as np
 
+from app.utils.produtos import normalizar_ean
+
 
 class NotaFiscalOCR:
     """OCR especializado em notas fiscais de supermercado"""
@@ -220,8 +222,8 @@ class NotaFiscalOCR:
     def extrair_produtos(self, texto: str) -> List[Dict]:
         """
         Extrai produtos e preços do texto da nota fiscal
-        Foca apenas em: nome do produto, unidade/quantidade e preço
-        Ignora códigos EAN, SKU e outras informações desnecessárias
+        Foca apenas em: nome do produto, unidade/quantidade, preço e código de barras
+        Guarda o EAN quando for válido; SKUs internos e outros códigos são ignorados
 
         Formato comum de linhas de produto:
         - PRODUTO NOME          QTD  PRECO
@@ -230,6 +232,7 @@ class NotaFiscalOCR:
         """
         produtos = []
         linhas = texto.split('\n')
+        ean_pendente = None  # EAN que o OCR separou em uma linha própria (vale para o próximo produto)
 
         # Primeiro tentar formato de 2 linhas (produto + preço separados)
         produtos_multilinhas = self._extrair_produtos_multilinhas(linhas, self.palavras_ignorar)
@@ -268,9 +271,10 @@ class NotaFiscalOCR:
             if any(palavra in linha_original.upper() for palavra in self.palavras_ignorar):
                 continue
 
-            # Pular linhas que são apenas códigos (EAN, SKU, etc)
+            # Linhas que são apenas códigos (EAN, SKU, etc): guardar o EAN para o próximo produto
             # Exemplos: "7896015289324", "002 57192502", "EAN 789601528"
             if re.match(r'^(?:EAN|SKU|COD|CODIGO)?\s*\d{7,13}\s*$', linha_original, re.IGNORECASE):
+                ean_pendente = normalizar_ean(linha_original) or ean_pendente
                 continue
 
             # Pular linhas que contêm apenas códigos técnicos (NCM, CST, CFOP, etc)
@@ -289,7 +293,7 @@ class NotaFiscalOCR:
                         if i == 0:  # Padrão 1: num codigo NOME qtd unidade preço_unit total
                             # grupos: (num, codigo, nome, qtd, unidade, preço_unit, total)
                             num_item = grupos[0]
-                            codigo = grupos[1]  # Ignorar
+                            ean = normalizar_ean(grupos[1])  # SKU interno da loja vira None
                             nome_produto = grupos[2].strip()
                             quantidade_str = grupos[3].replace(',', '.')
                             unidade = grupos[4].upper()
@@ -303,6 +307,7 @@ class NotaFiscalOCR:
                         elif i == 1:  # Padrão 2: num NOME qtd unidade preço_unit total (sem código)
                             # grupos: (num, nome, qtd, unidade, preço_unit, total)
                             num_item = grupos[0]
+                            ean = None
                             nome_produto = grupos[1].strip()
                             quantidade_str = grupos[2].replace(',', '.')
                             unidade = grupos[3].upper()
@@ -316,7 +321,7 @@ class NotaFiscalOCR:
                         elif i == 2:  # Padrão 3: num codigo NOME preço_unit total (2 preços)
                             # grupos: (num, codigo, nome, preço_unit, total)
                             num_item = grupos[0]
-                            codigo = grupos[1]  # Ignorar
+                            ean = normalizar_ean(grupos[1])  # SKU interno da loja vira None
                             nome_produto = grupos[2].strip()
                             preco_unitario = float(grupos[3].replace(',', '.'))
                             total = float(grupos[4].replace(',', '.'))
@@ -326,7 +331,7 @@ class NotaFiscalOCR:
                         elif i == 3:  # Padrão 4: num codigo NOME preço
                             # grupos: (num, codigo, nome, preço)
                             num_item = grupos[0]
-                            codigo = grupos[1]  # Ignorar
+                            ean = normalizar_ean(grupos[1])  # SKU interno da loja vira None
                             nome_produto = grupos[2].strip()
                             preco_unitario = float(grupos[3].replace(',', '.'))
                             quantidade = 1.0
@@ -419,8 +424,10 @@ class NotaFiscalOCR:
                                 'nome': nome_produto.title(),
                                 'preco': preco_unitario,
                                 'quantidade': quantidade if i < 2 else 1.0,
-                                'unidade': unidade if i < 2 else 'UN'
+                                'unidade': unidade if i < 2 else 'UN',
+                                'ean': ean or ean_pendente
                             })
+                            ean_pendente = None
                             produto_encontrado = True
                             break
 
@@ -441,7 +448,7 @@ class NotaFiscalOCR:
         Depois vem os produtos:
         Linha 1: 002 12556 FILE PEITO SUPER FRANGO Kg RESF
                  ↑   ↑     ↑ NOME DO PRODUTO
-                 |   └─────── código do produto (EAN/SKU) - REMOVER
+                 |   └─────── código do produto (EAN/SKU) - guardar se for EAN válido
                  └─────────── número do item - REMOVER
 
         Linha 2: 1,565Kg 19,98  36,06
@@ -518,8 +525,10 @@ class NotaFiscalOCR:
             # Exemplo: "006 789 MERANTE SUKITA 21 LARA" -> captura "MERANTE SUKITA"
             #          "04 2667 FILE PEITO SUPER FRANGO" -> captura "FILE PEITO SUPER FRANGO"
 
-            # Passo 1: Remover números e espaços do início
+            # Passo 1: Remover números e espaços do início (o código de barras, se houver, está ali)
             linha_limpa = re.sub(r'^[\d\s]+', '', linha_atual)
+            prefixo = linha_atual[:len(linha_atual) - len(linha_limpa)]
+            ean = next(filter(None, map(normalizar_ean, re.findall(r'\d{8,14}', prefixo))), None)
 
             # Passo 2: Capturar apenas letras e espaços (nome), parar em número isolado ou especificação
             match_nome = re.search(r'^([A-ZÇÁÉÍÓÚÀÃÕÂÊÔ][A-ZÇÁÉÍÓÚÀÃÕÂÊÔ\s]+?)(?:\s+\d+|\s+ka|\s+kg|\s+[A-Z]{1,2}\s*$|$)', linha_limpa, re.IGNORECASE)
@@ -611,7 +620,8 @@ class NotaFiscalOCR:
                                     'nome': nome_corrigido.title(),
                                     'preco': preco_unitario,  # preço unitário (por kg ou por unidade)
                                     'quantidade': quantidade,
-                                    'unidade': unidade  # adicionar unidade para referência
+                                    'unidade': unidade,  # adicionar unidade para referência
+                                    'ean': ean
                                 })
 
                                 i += 2  # Pula as duas linhas processadas
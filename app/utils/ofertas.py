@@ -0,0 +1,188 @@
+"""
+Ranking de ofertas
+Desconto e economia calculados na ingestão e top-N por supermercado (e geral)
+mantido de forma incremental na tabela ofertas_destaque
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.database import OfertaDestaque, Preco
+from app.utils.consenso import TODOS
+
+
+def calcular_desconto(preco: float, preco_original: Optional[float]) -> Tuple[float, float]:
+    """(desconto_percentual, economia) de um preço; zero sem preço original maior"""
+    if not preco_original or preco_original <= preco:
+        return 0.0, 0.0
+    return (
+        round((preco_original - preco) / preco_original * 100, 1),
+        round(preco_original - preco, 2)
+    )
+
+
+class RankingOfertas:
+    """Top-N das maiores promoções, por supermercado e geral
+
+    - Escopo "<supermercado>": promoções da loja nos últimos JANELA_DIAS (/api/promocoes)
+    - Escopo "*": promoções de todas as lojas nas últimas JANELA_GERAL_HORAS (/api/melhores-ofertas)
+
+    Preços novos entram em registrar (na transação da ingestão) e cada escopo é podado
+    para TAMANHO entradas; reconstruir refaz tudo (agendado) para repor as entradas que
+    saíram da janela. Leitura: ORDER BY desconto DESC LIMIT no índice (escopo, desconto).
+    """
+
+    TAMANHO = 50
+    JANELA_DIAS = 30
+    JANELA_GERAL_HORAS = 24
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _inicio_janela(self, geral: bool) -> datetime:
+        if geral:
+            return datetime.now() - timedelta(hours=self.JANELA_GERAL_HORAS)
+        return datetime.now() - timedelta(days=self.JANELA_DIAS)
+
+    # ---------- Escrita ----------
+
+    def registrar(self, precos: Iterable[Dict]):
+        """Preços novos (dicts com id, supermercado, desconto_percentual, em_promocao, data_coleta)"""
+        agora = datetime.now()
+        linhas = []
+        for preco in precos:
+            if not preco.get("em_promocao") or not preco.get("disponivel", True):
+                continue
+            for escopo in (preco["supermercado"], TODOS):
+                linhas.append({
+                    "escopo": escopo,
+                    "preco_id": preco["id"],
+                    "desconto_percentual": preco.get("desconto_percentual") or 0.0,
+                    "data_coleta": preco.get("data_coleta") or agora
+                })
+
+        if not linhas:
+            return
+
+        self.db.execute(sqlite_insert(OfertaDestaque.__table__).on_conflict_do_nothing(), linhas)
+        for escopo in {linha["escopo"] for linha in linhas}:
+            self._podar(escopo)
+
+    def remover(self, precos_ids: Iterable[int]):
+        """Tira do ranking preços que deixaram de valer (ex: marcados como anomalia)"""
+        precos_ids = list(precos_ids)
+        if precos_ids:
+            self.db.execute(delete(OfertaDestaque).where(OfertaDestaque.preco_id.in_(precos_ids)))
+
+    def _podar(self, escopo: str):
+        """Mantém só as TAMANHO maiores do escopo dentro da janela"""
+        inicio = self._inicio_janela(escopo == TODOS)
+        manter = select(OfertaDestaque.preco_id).where(
+            OfertaDestaque.escopo == escopo, OfertaDestaque.data_coleta >= inicio
+        ).order_by(
+            OfertaDestaque.desconto_percentual.desc(), OfertaDestaque.preco_id.desc()
+        ).limit(self.TAMANHO)
+
+        self.db.execute(delete(OfertaDestaque).where(
+            OfertaDestaque.escopo == escopo,
+            OfertaDestaque.preco_id.notin_(manter.scalar_subquery())
+        ))
+
+    def reconstruir(self) -> int:
+        """Refaz o ranking a partir dos preços (1 consulta com ROW_NUMBER por loja); não faz commit"""
+        em_oferta = (Preco.em_promocao == True, Preco.disponivel == True)
+
+        posicao = func.row_number().over(
+            partition_by=Preco.supermercado,
+            order_by=(Preco.desconto_percentual.desc(), Preco.id.desc())
+        ).label("posicao")
+        por_loja = select(
+            Preco.supermercado, Preco.id, Preco.desconto_percentual, Preco.data_coleta, posicao
+        ).where(*em_oferta, Preco.data_coleta >= self._inicio_janela(False)).subquery()
+
+        linhas = [
+            {"escopo": loja, "preco_id": preco_id, "desconto_percentual": desconto, "data_coleta": data}
+            for loja, preco_id, desconto, data in self.db.execute(
+                select(por_loja.c.supermercado, por_loja.c.id, por_loja.c.desconto_percentual,
+                       por_loja.c.data_coleta).where(por_loja.c.posicao <= self.TAMANHO)
+            )
+        ]
+        linhas += [
+            {"escopo": TODOS, "preco_id": preco_id, "desconto_percentual": desconto, "data_coleta": data}
+            for preco_id, desconto, data in self.db.execute(
+                select(Preco.id, Preco.desconto_percentual, Preco.data_coleta).where(
+                    *em_oferta, Preco.data_coleta >= self._inicio_janela(True)
+                ).order_by(Preco.desconto_percentual.desc(), Preco.id.desc()).limit(self.TAMANHO)
+            )
+        ]
+
+        self.db.execute(delete(OfertaDestaque))
+        if linhas:
+            self.db.execute(OfertaDestaque.__table__.insert(), linhas)
+        return len(linhas)
+
+    # ---------- Leitura ----------
+
+    def melhores(self, limite: int, supermercado: Optional[str] = None) -> List[Preco]:
+        """
+        Maiores descontos do ranking (geral, ou das lojas cujo nome contém supermercado)
+
+        Returns:
+            Preços (com o produto carregado) em ordem de desconto
+        """
+        query = self.db.query(Preco).join(
+            OfertaDestaque, OfertaDestaque.preco_id == Preco.id
+        ).options(joinedload(Preco.produto))
+
+        if supermercado:
+            query = query.filter(
+                OfertaDestaque.escopo != TODOS, OfertaDestaque.escopo.ilike(f"%{supermercado}%")
+            )
+        else:
+            query = query.filter(OfertaDestaque.escopo == TODOS)
+
+        return query.filter(
+            OfertaDestaque.data_coleta >= self._inicio_janela(not supermercado),
+            Preco.disponivel == True
+        ).order_by(
+            OfertaDestaque.desconto_percentual.desc(), OfertaDestaque.preco_id.desc()
+        ).limit(limite).all()
+
+    def proximas(self, limite: int, latitude: float, longitude: float, raio_km: float,
+                 supermercado: Optional[str] = None) -> List[Tuple[Preco, float]]:
+        """
+        Maiores descontos dentro do raio (janela geral, ou da loja se supermercado):
+        caixa de latitude/longitude nos índices, lida em ordem de desconto até juntar
+        o limite (distância exata em Python)
+
+        Returns:
+            Lista de (preço, distância em km)
+        """
+        from app.utils.geolocalizacao import GeoLocalizacao
+
+        delta_lat = raio_km / 111.32
+        delta_lon = raio_km / (111.32 * max(math.cos(math.radians(latitude)), 0.01))
+
+        query = self.db.query(Preco).options(joinedload(Preco.produto)).filter(
+            Preco.em_promocao == True,
+            Preco.disponivel == True,
+            Preco.data_coleta >= self._inicio_janela(not supermercado),
+            Preco.latitude.between(latitude - delta_lat, latitude + delta_lat),
+            Preco.longitude.between(longitude - delta_lon, longitude + delta_lon)
+        )
+        if supermercado:
+            query = query.filter(Preco.supermercado.ilike(f"%{supermercado}%"))
+
+        geo = GeoLocalizacao()
+        encontrados = []
+        for preco in query.order_by(Preco.desconto_percentual.desc(), Preco.id.desc()).yield_per(100):
+            distancia = geo.calcular_distancia(latitude, longitude, preco.latitude, preco.longitude)
+            if distancia <= raio_km:
+                encontrados.append((preco, distancia))
+                if len(encontrados) >= limite:
+                    break
+        return encontrados
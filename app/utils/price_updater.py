@@ -3,17 +3,26 @@ Price Updater Scheduler
 Agendador integrado à aplicação para atualização automática de preços
 """
 import logging
+import os
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy.orm import Session
 
-from app.models.database import SessionLocal, Produto, Preco
-from app.scrapers.scraper_manager import ScraperManager
+from app.models.database import SessionLocal
+from app.utils.estatisticas import EstatisticasMaterializadas, MAX_IDADE_SEGUNDOS
+from app.utils.ofertas import RankingOfertas
+from app.utils.tarefas import atualizar_lote, FILA_DISTRIBUIDA
+from app.utils.agenda_atualizacao import INTERVALO_CICLO_SEGUNDOS
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# Atraso máximo entre um evento de reputação e a reputação da carteira
+INTERVALO_REPUTACAO_SEGUNDOS = int(os.getenv("REPUTACAO_INTERVALO_SEGUNDOS", "30"))
+
+# Intervalo da reconstrução do ranking de ofertas (a janela geral é de 24h)
+INTERVALO_RANKING_MINUTOS = int(os.getenv("RANKING_OFERTAS_INTERVALO_MINUTOS", "15"))
+
 
 class PriceUpdater:
     """Gerenciador de atualização automática de preços"""
@@ -21,117 +30,131 @@ class PriceUpdater:
     def __init__(self):
         self.scheduler = BackgroundScheduler()
         self.running = False
-        self.scraper_manager = ScraperManager()
 
     def atualizar_precos(self):
-        """Atualiza preços dos produtos no banco de dados"""
-        logger.info("="*60)
-        logger.info(f"🔄 Iniciando atualização automática de preços - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info("="*60)
+        """
+        Um ciclo da atualização de preços por demanda
+
+        A agenda (app/utils/agenda_atualizacao.py) escolhe os produtos mais urgentes
+        dentro do orçamento; o trabalho vai para a fila (app.utils.tarefas): uma
+        tarefa por produto e fonte, com limite por fonte e novas tentativas. Sem
+        broker, roda aqui mesmo.
+        """
+        try:
+            resumo = atualizar_lote()
+            if resumo["produtos"]:
+                logger.info(
+                    f"🔄 Atualização de preços - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: "
+                    f"{resumo['produtos']} produtos, {resumo['tarefas']} tarefas de scraping"
+                )
+        except Exception as e:
+            logger.error(f"❌ Erro fatal na atualização de preços: {str(e)}", exc_info=True)
 
+    def recalcular_estatisticas(self):
+        """Recálculo completo das estatísticas materializadas (corrige divergências dos incrementos)"""
         db = SessionLocal()
+        try:
+            EstatisticasMaterializadas(db).recalcular()
+            db.commit()
+            logger.info("📊 Estatísticas materializadas recalculadas")
+        except Exception as e:
+            logger.error(f"❌ Erro ao recalcular estatísticas: {str(e)}", exc_info=True)
+        finally:
+            db.close()
 
+    def reconstruir_ranking_ofertas(self):
+        """Refaz o ranking de ofertas, repondo as posições das promoções que saíram da janela"""
+        db = SessionLocal()
         try:
-            from datetime import timedelta
-
-            # Buscar produtos com preços desatualizados (mais de 24h)
-            data_limite = datetime.now() - timedelta(hours=24)
-
-            # Pegar os 20 produtos mais recentes/buscados
-            produtos = db.query(Produto).join(Preco).filter(
-                Preco.data_coleta < data_limite
-            ).group_by(Produto.id).limit(20).all()
-
-            if not produtos:
-                logger.info("✅ Nenhum produto precisa de atualização no momento")
-                return
-
-            logger.info(f"📦 Encontrados {len(produtos)} produtos para atualizar")
-
-            total_atualizados = 0
-            total_novos_precos = 0
-
-            for produto in produtos:
-                logger.info(f"🔍 Atualizando: {produto.nome}...")
-
-                try:
-                    # Fazer scraping do produto
-                    resultados = self.scraper_manager.search_all(
-                        termo=produto.nome,
-                        supermercados=None
-                    )
-
-                    if resultados:
-                        for item in resultados:
-                            # Verificar se já existe preço recente deste supermercado
-                            preco_existente = db.query(Preco).filter(
-                                Preco.produto_id == produto.id,
-                                Preco.supermercado == item['supermercado'],
-                                Preco.data_coleta >= data_limite
-                            ).first()
-
-                            if not preco_existente:
-                                # Adicionar novo preço
-                                novo_preco = Preco(
-                                    produto_id=produto.id,
-                                    supermercado=item['supermercado'],
-                                    preco=item['preco'],
-                                    em_promocao=item.get('em_promocao', False),
-                                    url=item.get('url'),
-                                    disponivel=item.get('disponivel', True),
-                                    data_coleta=datetime.now(),
-                                    manual=False
-                                )
-                                db.add(novo_preco)
-                                total_novos_precos += 1
-                                logger.info(f"  ✅ {item['supermercado']}: R$ {item['preco']:.2f}")
-
-                        total_atualizados += 1
-                        db.commit()
-                    else:
-                        logger.warning(f"  ⚠️  Nenhum resultado encontrado para {produto.nome}")
-
-                except Exception as e:
-                    logger.error(f"  ❌ Erro ao atualizar {produto.nome}: {str(e)}")
-                    db.rollback()
-                    continue
-
-            logger.info("="*60)
-            logger.info("📊 Resumo da Atualização:")
-            logger.info(f"   • Produtos atualizados: {total_atualizados}")
-            logger.info(f"   • Novos preços adicionados: {total_novos_precos}")
-            logger.info(f"   • Concluído em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            logger.info("="*60)
+            total = RankingOfertas(db).reconstruir()
+            db.commit()
+            logger.info(f"🏷️  Ranking de ofertas reconstruído ({total} posições)")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erro ao reconstruir o ranking de ofertas: {str(e)}", exc_info=True)
+        finally:
+            db.close()
 
+    def aplicar_eventos_reputacao(self):
+        """Aplica em lote os eventos de reputação registrados desde a última execução"""
+        from app.utils.crypto_manager import ReputacaoManager
+
+        db = SessionLocal()
+        try:
+            resultado = ReputacaoManager(db).aplicar_eventos()
+            db.commit()
+            if resultado["eventos_aplicados"]:
+                logger.info(
+                    f"⭐ {resultado['eventos_aplicados']} eventos de reputação aplicados "
+                    f"({resultado['usuarios_atualizados']} usuários)"
+                )
         except Exception as e:
-            logger.error(f"❌ Erro fatal na atualização de preços: {str(e)}", exc_info=True)
+            db.rollback()
+            logger.error(f"❌ Erro ao aplicar eventos de reputação: {str(e)}", exc_info=True)
         finally:
             db.close()
 
-    def start(self, interval_hours: int = 7):
+    def start(self, intervalo_ciclo_segundos: int = INTERVALO_CICLO_SEGUNDOS):
         """
         Inicia o agendador de atualização de preços
 
         Args:
-            interval_hours: Intervalo em horas entre atualizações (padrão: 7)
+            intervalo_ciclo_segundos: Intervalo entre ciclos da agenda de atualização
+                (cada ciclo atualiza só os produtos vencidos, dentro do orçamento)
         """
         if not self.running:
+            # Com a fila distribuída, quem agenda a atualização é o celery beat (uma vez só,
+            # não uma por worker do uvicorn)
+            if not FILA_DISTRIBUIDA:
+                self.scheduler.add_job(
+                    self.atualizar_precos,
+                    trigger=IntervalTrigger(seconds=intervalo_ciclo_segundos),
+                    id='atualizar_precos',
+                    name='Atualização de Preços por Demanda',
+                    replace_existing=True,
+                    coalesce=True,
+                    max_instances=1  # Ciclo que atrasou não roda em paralelo com o próximo
+                )
+
+            # Recálculo na metade do limite de frescor (as leituras só servem o último snapshot)
+            self.scheduler.add_job(
+                self.recalcular_estatisticas,
+                trigger=IntervalTrigger(seconds=max(MAX_IDADE_SEGUNDOS // 2, 60)),
+                id='recalcular_estatisticas',
+                name='Recálculo das Estatísticas Materializadas',
+                replace_existing=True,
+                next_run_time=datetime.now()  # Snapshot logo ao subir: as leituras nunca recalculam
+            )
+
+            # Reputação: eventos aplicados em lote (1 UPDATE para todas as carteiras afetadas)
+            self.scheduler.add_job(
+                self.aplicar_eventos_reputacao,
+                trigger=IntervalTrigger(seconds=INTERVALO_REPUTACAO_SEGUNDOS),
+                id='aplicar_eventos_reputacao',
+                name='Aplicação dos Eventos de Reputação',
+                replace_existing=True
+            )
+
+            # Ranking de ofertas: promoções novas entram na ingestão; a reconstrução repõe as que expiraram
             self.scheduler.add_job(
-                self.atualizar_precos,
-                trigger=IntervalTrigger(hours=interval_hours),
-                id='atualizar_precos_7h',
-                name=f'Atualização Automática de Preços ({interval_hours}h)',
+                self.reconstruir_ranking_ofertas,
+                trigger=IntervalTrigger(minutes=INTERVALO_RANKING_MINUTOS),
+                id='reconstruir_ranking_ofertas',
+                name='Reconstrução do Ranking de Ofertas',
                 replace_existing=True
             )
 
             self.scheduler.start()
             self.running = True
 
-            logger.info(f"✅ Agendador de preços iniciado! Atualizando a cada {interval_hours} horas.")
+            if FILA_DISTRIBUIDA:
+                logger.info("✅ Agendador iniciado! Atualização de preços pelo celery beat.")
+            else:
+                logger.info(f"✅ Agendador de preços iniciado! Ciclo de atualização a cada {intervalo_ciclo_segundos}s.")
 
             # Log da próxima execução
             for job in self.scheduler.get_jobs():
-                if job.id == 'atualizar_precos_7h':
+                if job.id == 'atualizar_precos':
                     next_run = job.next_run_time.strftime('%Y-%m-%d %H:%M:%S') if job.next_run_time else 'N/A'
                     logger.info(f"📅 Próxima atualização: {next_run}")
 
@@ -0,0 +1,301 @@
+"""
+Identidade de produtos
+Código de barras (EAN/GTIN) + chave canônica determinística
+e resolução "busca ou cria" por índice único
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Iterable, Dict
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.database import Produto, AliasProduto
+
+
+# Palavras que não distinguem produtos
+STOPWORDS = {"de", "da", "do", "das", "dos", "com", "e", "em", "para"}
+
+# Negação: fica presa ao token seguinte ("sem açúcar" -> "sem_acucar"), senão
+# "com açúcar" e "sem açúcar" virariam o mesmo produto
+NEGACOES = {"sem"}
+
+# Abreviações de embalagem: "c/ açúcar" -> "com açúcar", "s/ lactose" -> "sem lactose"
+PADRAO_ABREVIACOES = re.compile(r"\b([cs])\s*/\s*")
+ABREVIACOES = {"c": "com ", "s": "sem "}
+
+# Unidade -> (unidade base, fator)
+UNIDADES = {
+    "kg": ("g", 1000), "kgs": ("g", 1000), "quilo": ("g", 1000), "quilos": ("g", 1000),
+    "g": ("g", 1), "gr": ("g", 1), "grs": ("g", 1), "grama": ("g", 1), "gramas": ("g", 1),
+    "mg": ("g", 0.001),
+    "l": ("ml", 1000), "lt": ("ml", 1000), "lts": ("ml", 1000), "litro": ("ml", 1000), "litros": ("ml", 1000),
+    "ml": ("ml", 1),
+    "un": ("un", 1), "und": ("un", 1), "unid": ("un", 1), "unidades": ("un", 1),
+}
+
+PADRAO_TAMANHO = re.compile(
+    r"(?:(\d+)\s*x\s*)?(\d+(?:[.,]\d+)?)\s*(" + "|".join(sorted(UNIDADES, key=len, reverse=True)) + r")\b"
+)
+
+
+def normalizar_ean(codigo) -> Optional[str]:
+    """
+    Valida e normaliza um código de barras (GTIN-8/12/13/14) para 13 dígitos
+
+    Retorna None para códigos inválidos (dígito verificador errado, OCR truncado)
+    e para códigos internos de loja (prefixo 2: balança, produtos fracionados),
+    que não identificam o produto fora daquele supermercado.
+    """
+    digitos = re.sub(r"\D", "", str(codigo or ""))
+    if len(digitos) not in (8, 12, 13, 14):
+        return None
+
+    # Dígito verificador GS1: pesos 3 e 1 alternados, da direita para a esquerda
+    corpo, verificador = digitos[:-1], int(digitos[-1])
+    soma = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(corpo)))
+    if (10 - soma % 10) % 10 != verificador:
+        return None
+
+    ean = digitos.zfill(14)
+    if ean.startswith("0"):
+        ean = ean[1:]  # GTIN-14 sem indicador de embalagem = EAN-13
+
+    if len(ean) == 13 and ean[0] == "2":
+        return None
+
+    return ean
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def extrair_tamanho(texto_normalizado: str) -> Optional[str]:
+    """
+    Extrai o tamanho/unidade em unidade base
+
+    Exemplos: "5kg" -> "5000g", "1,5 L" -> "1500ml", "12x350ml" -> "12x350ml"
+    """
+    match = PADRAO_TAMANHO.search(texto_normalizado)
+    if not match:
+        return None
+
+    pacote, valor, unidade = match.groups()
+    base, fator = UNIDADES[unidade]
+    quantidade = float(valor.replace(",", ".")) * fator
+    tamanho = f"{quantidade:g}{base}"
+
+    return f"{int(pacote)}x{tamanho}" if pacote else tamanho
+
+
+def tokens_nome(texto: str) -> list:
+    """
+    Tokens normalizados do nome (sem tamanho e sem stopwords)
+
+    Negações viram um token só com a palavra seguinte:
+    "Iogurte s/ Açúcar" -> ["iogurte", "sem_acucar"]
+    """
+    texto = normalizar_texto(texto)
+    texto = PADRAO_ABREVIACOES.sub(lambda m: ABREVIACOES[m.group(1)], texto)
+    texto = PADRAO_TAMANHO.sub(" ", texto)
+
+    tokens = []
+    negacao = None
+    for token in re.findall(r"[a-z0-9]+", texto):
+        if token in STOPWORDS:
+            continue
+        if token in NEGACOES:
+            negacao = token
+            continue
+        tokens.append(f"{negacao}_{token}" if negacao else token)
+        negacao = None
+    if negacao:
+        tokens.append(negacao)  # "Sem" no fim do nome: mantém a palavra
+    return tokens
+
+
+def gerar_chave_produto(nome: str, marca: Optional[str] = None) -> str:
+    """
+    Gera a chave canônica de um produto
+
+    Formato: "<tokens ordenados>|<tamanho>"
+    - Tokens do nome e da marca, sem acento, sem stopwords, ordenados e sem repetição
+      (negações presas à palavra seguinte: "sem_acucar" é outro token)
+    - Tamanho convertido para unidade base (g, ml, un)
+
+    Assim "Arroz Tio João 5 kg" e "ARROZ TIO JOAO 5KG" têm a mesma chave,
+    mas "Leite" e "Doce de Leite" não, nem "com Açúcar" e "sem Açúcar".
+    """
+    nome_normalizado = normalizar_texto(nome)
+    tamanho = extrair_tamanho(nome_normalizado)
+
+    tokens = set(tokens_nome(nome))
+    if marca:
+        tokens.update(tokens_nome(marca))
+
+    chave = " ".join(sorted(tokens)) or nome_normalizado.strip()
+    return f"{chave}|{tamanho or ''}"
+
+
+class CacheChaves:
+    """LRU pequeno (chave canônica -> produto_id) na frente do índice único"""
+
+    def __init__(self, tamanho_maximo: int = 2048):
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[int]:
+        with self._lock:
+            produto_id = self._itens.get(chave)
+            if produto_id is not None:
+                self._itens.move_to_end(chave)
+            return produto_id
+
+    def guardar(self, chave: str, produto_id: int):
+        with self._lock:
+            self._itens[chave] = produto_id
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def remover(self, chaves: Iterable[str]):
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+# Instância global
+cache_chaves = CacheChaves()
+
+
+def buscar_ids_por_chave(db: Session, chaves: Iterable[str]) -> Dict[str, int]:
+    """Resolve várias chaves de uma vez: LRU primeiro, depois SELECT ... IN (produtos e aliases)"""
+    encontrados = {}
+    faltando = set()
+
+    for chave in set(chaves):
+        produto_id = cache_chaves.obter(chave)
+        if produto_id is not None:
+            encontrados[chave] = produto_id
+        else:
+            faltando.add(chave)
+
+    if faltando:
+        for produto_id, chave in db.query(Produto.id, Produto.chave).filter(
+            Produto.chave.in_(faltando)
+        ).all():
+            encontrados[chave] = produto_id
+            cache_chaves.guardar(chave, produto_id)
+        faltando -= set(encontrados)
+
+    # Chaves de produtos que foram mesclados em outro (consolidação)
+    if faltando:
+        for produto_id, chave in db.query(AliasProduto.produto_id, AliasProduto.chave).filter(
+            AliasProduto.chave.in_(faltando)
+        ).all():
+            encontrados[chave] = produto_id
+            cache_chaves.guardar(chave, produto_id)
+
+    return encontrados
+
+
+def buscar_ids_por_ean(db: Session, eans: Iterable[str]) -> Dict[str, int]:
+    """Resolve vários EANs (já normalizados) em um SELECT ... IN pelo índice único"""
+    eans = set(e for e in eans if e)
+    if not eans:
+        return {}
+
+    return {
+        ean: produto_id
+        for produto_id, ean in db.query(Produto.id, Produto.ean).filter(Produto.ean.in_(eans)).all()
+    }
+
+
+def criar_produtos(db: Session, produtos: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Cria vários produtos (dicts com nome, marca, categoria, chave e ean opcional) em um INSERT multi-linha
+
+    Usa ON CONFLICT DO NOTHING: se outro request criou a mesma chave (ou o mesmo EAN)
+    ao mesmo tempo, reaproveita o produto dele em vez de falhar.
+    Os ids criados aqui não vão para o LRU (a transação ainda pode ser desfeita).
+    """
+    mappings = [
+        {
+            "nome": p["nome"].strip(),
+            "marca": p.get("marca"),
+            "categoria": p.get("categoria"),
+            "chave": p["chave"],
+            "ean": p.get("ean"),
+            "data_criacao": datetime.now()
+        }
+        for p in produtos
+    ]
+    if not mappings:
+        return {}
+
+    # Insert Core na tabela: um único executemany, mesmo com colunas nulas em algumas linhas
+    db.execute(sqlite_insert(Produto.__table__).on_conflict_do_nothing(), mappings)
+
+    criados = dict(
+        (chave, produto_id)
+        for produto_id, chave in db.query(Produto.id, Produto.chave).filter(
+            Produto.chave.in_([m["chave"] for m in mappings])
+        ).all()
+    )
+
+    # Conflito pelo EAN: o produto existe com outro nome
+    por_ean = buscar_ids_por_ean(db, [m["ean"] for m in mappings if m["chave"] not in criados])
+    for m in mappings:
+        if m["chave"] not in criados and m["ean"] in por_ean:
+            criados[m["chave"]] = por_ean[m["ean"]]
+
+    return criados
+
+
+def resolver_produto(db: Session, nome: str, marca: Optional[str] = None,
+                     categoria: Optional[str] = None, criar: bool = True,
+                     ean: Optional[str] = None) -> Optional[Produto]:
+    """
+    Busca ou cria um produto pelo EAN (se houver) e depois pela chave canônica
+
+    As buscas usam os índices únicos de produtos.ean e produtos.chave (O(log n)),
+    com um LRU em memória na frente da chave.
+    """
+    ean = normalizar_ean(ean)
+    if ean:
+        produto = db.query(Produto).filter(Produto.ean == ean).first()
+        if produto is not None:
+            return produto
+
+    chave = gerar_chave_produto(nome, marca)
+
+    produto_id = buscar_ids_por_chave(db, [chave]).get(chave)
+    if produto_id is not None:
+        produto = db.get(Produto, produto_id)
+        if produto is not None:
+            if ean and not produto.ean:
+                produto.ean = ean
+            return produto
+        # Produto removido/mesclado: descartar entrada velha do cache
+        cache_chaves.remover([chave])
+
+    if not criar:
+        return None
+
+    produto_id = criar_produtos(db, [{
+        "nome": nome, "marca": marca, "categoria": categoria, "chave": chave, "ean": ean
+    }])[chave]
+
+    return db.get(Produto, produto_id)
@@ -0,0 +1,300 @@
+"""
+Fila de tarefas (Celery) para scraping, atualização de preços e OCR
+Com CELERY_BROKER_URL (ex.: redis://localhost:6379/1) as tarefas vão para a fila
+e rodam nos workers; a vazão cresce subindo workers, não réplicas da API:
+
+    celery -A app.utils.tarefas worker -Q scraping,ocr,atualizacao --concurrency=4
+    celery -A app.utils.tarefas beat  # atualização periódica de preços
+
+Sem CELERY_BROKER_URL (desenvolvimento e testes) as tarefas rodam na hora, no
+próprio processo (modo eager), sem Redis e sem worker.
+
+A atualização periódica (precos.atualizar_lote) busca nas FONTES_ATUALIZACAO
+(padrão: google_shopping e mercado_livre; configurável em ATUALIZACAO_FONTES).
+"""
+import base64
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+import requests
+from celery import Celery
+
+from app.models.database import SessionLocal, Produto
+from app.scrapers.saude_fontes import saude_fontes, FonteIndisponivel
+from app.utils.ingestao import IngestaoPrecos
+from app.utils.anomalias import DetectorAnomalias
+from app.utils.agenda_atualizacao import (
+    AgendadorAtualizacao, ORCAMENTO_POR_CICLO, INTERVALO_CICLO_SEGUNDOS, PARALELISMO
+)
+
+
+FILA_URL = os.getenv("CELERY_BROKER_URL")
+FILA_DISTRIBUIDA = bool(FILA_URL)
+
+RESULTADO_EXPIRA_SEGUNDOS = int(os.getenv("CELERY_RESULTADO_EXPIRA_SEGUNDOS", "3600"))
+
+# Prioridades (no Redis, 0 é a mais alta): usuário esperando > OCR > atualização de fundo
+PRIORIDADE_USUARIO = 0
+PRIORIDADE_OCR = 3
+PRIORIDADE_ATUALIZACAO = 9
+
+# Limite de tarefas por worker para cada fonte (formato do Celery: "10/m")
+LIMITES_POR_FONTE: Dict[str, str] = {
+    "google_shopping": "10/m",
+    "mercado_livre": "60/m",  # API oficial
+    "carrefour": "20/m",
+    "pao_acucar": "20/m",
+    "extra": "20/m",
+}
+
+# Fontes do ciclo de atualização: Google Shopping (a fonte da busca da API) e a API
+# oficial do Mercado Livre. Os scrapers diretos de HTML (carrefour, pao_acucar, extra)
+# costumam ser bloqueados: as tarefas deles existem, mas só entram no ciclo por aqui
+FONTES_ATUALIZACAO: List[str] = [
+    fonte.strip() for fonte in os.getenv("ATUALIZACAO_FONTES", "google_shopping,mercado_livre").split(",")
+    if fonte.strip()
+]
+_desconhecidas = set(FONTES_ATUALIZACAO) - set(LIMITES_POR_FONTE)
+if _desconhecidas:
+    raise ValueError(f"ATUALIZACAO_FONTES com fontes desconhecidas: {sorted(_desconhecidas)}")
+
+# Falhas passageiras (rede e timeout): nova tentativa com espera exponencial. As fontes
+# deixam esses erros subirem depois das próprias tentativas (BaseScraper._get_page,
+# MercadoLivreScraper); erro do scraper (RuntimeError do servico_navegadores, HTTP
+# 4xx/5xx) se repetiria igual. No modo eager o Celery repete na hora, ignorando a
+# espera: sem broker não há nova tentativa da tarefa
+ERROS_PASSAGEIROS = (
+    httpx.TransportError, requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError
+)
+OPCOES_RETENTATIVA = {
+    "autoretry_for": ERROS_PASSAGEIROS,
+    "retry_backoff": 2,
+    "retry_backoff_max": 300,
+    "retry_jitter": True,
+    "max_retries": 3 if FILA_DISTRIBUIDA else 0,
+}
+
+
+celery_app = Celery("comparador_precos")
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=RESULTADO_EXPIRA_SEGUNDOS,
+    task_default_queue="scraping",
+    task_default_priority=5,
+    task_routes={
+        "scraping.*": {"queue": "scraping"},
+        "ocr.*": {"queue": "ocr"},
+        "precos.*": {"queue": "atualizacao"},
+    },
+    timezone="America/Sao_Paulo",
+    beat_schedule={
+        # Ciclo curto com orçamento: os mais urgentes da agenda a cada INTERVALO_CICLO_SEGUNDOS
+        "atualizar-precos": {
+            "task": "precos.atualizar_lote",
+            "schedule": timedelta(seconds=INTERVALO_CICLO_SEGUNDOS),
+            "options": {"priority": PRIORIDADE_ATUALIZACAO, "expires": INTERVALO_CICLO_SEGUNDOS},
+        },
+    },
+)
+
+if FILA_DISTRIBUIDA:
+    celery_app.conf.update(
+        broker_url=FILA_URL,
+        result_backend=os.getenv("CELERY_RESULT_BACKEND", FILA_URL),
+        broker_transport_options={"queue_order_strategy": "priority", "priority_steps": list(range(10)), "sep": ":"},
+        task_acks_late=True,  # Worker que morre no meio devolve a tarefa para a fila
+        worker_prefetch_multiplier=1,  # Não segurar tarefas de prioridade baixa na frente das altas
+    )
+else:
+    celery_app.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        task_always_eager=True,
+        # Sem propagar na hora: o erro aparece no .get() de executar
+    )
+
+
+def executar(tarefa, *args, prioridade: int = 5, timeout: float = 120, **kwargs):
+    """Enfileira a tarefa e espera o resultado (eager: roda aqui mesmo)"""
+    return tarefa.apply_async(args=args, kwargs=kwargs, priority=prioridade).get(timeout=timeout)
+
+
+# ---------- Scraping ----------
+
+@celery_app.task(name="scraping.tempo_real")
+def buscar_tempo_real(termo: str, latitude: float = None, longitude: float = None) -> List[Dict]:
+    """
+    Busca sob demanda do /api/buscar (a gravação fica com a API)
+
+    Sem novas tentativas: o usuário está esperando (a espera exponencial passaria do
+    timeout da API) e as fontes do buscar_todos já tratam as próprias falhas.
+    """
+    from app.scrapers.scraper_tempo_real import scraper_tempo_real
+    return scraper_tempo_real.buscar_todos(
+        termo, max_por_fonte=10, lat_usuario=latitude, lon_usuario=longitude
+    )
+
+
+_scrapers: Dict = {}
+
+
+def _scraper(fonte: str):
+    if not _scrapers:
+        from app.scrapers.scraper_manager import ScraperManager
+        _scrapers.update(ScraperManager(usar_google=False).scrapers)
+        _scrapers.update(ScraperManager(usar_google=True).scrapers)
+    return _scrapers[fonte]
+
+
+def _ingerir_atualizacao(produto_id: int, resultados: List[Dict]) -> int:
+    """Grava os preços de uma fonte para o produto; devolve quantos preços novos entraram"""
+    db = SessionLocal()
+    try:
+        produto = db.get(Produto, produto_id)
+        if produto is None:
+            return 0
+
+        registros = [
+            {
+                'produto_id': produto.id,
+                'nome': produto.nome,
+                'supermercado': item['supermercado'],
+                'preco': item['preco'],
+                'em_promocao': item.get('em_promocao', False),
+                'url': item.get('url'),
+                'disponivel': item.get('disponivel', True),
+                'manual': False
+            }
+            for item in resultados
+        ]
+
+        # Só grava supermercados sem preço recente deste produto
+        ingestao = IngestaoPrecos(db).ingerir(
+            registros,
+            duplicata_por=("produto_id", "supermercado"),
+            duplicata_desde=datetime.now() - timedelta(hours=24)
+        )
+        db.commit()
+
+        if ingestao['total_novos']:
+            relatorio = DetectorAnomalias(db).detectar(produtos_ids=[produto.id])
+            db.commit()
+            if relatorio["anomalias"]:
+                print(f"   🚨 {relatorio['anomalias']} preços anômalos em {produto.nome}")
+        return ingestao['total_novos']
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _criar_tarefa_fonte(fonte: str):
+    """Uma tarefa por fonte: o rate_limit do Celery vale por tipo de tarefa"""
+
+    @celery_app.task(name=f"scraping.{fonte}", rate_limit=LIMITES_POR_FONTE[fonte], **OPCOES_RETENTATIVA)
+    def buscar_fonte(termo: str, produto_id: Optional[int] = None):
+        """
+        Busca o termo na fonte. Com produto_id (atualização), grava os preços e
+        devolve {"produto_id", "fonte", "encontrados", "novos"}; sem, devolve os produtos.
+        Fonte com disjuntor aberto não é chamada (resultado com "pulada"); erro de rede
+        da fonte sobe e a tarefa é repetida (OPCOES_RETENTATIVA).
+        """
+        try:
+            resultados = saude_fontes.chamar(fonte, _scraper(fonte).search, termo)
+        except FonteIndisponivel:
+            resultados = None  # Disjuntor aberto: nova tentativa agora só bateria na mesma fonte fora do ar
+        if produto_id is None:
+            return resultados or []
+        if resultados is None:
+            return {"produto_id": produto_id, "fonte": fonte, "encontrados": 0, "novos": 0, "pulada": True}
+        novos = _ingerir_atualizacao(produto_id, resultados) if resultados else 0
+        return {"produto_id": produto_id, "fonte": fonte, "encontrados": len(resultados), "novos": novos}
+
+    return buscar_fonte
+
+
+TAREFAS_POR_FONTE = {fonte: _criar_tarefa_fonte(fonte) for fonte in LIMITES_POR_FONTE}
+
+
+# ---------- Atualização de preços ----------
+
+@celery_app.task(name="precos.atualizar_lote")
+def atualizar_lote(orcamento: Optional[int] = None, fontes: Optional[List[str]] = None) -> Dict:
+    """
+    Um ciclo da agenda de atualização: os produtos mais urgentes (até o orçamento),
+    uma tarefa por produto e fonte, com prioridade baixa
+
+    Com broker as tarefas só são enfileiradas (o paralelismo é o dos workers); sem
+    broker rodam aqui, no máximo PARALELISMO ao mesmo tempo.
+    """
+    fontes = fontes or FONTES_ATUALIZACAO
+
+    db = SessionLocal()
+    try:
+        produtos = AgendadorAtualizacao(db).proximos(orcamento or ORCAMENTO_POR_CICLO)
+        db.commit()
+    finally:
+        db.close()
+
+    pedidos = [(fonte, nome, produto_id) for produto_id, nome in produtos for fonte in fontes]
+
+    def enfileirar(pedido):
+        fonte, nome, produto_id = pedido
+        return TAREFAS_POR_FONTE[fonte].apply_async(
+            args=(nome,), kwargs={"produto_id": produto_id}, priority=PRIORIDADE_ATUALIZACAO
+        )
+
+    if FILA_DISTRIBUIDA or len(pedidos) <= 1:
+        resultados = [enfileirar(pedido) for pedido in pedidos]
+    else:
+        with ThreadPoolExecutor(max_workers=PARALELISMO) as executor:
+            resultados = list(executor.map(enfileirar, pedidos))
+
+    resumo = {"produtos": len(produtos), "tarefas": len(pedidos)}
+    if not FILA_DISTRIBUIDA:
+        resumo["novos_precos"] = sum(
+            resultado.result["novos"] for resultado in resultados if resultado.successful()
+        )
+        resumo["falhas"] = sum(1 for resultado in resultados if not resultado.successful())
+    if produtos:
+        print(f"🔄 Atualização de preços: {resumo}")
+    return resumo
+
+
+# ---------- OCR ----------
+# Imagens viajam em base64 (o serializador é JSON). OCR local é determinístico:
+# repetir não ajuda, então só o híbrido (que chama APIs externas) tem nova tentativa
+
+def codificar_imagem(conteudo: bytes) -> str:
+    return base64.b64encode(conteudo).decode("ascii")
+
+
+@celery_app.task(name="ocr.nota_fiscal")
+def ocr_nota_fiscal(imagem_b64: str) -> Dict:
+    from app.utils.ocr_nota_fiscal import get_ocr_nota_fiscal
+    return get_ocr_nota_fiscal().processar_nota_fiscal(base64.b64decode(imagem_b64))
+
+
+@celery_app.task(name="ocr.foto_preco")
+def ocr_foto_preco(imagem_b64: str) -> Dict:
+    from app.utils.ocr import get_ocr_instance
+    return get_ocr_instance().extrair_de_imagem(base64.b64decode(imagem_b64))
+
+
+@celery_app.task(name="ocr.hibrido", **OPCOES_RETENTATIVA)
+def ocr_hibrido(imagem_b64: str, usuario_prefere_gratis: bool = True, usuario_tem_creditos_api: bool = False,
+                modo_forcado: Optional[str] = None) -> Dict:
+    """OCR híbrido (pode chamar APIs externas: falhas de rede têm nova tentativa)"""
+    from app.utils.ocr_hibrido import get_ocr_hibrido
+    return get_ocr_hibrido().processar_nota_fiscal(
+        imagem_bytes=base64.b64decode(imagem_b64),
+        usuario_prefere_gratis=usuario_prefere_gratis,
+        usuario_tem_creditos_api=usuario_tem_creditos_api,
+        modo_forcado=modo_forcado
+    )
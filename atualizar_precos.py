@@ -6,14 +6,16 @@ Executa scraping periódico para manter preços atualizados
 import sys
 import os
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
 
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.models.database import get_db, Produto, Preco
+from app.models.database import get_db
 from app.scrapers.scraper_manager import ScraperManager
+from app.utils.ingestao import IngestaoPrecos
+from app.utils.tarefas import atualizar_lote, FILA_DISTRIBUIDA
 
 # Configurar logging
 logging.basicConfig(
@@ -27,90 +29,42 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def atualizar_precos_produtos():
-    """Atualiza preços dos produtos mais buscados"""
+def atualizar_precos_produtos(max_ciclos: int = 50):
+    """
+    Atualiza os produtos vencidos na agenda de atualização por demanda
+
+    Roda ciclos (cada um com o orçamento da agenda, mais urgentes primeiro) até
+    não sobrar produto vencido ou chegar a max_ciclos
+    """
     logger.info("="*60)
     logger.info(f"🔄 Iniciando atualização de preços - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("="*60)
 
-    db = next(get_db())
-    scraper_manager = ScraperManager()
-
-    # Buscar produtos com preços desatualizados (mais de 24h)
-    data_limite = datetime.now() - timedelta(hours=24)
-
-    try:
-        # Pegar os 20 produtos mais recentes/buscados
-        produtos = db.query(Produto).join(Preco).filter(
-            Preco.data_coleta < data_limite
-        ).group_by(Produto.id).limit(20).all()
-
-        if not produtos:
-            logger.info("✅ Nenhum produto precisa de atualização no momento")
-            return
+    total_produtos = 0
+    total_novos_precos = 0
 
-        logger.info(f"📦 Encontrados {len(produtos)} produtos para atualizar")
+    for ciclo in range(1, max_ciclos + 1):
+        resumo = atualizar_lote()
+        if not resumo['produtos']:
+            break
 
-        total_atualizados = 0
-        total_novos_precos = 0
-
-        for produto in produtos:
-            logger.info(f"🔍 Atualizando: {produto.nome}...")
-
-            try:
-                # Fazer scraping do produto
-                resultados = scraper_manager.search_all(
-                    termo=produto.nome,
-                    supermercados=None
-                )
-
-                if resultados:
-                    for item in resultados:
-                        # Verificar se já existe preço recente deste supermercado
-                        preco_existente = db.query(Preco).filter(
-                            Preco.produto_id == produto.id,
-                            Preco.supermercado == item['supermercado'],
-                            Preco.data_coleta >= data_limite
-                        ).first()
-
-                        if not preco_existente:
-                            # Adicionar novo preço
-                            novo_preco = Preco(
-                                produto_id=produto.id,
-                                supermercado=item['supermercado'],
-                                preco=item['preco'],
-                                em_promocao=item.get('em_promocao', False),
-                                url=item.get('url'),
-                                disponivel=item.get('disponivel', True),
-                                data_coleta=datetime.now(),
-                                manual=False
-                            )
-                            db.add(novo_preco)
-                            total_novos_precos += 1
-                            logger.info(f"  ✅ {item['supermercado']}: R$ {item['preco']:.2f}")
-
-                    total_atualizados += 1
-                    db.commit()
-                else:
-                    logger.warning(f"  ⚠️  Nenhum resultado encontrado para {produto.nome}")
+        total_produtos += resumo['produtos']
+        total_novos_precos += resumo.get('novos_precos', 0)
+        logger.info(f"📦 Ciclo {ciclo}: {resumo['produtos']} produtos, {resumo['tarefas']} tarefas")
 
-            except Exception as e:
-                logger.error(f"  ❌ Erro ao atualizar {produto.nome}: {str(e)}")
-                db.rollback()
-                continue
+    if not total_produtos:
+        logger.info("✅ Nenhum produto precisa de atualização no momento")
+        return
 
-        logger.info("="*60)
-        logger.info("📊 Resumo da Atualização:")
-        logger.info(f"   • Produtos atualizados: {total_atualizados}")
+    logger.info("="*60)
+    logger.info("📊 Resumo da Atualização:")
+    logger.info(f"   • Produtos atualizados: {total_produtos}")
+    if not FILA_DISTRIBUIDA:
         logger.info(f"   • Novos preços adicionados: {total_novos_precos}")
-        logger.info(f"   • Concluído em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info("="*60)
-
-    except Exception as e:
-        logger.error(f"❌ Erro fatal na atualização de preços: {str(e)}")
-        raise
-    finally:
-        db.close()
+    else:
+        logger.info("   • Tarefas enfileiradas para os workers do Celery")
+    logger.info(f"   • Concluído em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("="*60)
 
 
 def atualizar_produtos_principais():
@@ -143,35 +97,27 @@ def atualizar_produtos_principais():
                 resultados = scraper_manager.search_all(termo=termo, supermercados=None)
 
                 if resultados:
-                    for item in resultados[:3]:  # Top 3 resultados por termo
-                        # Buscar ou criar produto
-                        produto = db.query(Produto).filter(
-                            Produto.nome.ilike(f"%{item['nome'][:50]}%")
-                        ).first()
-
-                        if not produto:
-                            produto = Produto(
-                                nome=item['nome'],
-                                marca=item.get('marca'),
-                                categoria='basicos'
-                            )
-                            db.add(produto)
-                            db.flush()
-
-                        # Adicionar preço
-                        novo_preco = Preco(
-                            produto_id=produto.id,
-                            supermercado=item['supermercado'],
-                            preco=item['preco'],
-                            em_promocao=item.get('em_promocao', False),
-                            url=item.get('url'),
-                            disponivel=item.get('disponivel', True),
-                            data_coleta=datetime.now(),
-                            manual=False
-                        )
-                        db.add(novo_preco)
-                        total_precos += 1
-                        logger.info(f"  ✅ {item['nome'][:40]} - {item['supermercado']}: R$ {item['preco']:.2f}")
+                    registros = [
+                        {
+                            'nome': item['nome'],
+                            'marca': item.get('marca'),
+                            'categoria': 'basicos',
+                            'supermercado': item['supermercado'],
+                            'preco': item['preco'],
+                            'em_promocao': item.get('em_promocao', False),
+                            'url': item.get('url'),
+                            'disponivel': item.get('disponivel', True),
+                            'manual': False
+                        }
+                        for item in resultados[:3]  # Top 3 resultados por termo
+                    ]
+
+                    # Busca ou cria produtos pela chave canônica e grava os preços em lote
+                    ingestao = IngestaoPrecos(db).ingerir(registros)
+                    total_precos += ingestao['total_novos']
+
+                    for registro in registros:
+                        logger.info(f"  ✅ {registro['nome'][:40]} - {registro['supermercado']}: R$ {registro['preco']:.2f}")
 
                     db.commit()
                 else:
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Script de consolidação de produtos quase duplicados
+Ex: "ARROZ TIO JOAO 5KG", "Arroz Tio João 5 kg", "ARROZ T.JOAO 5KG"
+
+Uso:
+    python consolidar_produtos.py propor --saida propostas.json
+    (revise o arquivo e marque "aprovada": true nas propostas corretas)
+    python consolidar_produtos.py aplicar propostas.json
+"""
+import sys
+import os
+import json
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.models.database import SessionLocal, init_db
+from app.utils.consolidacao_produtos import ConsolidadorProdutos
+
+
+def propor(saida: str, aprovar_todas: bool = False):
+    """Gera propostas de mesclagem em um arquivo JSON"""
+    db = SessionLocal()
+    try:
+        propostas = ConsolidadorProdutos(db).propor_mesclagens()
+    finally:
+        db.close()
+
+    if aprovar_todas:
+        for proposta in propostas:
+            proposta["aprovada"] = True
+
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(propostas, f, ensure_ascii=False, indent=2)
+
+    total_mesclar = sum(len(p["mesclar"]) for p in propostas)
+    print(f"✅ {len(propostas)} grupos encontrados ({total_mesclar} produtos a mesclar)")
+    for proposta in propostas[:20]:
+        nomes = ", ".join(item["nome"] for item in proposta["mesclar"])
+        print(f"   #{proposta['sobrevivente_id']} {proposta['sobrevivente_nome']}  <-  {nomes}")
+    print(f"\n📄 Propostas salvas em {saida}")
+
+
+def aplicar(arquivo: str):
+    """Aplica as propostas aprovadas do arquivo JSON"""
+    with open(arquivo, encoding="utf-8") as f:
+        propostas = json.load(f)
+
+    db = SessionLocal()
+    try:
+        resultado = ConsolidadorProdutos(db).aplicar_mesclagens(propostas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"✅ Produtos mesclados: {resultado['produtos_mesclados']}")
+    print(f"   Preços reapontados: {resultado['precos_atualizados']}")
+    print(f"   Alertas reapontados: {resultado['alertas_atualizados']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Consolidar produtos quase duplicados (MinHash/LSH)')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_propor = sub.add_parser('propor', help='Gerar propostas de mesclagem')
+    p_propor.add_argument('--saida', default='propostas_mesclagem.json')
+    p_propor.add_argument('--aprovar-todas', action='store_true', help='Marcar todas as propostas como aprovadas')
+
+    p_aplicar = sub.add_parser('aplicar', help='Aplicar propostas aprovadas')
+    p_aplicar.add_argument('arquivo')
+
+    args = parser.parse_args()
+    init_db()
+
+    if args.comando == 'propor':
+        propor(args.saida, args.aprovar_todas)
+    else:
+        aplicar(args.arquivo)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Job de detecção de preços anômalos (z-score robusto por produto/supermercado/semana)
+Marca as anomalias como indisponíveis e não verificadas e gera um relatório
+
+Uso:
+    python detectar_anomalias.py                   # últimos 28 dias, marca as anomalias
+    python detectar_anomalias.py --simular         # só o relatório, sem marcar
+    python detectar_anomalias.py --json rel.json   # salva o relatório em JSON
+"""
+import json
+import sys
+
+from app.models.database import SessionLocal
+from app.utils.anomalias import DetectorAnomalias
+
+
+def detectar(simular: bool = False, arquivo_json: str = None):
+    db = SessionLocal()
+    try:
+        relatorio = DetectorAnomalias(db).detectar(aplicar=not simular)
+        db.commit()
+
+        print(f"📊 {relatorio['analisados']} preços analisados "
+              f"({relatorio['avaliados']} com grupo suficiente) em {relatorio['segundos']}s")
+
+        if relatorio["anomalias"]:
+            acao = "encontradas (simulação)" if simular else "marcadas como indisponíveis"
+            print(f"🚨 {relatorio['anomalias']} anomalias {acao}")
+            for supermercado, total in relatorio["por_supermercado"].items():
+                print(f"   {supermercado}: {total}")
+            print("\nPiores casos:")
+            for exemplo in relatorio["exemplos"]:
+                print(f"   #{exemplo['preco_id']} {exemplo['produto']} @ {exemplo['supermercado']}: "
+                      f"R$ {exemplo['preco']:.2f} (z={exemplo['z']})")
+        else:
+            print("✅ Nenhuma anomalia encontrada")
+
+        if arquivo_json:
+            with open(arquivo_json, "w", encoding="utf-8") as f:
+                json.dump(relatorio, f, ensure_ascii=False, indent=2)
+            print(f"\n💾 Relatório salvo em {arquivo_json}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    arquivo = sys.argv[sys.argv.index("--json") + 1] if "--json" in sys.argv else None
+    detectar(simular="--simular" in sys.argv, arquivo_json=arquivo)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script para criar a agenda de atualização por demanda (agenda_atualizacao) e
+agendar os produtos existentes pela idade do preço mais novo
+"""
+from app.models.database import engine, SessionLocal, AgendaAtualizacao, Produto
+from app.utils.agenda_atualizacao import AgendadorAtualizacao
+
+
+LOTE = 500
+
+
+def migrar():
+    AgendaAtualizacao.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Tabela 'agenda_atualizacao' criada")
+
+    db = SessionLocal()
+    try:
+        ids = [produto_id for (produto_id,) in db.query(Produto.id).order_by(Produto.id)]
+        agendador = AgendadorAtualizacao(db)
+        for inicio in range(0, len(ids), LOTE):
+            agendador.agendar(ids[inicio:inicio + LOTE])
+            db.commit()
+        print(f"✅ {len(ids)} produtos agendados")
+
+        resumo = agendador.resumo()
+        print(f"   • Vencidos agora: {resumo['vencidos']}")
+        print(f"   • Sem preço (entram no próximo ciclo): {resumo['sem_data']}")
+    finally:
+        db.close()
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
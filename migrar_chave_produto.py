@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar a chave canônica em produtos (produtos.chave)
+e preencher a chave dos produtos já cadastrados
+
+Pode rodar de novo quando a regra da chave mudar (ex: "sem açúcar" deixou de
+cair na mesma chave de "com açúcar"): as chaves são recalculadas.
+"""
+from app.models.database import engine, SessionLocal, Produto
+from app.utils.produtos import gerar_chave_produto
+from sqlalchemy import text
+
+
+def migrar():
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN chave TEXT"))
+            print("✅ Coluna 'chave' adicionada")
+        except Exception as e:
+            if "duplicate column name" in str(e).lower():
+                print("ℹ️  Coluna 'chave' já existe")
+            else:
+                print(f"❌ Erro ao adicionar 'chave': {e}")
+
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_produtos_chave ON produtos(chave)"))
+        print("✅ Índice único 'ix_produtos_chave' criado")
+        conn.commit()
+
+    # Preencher (ou recalcular, se a regra da chave mudou) as chaves
+    # O produto mais antigo fica com a chave; repetidos ficam sem
+    db = SessionLocal()
+    try:
+        produtos = db.query(Produto).order_by(Produto.id).all()
+        novas = {}
+        usadas = set()
+        repetidos = []
+        for produto in produtos:
+            chave = gerar_chave_produto(produto.nome, produto.marca)
+            if chave in usadas:
+                repetidos.append(produto)
+                chave = None
+            else:
+                usadas.add(chave)
+            novas[produto.id] = chave
+
+        alterados = [produto for produto in produtos if produto.chave != novas[produto.id]]
+
+        # Em duas etapas, para o índice único não reclamar de troca de chaves entre produtos
+        for produto in alterados:
+            produto.chave = None
+        db.flush()
+        for produto in alterados:
+            produto.chave = novas[produto.id]
+
+        db.commit()
+        print(f"✅ {len(alterados)} produtos com chave preenchida ou recalculada")
+
+        if repetidos:
+            print(f"⚠️  {len(repetidos)} produtos repetidos ficaram sem chave:")
+            for produto in repetidos[:20]:
+                print(f"   #{produto.id} {produto.nome}")
+    finally:
+        db.close()
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
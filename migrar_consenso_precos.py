@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script para criar o consenso de preços (precos_consenso), o contador de
+aprovações dos preços (precos.validacoes_aprovadas) e preencher os dois
+"""
+from app.models.database import engine, SessionLocal, PrecoConsenso
+from app.utils.consenso import ConsensoPrecos
+from sqlalchemy import text
+
+
+def migrar():
+    PrecoConsenso.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Tabela 'precos_consenso' criada")
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE precos ADD COLUMN validacoes_aprovadas INTEGER NOT NULL DEFAULT 0"))
+            print("✅ Coluna 'validacoes_aprovadas' adicionada")
+        except Exception as e:
+            if "duplicate column name" in str(e).lower():
+                print("ℹ️  Coluna 'validacoes_aprovadas' já existe")
+            else:
+                print(f"❌ Erro ao adicionar 'validacoes_aprovadas': {e}")
+
+        conn.execute(text("""
+            UPDATE precos SET validacoes_aprovadas = (
+                SELECT COUNT(*) FROM validacoes_precos v WHERE v.preco_id = precos.id AND v.aprovado = 1
+            )
+        """))
+        print("✅ Contador de aprovações preenchido")
+        conn.commit()
+
+    # Consenso a partir dos preços recentes
+    db = SessionLocal()
+    try:
+        total = ConsensoPrecos(db).reconstruir()
+        db.commit()
+        print(f"✅ Consenso calculado com {total} preços")
+    finally:
+        db.close()
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar os contadores de votos em comentários (likes/dislikes)
+e preenchê-los a partir da tabela votos_comentarios
+"""
+from app.models.database import engine
+from sqlalchemy import text
+
+
+def migrar():
+    with engine.connect() as conn:
+        for coluna in ("likes", "dislikes"):
+            try:
+                conn.execute(text(f"ALTER TABLE comentarios ADD COLUMN {coluna} INTEGER NOT NULL DEFAULT 0"))
+                print(f"✅ Coluna '{coluna}' adicionada")
+            except Exception as e:
+                if "duplicate column name" in str(e).lower():
+                    print(f"ℹ️  Coluna '{coluna}' já existe")
+                else:
+                    print(f"❌ Erro ao adicionar '{coluna}': {e}")
+
+        # Recontar a partir dos votos (pode ser rodado de novo para corrigir divergências)
+        conn.execute(text("""
+            UPDATE comentarios SET
+                likes = (SELECT COUNT(*) FROM votos_comentarios v
+                         WHERE v.comentario_id = comentarios.id AND v.tipo = 'like'),
+                dislikes = (SELECT COUNT(*) FROM votos_comentarios v
+                            WHERE v.comentario_id = comentarios.id AND v.tipo = 'dislike')
+        """))
+        print("✅ Contadores preenchidos")
+
+        conn.commit()
+        print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
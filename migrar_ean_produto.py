@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar o código de barras em produtos (produtos.ean)
+"""
+from app.models.database import engine
+from sqlalchemy import text
+
+
+def migrar():
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN ean TEXT"))
+            print("✅ Coluna 'ean' adicionada")
+        except Exception as e:
+            if "duplicate column name" in str(e).lower():
+                print("ℹ️  Coluna 'ean' já existe")
+            else:
+                print(f"❌ Erro ao adicionar 'ean': {e}")
+
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_produtos_ean ON produtos(ean)"))
+        print("✅ Índice único 'ix_produtos_ean' criado")
+        conn.commit()
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
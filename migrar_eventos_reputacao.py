@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script para criar o livro de eventos de reputação (eventos_reputacao)
+
+A reputação atual de cada carteira vira um evento de saldo inicial, para que o
+histórico reproduza os valores de hoje (ver aplicar_eventos_reputacao.py --recalcular)
+"""
+from app.models.database import engine, EventoReputacao, Contador
+from sqlalchemy import text
+
+
+def migrar():
+    Contador.__table__.create(bind=engine, checkfirst=True)
+    EventoReputacao.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Tabela 'eventos_reputacao' criada")
+
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT COUNT(*) FROM eventos_reputacao")).scalar():
+            print("ℹ️  Livro de eventos já preenchido")
+            return
+
+        conn.execute(text("""
+            INSERT INTO eventos_reputacao (usuario_nome, pontos, motivo, data_criacao)
+            SELECT usuario_nome, COALESCE(reputacao, 100) - 100, 'Saldo inicial (migração)', CURRENT_TIMESTAMP
+            FROM carteiras
+            WHERE COALESCE(reputacao, 100) != 100
+            ORDER BY id
+        """))
+
+        # Os eventos de saldo inicial já estão refletidos nas carteiras
+        conn.execute(text("""
+            INSERT INTO contadores (chave, valor, data_atualizacao)
+            VALUES ('reputacao.ultimo_evento', (SELECT COALESCE(MAX(id), 0) FROM eventos_reputacao), CURRENT_TIMESTAMP)
+            ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor
+        """))
+
+        total = conn.execute(text("SELECT COUNT(*) FROM eventos_reputacao")).scalar()
+        conn.commit()
+        print(f"✅ {total} eventos de saldo inicial registrados")
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar desconto e economia em preços (precos.desconto_percentual,
+precos.economia), o índice de ofertas e a tabela do ranking (ofertas_destaque)
+"""
+from app.models.database import engine, SessionLocal, OfertaDestaque
+from app.utils.ofertas import RankingOfertas
+from sqlalchemy import text
+
+
+def migrar():
+    with engine.connect() as conn:
+        for coluna in ("desconto_percentual", "economia"):
+            try:
+                conn.execute(text(f"ALTER TABLE precos ADD COLUMN {coluna} FLOAT NOT NULL DEFAULT 0"))
+                print(f"✅ Coluna '{coluna}' adicionada")
+            except Exception as e:
+                if "duplicate column name" in str(e).lower():
+                    print(f"ℹ️  Coluna '{coluna}' já existe")
+                else:
+                    print(f"❌ Erro ao adicionar '{coluna}': {e}")
+
+        # Mesmo cálculo de calcular_desconto (app/utils/ofertas.py)
+        conn.execute(text("""
+            UPDATE precos SET
+                desconto_percentual = ROUND((preco_original - preco) / preco_original * 100, 1),
+                economia = ROUND(preco_original - preco, 2)
+            WHERE preco_original > preco
+        """))
+        print("✅ Desconto e economia preenchidos")
+
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_precos_ofertas
+            ON precos(em_promocao, disponivel, desconto_percentual)
+        """))
+        print("✅ Índice 'ix_precos_ofertas' criado")
+
+        conn.commit()
+
+    OfertaDestaque.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Tabela 'ofertas_destaque' criada")
+
+    db = SessionLocal()
+    try:
+        total = RankingOfertas(db).reconstruir()
+        db.commit()
+        print(f"✅ Ranking de ofertas montado ({total} posições)")
+    finally:
+        db.close()
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar o score de anomalia em preços (precos.score_anomalia)
+"""
+from app.models.database import engine
+from sqlalchemy import text
+
+
+def migrar():
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE precos ADD COLUMN score_anomalia FLOAT"))
+            print("✅ Coluna 'score_anomalia' adicionada")
+        except Exception as e:
+            if "duplicate column name" in str(e).lower():
+                print("ℹ️  Coluna 'score_anomalia' já existe")
+            else:
+                print(f"❌ Erro ao adicionar 'score_anomalia': {e}")
+
+        conn.commit()
+        print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
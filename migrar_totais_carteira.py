@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar os totais do livro de transações nas carteiras
+(total_minerado, total_gasto, total_transacoes) e preenchê-los
+"""
+from app.models.database import engine
+from sqlalchemy import text
+
+from reconciliar_carteiras import reconciliar
+
+
+def migrar():
+    colunas = {
+        "total_minerado": "REAL NOT NULL DEFAULT 0",
+        "total_gasto": "REAL NOT NULL DEFAULT 0",
+        "total_transacoes": "INTEGER NOT NULL DEFAULT 0",
+    }
+
+    with engine.connect() as conn:
+        for coluna, tipo in colunas.items():
+            try:
+                conn.execute(text(f"ALTER TABLE carteiras ADD COLUMN {coluna} {tipo}"))
+                print(f"✅ Coluna '{coluna}' adicionada")
+            except Exception as e:
+                if "duplicate column name" in str(e).lower():
+                    print(f"ℹ️  Coluna '{coluna}' já existe")
+                else:
+                    print(f"❌ Erro ao adicionar '{coluna}': {e}")
+        conn.commit()
+
+    # Preencher a partir das transações existentes
+    reconciliar()
+
+    print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
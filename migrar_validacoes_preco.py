@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar o contador de validações em preços (precos.total_validacoes)
+e o índice da fila de validação
+"""
+from app.models.database import engine
+from sqlalchemy import text
+
+
+def migrar():
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE precos ADD COLUMN total_validacoes INTEGER NOT NULL DEFAULT 0"))
+            print("✅ Coluna 'total_validacoes' adicionada")
+        except Exception as e:
+            if "duplicate column name" in str(e).lower():
+                print("ℹ️  Coluna 'total_validacoes' já existe")
+            else:
+                print(f"❌ Erro ao adicionar 'total_validacoes': {e}")
+
+        # Recontar a partir das validações (pode ser rodado de novo para corrigir divergências)
+        conn.execute(text("""
+            UPDATE precos SET total_validacoes = (
+                SELECT COUNT(*) FROM validacoes_precos v WHERE v.preco_id = precos.id
+            )
+            WHERE manual = 1
+        """))
+        print("✅ Contador preenchido")
+
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_precos_fila_validacao
+            ON precos(manual, total_validacoes, data_coleta)
+        """))
+        print("✅ Índice 'ix_precos_fila_validacao' criado")
+
+        conn.commit()
+        print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
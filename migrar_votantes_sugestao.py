@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar o contador de votantes em sugestões (sugestoes.total_votantes)
+e a tabela de contadores globais
+"""
+from app.models.database import engine, Contador
+from sqlalchemy import text
+
+
+def migrar():
+    # Tabela de contadores (é preenchida sob demanda no primeiro uso)
+    Contador.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Tabela 'contadores' criada")
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE sugestoes ADD COLUMN total_votantes INTEGER NOT NULL DEFAULT 0"))
+            print("✅ Coluna 'total_votantes' adicionada")
+        except Exception as e:
+            if "duplicate column name" in str(e).lower():
+                print("ℹ️  Coluna 'total_votantes' já existe")
+            else:
+                print(f"❌ Erro ao adicionar 'total_votantes': {e}")
+
+        conn.execute(text("""
+            UPDATE sugestoes SET total_votantes = (
+                SELECT COUNT(DISTINCT v.usuario_nome) FROM votos v WHERE v.sugestao_id = sugestoes.id
+            )
+        """))
+        print("✅ Contador de votantes preenchido")
+
+        # Recalcular o total de carteiras no próximo uso
+        conn.execute(text("DELETE FROM contadores WHERE chave = 'total_carteiras'"))
+
+        conn.commit()
+        print("\n✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Job de recálculo das estatísticas materializadas
+Recalcula todos os contadores (contribuições, DAO, economia) a partir das tabelas
+
+Uso:
+    python recalcular_estatisticas.py
+"""
+from app.models.database import SessionLocal, Contador, engine
+from app.utils.estatisticas import EstatisticasMaterializadas
+
+
+def recalcular():
+    # Tabela de contadores (caso o banco seja anterior a ela)
+    Contador.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        valores = EstatisticasMaterializadas(db).recalcular()
+        db.commit()
+        print(f"✅ {len(valores)} estatísticas recalculadas")
+        for chave in sorted(valores):
+            if chave != EstatisticasMaterializadas.RECALCULADO_EM:
+                print(f"   {chave}: {valores[chave]:g}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    recalcular()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Job de reconciliação dos totais das carteiras
+Recalcula total_minerado, total_gasto e total_transacoes a partir das transações
+
+Uso:
+    python reconciliar_carteiras.py
+"""
+from app.models.database import SessionLocal
+from app.utils.crypto_manager import CryptoManager
+
+
+def reconciliar():
+    db = SessionLocal()
+    try:
+        resultado = CryptoManager(db).reconciliar_totais()
+        db.commit()
+
+        if resultado["carteiras_corrigidas"]:
+            print(f"⚠️  {resultado['carteiras_corrigidas']} carteiras divergentes corrigidas:")
+            for usuario in resultado["usuarios"][:20]:
+                print(f"   {usuario}")
+        else:
+            print("✅ Todas as carteiras estão consistentes")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reconciliar()
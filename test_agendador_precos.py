@@ -28,9 +28,9 @@ def test_agendador():
     print("="*60 + "\n")
 
     try:
-        # Iniciar o agendador (a cada 7 horas)
+        # Iniciar o agendador (ciclos da agenda de atualização por demanda)
         logger.info("Iniciando agendador...")
-        price_updater.start(interval_hours=7)
+        price_updater.start()
 
         # Verificar se está rodando
         if price_updater.running:
@@ -51,7 +51,7 @@ def test_agendador():
             price_updater.atualizar_precos()
 
             logger.info("\n✅ Teste concluído com sucesso!")
-            logger.info("💡 O agendador continuará rodando e atualizará os preços a cada 7 horas.")
+            logger.info("💡 O agendador continuará rodando e atualizará os produtos vencidos a cada ciclo.")
             logger.info("⚠️  Para usar em produção, inicie a aplicação FastAPI normalmente.")
 
         else:
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Teste do detector de preços anômalos (app.utils.anomalias.DetectorAnomalias)
+
+MAD zero (grupo todo igual ou quase), grupos pequenos caindo para a estatística
+do produto e anomalias saindo do ranking de ofertas. Roda em um banco SQLite
+temporário (não toca no precos.db).
+
+Uso:
+    python test_anomalias.py
+    python -m pytest test_anomalias.py
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, Produto, Preco, OfertaDestaque
+from app.utils.anomalias import DetectorAnomalias
+from app.utils.ofertas import RankingOfertas, calcular_desconto
+
+
+pasta = None
+engine_teste = None
+SessionTeste = None
+
+
+def setup_module(module=None):
+    global pasta, engine_teste, SessionTeste
+    pasta = tempfile.mkdtemp()
+    engine_teste = create_engine(f"sqlite:///{os.path.join(pasta, 'teste.db')}")
+    SessionTeste = sessionmaker(autocommit=False, autoflush=False, bind=engine_teste)
+    Base.metadata.create_all(bind=engine_teste)
+
+
+def teardown_module(module=None):
+    engine_teste.dispose()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+def tabela(*linhas, dia=2460000.0):
+    """DataFrame no formato do carregar: (produto_id, supermercado, preco) na mesma semana"""
+    return pd.DataFrame([
+        {"id": i + 1, "produto_id": produto_id, "supermercado": loja, "preco": preco, "dia": dia}
+        for i, (produto_id, loja, preco) in enumerate(linhas)
+    ])
+
+
+def test_grupo_todo_igual_nao_tem_anomalia():
+    scores = DetectorAnomalias(None).pontuar(tabela(*[(1, "carrefour", 10.0)] * 10))
+    assert (scores["z"] == 0).all()
+
+
+def test_mad_zero_ainda_pega_o_preco_fora():
+    # 9 de 10 preços iguais: MAD = 0, cai para o desvio médio absoluto
+    scores = DetectorAnomalias(None).pontuar(tabela(*[(1, "carrefour", 10.0)] * 9, (1, "carrefour", 1.0)))
+    assert abs(scores["z"].iloc[-1]) > DetectorAnomalias.LIMIAR
+    assert (scores["z"].iloc[:-1] == 0).all()
+
+
+def test_grupo_pequeno_usa_o_produto():
+    # 4 + 5 preços por loja (grupos < 8), 9 no produto; produto 2 com 5 preços não é avaliado
+    precos = tabela(
+        (1, "carrefour", 10.0), (1, "carrefour", 10.2), (1, "carrefour", 9.8), (1, "carrefour", 10.1),
+        (1, "extra", 9.9), (1, "extra", 10.3), (1, "extra", 10.0), (1, "extra", 9.7), (1, "extra", 1.0),
+        *[(2, "extra", 5.0)] * 5
+    )
+    scores = DetectorAnomalias(None).pontuar(precos)
+
+    assert abs(scores["z"].iloc[8]) > DetectorAnomalias.LIMIAR
+    assert (scores["z"].iloc[:8].abs() < DetectorAnomalias.LIMIAR).all()
+    assert np.isnan(scores["z"].iloc[9:]).all()
+
+
+def test_anomalia_sai_das_buscas_e_do_ranking_de_ofertas():
+    db = SessionTeste()
+    try:
+        produto = Produto(nome="Arroz Tio João 5kg")
+        db.add(produto)
+        db.flush()
+
+        precos = [Preco(produto_id=produto.id, supermercado="carrefour", preco=p)
+                  for p in (25.0, 24.9, 25.5, 24.5, 25.2, 24.8, 25.1, 25.3)]
+        promocao = Preco(produto_id=produto.id, supermercado="carrefour", preco=22.9,
+                         preco_original=25.0, em_promocao=True)
+        erro = Preco(produto_id=produto.id, supermercado="carrefour", preco=2.5,
+                     preco_original=25.0, em_promocao=True)
+        for preco in (promocao, erro):
+            preco.desconto_percentual, preco.economia = calcular_desconto(preco.preco, preco.preco_original)
+        db.add_all(precos + [promocao, erro])
+        db.flush()
+
+        RankingOfertas(db).registrar([
+            {"id": p.id, "supermercado": p.supermercado, "em_promocao": True,
+             "desconto_percentual": p.desconto_percentual, "data_coleta": p.data_coleta}
+            for p in (promocao, erro)
+        ])
+        db.commit()
+
+        relatorio = DetectorAnomalias(db).detectar()
+        db.commit()
+
+        assert relatorio["anomalias"] == 1
+        assert relatorio["exemplos"][0]["preco_id"] == erro.id
+        db.refresh(erro)
+        assert erro.disponivel is False and erro.score_anomalia < -DetectorAnomalias.LIMIAR
+        assert {pid for pid, in db.query(OfertaDestaque.preco_id)} == {promocao.id}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🧪 TESTANDO DETECTOR DE ANOMALIAS\n")
+    setup_module()
+    try:
+        for nome, teste in list(globals().items()):
+            if nome.startswith("test_") and callable(teste):
+                teste()
+                print(f"✅ {nome}")
+    finally:
+        teardown_module()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Teste da chave canônica de produtos (app.utils.produtos.gerar_chave_produto)
+
+Mesmo produto escrito de jeitos diferentes cai na mesma chave; produtos
+opostos ("com açúcar" / "sem açúcar") não.
+
+Uso:
+    python test_chave_produto.py
+    python -m pytest test_chave_produto.py
+"""
+from app.utils.produtos import gerar_chave_produto, tokens_nome
+
+
+def test_mesmo_produto_mesma_chave():
+    assert gerar_chave_produto("Arroz Tio João 5 kg") == gerar_chave_produto("ARROZ TIO JOAO 5KG")
+    assert gerar_chave_produto("Leite Integral 1L") == gerar_chave_produto("Leite Integral 1 litro")
+    assert gerar_chave_produto("Leite Doce de Leite 400g") != gerar_chave_produto("Leite 400g")
+
+
+def test_com_e_sem_acucar_sao_produtos_diferentes():
+    assert gerar_chave_produto("Iogurte Natural com Açúcar 170g") != \
+        gerar_chave_produto("Iogurte Natural sem Açúcar 170g")
+
+
+def test_abreviacoes_c_e_s_barra():
+    assert gerar_chave_produto("Achocolatado c/ açúcar 400g") != gerar_chave_produto("Achocolatado s/ açúcar 400g")
+    assert gerar_chave_produto("Achocolatado s/ açúcar 400g") == gerar_chave_produto("ACHOCOLATADO SEM ACUCAR 400G")
+    assert gerar_chave_produto("Achocolatado c/ açúcar 400g") == gerar_chave_produto("Achocolatado com Açúcar 400g")
+
+
+def test_negacao_presa_a_palavra_seguinte():
+    assert tokens_nome("Leite s/ Lactose 1L") == ["leite", "sem_lactose"]
+    assert tokens_nome("Biscoito sem de Glúten") == ["biscoito", "sem_gluten"]
+    assert tokens_nome("Refrigerante Sem") == ["refrigerante", "sem"]
+
+
+if __name__ == "__main__":
+    print("🧪 TESTANDO CHAVE CANÔNICA DE PRODUTOS\n")
+    for nome, teste in list(globals().items()):
+        if nome.startswith("test_") and callable(teste):
+            teste()
+            print(f"✅ {nome}")
+    print("\n✅ Todos os testes passaram!")
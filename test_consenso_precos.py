@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Teste do estimador P² do consenso de preços (app.utils.consenso.EstimadorP2)
+
+Os marcadores têm que acompanhar a mediana com pesos fracionários (reputação
+baixa) e depois do esquecimento, que encolhe as posições.
+
+Uso:
+    python test_consenso_precos.py
+    python -m pytest test_consenso_precos.py
+"""
+import random
+
+from app.utils.consenso import EstimadorP2
+
+
+def test_pesos_inteiros():
+    random.seed(7)
+    estimador = EstimadorP2()
+    for _ in range(2000):
+        estimador.adicionar(random.gauss(100, 10))
+    assert abs(estimador.quantil(0.5) - 100) < 1.5
+    assert abs(estimador.quantil(0.25) - 93.3) < 1.5
+    assert abs(estimador.quantil(0.75) - 106.7) < 1.5
+
+
+def test_pesos_fracionarios():
+    # Reputação <= 10: peso 0.1 por preço
+    estimador = EstimadorP2()
+    for _ in range(5):
+        estimador.adicionar(10.0, peso=0.1)
+    for _ in range(30):
+        estimador.adicionar(20.0, peso=0.1)
+    assert abs(estimador.quantil(0.5) - 20) < 1
+
+
+def test_esquecimento():
+    estimador = EstimadorP2()
+    for _ in range(5):
+        estimador.adicionar(10.0, peso=0.5)
+    for _ in range(30):
+        estimador.esquecer(0.9)
+        estimador.adicionar(20.0, peso=0.5)
+    assert abs(estimador.quantil(0.5) - 20) < 1
+
+
+def test_esquecimento_forte_acompanha_mudanca_de_preco():
+    # Massa total perto de 3: passo 1 congelaria os quartis nos preços antigos
+    random.seed(3)
+    estimador = EstimadorP2()
+    for _ in range(200):
+        estimador.esquecer(0.7)
+        estimador.adicionar(random.uniform(0, 100))
+    for _ in range(200):
+        estimador.esquecer(0.7)
+        estimador.adicionar(random.uniform(200, 300))
+    assert estimador.quantil(0.25) > 150
+    assert 200 < estimador.quantil(0.5) < 300
+
+
+def test_pesos_misturados_com_esquecimento():
+    random.seed(11)
+    estimador = EstimadorP2()
+    for _ in range(2000):
+        estimador.esquecer(0.99)
+        estimador.adicionar(random.gauss(100, 10), peso=random.choice([0.1, 1.0, 2.0]))
+    assert abs(estimador.quantil(0.5) - 100) < 3
+
+
+if __name__ == "__main__":
+    print("🧪 TESTANDO ESTIMADOR P² DO CONSENSO\n")
+    for nome, teste in list(globals().items()):
+        if nome.startswith("test_") and callable(teste):
+            teste()
+            print(f"✅ {nome}")
+    print("\n✅ Todos os testes passaram!")
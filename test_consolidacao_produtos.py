@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Teste da consolidação de produtos quase duplicados (app.utils.consolidacao_produtos)
+
+Agrupamento MinHash/LSH (tamanho e negação bloqueiam a mesclagem) e aplicação
+das propostas: cadeias resolvidas, preços, alertas, aliases, EAN e agenda
+passando para o sobrevivente. Roda em um banco SQLite temporário (não toca no precos.db).
+
+Uso:
+    python test_consolidacao_produtos.py
+    python -m pytest test_consolidacao_produtos.py
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, Produto, Preco, Alerta, AliasProduto, AgendaAtualizacao
+from app.utils.consolidacao_produtos import ConsolidadorProdutos
+from app.utils.produtos import gerar_chave_produto
+
+
+pasta = None
+engine_teste = None
+SessionTeste = None
+
+
+def setup_module(module=None):
+    global pasta, engine_teste, SessionTeste
+    pasta = tempfile.mkdtemp()
+    engine_teste = create_engine(f"sqlite:///{os.path.join(pasta, 'teste.db')}")
+    SessionTeste = sessionmaker(autocommit=False, autoflush=False, bind=engine_teste)
+    Base.metadata.create_all(bind=engine_teste)
+
+
+def teardown_module(module=None):
+    engine_teste.dispose()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+def agrupar(*nomes):
+    """Grupos pelos nomes (ids = posição + 1)"""
+    grupos = ConsolidadorProdutos(None).encontrar_grupos(
+        [{"id": i + 1, "nome": nome} for i, nome in enumerate(nomes)]
+    )
+    return [[nomes[pid - 1] for pid in grupo] for grupo in grupos]
+
+
+def criar_produto(db, nome, ean=None):
+    produto = Produto(nome=nome, chave=gerar_chave_produto(nome), ean=ean)
+    db.add(produto)
+    db.flush()
+    return produto.id
+
+
+def proposta(sobrevivente_id, *ids):
+    return {"sobrevivente_id": sobrevivente_id, "mesclar": [{"id": pid} for pid in ids], "aprovada": True}
+
+
+def test_variacoes_de_escrita_sao_agrupadas():
+    assert agrupar("Arroz Tio João 5 kg", "ARROZ TIO JOAO 5KG", "Arroz Tio Joao Tipo 1 5kg") == [
+        ["Arroz Tio João 5 kg", "ARROZ TIO JOAO 5KG", "Arroz Tio Joao Tipo 1 5kg"]
+    ]
+
+
+def test_tamanhos_diferentes_nao_mesclam():
+    assert agrupar("Arroz Tio João 1kg", "Arroz Tio João 5kg") == []
+
+
+def test_com_e_sem_acucar_nao_mesclam():
+    assert agrupar(
+        "Iogurte Natural com Açúcar 170g", "Iogurte Natural sem Açúcar 170g",
+        "Iogurte Natural c/ Açúcar 170g", "Iogurte Natural s/ Açúcar 170g"
+    ) == [
+        ["Iogurte Natural com Açúcar 170g", "Iogurte Natural c/ Açúcar 170g"],
+        ["Iogurte Natural sem Açúcar 170g", "Iogurte Natural s/ Açúcar 170g"],
+    ]
+
+
+def test_propostas_aprovadas_movem_tudo_para_o_sobrevivente():
+    db = SessionTeste()
+    try:
+        a = criar_produto(db, "Feijão Carioca Camil 1kg", ean="7896006711117")
+        b = criar_produto(db, "FEIJAO CARIOCA CAMIL T1 1 KG")
+        c = criar_produto(db, "Feijao Carioca Camil Tipo 1 1kg")
+        chaves_removidas = {pid: db.get(Produto, pid).chave for pid in (a, b)}
+
+        db.add_all([
+            Preco(produto_id=a, supermercado="carrefour", preco=8.0),
+            Preco(produto_id=b, supermercado="extra", preco=8.5),
+            Alerta(produto_id=a, preco_alvo=7.0),
+            AgendaAtualizacao(produto_id=a, buscas=2.0, data_ultima_busca=datetime.now()),
+            AgendaAtualizacao(produto_id=b, buscas=3.0, data_ultima_busca=datetime.now()),
+        ])
+        db.commit()
+
+        # Cadeia A -> B -> C: tudo termina em C
+        resultado = ConsolidadorProdutos(db).aplicar_mesclagens([proposta(b, a), proposta(c, b)])
+        db.commit()
+
+        assert resultado == {"produtos_mesclados": 2, "precos_atualizados": 2, "alertas_atualizados": 1}
+        assert db.query(Produto.id).filter(Produto.id.in_([a, b])).count() == 0
+        assert {pid for pid, in db.query(Preco.produto_id)} == {c}
+        assert {pid for pid, in db.query(Alerta.produto_id)} == {c}
+        assert dict(db.query(AliasProduto.chave, AliasProduto.produto_id)) == {
+            chaves_removidas[a]: c, chaves_removidas[b]: c
+        }
+        assert db.get(Produto, c).ean == "7896006711117"
+
+        agenda = db.query(AgendaAtualizacao).all()
+        assert [linha.produto_id for linha in agenda] == [c]
+        assert abs(agenda[0].buscas - 5.0) < 0.01
+    finally:
+        db.close()
+
+
+def test_propostas_nao_aprovadas_sao_ignoradas():
+    db = SessionTeste()
+    try:
+        a = criar_produto(db, "Óleo de Soja Liza 900ml")
+        b = criar_produto(db, "OLEO SOJA LIZA REFINADO 900 ML")
+        db.commit()
+
+        nao_aprovada = dict(proposta(a, b), aprovada=False)
+        resultado = ConsolidadorProdutos(db).aplicar_mesclagens([nao_aprovada])
+
+        assert resultado["produtos_mesclados"] == 0
+        assert db.query(Produto.id).filter(Produto.id.in_([a, b])).count() == 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🧪 TESTANDO CONSOLIDAÇÃO DE PRODUTOS\n")
+    setup_module()
+    try:
+        for nome, teste in list(globals().items()):
+            if nome.startswith("test_") and callable(teste):
+                teste()
+                print(f"✅ {nome}")
+    finally:
+        teardown_module()
+    print("\n✅ Todos os testes passaram!")
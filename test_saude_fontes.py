@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Teste da saúde das fontes (app.scrapers.saude_fontes.SaudeFontes)
+
+Disjuntor fechado -> aberto -> meio-aberto -> fechado, resposta vazia separada
+de falha e fonte fora do ar abrindo o disjuntor pelo ScraperManager.search_all
+(contra um servidor HTTP local; sem rede externa).
+
+Uso:
+    python test_saude_fontes.py
+    python -m pytest test_saude_fontes.py
+"""
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+
+from app.scrapers.base import BaseScraper
+from app.scrapers.cliente_http import registro_http
+from app.scrapers.motor_async import FontesFalharam
+from app.scrapers.saude_fontes import SaudeFontes, FECHADO, ABERTO, MEIO_ABERTO, ESPERA_ABERTO_SEGUNDOS
+from app.scrapers.scraper_apis import ScraperAPIs
+from app.scrapers.scraper_manager import ScraperManager
+
+
+class Relogio:
+    """time.monotonic controlado pelo teste"""
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+
+class PaginaLocal(BaseHTTPRequestHandler):
+    """/vazio: 200 sem produtos; /produtos: 200 com um produto; resto: 503"""
+
+    def do_GET(self):
+        if self.path.startswith("/vazio"):
+            self._responder(200, "<html><body>Nenhum resultado</body></html>")
+        elif self.path.startswith("/produtos"):
+            self._responder(200, '<html><body><div class="produto">Arroz 5kg</div></body></html>')
+        else:
+            self._responder(503, "fora do ar")
+
+    def _responder(self, status, corpo):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(corpo.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class ScraperLocal(BaseScraper):
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+
+    def get_supermercado_name(self):
+        return "local"
+
+    def search(self, termo):
+        # Mesmo formato de carrefour/extra/pao_acucar
+        soup = self._get_page(f"{self.url}?q={termo}", retries=1)
+        if not soup:
+            return []
+        return [{"nome": div.get_text(), "preco": 1.0} for div in soup.select("div.produto")]
+
+
+servidor = None
+
+
+def setup_module(module=None):
+    global servidor
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), PaginaLocal)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+
+def teardown_module(module=None):
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def porta_fechada() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def buscar_varias_vezes(url, vezes):
+    """search_all com uma só fonte, contra uma SaudeFontes nova, sem cache HTTP nem limite por host"""
+    saude = SaudeFontes()
+    manager = ScraperManager()
+    manager.scrapers = {"local": ScraperLocal(url)}
+    with mock.patch("app.scrapers.scraper_manager.saude_fontes", saude), \
+            mock.patch("app.scrapers.cliente_http.CACHE_ATIVO", False), \
+            mock.patch.object(registro_http, "balde"):
+        resultados = [manager.search_all("arroz") for _ in range(vezes)]
+    return saude.resumo()["local"], resultados
+
+
+def falhar(saude, fonte, vezes):
+    for _ in range(vezes):
+        saude.registrar(fonte, False, 1.0)
+
+
+def test_falhas_seguidas_abrem_o_disjuntor():
+    saude = SaudeFontes()
+    falhar(saude, "fonte", SaudeFontes.FALHAS_SEGUIDAS_MAXIMAS - 1)
+    assert saude.permitir("fonte")
+
+    falhar(saude, "fonte", 1)
+    assert saude.resumo()["fonte"]["estado"] == ABERTO
+    assert not saude.permitir("fonte")
+    assert saude.resumo()["fonte"]["puladas"] == 1
+
+
+def test_taxa_de_sucesso_baixa_abre():
+    saude = SaudeFontes()
+    for _ in range(2):
+        saude.registrar("fonte", True, 1.0)
+        falhar(saude, "fonte", 2)
+    assert saude.resumo()["fonte"]["estado"] == FECHADO  # 2 sucessos em 6
+
+    falhar(saude, "fonte", 2)  # 2 em 8: abaixo de TAXA_SUCESSO_MINIMA, com só 4 falhas seguidas
+    assert saude.resumo()["fonte"]["estado"] == ABERTO
+
+
+def test_meio_aberto_deixa_uma_sonda_e_fecha_com_sucesso():
+    relogio = Relogio()
+    with mock.patch("app.scrapers.saude_fontes.time", relogio):
+        saude = SaudeFontes()
+        falhar(saude, "fonte", SaudeFontes.FALHAS_SEGUIDAS_MAXIMAS)
+        assert not saude.permitir("fonte")
+
+        relogio.agora += ESPERA_ABERTO_SEGUNDOS
+        assert saude.permitir("fonte")  # Sonda
+        assert saude.resumo()["fonte"]["estado"] == MEIO_ABERTO
+        assert not saude.permitir("fonte")  # Só uma por vez
+
+        saude.registrar("fonte", True, 1.0)
+        resumo = saude.resumo()["fonte"]
+        assert resumo["estado"] == FECHADO
+        assert resumo["chamadas_na_janela"] == 1 and resumo["taxa_sucesso"] == 1.0
+        assert saude.permitir("fonte")
+
+
+def test_sonda_com_falha_reabre_com_o_dobro_da_espera():
+    relogio = Relogio()
+    with mock.patch("app.scrapers.saude_fontes.time", relogio):
+        saude = SaudeFontes()
+        falhar(saude, "fonte", SaudeFontes.FALHAS_SEGUIDAS_MAXIMAS)
+        relogio.agora += ESPERA_ABERTO_SEGUNDOS
+        assert saude.permitir("fonte")
+
+        falhar(saude, "fonte", 1)
+        assert saude.resumo()["fonte"]["estado"] == ABERTO
+        assert saude.resumo()["fonte"]["reabre_em_segundos"] == 2 * ESPERA_ABERTO_SEGUNDOS
+
+        relogio.agora += ESPERA_ABERTO_SEGUNDOS
+        assert not saude.permitir("fonte")
+        relogio.agora += ESPERA_ABERTO_SEGUNDOS
+        assert saude.permitir("fonte")
+
+
+def test_resposta_vazia_nao_e_falha():
+    saude = SaudeFontes()
+    for _ in range(20):
+        assert saude.chamar("fonte", lambda: []) == []
+    resumo = saude.resumo()["fonte"]
+    assert resumo["estado"] == FECHADO
+    assert resumo["vazias"] == 20 and resumo["falhas_seguidas"] == 0 and resumo["chamadas_na_janela"] == 0
+
+    with pytest.raises(ValueError):
+        saude.chamar("fonte", lambda: int("x"))
+    assert saude.resumo()["fonte"]["falhas_seguidas"] == 1
+
+
+def test_sonda_vazia_libera_outra_sonda():
+    relogio = Relogio()
+    with mock.patch("app.scrapers.saude_fontes.time", relogio):
+        saude = SaudeFontes()
+        falhar(saude, "fonte", SaudeFontes.FALHAS_SEGUIDAS_MAXIMAS)
+        relogio.agora += ESPERA_ABERTO_SEGUNDOS
+        assert saude.permitir("fonte")
+
+        saude.registrar_vazia("fonte")
+        assert saude.resumo()["fonte"]["estado"] == MEIO_ABERTO
+        assert saude.permitir("fonte")
+
+
+def test_timeout_adaptativo_com_piso():
+    saude = SaudeFontes()
+    assert saude.timeout("fonte", 90) == 90  # Poucas amostras: padrão
+    for _ in range(SaudeFontes.MINIMO_CHAMADAS):
+        saude.registrar("fonte", True, 2.0)
+    assert saude.timeout("fonte", 90) == 3.0  # p95 2s x 1.5
+    assert saude.timeout("fonte", 90, minimo=45) == 45
+
+
+def test_fonte_fora_do_ar_abre_o_disjuntor_no_search_all():
+    resumo, resultados = buscar_varias_vezes(f"http://127.0.0.1:{porta_fechada()}/", 7)
+    assert resultados == [[]] * 7
+    assert resumo["estado"] == ABERTO
+    assert resumo["falhas_seguidas"] == SaudeFontes.FALHAS_SEGUIDAS_MAXIMAS
+    assert resumo["vazias"] == 0 and resumo["puladas"] == 2
+
+
+def test_http_fora_de_2xx_e_falha():
+    resumo, _ = buscar_varias_vezes(f"http://127.0.0.1:{servidor.server_port}/erro", 1)
+    assert resumo["falhas_seguidas"] == 1 and resumo["vazias"] == 0
+
+
+def test_resposta_2xx_sem_produtos_e_vazia():
+    resumo, resultados = buscar_varias_vezes(f"http://127.0.0.1:{servidor.server_port}/vazio", 6)
+    assert resultados == [[]] * 6
+    assert resumo["estado"] == FECHADO
+    assert resumo["vazias"] == 6 and resumo["falhas_seguidas"] == 0
+
+    resumo, resultados = buscar_varias_vezes(f"http://127.0.0.1:{servidor.server_port}/produtos", 1)
+    assert len(resultados[0]) == 1 and resumo["taxa_sucesso"] == 1.0
+
+
+def test_apis_todas_fora_do_ar_levantam_falha():
+    execucao = {"resultados": {}, "falhas": {"mercadolivre_api": "HTTP 503"}, "segundos": 0.1}
+    with mock.patch("app.scrapers.scraper_apis.motor_scraping.executar", return_value=execucao):
+        with pytest.raises(FontesFalharam):
+            ScraperAPIs().buscar_todos("arroz")
+
+    execucao = {"resultados": {"mercadolivre_api": []}, "falhas": {"shopee_api": "HTTP 503"}, "segundos": 0.1}
+    with mock.patch("app.scrapers.scraper_apis.motor_scraping.executar", return_value=execucao):
+        assert ScraperAPIs().buscar_todos("arroz") == []
+
+
+if __name__ == "__main__":
+    print("🧪 TESTANDO SAÚDE DAS FONTES (DISJUNTOR)\n")
+    setup_module()
+    try:
+        for nome, teste in list(globals().items()):
+            if nome.startswith("test_") and callable(teste):
+                teste()
+                print(f"✅ {nome}")
+    finally:
+        teardown_module()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Teste da unidade de trabalho: cada requisição faz um único commit
+
+CryptoManager e ReputacaoManager não fazem commit; o endpoint faz um só no final.
+Roda em um banco SQLite temporário (não toca no precos.db).
+
+Uso:
+    python test_unidade_trabalho.py
+    python -m pytest test_unidade_trabalho.py
+"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.main import app
+from app.models.database import Base, get_db, Carteira, Sugestao, StatusSugestao
+from app.utils.crypto_manager import CryptoManager
+
+
+pasta = None
+engine_teste = None
+SessionTeste = None
+client = None
+commits = []
+
+
+def get_db_teste():
+    db = SessionTeste()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def setup_module(module=None):
+    """Banco temporário e override do get_db só enquanto os testes deste arquivo rodam"""
+    global pasta, engine_teste, SessionTeste, client
+    pasta = tempfile.mkdtemp()
+    engine_teste = create_engine(
+        f"sqlite:///{os.path.join(pasta, 'teste.db')}", connect_args={"check_same_thread": False}
+    )
+    SessionTeste = sessionmaker(autocommit=False, autoflush=False, bind=engine_teste)
+    Base.metadata.create_all(bind=engine_teste)
+    event.listen(engine_teste, "commit", lambda conn: commits.append(1))
+
+    app.dependency_overrides[get_db] = get_db_teste
+    client = TestClient(app)
+
+
+def teardown_module(module=None):
+    app.dependency_overrides.pop(get_db, None)
+    engine_teste.dispose()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+def contar_commits(metodo, url, **kwargs):
+    """Executa a requisição e retorna (resposta, número de commits)"""
+    commits.clear()
+    resposta = getattr(client, metodo)(url, **kwargs)
+    assert resposta.status_code == 200, resposta.text
+    return resposta, len(commits)
+
+
+def preparar_usuarios(*usuarios, tokens=50):
+    db = SessionTeste()
+    try:
+        for usuario in usuarios:
+            CryptoManager(db).minerar_tokens(usuario, quantidade=tokens)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_contribuir_um_commit():
+    # Recompensa + validação automática (com reputação) na mesma transação
+    for preco in (10.0, 10.5, 9.8):
+        _, total = contar_commits("post", "/api/contribuir", json={
+            "produto_nome": "Arroz Tio João 5kg",
+            "supermercado": "Supermercado Teste",
+            "preco": preco,
+            "usuario_nome": "contribuidor"
+        })
+        assert total == 1
+
+
+def test_nota_fiscal_um_commit_para_varios_produtos():
+    nota = {
+        "sucesso": True,
+        "supermercado": "Mercado da Nota",
+        "produtos": [{"nome": f"Produto {i} 1kg", "preco": 5.0 + i, "quantidade": 1} for i in range(10)]
+    }
+    resposta, total = contar_commits("post", "/api/escanear-nota-fiscal", data={
+        "usuario_nome": "leitor_nota",
+        "dados_manuais": json.dumps(nota)
+    })
+    assert resposta.json()["total_produtos"] == 10
+    assert total == 1
+
+
+def test_comentario_e_voto_um_commit():
+    resposta, total = contar_commits("post", "/api/dao/comentarios", json={
+        "usuario_nome": "autor", "conteudo": "Sugestão de melhoria"
+    })
+    assert total == 1
+
+    comentario_id = resposta.json()["id"]
+    resposta, total = contar_commits(
+        "post", f"/api/dao/comentarios/{comentario_id}/votar",
+        params={"usuario_nome": "leitor", "tipo": "like"}
+    )
+    assert resposta.json()["likes"] == 1
+    assert total == 1
+
+
+def test_sugestao_e_voto_um_commit():
+    preparar_usuarios("proponente", "votante")
+
+    resposta, total = contar_commits("post", "/api/dao/sugestoes", json={
+        "usuario_nome": "proponente",
+        "titulo": "Nova funcionalidade",
+        "descricao": "Descrição da nova funcionalidade"
+    })
+    assert total == 1
+
+    db = SessionTeste()
+    try:
+        sugestao = db.get(Sugestao, resposta.json()["id"])
+        sugestao.status = StatusSugestao.EM_VOTACAO
+        db.commit()
+        sugestao_id = sugestao.id
+    finally:
+        db.close()
+
+    # Débito de tokens + voto + reputação do votante
+    _, total = contar_commits("post", "/api/dao/votar", json={
+        "sugestao_id": sugestao_id, "usuario_nome": "votante", "tokens_usados": 4, "voto_favor": True
+    })
+    assert total == 1
+
+
+def saldo(usuario):
+    db = SessionTeste()
+    try:
+        return db.query(Carteira.saldo).filter(Carteira.usuario_nome == usuario).scalar()
+    finally:
+        db.close()
+
+
+def test_busca_cobrada_mesmo_com_falha_no_scraping():
+    preparar_usuarios("buscador")
+    antes = saldo("buscador")
+    saldo_durante_scraping = []
+
+    def scraping_quebrado(*args, **kwargs):
+        # Outra conexão: só vê o débito se ele já foi confirmado antes do scraping
+        saldo_durante_scraping.append(saldo("buscador"))
+        raise RuntimeError("scraper fora do ar")
+
+    with mock.patch("app.api.main.executar", side_effect=scraping_quebrado):
+        resposta, _ = contar_commits("post", "/api/buscar", params={"usuario_nome": "buscador"}, json={
+            "termo": "arroz"
+        })
+
+    assert resposta.json()["tokens"]["tokens_gastos"] == CryptoManager.CUSTO_BUSCA
+    assert saldo_durante_scraping == [antes - CryptoManager.CUSTO_BUSCA]
+    assert saldo("buscador") == antes - CryptoManager.CUSTO_BUSCA
+
+
+if __name__ == "__main__":
+    print("🧪 TESTANDO UNIDADE DE TRABALHO (1 commit por requisição)\n")
+    setup_module()
+    try:
+        for nome, teste in list(globals().items()):
+            if nome.startswith("test_") and callable(teste):
+                teste()
+                print(f"✅ {nome}")
+    finally:
+        teardown_module()
+    print("\n✅ Todos os testes passaram!")